@@ -0,0 +1,481 @@
+"""
+Benchmarks for Claudius hot paths.
+Generates synthetic trees in a temporary directory, times scanning, tree
+queries, the reducer and rendering on each, and records peak memory.
+Results can be saved as a JSON baseline and later runs compared against it.
+
+Usage:
+    python benchmarks/bench.py                        # 1k, 10k and 100k nodes
+    python benchmarks/bench.py --sizes 1000,1000000   # up to a million nodes
+    python benchmarks/bench.py --output baseline.json
+    python benchmarks/bench.py --baseline baseline.json --threshold 0.25
+    python benchmarks/bench.py --imports --bench scan # cold-start import budgets
+    python benchmarks/bench.py --bench session,compact_session  # compact tree memory
+
+Baselines are only comparable on the machine that recorded them.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+# Run from a checkout without installing
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from claudius.models.compact_tree import CompactTree  # noqa: E402
+from claudius.models.file_system import load_prune_matcher, scan_filesystem  # noqa: E402
+from claudius.models.state import ActionType, get_initial_state, reducer  # noqa: E402
+from claudius.utils.calculations import (  # noqa: E402
+    get_all_descendants, get_inclusion_state, get_visible_items)
+
+RESULTS_VERSION = 1
+DEFAULT_SIZES = [1000, 10000, 100000]
+SHAPES = ["wide", "deep", "monorepo"]
+
+# Regressions smaller than this many seconds are treated as noise
+DEFAULT_NOISE_FLOOR = 0.002
+
+# Selection moves per reducer run
+MOVES = 1000
+
+# Terminal size for the render benchmark
+SCREEN = (120, 50)
+
+EXTENSIONS = [".py", ".ts", ".md", ".json", ".txt", ".js"]
+
+# Cold-start import budgets: the headless commands and the UI
+IMPORT_BUDGETS_MS = {"claudius.cli": 250, "claudius.views.app": 1000}
+
+# Bench name -> (setup(root, edges, folders) -> run)
+Bench = Callable[[str, dict, set], Callable[[], object]]
+
+
+def _touch(path: str) -> None:
+    """Create an empty file."""
+    open(path, "w").close()
+
+
+def _makedirs(path: str) -> int:
+    """Create a folder and any missing parents; return how many were created."""
+    missing = []
+    while not os.path.isdir(path):
+        missing.append(path)
+        path = os.path.dirname(path)
+    for folder in reversed(missing):
+        os.mkdir(folder)
+    return len(missing)
+
+
+def make_wide(root: str, size: int) -> int:
+    """Create about sqrt(size) folders of sqrt(size) files each; return the node count."""
+    side = max(1, int(size ** 0.5))
+    count = 0
+    for i in range(side):
+        folder = os.path.join(root, f"dir{i:04}")
+        os.mkdir(folder)
+        count += 1
+        for j in range(min(side, size - count)):
+            _touch(os.path.join(folder, f"file{j:04}{EXTENSIONS[j % len(EXTENSIONS)]}"))
+            count += 1
+        if count >= size:
+            break
+    return count
+
+
+def make_deep(root: str, size: int, depth: int = 100, files: int = 4) -> int:
+    """Create chains of nested folders with a few files at every level; return the node count."""
+    count = 0
+    chain = 0
+    while count < size:
+        folder = os.path.join(root, f"chain{chain}")
+        for level in range(depth):
+            os.mkdir(folder)
+            count += 1
+            for j in range(files):
+                _touch(os.path.join(folder, f"f{j}.py"))
+                count += 1
+            if count >= size:
+                break
+            folder = os.path.join(folder, f"level{level}")
+        chain += 1
+    return count
+
+
+def make_monorepo(root: str, size: int, seed: int = 0) -> int:
+    """Create packages with source, test and docs trees plus pruned folders; return the node count."""
+    rng = random.Random(seed)
+    count = 0
+
+    # Version control and dependency folders that the scan prunes
+    for pruned in (".git/objects", "node_modules/left-pad"):
+        os.makedirs(os.path.join(root, pruned))
+        _touch(os.path.join(root, pruned, "blob"))
+    for name in ("README.md", "package.json", ".gitignore"):
+        _touch(os.path.join(root, name))
+        count += 1
+
+    package = 0
+    while count < size:
+        top = ("packages", "services", "tools")[package % 3]
+        base = os.path.join(root, top, f"pkg{package:04}")
+        count += _makedirs(base)
+        for name in ("README.md", "package.json"):
+            _touch(os.path.join(base, name))
+            count += 1
+        for part, files in (("src", 30), ("tests", 12), ("docs", 5)):
+            for module in range(rng.randint(1, 6)):
+                folder = os.path.join(base, part, *(f"mod{module}_{level}"
+                                                     for level in range(rng.randint(1, 4))))
+                count += _makedirs(folder)
+                for j in range(rng.randint(1, files)):
+                    ext = EXTENSIONS[rng.randrange(len(EXTENSIONS))]
+                    _touch(os.path.join(folder, f"{part}_{j}{ext}"))
+                    count += 1
+                if count >= size:
+                    return count
+        package += 1
+    return count
+
+
+MAKERS = {"wide": make_wide, "deep": make_deep, "monorepo": make_monorepo}
+
+
+def load_state(edges: dict, folders: set, expanded: bool = True):
+    """Build the app state the UI would have after loading the tree."""
+    return reducer(get_initial_state(), {
+        "type": ActionType.LOAD_DATA,
+        "edges": edges,
+        "folders": folders,
+        "included_paths": set(),
+        "selected_item": next(iter(edges.get("", [])), None),
+        "expanded_folders": folders if expanded else set(),
+    })
+
+
+def _largest_top_folder(edges: dict) -> str:
+    """Return the top-level entry with the most descendants."""
+    return max(edges.get("", []), key=lambda path: len(get_all_descendants(edges, path)))
+
+
+def bench_scan(root: str, edges: dict, folders: set) -> Callable[[], object]:
+    """Full scan of the tree with the default pruning."""
+    prune = load_prune_matcher(root)
+    return lambda: scan_filesystem(root, prune=prune)
+
+
+def bench_descendants(root: str, edges: dict, folders: set) -> Callable[[], object]:
+    """Collect every node under the root."""
+    return lambda: get_all_descendants(edges, "")
+
+
+def bench_visible(root: str, edges: dict, folders: set) -> Callable[[], object]:
+    """List the visible rows of a fully expanded tree from scratch."""
+    state = load_state(edges, folders)
+    return lambda: get_visible_items(state.update(visible_rows=None))
+
+
+def bench_toggle_include(root: str, edges: dict, folders: set) -> Callable[[], object]:
+    """Recursively include, then exclude, the largest top-level folder."""
+    state = load_state(edges, folders)
+    action = {"type": ActionType.TOGGLE_INCLUDE, "path": _largest_top_folder(edges)}
+    return lambda: reducer(reducer(state, action), action)
+
+
+def bench_move_selection(root: str, edges: dict, folders: set) -> Callable[[], object]:
+    """Move the selection down MOVES times through a fully expanded tree."""
+    state = load_state(edges, folders)
+    get_visible_items(state)  # The UI has the rows before the first key press
+    action = {"type": ActionType.MOVE_SELECTION, "direction": "down"}
+
+    def run():
+        current = state
+        for _ in range(MOVES):
+            current = reducer(current, action)
+        return current
+    return run
+
+
+def bench_render(root: str, edges: dict, folders: set) -> Callable[[], object]:
+    """Render one full screen of a fully expanded tree."""
+    from textual.app import App
+    from claudius.views.file_tree import FileTree
+
+    state = load_state(edges, folders)
+    rows = get_visible_items(state)
+    # Select a row in the middle, as deep in the tree as rows get
+    state = state.update(selected_item=rows[len(rows) // 2])
+
+    class RenderApp(App):
+        def compose(self):
+            yield FileTree()
+
+    def run():
+        async def render():
+            app = RenderApp()
+            async with app.run_test(size=SCREEN) as pilot:
+                tree = app.query_one(FileTree)
+                tree.update_from_state(state)
+                await pilot.pause()
+                start = time.perf_counter()
+                for y in range(tree.size.height):
+                    tree.render_line(y)
+                return time.perf_counter() - start
+        return asyncio.run(render())
+    run.timed_inside = True
+    return run
+
+
+def _session(state, path: str) -> object:
+    """Draw a screen of rows, toggle a folder and draw them again, as FileTree would."""
+    rows = state.get_visible_rows().paths[:SCREEN[1]]
+    for row in rows:
+        get_inclusion_state(state, row)
+    state = reducer(state, {"type": ActionType.TOGGLE_INCLUDE, "path": path})
+    for row in rows:
+        get_inclusion_state(state, row)
+    return state
+
+
+def bench_session(root: str, edges: dict, folders: set) -> Callable[[], object]:
+    """Load the tree collapsed, draw the first screen and toggle a folder."""
+    top = _largest_top_folder(edges)
+    return lambda: _session(load_state(edges, folders, expanded=False), top)
+
+
+def bench_compact_session(root: str, edges: dict, folders: set) -> Callable[[], object]:
+    """The session benchmark on the compact tree, whose memory should stay below the dict tree's."""
+    top = _largest_top_folder(edges)
+    tree = CompactTree.from_edges(edges, folders)
+    return lambda: _session(load_state(tree.edges, tree.folders, expanded=False), top)
+
+
+BENCHES: Dict[str, Bench] = {
+    "scan": bench_scan,
+    "descendants": bench_descendants,
+    "visible_items": bench_visible,
+    "toggle_include": bench_toggle_include,
+    "move_selection": bench_move_selection,
+    "render": bench_render,
+    "session": bench_session,
+    "compact_session": bench_compact_session,
+}
+
+
+def measure(run: Callable[[], object], repeat: int) -> Tuple[float, int]:
+    """
+    Time a benchmark and record its peak memory.
+
+    Args:
+        run: Benchmark body; returns its own duration if run.timed_inside
+        repeat: Timed runs; the fastest counts
+
+    Returns:
+        Tuple of (seconds, peak traced bytes)
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = run()
+        elapsed = result if getattr(run, "timed_inside", False) else time.perf_counter() - start
+        best = min(best, elapsed)
+        del result
+
+    # Tracing slows everything down, so memory gets a run of its own
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def import_times(module: str) -> Dict[str, float]:
+    """Import module in a fresh interpreter and return {module: cumulative ms}."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+def run_imports(repeat: int) -> Tuple[Dict[str, Dict[str, float]], List[str]]:
+    """
+    Time a cold import of each module in IMPORT_BUDGETS_MS.
+
+    Args:
+        repeat: Fresh interpreters per module; the fastest counts
+
+    Returns:
+        Tuple of results keyed "import/<module>" and one message per
+        module over its budget
+    """
+    results, over = {}, []
+    for module, budget in IMPORT_BUDGETS_MS.items():
+        ms = min(import_times(module)[module] for _ in range(max(1, repeat)))
+        key = f"import/{module}"
+        results[key] = {"seconds": ms / 1000, "peak_bytes": 0, "nodes": 0}
+        print(f"{key:40} {ms:10.2f} ms (budget {budget} ms)", flush=True)
+        if ms > budget:
+            over.append(f"{key}: {ms:.0f} ms, budget {budget} ms")
+    return results, over
+
+
+def run_benchmarks(sizes: List[int], shapes: List[str], benches: List[str],
+                   repeat: int) -> Dict[str, Dict[str, float]]:
+    """
+    Generate each tree and run the selected benchmarks on it.
+
+    Returns:
+        Map of "shape/size/bench" to {"seconds", "peak_bytes", "nodes"}
+    """
+    results = {}
+    for shape in shapes:
+        for size in sizes:
+            root = tempfile.mkdtemp(prefix=f"claudius-bench-{shape}-")
+            try:
+                nodes = MAKERS[shape](root, size)
+                edges, folders = scan_filesystem(root, prune=load_prune_matcher(root))
+                for name in benches:
+                    run = BENCHES[name](root, edges, folders)
+                    seconds, peak = measure(run, repeat)
+                    key = f"{shape}/{size}/{name}"
+                    results[key] = {"seconds": seconds, "peak_bytes": peak, "nodes": nodes}
+                    print(f"{key:40} {seconds * 1000:10.2f} ms {peak / 2**20:9.1f} MiB",
+                          flush=True)
+            finally:
+                shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float,
+            noise_floor: float) -> List[str]:
+    """
+    Find results that regressed against a baseline.
+
+    Args:
+        results: Results of this run
+        baseline: Results of the baseline run
+        threshold: Allowed relative slowdown or memory growth, such as 0.25
+        noise_floor: Slowdowns below this many seconds are ignored
+
+    Returns:
+        One message per regression
+    """
+    regressions = []
+    for key, result in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        limit = old["seconds"] * (1 + threshold)
+        if result["seconds"] > limit and result["seconds"] - old["seconds"] > noise_floor:
+            regressions.append(f"{key}: {result['seconds'] * 1000:.2f} ms, "
+                               f"baseline {old['seconds'] * 1000:.2f} ms")
+        if result["peak_bytes"] > old["peak_bytes"] * (1 + threshold) + 2**16:
+            regressions.append(f"{key}: peak {result['peak_bytes'] / 2**20:.1f} MiB, "
+                               f"baseline {old['peak_bytes'] / 2**20:.1f} MiB")
+    return regressions
+
+
+def check_compact_memory(results: Dict[str, dict]) -> List[str]:
+    """
+    Check that the compact tree session peaks below the dict tree session.
+
+    Args:
+        results: Results of this run
+
+    Returns:
+        One message per tree where compact_session used more memory than session
+    """
+    over = []
+    for key, result in results.items():
+        if not key.endswith("/compact_session"):
+            continue
+        dict_result = results.get(key[:-len("compact_session")] + "session")
+        if dict_result is not None and result["peak_bytes"] > dict_result["peak_bytes"]:
+            over.append(f"{key}: peak {result['peak_bytes'] / 2**20:.1f} MiB, "
+                        f"dict tree {dict_result['peak_bytes'] / 2**20:.1f} MiB")
+    return over
+
+
+def parse_list(value: str) -> List[str]:
+    """Split a comma-separated option."""
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main(argv: List[str] = None) -> int:
+    """Run the benchmarks; return 1 if any regressed past the threshold or went over budget."""
+    parser = argparse.ArgumentParser(description="Benchmark Claudius hot paths on synthetic trees")
+    parser.add_argument("--sizes", type=lambda v: [int(s) for s in parse_list(v)],
+                        default=DEFAULT_SIZES, help="comma-separated node counts")
+    parser.add_argument("--shapes", type=parse_list, default=SHAPES,
+                        help=f"comma-separated tree shapes ({', '.join(SHAPES)})")
+    parser.add_argument("--bench", type=parse_list, default=list(BENCHES),
+                        help=f"comma-separated benchmarks ({', '.join(BENCHES)})")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed relative regression (default 0.25)")
+    parser.add_argument("--noise-floor", type=float, default=DEFAULT_NOISE_FLOOR,
+                        help="ignore slowdowns below this many seconds")
+    parser.add_argument("--imports", action="store_true",
+                        help="also check cold-start import times against their budgets")
+    args = parser.parse_args(argv)
+
+    unknown = [s for s in args.shapes if s not in MAKERS] + [b for b in args.bench if b not in BENCHES]
+    if unknown:
+        parser.error(f"unknown shape or benchmark: {', '.join(unknown)}")
+
+    results = run_benchmarks(args.sizes, args.shapes, args.bench, args.repeat)
+    over_budget = check_compact_memory(results)
+    for message in over_budget:
+        print(f"OVER BUDGET {message}", file=sys.stderr)
+    if args.imports:
+        import_results, over_imports = run_imports(args.repeat)
+        results.update(import_results)
+        for message in over_imports:
+            print(f"OVER BUDGET {message}", file=sys.stderr)
+        over_budget += over_imports
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "version": RESULTS_VERSION,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results,
+            }, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("version") != RESULTS_VERSION:
+            print(f"Baseline {args.baseline} has an unsupported version", file=sys.stderr)
+            return 2
+        regressions = compare(results, baseline["results"], args.threshold, args.noise_floor)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""
+Replay a recorded Claudius session as a latency benchmark.
+Re-runs the actions recorded with `claudius --record FILE` against the tree
+snapshot the recording starts with, and reports the latency from each
+input to the new state and, in app mode, to the frame that shows it.
+
+Usage:
+    python benchmarks/replay.py session.jsonl                       # bare reducer
+    python benchmarks/replay.py session.jsonl --mode app            # headless UI
+    python benchmarks/replay.py session.jsonl --mode app --speed 0  # no pauses
+    python benchmarks/replay.py session.jsonl --output latency.json
+
+App mode keeps the recorded gaps between inputs (scaled by --speed), so
+held keys and bursts coalesce into frames the way they did live.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Tuple
+
+# Run from a checkout without installing
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from claudius.models.file_system import write_claudeignore  # noqa: E402
+from claudius.models.recording import read_recording  # noqa: E402
+from claudius.models.state import ActionType, get_initial_state, reducer  # noqa: E402
+from claudius.utils.calculations import get_ignore_lines  # noqa: E402
+
+RESULTS_VERSION = 1
+
+# Terminal size for app mode
+SCREEN = (120, 50)
+
+# Seconds to wait for the last frame after the last input
+SETTLE_TIMEOUT = 5.0
+
+# (label, seconds) per replayed input
+Samples = List[Tuple[str, float]]
+
+
+def load_session(path: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Split a recording into its tree snapshot and the inputs that follow.
+
+    Args:
+        path: Recording file
+
+    Returns:
+        The first LOAD_DATA action and the records after it
+
+    Raises:
+        ValueError: If the recording has no LOAD_DATA action
+    """
+    snapshot, events = None, []
+    for record in read_recording(path):
+        if snapshot is None:
+            if record.get("action", {}).get("type") == ActionType.LOAD_DATA:
+                snapshot = record["action"]
+            continue
+        events.append(record)
+    if snapshot is None:
+        raise ValueError(f"{path} has no tree snapshot (LOAD_DATA action)")
+    return snapshot, events
+
+
+def label(event: Dict[str, Any]) -> str:
+    """Name an input by its action type or command."""
+    return event["action"]["type"] if "action" in event else event["command"]
+
+
+def replay_reducer(snapshot: Dict[str, Any], events: List[Dict[str, Any]],
+                   write_dir: str) -> Dict[str, Samples]:
+    """
+    Run every input through the bare reducer, back to back.
+
+    Args:
+        snapshot: LOAD_DATA action to start from
+        events: Recorded inputs
+        write_dir: Directory .claudeignore writes go to
+
+    Returns:
+        {"state": samples}
+    """
+    state = reducer(get_initial_state(), snapshot)
+    samples = []
+    for event in events:
+        start = time.perf_counter()
+        if "action" in event:
+            state = reducer(state, event["action"])
+        elif event["command"] == "write_file":
+            patterns, entries = get_ignore_lines(state)
+            write_claudeignore(write_dir, entries, patterns)
+        samples.append((label(event), time.perf_counter() - start))
+    return {"state": samples}
+
+
+def replay_app(snapshot: Dict[str, Any], events: List[Dict[str, Any]],
+               write_dir: str, speed: float = 1.0) -> Dict[str, Samples]:
+    """
+    Feed every input to a headless ClaudiusApp at its recorded pace.
+
+    Args:
+        snapshot: LOAD_DATA action to start from
+        events: Recorded inputs
+        write_dir: Working directory for the app, where it writes its files
+        speed: Replay speed; 2 halves the gaps between inputs, 0 drops them
+
+    Returns:
+        {"state": samples, "frame": samples}; the frame latency runs until
+        the screen refresh after the frame that showed the input
+    """
+    from claudius.views.app import ClaudiusApp
+
+    loading = Future()
+    loading.set_result({key: value for key, value in snapshot.items() if key != "type"})
+    state_samples, frame_samples = [], []
+    shown = []  # (label, input time) dispatched since the last frame
+
+    async def run():
+        app = ClaudiusApp(use_cache=False, watch=False, loading=loading)
+        # The snapshot already holds the stats; don't scan the empty directory
+        app.collect_stats = lambda: None
+        app.build_path_index = lambda: None
+        render_frame = app.render_frame
+
+        def timed_frame():
+            render_frame()
+            batch = list(shown)
+            shown.clear()
+
+            def painted():
+                now = time.perf_counter()
+                frame_samples.extend((name, now - start) for name, start in batch)
+            app.call_after_refresh(painted)
+        app.render_frame = timed_frame
+
+        async with app.run_test(size=SCREEN) as pilot:
+            while app.rendered_state is not app.state or not app.state.edges:
+                await pilot.pause(0.05)
+            origin = time.perf_counter()
+            first = events[0]["t"] if events else 0.0
+            for event in events:
+                if speed > 0:
+                    delay = origin + (event["t"] - first) / speed - time.perf_counter()
+                    await asyncio.sleep(max(0.0, delay))
+                else:
+                    await asyncio.sleep(0)
+                name = label(event)
+                start = time.perf_counter()
+                if "action" in event:
+                    action = dict(event["action"])
+                    app.dispatch(action.pop("type"), action)
+                else:
+                    getattr(app, f"action_{event['command']}")()
+                state_samples.append((name, time.perf_counter() - start))
+                shown.append((name, start))
+
+            deadline = time.perf_counter() + SETTLE_TIMEOUT
+            while len(frame_samples) < len(state_samples) and time.perf_counter() < deadline:
+                await pilot.pause(0.05)
+
+    cwd = os.getcwd()
+    os.chdir(write_dir)
+    try:
+        asyncio.run(run())
+    finally:
+        os.chdir(cwd)
+    return {"state": state_samples, "frame": frame_samples}
+
+
+def percentiles(seconds: List[float]) -> Dict[str, float]:
+    """Return the count and nearest-rank p50/p95/p99/max in milliseconds."""
+    ordered = sorted(seconds)
+
+    def rank(fraction):
+        return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)] * 1e3
+
+    return {"count": len(ordered), "p50_ms": rank(0.50), "p95_ms": rank(0.95),
+            "p99_ms": rank(0.99), "max_ms": ordered[-1] * 1e3}
+
+
+def summarize(samples: Samples) -> Dict[str, Dict[str, float]]:
+    """
+    Summarize latencies overall and per input type.
+
+    Args:
+        samples: (label, seconds) per input
+
+    Returns:
+        "all" and each label -> percentiles(), labels with the most time first
+    """
+    if not samples:
+        return {}
+    by_label: Dict[str, List[float]] = {}
+    for name, seconds in samples:
+        by_label.setdefault(name, []).append(seconds)
+    ordered = sorted(by_label.items(), key=lambda item: -sum(item[1]))
+    summary = {"all": percentiles([seconds for _, seconds in samples])}
+    summary.update((name, percentiles(values)) for name, values in ordered)
+    return summary
+
+
+def print_summary(title: str, summary: Dict[str, Dict[str, float]]) -> None:
+    """Print one latency table."""
+    print(f"{title:<22} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, s in summary.items():
+        print(f"  {name:<20} {s['count']:>7} {s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} "
+              f"{s['p99_ms']:>8.2f} {s['max_ms']:>8.2f}")
+
+
+def main(argv: List[str] = None) -> int:
+    """Replay a recording and report its latency distribution."""
+    parser = argparse.ArgumentParser(description="Replay a recorded Claudius session")
+    parser.add_argument("recording", help="file written by claudius --record")
+    parser.add_argument("--mode", choices=["reducer", "app"], default="reducer",
+                        help="bare reducer (input to state) or headless app (also input to frame)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="app mode replay speed; 0 replays without pauses")
+    parser.add_argument("--output", help="write the summaries to this JSON file")
+    args = parser.parse_args(argv)
+
+    try:
+        snapshot, events = load_session(args.recording)
+    except (OSError, ValueError) as e:
+        print(f"Cannot replay {args.recording}: {e}", file=sys.stderr)
+        return 2
+
+    write_dir = tempfile.mkdtemp(prefix="claudius-replay-")
+    try:
+        if args.mode == "app":
+            samples = replay_app(snapshot, events, write_dir, args.speed)
+        else:
+            samples = replay_reducer(snapshot, events, write_dir)
+    finally:
+        shutil.rmtree(write_dir, ignore_errors=True)
+
+    summaries = {kind: summarize(kind_samples) for kind, kind_samples in samples.items()}
+    for kind, summary in summaries.items():
+        print_summary(f"input to {kind}", summary)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "version": RESULTS_VERSION,
+                "recording": args.recording,
+                "mode": args.mode,
+                "inputs": len(events),
+                "latency": summaries,
+            }, f, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
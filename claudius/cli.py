@@ -0,0 +1,222 @@
+"""
+Headless commands for Claudius.
+Check and edit .claudeignore from scripts, CI and pre-commit hooks without
+starting the terminal UI. Nothing here imports Textual or Rich.
+"""
+import argparse
+import os
+import sys
+from typing import Callable, Dict, Iterable, List, Optional, TextIO
+
+from .models.file_system import (
+    expand_claudeignore, load_prune_matcher, parse_claudeignore,
+    stream_claudeignore, write_claudeignore)
+from .models.persistence import get_scan_cache_path, get_token_cache_path
+from .models.scan_cache import cached_scan
+from .models.scanner import scan_tree
+from .models.stats import collect_file_stats, load_token_cache, write_token_cache
+from .models.state import ActionType, AppState, get_initial_state, reducer
+from .utils.calculations import (
+    format_size, format_tokens, get_ignore_lines, get_subtree_stats)
+from .utils.patterns import PatternMatcher
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the parser for the headless commands."""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "-C", "--root", default=".",
+        help="Project root containing .claudeignore (default: current directory)")
+    common.add_argument(
+        "--no-cache", action="store_true",
+        help="Always do a full scan instead of reusing the on-disk scan index")
+    common.add_argument(
+        "--no-prune", action="store_true",
+        help="Walk into .git, node_modules, virtualenvs and build output too")
+    common.add_argument(
+        "--no-gitignore", action="store_true",
+        help="Don't prune paths matched by the root .gitignore")
+
+    parser = argparse.ArgumentParser(
+        prog="claudius",
+        description="Check and edit .claudeignore without starting the terminal UI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser(
+        "check", parents=[common],
+        help="Report .claudeignore entries that don't exist on disk")
+    for name, verb in (("add", "Include"), ("remove", "Exclude")):
+        command = commands.add_parser(
+            name, parents=[common],
+            help=f"{verb} paths in .claudeignore (folders recursively)")
+        command.add_argument("paths", nargs="+", metavar="PATH")
+        command.add_argument(
+            "--no-collapse", action="store_true",
+            help="Write every included path instead of one entry per fully included folder")
+    command = commands.add_parser(
+        "list", parents=[common],
+        help="Print the included paths in tree order")
+    command.add_argument(
+        "--stream", action="store_true",
+        help="Print paths while walking the disk instead of scanning first")
+    commands.add_parser(
+        "stats", parents=[common],
+        help="Summarize what .claudeignore includes, with sizes and token estimates")
+    return parser
+
+
+def load_tree(args: argparse.Namespace) -> AppState:
+    """
+    Scan the project and load .claudeignore into an app state.
+
+    Args:
+        args: Parsed command line arguments
+
+    Returns:
+        State with the scanned tree and the included paths
+    """
+    prune = load_prune_matcher(
+        args.root, use_defaults=not args.no_prune,
+        use_gitignore=not args.no_gitignore)
+    if args.no_cache:
+        result = scan_tree(args.root, prune=prune)
+    else:
+        result = cached_scan(args.root, get_scan_cache_path(args.root), prune=prune)
+    result.edges.setdefault("", [])
+
+    paths, folder_entries, patterns = parse_claudeignore(args.root)
+    matcher = PatternMatcher(patterns)
+    included = expand_claudeignore(paths, folder_entries, result.edges, matcher,
+                                   result.folders, result.pruned)
+    return reducer(get_initial_state(), {
+        "type": ActionType.LOAD_DATA,
+        "edges": result.edges,
+        "folders": result.folders,
+        "included_paths": included,
+        "selected_item": None,
+        "expanded_folders": set(),
+        "pruned_folders": result.pruned,
+        "ignore_matcher": matcher
+    })
+
+
+def emit(lines: Iterable[str], out: TextIO, flush: bool = False) -> None:
+    """Write lines as they are produced, optionally flushing each one."""
+    for line in lines:
+        out.write(line + "\n")
+        if flush:
+            out.flush()
+
+
+def relative_path(root: str, path: str) -> str:
+    """Turn a command line path into a '/'-separated path relative to root."""
+    rel = os.path.relpath(os.path.abspath(path), root)
+    return "" if rel == "." else rel.replace(os.sep, "/")
+
+
+def run_check(args: argparse.Namespace, out: TextIO) -> int:
+    """Report entries that name missing paths; no scan is needed."""
+    paths, folder_entries, _ = parse_claudeignore(args.root)
+    missing = [path for path in sorted(paths | folder_entries)
+               if not os.path.lexists(os.path.join(args.root, path))]
+    emit((f"{path}: no such file or directory" for path in missing), out)
+    return 1 if missing else 0
+
+
+def run_edit(args: argparse.Namespace, out: TextIO) -> int:
+    """Include or exclude paths and rewrite .claudeignore."""
+    state = load_tree(args)
+    index = state.get_tree_index()
+    status = 0
+    for arg in args.paths:
+        path = relative_path(args.root, arg)
+        if path not in index or not path:
+            sys.stderr.write(f"{arg}: not in the scanned tree\n")
+            status = 1
+            continue
+        state = reducer(state, {"type": ActionType.SET_INCLUDE, "path": path,
+                                "included": args.command == "add"})
+
+    patterns, entries = get_ignore_lines(state, collapse=not args.no_collapse)
+    if not write_claudeignore(args.root, entries, patterns):
+        return 1
+    return status
+
+
+def run_list(args: argparse.Namespace, out: TextIO) -> int:
+    """Print included paths, in tree order."""
+    if args.stream:
+        prune = load_prune_matcher(
+            args.root, use_defaults=not args.no_prune,
+            use_gitignore=not args.no_gitignore)
+        emit(stream_claudeignore(args.root, prune), out, flush=True)
+        return 0
+
+    state = load_tree(args)
+    emit(state.get_included(), out)
+    return 0
+
+
+def run_stats(args: argparse.Namespace, out: TextIO) -> int:
+    """Print how much of the tree .claudeignore includes."""
+    state = load_tree(args)
+    index = state.get_tree_index()
+    included = state.get_included()
+    folders, pruned = state.folders, state.pruned_folders
+
+    total_folders = len(folders) + len(pruned)
+    total_files = len(index) - 1 - total_folders
+    included_folders = sum(1 for path in included if path in folders or path in pruned)
+    included_files = len(included) - len(included.extra) - included_folders
+    lines = sum(len(entries) for entries in parse_claudeignore(args.root))
+
+    if args.no_cache:
+        file_stats, _ = collect_file_stats(args.root, state.edges)
+    else:
+        cache_path = get_token_cache_path(args.root)
+        old_cache = load_token_cache(cache_path)
+        file_stats, cache = collect_file_stats(args.root, state.edges, old_cache)
+        if cache != old_cache:
+            write_token_cache(cache_path, cache)
+    state = reducer(state, {"type": ActionType.SET_FILE_STATS, "stats": file_stats})
+    (size, tokens), (total_size, total_tokens) = get_subtree_stats(state, "")
+
+    emit([f"files: {included_files} of {total_files} included",
+          f"folders: {included_folders} of {total_folders} included",
+          f"size: {format_size(size)} of {format_size(total_size)} included",
+          f"tokens: {format_tokens(tokens)} of {format_tokens(total_tokens)} included (estimated)",
+          f".claudeignore: {lines} entries"], out)
+    return 0
+
+
+COMMANDS: Dict[str, Callable[[argparse.Namespace, TextIO], int]] = {
+    "check": run_check,
+    "add": run_edit,
+    "remove": run_edit,
+    "list": run_list,
+    "stats": run_stats,
+}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run one headless command.
+
+    Args:
+        argv: Command line arguments, starting with the command name
+
+    Returns:
+        Exit status
+    """
+    args = build_parser().parse_args(argv)
+    args.root = os.path.abspath(args.root)
+    try:
+        return COMMANDS[args.command](args, sys.stdout)
+    except BrokenPipeError:
+        # The reader (head, grep -m, ...) stopped early; that's not an error
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
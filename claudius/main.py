@@ -2,14 +2,103 @@
 """
 Claudius - A terminal UI for managing .claudeignore files.
 """
+import argparse
 import os
 import sys
-from claudius.views.app import ClaudiusApp
+from claudius import cli
+from claudius.utils.profiling import PROFILE_ENV, TRACE_ENV, enable_from_environment
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="claudius",
+        description="A terminal UI for managing .claudeignore files.",
+        epilog="Headless commands: " + ", ".join(cli.COMMANDS)
+        + " (run 'claudius COMMAND --help' for details).")
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Number of threads used to scan the filesystem (1 scans serially)")
+    parser.add_argument(
+        "--processes", action="store_true",
+        help="Scan top-level folders in separate processes (for very wide trees)")
+    parser.add_argument(
+        "--lazy", action="store_true",
+        help="Only list visible folders at startup and load the rest in the background")
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Always do a full scan instead of reusing the on-disk scan index")
+    parser.add_argument(
+        "--no-watch", action="store_true",
+        help="Don't watch the filesystem for changes while running")
+    parser.add_argument(
+        "--poll", action="store_true",
+        help="Watch for changes by polling folder mtimes instead of using inotify")
+    parser.add_argument(
+        "--no-prune", action="store_true",
+        help="Walk into .git, node_modules, virtualenvs and build output too")
+    parser.add_argument(
+        "--prune", action="append", default=[], metavar="PATTERN",
+        help="Also prune paths matching this gitignore-style pattern (repeatable)")
+    parser.add_argument(
+        "--no-gitignore", action="store_true",
+        help="Don't prune paths matched by the root .gitignore")
+    parser.add_argument(
+        "--compact", action="store_true",
+        help="Keep the tree in a compact form to save memory on very large trees")
+    parser.add_argument(
+        "--no-collapse", action="store_true",
+        help="Write every included path to .claudeignore instead of one entry per fully included folder")
+    parser.add_argument(
+        "--profile", action="store_true",
+        help=f"Record latency histograms from startup (F12 shows them; also {PROFILE_ENV}=1)")
+    parser.add_argument(
+        "--record", metavar="FILE",
+        help="Record every action with its time to FILE for benchmarks/replay.py")
+    parser.add_argument(
+        "--trace", metavar="FILE",
+        help=f"Append a JSONL record per instrumented call to FILE (also {TRACE_ENV}=FILE)")
+    return parser.parse_args(argv)
 
 
 def main():
     """Main entry point for the application."""
-    app = ClaudiusApp()
+    # Headless commands never load the UI (Textual, Rich)
+    if len(sys.argv) > 1 and sys.argv[1] in cli.COMMANDS:
+        enable_from_environment()
+        sys.exit(cli.main(sys.argv[1:]))
+
+    args = parse_args()
+    enable_from_environment(args.trace, force=args.profile)
+    # Start scanning now so the scan overlaps importing and starting Textual
+    from claudius.models.file_system import load_prune_matcher
+    from claudius.models.loader import start_loading
+    root_dir = os.getcwd()
+    loading = start_loading(
+        root_dir,
+        prune=load_prune_matcher(root_dir, args.prune,
+                                 use_defaults=not args.no_prune,
+                                 use_gitignore=not args.no_gitignore),
+        lazy=args.lazy,
+        use_cache=not args.no_cache,
+        workers=args.workers,
+        use_processes=args.processes,
+        compact=args.compact)
+
+    from claudius.views.app import ClaudiusApp
+    app = ClaudiusApp(scan_workers=args.workers,
+                      scan_processes=args.processes,
+                      lazy=args.lazy,
+                      use_cache=not args.no_cache,
+                      watch=not args.no_watch,
+                      force_polling=args.poll,
+                      prune=not args.no_prune,
+                      prune_patterns=args.prune,
+                      use_gitignore=not args.no_gitignore,
+                      compact=args.compact,
+                      collapse_ignore=not args.no_collapse,
+                      loading=loading,
+                      record=args.record)
     app.run()
 
 
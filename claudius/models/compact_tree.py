@@ -0,0 +1,505 @@
+"""
+Compact tree model for Claudius.
+Stores the file tree as integer node IDs with first-child/next-sibling links
+in flat arrays, interning each path segment once, so very large trees don't
+keep a full path string for every node.
+
+TreeEdges and TreeFolders expose a tree through the same interface as the
+edges dict and folders set, so the reducer and calculations run unchanged.
+Every edit returns a new tree, leaving earlier states intact.
+"""
+from array import array
+from collections.abc import Mapping, Set as AbstractSet
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+ROOT = 0
+NO_NODE = -1
+
+# Node flags
+FOLDER = 1  # Node is a folder
+LOADED = 2  # Folder's children have been listed (it has a key in edges)
+REMOVED = 4  # Node was deleted and is no longer linked into the tree
+
+# Folders with more children than this get a name -> child index
+_INDEX_THRESHOLD = 16
+
+
+class CompactTree:
+    """
+    A file tree of integer node IDs.
+
+    Node 0 is the root. Children are linked through first_child and
+    next_sibling in display order (folders first, then files, each sorted
+    by name). Names are indexes into a segment table shared by every
+    version of the tree.
+    """
+
+    def __init__(self, names: List[str], name_ids: Dict[str, int], name: array,
+                 parent: array, first_child: array, next_sibling: array,
+                 flags: bytearray, n_folders: int, n_loaded: int) -> None:
+        self.names = names
+        self.name_ids = name_ids
+        self.name = name
+        self.parent = parent
+        self.first_child = first_child
+        self.next_sibling = next_sibling
+        self.flags = flags
+        self.n_folders = n_folders
+        self.n_loaded = n_loaded
+        self._child_index: Dict[int, Dict[int, int]] = {}
+        self.edges = TreeEdges(self)
+        self.folders = TreeFolders(self)
+
+    @classmethod
+    def empty(cls) -> 'CompactTree':
+        """Return a tree holding only an unlisted root."""
+        return cls([""], {"": 0}, array('I', [0]), array('i', [NO_NODE]),
+                   array('i', [NO_NODE]), array('i', [NO_NODE]),
+                   bytearray([FOLDER]), 0, 0)
+
+    @classmethod
+    def from_edges(cls, edges: Dict[str, List[str]], folders: Iterable[str]) -> 'CompactTree':
+        """
+        Build a tree from an edges dict and folders set.
+
+        Args:
+            edges: Map of parent paths to child paths
+            folders: Paths that are folders
+
+        Returns:
+            New CompactTree; each folder's children get consecutive IDs
+        """
+        tree = cls.empty()
+        intern = tree.intern
+        name, parent, first_child = tree.name, tree.parent, tree.first_child
+        next_sibling, flags = tree.next_sibling, tree.flags
+
+        stack = [(ROOT, "")]
+        while stack:
+            node, path = stack.pop()
+            children = edges.get(path)
+            if children is None:
+                continue  # Folder not listed yet
+            flags[node] |= LOADED
+            tree.n_loaded += 1
+            if not children:
+                continue
+
+            # Append all children at once; siblings are consecutive IDs
+            cut = len(path) + 1 if path else 0
+            start = len(flags)
+            count = len(children)
+            child_flags = bytes(FOLDER if child in folders else 0 for child in children)
+            name.extend(intern(child[cut:]) for child in children)
+            parent.extend([node] * count)
+            first_child.extend([NO_NODE] * count)
+            next_sibling.extend(range(start + 1, start + count))
+            next_sibling.append(NO_NODE)
+            flags.extend(child_flags)
+            first_child[node] = start
+
+            subfolders = [(start + i, children[i])
+                          for i, is_folder in enumerate(child_flags) if is_folder]
+            tree.n_folders += len(subfolders)
+            stack.extend(reversed(subfolders))
+        return tree
+
+    def copy(self) -> 'CompactTree':
+        """Return an independent copy (the segment table is shared)."""
+        return CompactTree(self.names, self.name_ids, array('I', self.name),
+                           array('i', self.parent), array('i', self.first_child),
+                           array('i', self.next_sibling), bytearray(self.flags),
+                           self.n_folders, self.n_loaded)
+
+    def __len__(self) -> int:
+        """Number of node slots, including removed ones."""
+        return len(self.flags)
+
+    # Lookups
+
+    def intern(self, segment: str) -> int:
+        """Return the ID of a path segment, adding it if new."""
+        name_id = self.name_ids.get(segment)
+        if name_id is None:
+            name_id = len(self.names)
+            self.names.append(segment)
+            self.name_ids[segment] = name_id
+        return name_id
+
+    def children(self, node: int) -> Iterator[int]:
+        """Iterate over the children of a node."""
+        next_sibling = self.next_sibling
+        child = self.first_child[node]
+        while child != NO_NODE:
+            yield child
+            child = next_sibling[child]
+
+    def find_child(self, node: int, segment: str) -> int:
+        """
+        Find a child by name.
+
+        Args:
+            node: Parent node
+            segment: Name of the child
+
+        Returns:
+            Child node, or NO_NODE
+        """
+        name_id = self.name_ids.get(segment)
+        if name_id is None:
+            return NO_NODE
+
+        index = self._child_index.get(node)
+        if index is not None:
+            return index.get(name_id, NO_NODE)
+
+        name, next_sibling = self.name, self.next_sibling
+        child = self.first_child[node]
+        for _ in range(_INDEX_THRESHOLD):
+            if child == NO_NODE:
+                return NO_NODE
+            if name[child] == name_id:
+                return child
+            child = next_sibling[child]
+        if child == NO_NODE:
+            return NO_NODE
+
+        # Wide folder: index it so later lookups don't scan every sibling
+        index = {name[c]: c for c in self.children(node)}
+        self._child_index[node] = index
+        return index.get(name_id, NO_NODE)
+
+    def find(self, path: str) -> int:
+        """
+        Find the node for a relative path.
+
+        Args:
+            path: Path relative to the root ('' for the root)
+
+        Returns:
+            Node ID, or NO_NODE if the path isn't in the tree
+        """
+        if not path:
+            return ROOT
+        node = ROOT
+        for segment in path.split('/'):
+            node = self.find_child(node, segment)
+            if node == NO_NODE:
+                return NO_NODE
+        return node
+
+    def path(self, node: int) -> str:
+        """Rebuild the relative path of a node."""
+        parts = []
+        names, name, parent = self.names, self.name, self.parent
+        while node != ROOT:
+            parts.append(names[name[node]])
+            node = parent[node]
+        return '/'.join(reversed(parts))
+
+    def is_folder(self, node: int) -> bool:
+        """Return whether a node is a folder."""
+        return bool(self.flags[node] & FOLDER)
+
+    def is_loaded(self, node: int) -> bool:
+        """Return whether a folder's children have been listed."""
+        return bool(self.flags[node] & LOADED)
+
+    def child_paths(self, node: int, path: str) -> List[str]:
+        """Return the paths of a node's children."""
+        prefix = path + '/' if path else ''
+        names, name = self.names, self.name
+        return [prefix + names[name[child]] for child in self.children(node)]
+
+    def walk(self, flag: int) -> Iterator[str]:
+        """Yield the paths of all linked nodes with the given flag, in pre-order."""
+        flags, names, name = self.flags, self.names, self.name
+        if flags[ROOT] & flag:
+            yield ""
+        stack = [(ROOT, "")]
+        while stack:
+            node, path = stack.pop()
+            prefix = path + '/' if path else ''
+            folders = []
+            for child in self.children(node):
+                child_flags = flags[child]
+                if child_flags & FOLDER:
+                    child_path = prefix + names[name[child]]
+                    if child_flags & flag:
+                        yield child_path
+                    folders.append((child, child_path))
+            stack.extend(reversed(folders))
+
+    # Editing (all public edits return a new tree)
+
+    def _new_node(self, parent: int, segment: str, is_folder: bool) -> int:
+        """Append an unlinked node."""
+        node = len(self.flags)
+        self.name.append(self.intern(segment))
+        self.parent.append(parent)
+        self.first_child.append(NO_NODE)
+        self.next_sibling.append(NO_NODE)
+        self.flags.append(FOLDER if is_folder else 0)
+        if is_folder:
+            self.n_folders += 1
+        return node
+
+    def _set_folder(self, node: int) -> None:
+        """Mark an existing node as a folder."""
+        if not self.flags[node] & FOLDER:
+            self.flags[node] |= FOLDER
+            self.n_folders += 1
+
+    def _sort_key(self, node: int) -> Tuple[int, str]:
+        """Display order: folders first, then by name."""
+        return (0 if self.flags[node] & FOLDER else 1, self.names[self.name[node]])
+
+    def _link(self, parent: int, node: int) -> None:
+        """Link a node into its parent's children at its display position."""
+        self.parent[node] = parent
+        key = self._sort_key(node)
+        prev = NO_NODE
+        child = self.first_child[parent]
+        while child != NO_NODE and self._sort_key(child) < key:
+            prev = child
+            child = self.next_sibling[child]
+        self.next_sibling[node] = child
+        if prev == NO_NODE:
+            self.first_child[parent] = node
+        else:
+            self.next_sibling[prev] = node
+        index = self._child_index.get(parent)
+        if index is not None:
+            index[self.name[node]] = node
+
+    def _unlink(self, node: int) -> None:
+        """Detach a node from its parent's children."""
+        parent = self.parent[node]
+        prev = NO_NODE
+        child = self.first_child[parent]
+        while child != NO_NODE and child != node:
+            prev = child
+            child = self.next_sibling[child]
+        if child == NO_NODE:
+            return
+        if prev == NO_NODE:
+            self.first_child[parent] = self.next_sibling[node]
+        else:
+            self.next_sibling[prev] = self.next_sibling[node]
+        self.next_sibling[node] = NO_NODE
+        self._child_index.pop(parent, None)
+
+    def _set_children(self, node: int, path: str, child_paths: List[str],
+                      folders: Set[str]) -> None:
+        """Replace a folder's listing, reusing nodes for children it already had."""
+        cut = len(path) + 1 if path else 0
+        existing = {self.name[child]: child for child in self.children(node)}
+        prev = NO_NODE
+        for child_path in child_paths:
+            segment = child_path[cut:]
+            child = existing.pop(self.name_ids.get(segment, -1), NO_NODE)
+            if child == NO_NODE:
+                child = self._new_node(node, segment, child_path in folders)
+            elif child_path in folders:
+                self._set_folder(child)
+            if prev == NO_NODE:
+                self.first_child[node] = child
+            else:
+                self.next_sibling[prev] = child
+            prev = child
+        if prev == NO_NODE:
+            self.first_child[node] = NO_NODE
+        else:
+            self.next_sibling[prev] = NO_NODE
+        self._child_index.pop(node, None)
+        for child in existing.values():
+            self._release(child)  # No longer in the listing
+
+        if not self.flags[node] & LOADED:
+            self.flags[node] |= LOADED
+            self.n_loaded += 1
+
+    def _add_listings(self, edges: Dict[str, List[str]], folders: Set[str],
+                      overwrite: bool) -> None:
+        """Apply folder listings, parents before children."""
+        for path in sorted(edges, key=lambda p: p.count('/') + bool(p)):
+            node = self.find(path)
+            if node == NO_NODE:
+                continue  # Parent not listed
+            if not overwrite and self.flags[node] & LOADED:
+                continue
+            if path:
+                self._set_folder(node)
+            self._set_children(node, path, edges[path], folders)
+        for path in folders:
+            node = self.find(path)
+            if node != NO_NODE:
+                self._set_folder(node)
+
+    def merged(self, edges: Dict[str, List[str]], folders: Set[str]) -> 'CompactTree':
+        """
+        Return a tree with new or updated folder listings.
+
+        Args:
+            edges: Listings to add; each replaces the folder's old listing
+            folders: Paths that are folders
+
+        Returns:
+            New tree
+        """
+        tree = self.copy()
+        tree._add_listings(edges, folders, overwrite=True)
+        return tree
+
+    def inserted(self, paths: Iterable[str], edges: Dict[str, List[str]],
+                 folders: Set[str]) -> 'CompactTree':
+        """
+        Return a tree with new nodes linked in under their (listed) parents.
+
+        Args:
+            paths: New nodes
+            edges: Listings of new folders
+            folders: Paths that are folders
+
+        Returns:
+            New tree
+        """
+        tree = self.copy()
+        for path in paths:
+            parent_path, _, segment = path.rpartition('/')
+            parent = tree.find(parent_path)
+            if parent == NO_NODE or not tree.flags[parent] & LOADED:
+                continue
+            if tree.find_child(parent, segment) != NO_NODE:
+                continue
+            tree._link(parent, tree._new_node(parent, segment, path in folders))
+        tree._add_listings(edges, folders, overwrite=False)
+        return tree
+
+    def _release(self, node: int) -> None:
+        """Mark a detached subtree as removed and update the counts."""
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            current_flags = self.flags[current]
+            if current_flags & FOLDER:
+                self.n_folders -= 1
+            if current_flags & LOADED:
+                self.n_loaded -= 1
+            self.flags[current] = REMOVED
+            stack.extend(self.children(current))
+            self._child_index.pop(current, None)
+
+    def removed(self, paths: Iterable[str]) -> 'CompactTree':
+        """
+        Return a tree without the given nodes and their descendants.
+
+        Args:
+            paths: Nodes to remove
+
+        Returns:
+            New tree
+        """
+        tree = self.copy()
+        for path in paths:
+            node = tree.find(path) if path else NO_NODE
+            if node == NO_NODE:
+                continue
+            tree._unlink(node)
+            tree._release(node)
+        return tree
+
+    def renamed(self, old: str, new: str) -> 'CompactTree':
+        """
+        Return a tree with a node (and so its whole subtree) moved.
+
+        Descendants need no changes since paths are rebuilt from parents.
+
+        Args:
+            old: Current path
+            new: New path
+
+        Returns:
+            New tree
+        """
+        tree = self.copy()
+        node = tree.find(old) if old else NO_NODE
+        if node == NO_NODE:
+            return self
+        tree._unlink(node)
+
+        new_parent_path, _, segment = new.rpartition('/')
+        new_parent = tree.find(new_parent_path)
+        existing = tree.find_child(new_parent, segment) if new_parent != NO_NODE else NO_NODE
+        if existing != NO_NODE:
+            tree._unlink(existing)
+            tree._release(existing)
+        if new_parent == NO_NODE or not tree.flags[new_parent] & LOADED:
+            tree._release(node)  # Moved somewhere we haven't listed
+            return tree
+        tree.name[node] = tree.intern(segment)
+        tree._link(new_parent, node)
+        return tree
+
+
+class TreeEdges(Mapping):
+    """Read-only view of a CompactTree as an edges dict (folder path -> child paths)."""
+
+    __slots__ = ("tree",)
+
+    def __init__(self, tree: CompactTree) -> None:
+        self.tree = tree
+
+    def __getitem__(self, path: str) -> List[str]:
+        node = self.tree.find(path)
+        if node == NO_NODE or not self.tree.flags[node] & LOADED:
+            raise KeyError(path)
+        return self.tree.child_paths(node, path)
+
+    def get(self, path: str, default: Optional[List[str]] = None) -> Optional[List[str]]:
+        node = self.tree.find(path)
+        if node == NO_NODE or not self.tree.flags[node] & LOADED:
+            return default
+        return self.tree.child_paths(node, path)
+
+    def __contains__(self, path: object) -> bool:
+        if not isinstance(path, str):
+            return False
+        node = self.tree.find(path)
+        return node != NO_NODE and bool(self.tree.flags[node] & LOADED)
+
+    def __iter__(self) -> Iterator[str]:
+        return self.tree.walk(LOADED)
+
+    def __len__(self) -> int:
+        return self.tree.n_loaded
+
+
+class TreeFolders(AbstractSet):
+    """Read-only view of a CompactTree as the set of folder paths."""
+
+    __slots__ = ("tree",)
+
+    def __init__(self, tree: CompactTree) -> None:
+        self.tree = tree
+
+    @classmethod
+    def _from_iterable(cls, iterable: Iterable[str]) -> Set[str]:
+        # Set operations (|, -, &) produce plain sets
+        return set(iterable)
+
+    def __contains__(self, path: object) -> bool:
+        if not isinstance(path, str) or not path:
+            return False
+        node = self.tree.find(path)
+        return node != NO_NODE and bool(self.tree.flags[node] & FOLDER)
+
+    def __iter__(self) -> Iterator[str]:
+        return (path for path in self.tree.walk(FOLDER) if path)
+
+    def __len__(self) -> int:
+        return self.tree.n_folders
+
+    def copy(self) -> Set[str]:
+        """Return the folders as a plain set."""
+        return set(self)
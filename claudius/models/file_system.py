@@ -3,100 +3,331 @@ File system operations for Claudius.
 These functions handle reading/writing files and scanning the filesystem.
 """
 import os
-from typing import Set, Dict, List, Tuple
+from typing import Set, Dict, Iterable, Iterator, List, Optional, Tuple
 
-def scan_filesystem(root_dir: str) -> Tuple[Dict[str, List[str]], Set[str]]:
+from .persistence import atomic_write, get_local_dir
+from .scanner import list_directory, scan_tree
+from ..utils.calculations import get_pattern_matches
+from ..utils.patterns import PatternMatcher, is_pattern, unescape_path
+from ..utils.profiling import timed
+from ..utils.traversal import iter_descendants
+
+# Folders that are listed but never walked unless pruning is turned off
+DEFAULT_PRUNE = [
+    '.git/',
+    '.hg/',
+    '.svn/',
+    'node_modules/',
+    '__pycache__/',
+    '.venv/',
+    'venv/',
+    '.tox/',
+    '.nox/',
+    '.mypy_cache/',
+    '.pytest_cache/',
+    '.ruff_cache/',
+    'build/',
+    'dist/',
+    '*.egg-info/',
+]
+
+# Lines joined into each chunk when writing .claudeignore
+WRITE_CHUNK_LINES = 4096
+
+# First line of every .claudeignore Claudius writes. Paths in such files are
+# escaped (see escape_path); files without it list paths as they are.
+CLAUDEIGNORE_HEADER = '# claudius: escaped paths'
+
+def read_gitignore(root_dir: str) -> List[str]:
+    """
+    Read the root .gitignore and .git/info/exclude.
+    
+    Args:
+        root_dir: Root directory of the tree
+        
+    Returns:
+        List of pattern lines, in the order git applies them
+    """
+    lines = []
+    for rel in (os.path.join('.git', 'info', 'exclude'), '.gitignore'):
+        try:
+            with open(os.path.join(root_dir, rel), 'r', errors='surrogateescape') as f:
+                lines.extend(f.read().splitlines())
+        except OSError:
+            continue
+    return lines
+
+def load_prune_matcher(root_dir: str, patterns: Iterable[str] = (),
+                       use_defaults: bool = True,
+                       use_gitignore: bool = True,
+                       skip: Optional[Iterable[str]] = None) -> PatternMatcher:
+    """
+    Build the matcher for paths the scanner should not walk.
+    
+    Later patterns win, so .gitignore negations can re-enable a default
+    and patterns given on the command line override both.
+    
+    Args:
+        root_dir: Root directory of the tree
+        patterns: Extra gitignore-style patterns
+        use_defaults: Start from DEFAULT_PRUNE
+        use_gitignore: Add the root .gitignore and .git/info/exclude
+        skip: Root-relative paths to leave out of the tree. Defaults to the
+            local-mode folder, if it is inside the root.
+        
+    Returns:
+        Compiled PatternMatcher (empty if there is nothing to prune)
+    """
+    lines = list(DEFAULT_PRUNE) if use_defaults else []
+    if use_gitignore:
+        lines.extend(read_gitignore(root_dir))
+    lines.extend(patterns)
+    if skip is None:
+        local_dir = get_local_dir(root_dir)
+        skip = [local_dir] if local_dir else []
+    return PatternMatcher(lines, skip)
+
+def scan_filesystem(root_dir: str, workers: Optional[int] = None,
+                    use_processes: bool = False,
+                    prune: Optional[PatternMatcher] = None) -> Tuple[Dict[str, List[str]], Set[str]]:
     """
     Scan filesystem and return edges and folders.
     
     Args:
         root_dir: Root directory to scan
+        workers: Number of scanner threads (or processes). Defaults to a
+            value based on the CPU count; 1 scans serially.
+        use_processes: Use a process pool instead of threads
+        prune: Matcher for folders to list without walking and files to skip
         
     Returns:
         Tuple containing:
         - edges: Dict mapping parent paths to lists of child paths
         - folders: Set of paths that are folders
     """
-    edges = {"": []}  # Start with empty root
-    folders = set()
-    
-    for dirpath, dirnames, filenames in os.walk(root_dir):
-        rel_dirpath = os.path.relpath(dirpath, root_dir)
-        if rel_dirpath == '.':
-            rel_dirpath = ''
-        
-        # Add this directory to folders set (except root)
-        if rel_dirpath:
-            folders.add(rel_dirpath)
-        
-        # Create edges for subdirectories
-        parent = rel_dirpath
-        children = []
-        
-        for dirname in sorted(dirnames):
-            child_path = os.path.join(rel_dirpath, dirname).replace('\\', '/')
-            children.append(child_path)
-        
-        # Create edges for files
-        for filename in sorted(filenames):
-            # Skip .claudeignore itself
-            if filename == '.claudeignore' and rel_dirpath == '':
-                continue
-                
-            child_path = os.path.join(rel_dirpath, filename).replace('\\', '/')
-            children.append(child_path)
-        
-        edges[parent] = children
+    result = scan_tree(root_dir, workers=workers, use_processes=use_processes,
+                       prune=prune)
+    if "" not in result.edges:
+        result.edges[""] = []  # Always have a root
+    return result.edges, result.folders
+
+def _is_legacy_path(root_dir: str, line: str) -> bool:
+    """
+    Check whether a pattern-like line from an unmarked file is an existing path.
     
-    return edges, folders
+    Older versions wrote paths unescaped, so 'pages/[slug].tsx' or '/[id]/'
+    meant that path. Unanchored folder patterns such as 'build/' were never
+    written for paths, so they stay patterns.
+    """
+    if not is_pattern(line) or (line.endswith('/') and not line.startswith('/')):
+        return False
+    return os.path.lexists(os.path.join(root_dir, line.strip('/')))
 
-def read_claudeignore(root_dir: str) -> Set[str]:
+@timed("fs.parse_claudeignore")
+def parse_claudeignore(root_dir: str) -> Tuple[Set[str], Set[str], List[str]]:
     """
-    Read .claudeignore file and return set of included paths.
+    Read .claudeignore into literal paths, folder entries and patterns.
+    
+    A line ending in '/' (written as '/folder/') stands for the folder and
+    everything under it; it is anchored at the root, never an absolute
+    path. Backslash escapes in paths are undone, so names with glob
+    characters read back as written. Gitignore-style patterns ('*.log',
+    'build/', '!keep.log', ...) are returned in file order, since the last
+    matching pattern wins.
+    
+    Files without CLAUDEIGNORE_HEADER were written before paths were
+    escaped, or by hand. There, a line that looks like a pattern but names
+    a path that exists (such as 'pages/[slug].tsx') is taken literally.
     
     Args:
         root_dir: Root directory containing .claudeignore
         
     Returns:
-        Set of included paths
+        Tuple containing:
+        - paths: Paths listed one by one
+        - folder_entries: Folders included together with their whole subtree
+        - patterns: Pattern lines
     """
     ignore_path = os.path.join(root_dir, '.claudeignore')
+    root_prefix = os.path.join(root_dir, '')
+    escaped = False
     included = set()
+    folder_entries = set()
+    patterns = []
     
     if os.path.exists(ignore_path):
         try:
             with open(ignore_path, 'r') as f:
-                for line in f:
+                for number, line in enumerate(f):
                     line = line.strip()
-                    if line and not line.startswith('#'):
-                        # Convert absolute paths to relative if needed
-                        if os.path.isabs(line) and line.startswith(root_dir):
+                    if number == 0 and line == CLAUDEIGNORE_HEADER:
+                        escaped = True
+                    elif line and not line.startswith('#'):
+                        # Convert absolute paths under the root to relative;
+                        # '/folder/' entries are already relative to it
+                        if not line.endswith('/') and line.startswith(root_prefix):
                             line = os.path.relpath(line, root_dir).replace('\\', '/')
-                        included.add(line)
+                        if not escaped and _is_legacy_path(root_dir, line):
+                            if line.endswith('/'):
+                                folder_entries.add(line.strip('/'))
+                            else:
+                                included.add(line)
+                        elif is_pattern(line):
+                            patterns.append(line)
+                        elif line.endswith('/'):
+                            folder = line.strip('/')
+                            if folder:
+                                folder_entries.add(unescape_path(folder) if escaped else folder)
+                        else:
+                            included.add(unescape_path(line) if escaped else line)
         except Exception as e:
             print(f"Error reading .claudeignore: {e}")
     
+    return included, folder_entries, patterns
+
+def expand_claudeignore(paths: Set[str], folder_entries: Set[str],
+                        edges: Dict[str, List[str]],
+                        matcher: Optional[PatternMatcher] = None,
+                        folders: Set[str] = frozenset(),
+                        pruned_folders: Set[str] = frozenset()) -> Set[str]:
+    """
+    Expand folder entries and patterns against a scanned tree.
+    
+    Args:
+        paths: Paths listed one by one
+        folder_entries: Folders included together with their whole subtree
+        edges: Map of parent paths to child paths
+        matcher: Compiled patterns, checked once per node
+        folders: Set of paths that are folders
+        pruned_folders: Folders that are listed but not walked
+        
+    Returns:
+        Set of included paths
+    """
+    included = set(paths)
+    for folder in folder_entries:
+        included.add(folder)
+        included.update(iter_descendants(edges, folder, ordered=False))
+    if matcher:
+        included |= get_pattern_matches(matcher, edges, folders, pruned_folders)
     return included
 
-def write_claudeignore(root_dir: str, included_paths: Set[str]) -> bool:
+def read_claudeignore(root_dir: str, edges: Optional[Dict[str, List[str]]] = None,
+                      folders: Set[str] = frozenset()) -> Set[str]:
+    """
+    Read .claudeignore file and return set of included paths.
+    
+    Args:
+        root_dir: Root directory containing .claudeignore
+        edges: Scanned tree to expand folder entries and patterns against;
+            without it a folder entry includes just the folder and patterns
+            match nothing
+        folders: Set of paths that are folders in edges
+        
+    Returns:
+        Set of included paths
+    """
+    paths, folder_entries, patterns = parse_claudeignore(root_dir)
+    return expand_claudeignore(paths, folder_entries, edges or {},
+                               PatternMatcher(patterns), folders)
+
+def stream_claudeignore(root_dir: str, prune: Optional[PatternMatcher] = None) -> Iterator[str]:
+    """
+    Walk the disk and yield each included path as soon as it is listed.
+    
+    Paths come in tree order (folders first, then files, each sorted), and
+    nothing is held in memory beyond the folders on the current path, so
+    the first lines appear before the rest of the tree has been read.
+    
+    Args:
+        root_dir: Root directory containing .claudeignore
+        prune: Matcher for folders to list without walking and files to skip
+        
+    Yields:
+        Included paths
+    """
+    paths, folder_entries, patterns = parse_claudeignore(root_dir)
+    matcher = PatternMatcher(patterns)
+    
+    # Each frame: (children iterator, walkable subdirs, pruned names,
+    # folder is under a folder entry, folder is included by the patterns)
+    def listing(rel: str, whole: bool, matched: bool):
+        try:
+            children, subdirs, pruned = list_directory(
+                os.path.join(root_dir, rel) if rel else root_dir, rel, prune)
+        except OSError:
+            return None
+        return iter(children), set(subdirs), set(pruned), whole, matched
+    
+    root = listing("", False, False)
+    stack = [root] if root else []
+    while stack:
+        children, subdirs, pruned, whole, matched = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            continue
+        name = child.rpartition("/")[2]
+        is_dir = name in subdirs or name in pruned
+        child_whole = whole or child in folder_entries
+        child_matched = matched
+        if matcher:
+            result = matcher.check(child, is_dir, name)
+            if result is not None:
+                child_matched = result
+        if child_whole or child_matched or child in paths:
+            yield child
+        if name in subdirs:
+            frame = listing(child, child_whole, child_matched)
+            if frame:
+                stack.append(frame)
+
+def _claudeignore_chunks(included_paths: Set[str], patterns: Iterable[str]) -> List[bytes]:
+    """Format .claudeignore as byte chunks of up to WRITE_CHUNK_LINES lines."""
+    # Paths are already escaped, so backslashes are kept as they are
+    lines = [CLAUDEIGNORE_HEADER, *patterns, *sorted(included_paths)]
+    return [
+        ('\n'.join(lines[i:i + WRITE_CHUNK_LINES]) + '\n').encode('utf-8', 'surrogateescape')
+        for i in range(0, len(lines), WRITE_CHUNK_LINES)
+    ]
+
+def _file_matches(path: str, chunks: List[bytes]) -> bool:
+    """Check whether a file already holds exactly the given chunks."""
+    try:
+        if os.path.getsize(path) != sum(map(len, chunks)):
+            return False
+        with open(path, 'rb') as f:
+            return all(f.read(len(chunk)) == chunk for chunk in chunks)
+    except OSError:
+        return False
+
+@timed("fs.write_claudeignore")
+def write_claudeignore(root_dir: str, included_paths: Set[str],
+                       patterns: Iterable[str] = ()) -> bool:
     """
     Write included paths to .claudeignore file.
     
+    The contents are built in large chunks and compared with the file on
+    disk first; an unchanged file is left alone. Otherwise the file is
+    replaced atomically, so a crash never leaves it half written.
+    
     Args:
         root_dir: Root directory for .claudeignore
         included_paths: Set of paths to include
+        patterns: Pattern lines, written first and in order
         
     Returns:
-        bool: True if successful, False otherwise
+        bool: True if successful or already up to date, False otherwise
     """
     ignore_path = os.path.join(root_dir, '.claudeignore')
     
     try:
-        with open(ignore_path, 'w') as f:
-            for path in sorted(included_paths):
-                # Ensure path uses forward slashes
-                path = path.replace('\\', '/')
-                f.write(f"{path}\n")
+        chunks = _claudeignore_chunks(included_paths, patterns)
+        if _file_matches(ignore_path, chunks):
+            return True
+        if not atomic_write(ignore_path, chunks):
+            print("Error writing .claudeignore")
+            return False
         return True
     except Exception as e:
         print(f"Error writing .claudeignore: {e}")
@@ -0,0 +1,144 @@
+"""
+Startup loading for Claudius.
+Scans the tree and reads .claudeignore without touching the UI, so the
+scan can run on a thread while Textual is still importing and starting.
+"""
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, Iterable, Optional
+
+from .compact_tree import CompactTree
+from .file_system import expand_claudeignore, parse_claudeignore
+from .persistence import get_scan_cache_path, load_state
+from .scan_cache import cached_scan
+from .scanner import ScanResult, list_folders, scan_subtree, scan_tree
+from ..utils.patterns import PatternMatcher
+from ..utils.profiling import timed
+from ..utils.traversal import iter_ancestors
+
+
+def scan_visible(root_dir: str, expanded_folders: Iterable[str],
+                 full_folders: Iterable[str] = (),
+                 prune: Optional[PatternMatcher] = None) -> ScanResult:
+    """
+    List the root and the given expanded folders (with their ancestors) only.
+
+    Args:
+        root_dir: Root directory of the tree
+        expanded_folders: Persisted expanded folders
+        full_folders: Folders to list with their whole subtree, such as
+            folder entries in .claudeignore that must be expanded
+        prune: Matcher for paths that should not be walked
+
+    Returns:
+        ScanResult for the listed part of the tree
+    """
+    wanted = {""}
+    for folder in [*expanded_folders, *full_folders]:
+        wanted.add(folder)
+        wanted.update(iter_ancestors(folder))
+
+    scan = ScanResult()
+    # Parents sort before their children, so each folder is known
+    # from its parent's listing before we try to list it
+    for rel in sorted(wanted, key=lambda path: path.count("/") + bool(path)):
+        if rel and rel not in scan.folders:
+            continue
+        scan.merge(list_folders(root_dir, [rel], prune))
+    for folder in full_folders:
+        if folder in scan.folders:
+            scan.merge(scan_subtree(root_dir, folder, prune=prune))
+    return scan
+
+
+@timed("load")
+def load_initial_data(root_dir: str, prune: Optional[PatternMatcher] = None,
+                      lazy: bool = False, use_cache: bool = True,
+                      workers: Optional[int] = None, use_processes: bool = False,
+                      compact: bool = False) -> Dict[str, Any]:
+    """
+    Scan the tree and merge it with .claudeignore and the saved state.
+
+    Args:
+        root_dir: Root directory of the tree
+        prune: Matcher for paths that should not be walked
+        lazy: List only the root and saved expanded folders
+        use_cache: Reuse the on-disk scan index
+        workers: Number of scan threads
+        use_processes: Scan top-level folders in separate processes
+        compact: Convert the tree to its compact form
+
+    Returns:
+        Payload for a LOAD_DATA action
+    """
+    saved_state = load_state(root_dir)
+    expanded_folders = saved_state['expanded_folders']
+    ignore_paths, ignore_folders, ignore_patterns = parse_claudeignore(root_dir)
+    ignore_matcher = PatternMatcher(ignore_patterns)
+
+    if lazy:
+        result = scan_visible(root_dir, expanded_folders, ignore_folders, prune)
+    elif use_cache:
+        result = cached_scan(
+            root_dir,
+            get_scan_cache_path(root_dir),
+            workers=workers,
+            use_processes=use_processes,
+            prune=prune)
+    else:
+        result = scan_tree(
+            root_dir,
+            workers=workers,
+            use_processes=use_processes,
+            prune=prune)
+    edges, folders, pruned_folders = result.edges, result.folders, result.pruned
+    edges.setdefault("", [])  # Always have a root
+    included_paths = expand_claudeignore(
+        ignore_paths, ignore_folders, edges, ignore_matcher, folders, pruned_folders)
+    if compact:
+        # Keep only the tree, not the scan's path strings
+        tree = CompactTree.from_edges(edges, folders)
+        edges, folders = tree.edges, tree.folders
+        del result
+
+    # Filter out any folders that don't exist anymore
+    valid_expanded_folders = {
+        folder for folder in expanded_folders if folder in folders}
+
+    # Get selected item, defaulting to first item if saved one doesn't exist
+    selected_item = saved_state['selected_item']
+    if selected_item not in edges.get('', []) and selected_item not in folders:
+        selected_item = next(iter(edges.get('', [])), None)
+
+    return {
+        "edges": edges,
+        "folders": folders,
+        "included_paths": included_paths,
+        "selected_item": selected_item,
+        "expanded_folders": valid_expanded_folders,
+        "pruned_folders": pruned_folders,
+        "ignore_matcher": ignore_matcher
+    }
+
+
+def start_loading(root_dir: str, **options: Any) -> Future:
+    """
+    Run load_initial_data on a background thread.
+
+    Args:
+        root_dir: Root directory of the tree
+        **options: Keyword arguments for load_initial_data
+
+    Returns:
+        Future holding the LOAD_DATA payload, or the error raised while loading
+    """
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(load_initial_data(root_dir, **options))
+        except Exception as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="claudius-load", daemon=True).start()
+    return future
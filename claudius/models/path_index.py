@@ -0,0 +1,139 @@
+"""
+Path index for the fuzzy finder.
+Paths share far fewer distinct names than there are paths, so the index
+holds each lowercase name once, ranked from shortest to longest, with the
+paths that end in it. The ranked names are joined into one string that a
+compiled pattern scans at C speed; matches come out best first, so a query
+stops as soon as it has enough results.
+"""
+import re
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# Results returned by a query
+MAX_RESULTS = 50
+
+
+class PathIndex:
+    """
+    Immutable index of every path in a tree, searched by name.
+
+    A query is split on whitespace. Its last word (after any '/') must
+    occur in a path's own name and every word must occur somewhere in the
+    path. If no name contains the last word, its letters only need to
+    appear in order. Results are ranked by name length, then by where the
+    match starts, then by depth.
+    """
+
+    __slots__ = ("edges", "names", "paths", "text", "offsets")
+
+    def __init__(self, edges: Dict[str, List[str]], names: List[str],
+                 paths: List[List[str]]) -> None:
+        self.edges = edges  # Edges the index was built from
+        self.names = names  # Distinct lowercase names, shortest first
+        self.paths = paths  # Per name, the paths ending in it, shallowest first
+        self.text = "\n".join(names)  # One name per line, in rank order
+        self.offsets = array("q", accumulate((len(name) + 1 for name in names), initial=0))
+
+    @classmethod
+    def build(cls, edges: Dict[str, List[str]]) -> 'PathIndex':
+        """
+        Index every path listed in edges.
+
+        Args:
+            edges: Map of parent paths to child paths
+
+        Returns:
+            New PathIndex
+        """
+        by_name = {}
+        for folder in edges:
+            for path in edges[folder]:
+                name = path.rpartition("/")[2].lower()
+                found = by_name.get(name)
+                if found is None:
+                    by_name[name] = [path]
+                else:
+                    found.append(path)
+
+        names = sorted(by_name, key=lambda name: (len(name), name))
+        paths = []
+        for name in names:
+            found = by_name[name]
+            if len(found) > 1:
+                found.sort(key=lambda path: (path.count("/"), path))
+            paths.append(found)
+        return cls(edges, names, paths)
+
+    def __len__(self) -> int:
+        return sum(map(len, self.paths))
+
+    def _matches(self, pattern: re.Pattern) -> Iterator[Tuple[int, int]]:
+        """Yield (name id, match start) for each name the pattern matches, best first."""
+        offsets = self.offsets
+        previous = -1
+        for match in pattern.finditer(self.text):
+            name_id = bisect_right(offsets, match.start()) - 1
+            if name_id != previous:
+                previous = name_id
+                yield name_id, match.start() - offsets[name_id]
+
+    def _collect(self, matches: Iterable[Tuple[int, int]], filters: List[str],
+                 limit: int) -> List[str]:
+        """
+        Gather the paths of (name id, match start) pairs given best first.
+
+        Names of equal length are ranked by match start, so the walk only
+        stops once the name length moves past that of the last result.
+        """
+        found = []
+        count = 0
+        last_length = None
+        for name_id, start in matches:
+            length = len(self.names[name_id])
+            if count >= limit and length != last_length:
+                break
+            paths = self.paths[name_id]
+            if filters:
+                paths = [path for path in paths
+                         if all(word in path.lower() for word in filters)]
+            if paths:
+                found.append((length, start, name_id, paths))
+                count += len(paths)
+                last_length = length
+        found.sort()
+        return list(islice((path for *_, paths in found for path in paths), limit))
+
+    def search(self, query: str, limit: int = MAX_RESULTS) -> List[str]:
+        """
+        Find paths matching a query.
+
+        Args:
+            query: Words to look for, case-insensitive
+            limit: Maximum number of results
+
+        Returns:
+            Matching paths, best first
+        """
+        words = [word.strip("/") for word in query.lower().split()]
+        words = [word for word in words if word]
+        if not words:
+            return []
+        folder, _, word = words[-1].rpartition("/")
+
+        # The last word is matched against names; the rest, and the last
+        # word itself when it names folders too, against whole paths
+        filters = words[:-1] + ([words[-1]] if folder else [])
+        results = self._collect(self._matches(re.compile(re.escape(word))), filters, limit)
+        if results:
+            return results
+
+        # No name contains the word: fall back to its letters in order. Each
+        # gap skips only characters other than the next letter, so the scan
+        # never backtracks
+        pattern = re.compile(re.escape(word[0]) + "".join(
+            f"[^{re.escape(char)}\n]*{re.escape(char)}" for char in word[1:]))
+        filters = words[:-1] + ([folder] if folder else [])
+        return self._collect(self._matches(pattern), filters, limit)
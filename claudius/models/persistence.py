@@ -4,14 +4,47 @@ Handles saving and loading application state.
 """
 import os
 import json
+import hashlib
 import platform
+import sys
+import threading
 from pathlib import Path
-from typing import Dict, Set, Optional, Union, Any
+from typing import Callable, Dict, Set, Optional, Union, Any, Iterable
+
+from ..utils.profiling import timed
+
+STATE_LOG_VERSION = 1
+
+# Rewrite a root's state log as one snapshot once it holds this many deltas
+COMPACT_AFTER = 256
+
+# Folder for local-mode files, in the current directory
+LOCAL_DIR = '.claudius'
+# Files kept in LOCAL_DIR; older versions wrote them as '.claudius_<name>'
+LOCAL_FILES = ('state.log', 'scan_cache.bin', 'token_cache.bin')
+
+
+def get_config_dir() -> Path:
+    """
+    Get the per-user configuration directory, creating it if needed.
+
+    Returns:
+        Path to the config directory
+    """
+    if platform.system() == 'Windows':
+        config_dir = Path(os.path.expandvars('%APPDATA%')) / 'Claudius'
+    else:  # Linux, MacOS, etc.
+        config_dir = Path.home() / '.config' / 'claudius'
+
+    # Ensure directory exists
+    config_dir.mkdir(parents=True, exist_ok=True)
+
+    return config_dir
 
 
 def get_state_file_path(local_mode: bool = False) -> Path:
     """
-    Get the path to the state file.
+    Get the path to the old global state file, read once per root to migrate it.
 
     Args:
         local_mode: If True, use local directory instead of user config dir
@@ -24,45 +57,171 @@ def get_state_file_path(local_mode: bool = False) -> Path:
         return Path('.claudius_state.json')
 
     # Otherwise, use the appropriate config directory for the OS
-    if platform.system() == 'Windows':
-        config_dir = Path(os.path.expandvars('%APPDATA%')) / 'Claudius'
-    else:  # Linux, MacOS, etc.
-        config_dir = Path.home() / '.config' / 'claudius'
+    return get_config_dir() / 'state.json'
 
-    # Ensure directory exists
-    config_dir.mkdir(parents=True, exist_ok=True)
 
-    return config_dir / 'state.json'
+def get_local_path(name: str) -> Path:
+    """
+    Get the path to a local-mode file.
+
+    The folder is created by whoever writes the file, so asking for the
+    path never changes the current directory.
 
+    Args:
+        name: File name inside LOCAL_DIR
 
-def save_state(expanded_folders: Set[str], selected_item: Optional[str], local_mode: bool = None) -> bool:
+    Returns:
+        Path to the file
     """
-    Save application state to disk.
+    return Path(LOCAL_DIR) / name
+
+
+def migrate_local_files() -> None:
+    """Move local-mode files left in the current directory by older versions into LOCAL_DIR."""
+    for name in LOCAL_FILES:
+        legacy = Path(f'.claudius_{name}')
+        path = get_local_path(name)
+        if legacy.exists() and not path.exists():
+            try:
+                path.parent.mkdir(exist_ok=True)
+                os.replace(legacy, path)
+            except OSError:
+                pass
+
+
+def get_local_dir(root_dir: str) -> Optional[str]:
+    """
+    Get the path of the local-mode folder relative to a root, if it is inside it.
+
+    Scans leave this folder out of the tree, so writing caches to it
+    neither shows up in the tree nor changes the mtimes the scan cache
+    checks. A folder of the same name anywhere else is listed as usual.
 
     Args:
-        expanded_folders: Set of expanded folder paths
-        selected_item: Currently selected item path
-        local_mode: If True, save to local directory. If None, auto-detect.
+        root_dir: Root directory being scanned
 
     Returns:
-        True if successful, False otherwise
+        Root-relative path with '/' separators, or None if local mode is
+        off or the folder is outside the root
+    """
+    if not get_local_mode():
+        return None
+    rel_path = os.path.relpath(os.path.realpath(LOCAL_DIR), os.path.realpath(root_dir))
+    if rel_path == os.pardir or rel_path.startswith(os.pardir + os.sep):
+        return None
+    return rel_path.replace(os.sep, '/')
+
+
+def _root_digest(root_dir: str) -> str:
+    """Return a short, stable file name for a canonical root path."""
+    root = os.path.realpath(root_dir)
+    return hashlib.sha1(root.encode('utf-8', 'surrogateescape')).hexdigest()[:16]
+
+
+def get_state_log_path(root_dir: str, local_mode: bool = None) -> Path:
+    """
+    Get the path to the state log for a root directory.
+
+    Each canonical root path has its own log, so finding a project's state
+    costs the same however many projects have been opened.
+
+    Args:
+        root_dir: Root directory the state belongs to
+        local_mode: If True, use local directory. If None, auto-detect.
+
+    Returns:
+        Path to the state log
     """
     if local_mode is None:
         local_mode = get_local_mode()
-    state_path = get_state_file_path(local_mode)
+    if local_mode:
+        return get_local_path('state.log')
+
+    state_dir = get_config_dir() / 'state'
+    state_dir.mkdir(parents=True, exist_ok=True)
+    return state_dir / f'{_root_digest(root_dir)}.log'
+
+
+def get_scan_cache_path(root_dir: str, local_mode: bool = None) -> Path:
+    """
+    Get the path to the scan cache for a root directory.
+
+    Caches live next to the state file, one per canonical root path. In
+    local mode that is LOCAL_DIR, which scans skip (see get_local_dir), so
+    writing the cache doesn't invalidate the root folder's entry in it.
+
+    Args:
+        root_dir: Root directory that was scanned
+        local_mode: If True, use local directory. If None, auto-detect.
+
+    Returns:
+        Path to the scan cache file
+    """
+    if local_mode is None:
+        local_mode = get_local_mode()
+    if local_mode:
+        return get_local_path('scan_cache.bin')
+
+    cache_dir = get_config_dir() / 'scan_cache'
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir / f'{_root_digest(root_dir)}.bin'
+
+
+def get_token_cache_path(root_dir: str, local_mode: bool = None) -> Path:
+    """
+    Get the path to the token estimate cache for a root directory.
+
+    Args:
+        root_dir: Root directory the estimates are for
+        local_mode: If True, use local directory. If None, auto-detect.
+
+    Returns:
+        Path to the token cache file
+    """
+    if local_mode is None:
+        local_mode = get_local_mode()
+    if local_mode:
+        return get_local_path('token_cache.bin')
+
+    cache_dir = get_config_dir() / 'token_cache'
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir / f'{_root_digest(root_dir)}.bin'
 
-    # Convert to serializable format
-    state_data = {
-        'expanded_folders': list(expanded_folders),
-        'selected_item': selected_item
-    }
 
+def atomic_write(path: Union[str, Path], chunks: Iterable[bytes], fsync: bool = True,
+                 make_dirs: bool = False) -> bool:
+    """
+    Replace a file so readers, and a crash, only ever see the old or the new contents.
+
+    The data goes to a temporary file in the same folder, which is flushed
+    to disk and then renamed over the target.
+
+    Args:
+        path: File to replace
+        chunks: Contents to write, as one or more byte strings
+        fsync: Flush the data to disk before renaming
+        make_dirs: Create the file's folder if it doesn't exist
+
+    Returns:
+        True if successful, False otherwise
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
     try:
-        with open(state_path, 'w') as f:
-            json.dump(state_data, f)
+        if make_dirs:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
         return True
-    except Exception as e:
-        print(f"Error saving state: {e}")
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
         return False
 
 
@@ -92,28 +251,19 @@ def get_local_mode() -> bool:
     return not is_package_installed()
 
 
-def load_state(local_mode: bool = None) -> Dict[str, Any]:
-    """
-    Load application state from disk.
-
-    Args:
-        local_mode: If True, load from local directory. If None, auto-detect.
-
-    Returns:
-        Dictionary with loaded state or empty values if file doesn't exist
-    """
-    if local_mode is None:
-        local_mode = get_local_mode()
-    state_path = get_state_file_path(local_mode)
-
-    # Default state if file doesn't exist
-    default_state = {
+def _default_state() -> Dict[str, Any]:
+    """Return the state used when nothing was saved."""
+    return {
         'expanded_folders': set(),
         'selected_item': None
     }
 
+
+def _load_legacy_state(local_mode: bool) -> Dict[str, Any]:
+    """Load the old global state file, if there is one."""
+    state_path = get_state_file_path(local_mode)
     if not state_path.exists():
-        return default_state
+        return _default_state()
 
     try:
         with open(state_path, 'r') as f:
@@ -125,5 +275,268 @@ def load_state(local_mode: bool = None) -> Dict[str, Any]:
             'selected_item': state_data.get('selected_item')
         }
     except Exception as e:
-        print(f"Error loading state: {e}")
-        return default_statee
+        # Runs before or beside the UI, which owns stdout
+        sys.stderr.write(f"Error loading state: {e}\n")
+        return _default_state()
+
+
+class StateStore:
+    """
+    UI state for one root directory, kept as an append-only log.
+
+    The log is JSON lines: a snapshot ({"v", "root", "expanded", "selected"})
+    followed by deltas ({"add", "remove", "selected"}, each key optional).
+    Saving appends only what changed since the last save; once the log
+    holds COMPACT_AFTER deltas it is rewritten as a single snapshot. A line
+    torn by a crash ends the log and forces the next save to compact.
+    """
+
+    def __init__(self, root_dir: str, local_mode: bool = None) -> None:
+        if local_mode is None:
+            local_mode = get_local_mode()
+        self.root = os.path.realpath(root_dir)
+        self.local_mode = local_mode
+        self.path = get_state_log_path(root_dir, local_mode)
+        if local_mode:
+            migrate_local_files()
+        self._expanded = None  # Expanded folders as on disk; None until loaded
+        self._selected = None
+        self._deltas = 0  # Deltas after the snapshot
+        self._clean = False  # Whether the log can be appended to
+        self.error: Optional[str] = None  # Why the last save failed
+
+    def _read(self) -> Optional[Dict[str, Any]]:
+        """Replay the log into self; return None if there is no usable log."""
+        try:
+            with open(self.path, 'rb') as f:
+                lines = f.read().split(b'\n')
+        except OSError:
+            return None
+
+        try:
+            snapshot = json.loads(lines[0])
+        except ValueError:
+            return None
+        if (not isinstance(snapshot, dict) or snapshot.get('v') != STATE_LOG_VERSION
+                or snapshot.get('root') != self.root):
+            return None
+
+        expanded = set(snapshot.get('expanded', []))
+        selected = snapshot.get('selected')
+        deltas = 0
+        clean = lines[-1] == b''
+        for line in lines[1:-1]:
+            try:
+                delta = json.loads(line)
+            except ValueError:
+                delta = None
+            if not isinstance(delta, dict):
+                clean = False
+                break
+            expanded.difference_update(delta.get('remove', ()))
+            expanded.update(delta.get('add', ()))
+            if 'selected' in delta:
+                selected = delta['selected']
+            deltas += 1
+
+        self._expanded, self._selected = expanded, selected
+        self._deltas, self._clean = deltas, clean
+        return {
+            'expanded_folders': set(expanded),
+            'selected_item': selected
+        }
+
+    def load(self) -> Dict[str, Any]:
+        """
+        Load the saved state for this root.
+
+        Returns:
+            Dictionary with the expanded folders and selected item; the old
+            global state file's contents if this root has no log yet
+        """
+        state = self._read()
+        if state is None:
+            state = _load_legacy_state(self.local_mode)
+            self._expanded = set(state['expanded_folders'])
+            self._selected = state['selected_item']
+            self._deltas, self._clean = 0, False
+        return state
+
+    def _compact(self, expanded: Set[str], selected_item: Optional[str]) -> bool:
+        """Replace the log with a snapshot of the given state."""
+        snapshot = {
+            'v': STATE_LOG_VERSION,
+            'root': self.root,
+            'expanded': sorted(expanded),
+            'selected': selected_item
+        }
+        if not atomic_write(self.path, [json.dumps(snapshot).encode('utf-8'), b'\n'],
+                            make_dirs=True):
+            return False
+        self._deltas, self._clean = 0, True
+        return True
+
+    @timed("state.save")
+    def save(self, expanded_folders: Set[str], selected_item: Optional[str]) -> bool:
+        """
+        Record the state, appending only what changed since the last save.
+
+        Args:
+            expanded_folders: Set of expanded folder paths
+            selected_item: Currently selected item path
+
+        Returns:
+            True if successful, False otherwise (see self.error)
+        """
+        self.error = None
+        if self._expanded is None:
+            self.load()
+        old = self._expanded
+        expanded = set(expanded_folders)
+
+        try:
+            if not self._clean or self._deltas >= COMPACT_AFTER:
+                written = self._compact(expanded, selected_item)
+            else:
+                delta = {}
+                added = expanded - old
+                removed = old - expanded
+                if added:
+                    delta['add'] = sorted(added)
+                if removed:
+                    delta['remove'] = sorted(removed)
+                if selected_item != self._selected:
+                    delta['selected'] = selected_item
+                if not delta:
+                    return True
+                with open(self.path, 'ab') as f:
+                    f.write(json.dumps(delta).encode('utf-8') + b'\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._deltas += 1
+                written = True
+        except Exception as e:
+            self.error = f"Error saving state: {e}"
+            self._clean = False
+            return False
+
+        if written:
+            self._expanded, self._selected = expanded, selected_item
+        else:
+            self.error = f"Error saving state to {self.path}"
+        return written
+
+
+def load_state(root_dir: str, local_mode: bool = None) -> Dict[str, Any]:
+    """
+    Load the saved state for a root directory.
+
+    Args:
+        root_dir: Root directory the state belongs to
+        local_mode: If True, load from local directory. If None, auto-detect.
+
+    Returns:
+        Dictionary with loaded state or empty values if nothing was saved
+    """
+    return StateStore(root_dir, local_mode).load()
+
+
+def save_state(root_dir: str, expanded_folders: Set[str], selected_item: Optional[str],
+               local_mode: bool = None) -> bool:
+    """
+    Save the state for a root directory.
+
+    Args:
+        root_dir: Root directory the state belongs to
+        expanded_folders: Set of expanded folder paths
+        selected_item: Currently selected item path
+        local_mode: If True, save to local directory. If None, auto-detect.
+
+    Returns:
+        True if successful, False otherwise
+    """
+    return StateStore(root_dir, local_mode).save(expanded_folders, selected_item)
+
+
+class StateWriter:
+    """
+    Write-behind saving of the UI state.
+
+    save() only records the newest state and wakes a background thread,
+    so it costs the same however many folders are expanded. The thread
+    waits out the interval, letting further changes pile up, then writes
+    the newest state once. close() writes whatever is still pending.
+    A failed write is reported to on_error, possibly from that thread.
+    """
+
+    def __init__(self, root_dir: str, interval: float = 1.0, local_mode: bool = None,
+                 on_error: Optional[Callable[[str], None]] = None) -> None:
+        self.interval = interval
+        self.on_error = on_error
+        self.store = StateStore(root_dir, local_mode)
+        self._pending = None  # Newest (expanded_folders, selected_item) not yet written
+        self._closed = False
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()  # Keeps writes in order
+        self._thread = None
+
+    def save(self, expanded_folders: Set[str], selected_item: Optional[str]) -> None:
+        """
+        Schedule a save.
+
+        Args:
+            expanded_folders: Set of expanded folder paths; must not be mutated later
+            selected_item: Currently selected item path
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._pending = (expanded_folders, selected_item)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="claudius-state-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self) -> None:
+        """Background loop: wait for a change, let more arrive, write once."""
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or self._closed)
+                if self._closed:
+                    return
+                # Returns early only when closing; close() flushes then
+                if self._cond.wait_for(lambda: self._closed, timeout=self.interval):
+                    return
+            self.flush()
+
+    def flush(self) -> bool:
+        """
+        Write any pending state now.
+
+        Returns:
+            True if nothing was pending or the write succeeded
+        """
+        with self._write_lock:
+            with self._cond:
+                pending, self._pending = self._pending, None
+            if pending is None:
+                return True
+            saved = self.store.save(*pending)
+        if not saved and self.on_error is not None:
+            self.on_error(self.store.error)
+        return saved
+
+    def close(self) -> bool:
+        """
+        Stop the background thread and write any pending state.
+
+        Returns:
+            True if nothing was pending or the final write succeeded
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+        return self.flush()
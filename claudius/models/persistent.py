@@ -0,0 +1,638 @@
+"""
+Persistent collections for Claudius.
+Hash array mapped tries (HAMTs) that share structure between versions, so
+adding or removing one path copies O(log N) nodes instead of the whole
+collection, and keeping old states around costs almost nothing. PBits
+stores a byte per position in chunks held by such a trie, and OverlayMap
+keeps a plain dict with a trie of edits on top.
+"""
+from collections.abc import ItemsView, Mapping, Set as AbstractSet
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_BITS = 64  # Hashes are folded to 64 bits; deeper keys share a collision node
+_HASH_MASK = (1 << _HASH_BITS) - 1
+
+try:
+    _popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def _popcount(value: int) -> int:
+        return bin(value).count("1")
+
+
+def _hash(key: Any) -> int:
+    return hash(key) & _HASH_MASK
+
+
+class _Node:
+    """
+    Trie node with up to 32 slots.
+
+    Each set bit of bitmap owns one entry, in bit order. An entry is either
+    a (key, value) tuple or a child node. owner marks nodes created during
+    the current batch edit, which may be changed in place.
+    """
+
+    __slots__ = ("bitmap", "entries", "owner")
+
+    def __init__(self, bitmap: int, entries: List[Any], owner: Optional[object]) -> None:
+        self.bitmap = bitmap
+        self.entries = entries
+        self.owner = owner
+
+    def _editable(self, owner: Optional[object]) -> '_Node':
+        if owner is not None and self.owner is owner:
+            return self
+        return _Node(self.bitmap, list(self.entries), owner)
+
+    def assoc(self, shift: int, key_hash: int, key: Any, value: Any,
+              owner: Optional[object]) -> Tuple['_Node', bool]:
+        """Return a node with key set to value, and whether key is new."""
+        bit = 1 << ((key_hash >> shift) & _MASK)
+        slot = _popcount(self.bitmap & (bit - 1))
+        if not self.bitmap & bit:
+            node = self._editable(owner)
+            node.entries.insert(slot, (key, value))
+            node.bitmap |= bit
+            return node, True
+
+        entry = self.entries[slot]
+        if type(entry) is tuple:
+            if entry[0] == key:
+                if entry[1] is value:
+                    return self, False
+                node = self._editable(owner)
+                node.entries[slot] = (key, value)
+                return node, False
+            child = _pair(shift + _BITS, _hash(entry[0]), entry, key_hash, (key, value), owner)
+            added = True
+        else:
+            child, added = entry.assoc(shift + _BITS, key_hash, key, value, owner)
+            if child is entry:
+                return self, added
+        node = self._editable(owner)
+        node.entries[slot] = child
+        return node, added
+
+    def without(self, shift: int, key_hash: int, key: Any,
+                owner: Optional[object]) -> Tuple[Any, bool]:
+        """
+        Return the node with key removed, and whether it was present.
+
+        A node left with a single (key, value) entry is returned as that
+        tuple so the parent can pull it up; an empty node comes back as None.
+        """
+        bit = 1 << ((key_hash >> shift) & _MASK)
+        if not self.bitmap & bit:
+            return self, False
+        slot = _popcount(self.bitmap & (bit - 1))
+        entry = self.entries[slot]
+        if type(entry) is tuple:
+            if entry[0] != key:
+                return self, False
+            child = None
+        else:
+            child, removed = entry.without(shift + _BITS, key_hash, key, owner)
+            if not removed:
+                return self, False
+
+        if child is None:
+            if len(self.entries) == 1:
+                return None, True
+            if len(self.entries) == 2 and shift:
+                other = self.entries[1 - slot]
+                if type(other) is tuple:
+                    return other, True
+            node = self._editable(owner)
+            del node.entries[slot]
+            node.bitmap ^= bit
+            return node, True
+
+        if len(self.entries) == 1 and shift and type(child) is tuple:
+            return child, True
+        node = self._editable(owner)
+        node.entries[slot] = child
+        return node, True
+
+    def iter_entries(self) -> Iterator[Tuple[Any, Any]]:
+        stack = [iter(self.entries)]
+        while stack:
+            entry = next(stack[-1], None)
+            if entry is None:
+                stack.pop()
+            elif type(entry) is tuple:
+                yield entry
+            elif type(entry) is _Collision:
+                yield from entry.pairs
+            else:
+                stack.append(iter(entry.entries))
+
+
+class _Collision:
+    """Entries whose 64-bit hashes are identical."""
+
+    __slots__ = ("key_hash", "pairs")
+
+    def __init__(self, key_hash: int, pairs: List[Tuple[Any, Any]]) -> None:
+        self.key_hash = key_hash
+        self.pairs = pairs
+
+    def get(self, key: Any, default: Any) -> Any:
+        for entry_key, value in self.pairs:
+            if entry_key == key:
+                return value
+        return default
+
+    def assoc(self, shift: int, key_hash: int, key: Any, value: Any,
+              owner: Optional[object]) -> Tuple['_Collision', bool]:
+        pairs = [pair for pair in self.pairs if pair[0] != key]
+        added = len(pairs) == len(self.pairs)
+        pairs.append((key, value))
+        return _Collision(self.key_hash, pairs), added
+
+    def without(self, shift: int, key_hash: int, key: Any,
+                owner: Optional[object]) -> Tuple[Any, bool]:
+        pairs = [pair for pair in self.pairs if pair[0] != key]
+        if len(pairs) == len(self.pairs):
+            return self, False
+        if len(pairs) == 1:
+            return pairs[0], True
+        return _Collision(self.key_hash, pairs), True
+
+
+def _pair(shift: int, hash1: int, entry1: Tuple[Any, Any], hash2: int,
+          entry2: Tuple[Any, Any], owner: Optional[object]) -> Any:
+    """Build the smallest subtrie holding two entries with different keys."""
+    if shift >= _HASH_BITS:
+        return _Collision(hash1, [entry1, entry2])
+    index1 = (hash1 >> shift) & _MASK
+    index2 = (hash2 >> shift) & _MASK
+    if index1 == index2:
+        child = _pair(shift + _BITS, hash1, entry1, hash2, entry2, owner)
+        return _Node(1 << index1, [child], owner)
+    entries = [entry1, entry2] if index1 < index2 else [entry2, entry1]
+    return _Node((1 << index1) | (1 << index2), entries, owner)
+
+
+def _lookup(root: _Node, key: Any, default: Any) -> Any:
+    """Return the value stored for key, or default."""
+    # Lookups are the hot path when rows are rebuilt, so the walk is inlined
+    key_hash = hash(key) & _HASH_MASK
+    node = root
+    shift = 0
+    while True:
+        bitmap = node.bitmap
+        bit = 1 << ((key_hash >> shift) & _MASK)
+        if not bitmap & bit:
+            return default
+        entry = node.entries[_popcount(bitmap & (bit - 1))]
+        kind = type(entry)
+        if kind is tuple:
+            return entry[1] if entry[0] is key or entry[0] == key else default
+        if kind is _Collision:
+            return entry.get(key, default)
+        node = entry
+        shift += _BITS
+
+
+_EMPTY = _Node(0, [], None)
+_MISSING = object()
+
+
+class _Trie:
+    """Shared plumbing for PMap and PSet: a root node and a size."""
+
+    __slots__ = ("_root", "_size")
+
+    def __init__(self) -> None:
+        self._root = _EMPTY
+        self._size = 0
+
+    @classmethod
+    def _make(cls, root: _Node, size: int) -> Any:
+        if size == 0:
+            root = _EMPTY
+        instance = cls.__new__(cls)
+        instance._root = root
+        instance._size = size
+        return instance
+
+    def _assoc_all(self, pairs: Iterable[Tuple[Any, Any]]) -> Any:
+        # Nodes created in this batch are owned by it and edited in place
+        owner = object()
+        root, size = self._root, self._size
+        for key, value in pairs:
+            root, added = root.assoc(0, _hash(key), key, value, owner)
+            size += added
+        if root is self._root:
+            return self
+        return self._make(root, size)
+
+    def _without_all(self, keys: Iterable[Any]) -> Any:
+        owner = object()
+        root, size = self._root, self._size
+        for key in keys:
+            if not size:
+                break
+            new_root, removed = root.without(0, _hash(key), key, owner)
+            if removed:
+                size -= 1
+                root = new_root if new_root is not None else _EMPTY
+        if root is self._root:
+            return self
+        return self._make(root, size)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, key: object) -> bool:
+        return _lookup(self._root, key, _MISSING) is not _MISSING
+
+
+class PMap(_Trie, Mapping):
+    """
+    Immutable mapping with structural sharing.
+
+    set, discard and update return a new map; the original is unchanged.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, items: Any = ()) -> None:
+        super().__init__()
+        if items:
+            pairs = items.items() if isinstance(items, Mapping) else items
+            built = self._assoc_all(pairs)
+            self._root, self._size = built._root, built._size
+
+    @classmethod
+    def coerce(cls, items: Any) -> 'PMap':
+        """Return items as a PMap, without copying if it already is one."""
+        return items if isinstance(items, PMap) else cls(items)
+
+    def thaw(self) -> dict:
+        """Return a plain dict copy, for passes that look up most keys."""
+        return dict(self._root.iter_entries())
+
+    def __getitem__(self, key: Any) -> Any:
+        value = _lookup(self._root, key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return _lookup(self._root, key, default)
+
+    def __iter__(self) -> Iterator[Any]:
+        for key, _ in self._root.iter_entries():
+            yield key
+
+    def items(self):
+        return _PMapItems(self)
+
+    def __repr__(self) -> str:
+        return f"PMap({dict(self.items())!r})"
+
+    def set(self, key: Any, value: Any) -> 'PMap':
+        """Return a copy with key mapped to value."""
+        root, added = self._root.assoc(0, _hash(key), key, value, None)
+        if root is self._root:
+            return self
+        return self._make(root, self._size + added)
+
+    def discard(self, key: Any) -> 'PMap':
+        """Return a copy without key (or this map if key is absent)."""
+        return self._without_all((key,))
+
+    def update(self, items: Any) -> 'PMap':
+        """
+        Return a copy with every key of items set.
+
+        Args:
+            items: Mapping or iterable of (key, value) pairs
+
+        Returns:
+            New map
+        """
+        pairs = items.items() if isinstance(items, Mapping) else items
+        return self._assoc_all(pairs)
+
+    def discard_all(self, keys: Iterable[Any]) -> 'PMap':
+        """Return a copy without any of keys."""
+        return self._without_all(keys)
+
+
+class _PMapItems(ItemsView):
+    """Items view that walks the trie once instead of looking up each key."""
+
+    __slots__ = ()
+
+    def __iter__(self) -> Iterator[Tuple[Any, Any]]:
+        return self._mapping._root.iter_entries()
+
+
+class PSet(_Trie, AbstractSet):
+    """
+    Immutable set with structural sharing.
+
+    add and discard return a new set in O(log N). The |, - and &
+    operators return PSets and only touch the smaller side where they can.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, items: Iterable[Any] = ()) -> None:
+        super().__init__()
+        if items:
+            built = self._assoc_all((item, True) for item in items)
+            self._root, self._size = built._root, built._size
+
+    @classmethod
+    def coerce(cls, items: Iterable[Any]) -> 'PSet':
+        """Return items as a PSet, without copying if it already is one."""
+        return items if isinstance(items, PSet) else cls(items)
+
+    def thaw(self) -> frozenset:
+        """Return a frozenset copy, for passes that test many paths."""
+        return frozenset(key for key, _ in self._root.iter_entries())
+
+    @classmethod
+    def _from_iterable(cls, iterable: Iterable[Any]) -> 'PSet':
+        return cls(iterable)
+
+    def __iter__(self) -> Iterator[Any]:
+        for key, _ in self._root.iter_entries():
+            yield key
+
+    def __repr__(self) -> str:
+        return f"PSet({set(self)!r})"
+
+    def add(self, item: Any) -> 'PSet':
+        """Return a copy with item added."""
+        root, added = self._root.assoc(0, _hash(item), item, True, None)
+        if not added:
+            return self
+        return self._make(root, self._size + 1)
+
+    def discard(self, item: Any) -> 'PSet':
+        """Return a copy without item (or this set if item is absent)."""
+        return self._without_all((item,))
+
+    def union(self, items: Iterable[Any]) -> 'PSet':
+        """Return a copy with every item of items added."""
+        if isinstance(items, PSet) and len(items) > len(self):
+            return items.union(self)
+        return self._assoc_all((item, True) for item in items)
+
+    def difference(self, items: Iterable[Any]) -> 'PSet':
+        """Return a copy without any item of items."""
+        if isinstance(items, AbstractSet) and len(items) > len(self):
+            return self._from_iterable(item for item in self if item not in items)
+        return self._without_all(items)
+
+    def __or__(self, other: Any) -> Any:
+        if not isinstance(other, AbstractSet):
+            return NotImplemented
+        return self.union(other)
+
+    __ror__ = __or__
+
+    def __sub__(self, other: Any) -> Any:
+        if not isinstance(other, AbstractSet):
+            return NotImplemented
+        return self.difference(other)
+
+    def __and__(self, other: Any) -> Any:
+        if not isinstance(other, AbstractSet):
+            return NotImplemented
+        small, large = (other, self) if len(other) < len(self) else (self, other)
+        return self._from_iterable(item for item in small if item in large)
+
+    __rand__ = __and__
+
+    __hash__ = AbstractSet._hash
+
+
+_REMOVED = object()
+
+
+class OverlayMap(Mapping):
+    """
+    Immutable mapping made of a plain dict with edits on top in a PMap.
+
+    Turning a large dict into a PMap costs seconds, so a mapping that is
+    mostly replaced whole (such as the collected file stats) keeps the dict
+    it came as, shared and never changed, and only its later edits go in
+    the trie.
+    """
+
+    __slots__ = ("base", "changes", "size")
+
+    def __init__(self, base: Mapping, changes: PMap = PMap(), size: Optional[int] = None) -> None:
+        self.base = base
+        self.changes = changes  # Key -> new value, or _REMOVED
+        self.size = len(base) if size is None else size
+
+    @classmethod
+    def coerce(cls, items: Mapping) -> 'OverlayMap':
+        """Return items as an OverlayMap, wrapping (not copying) a plain mapping."""
+        return items if isinstance(items, OverlayMap) else cls(items)
+
+    def __getitem__(self, key: Any) -> Any:
+        value = self.changes.get(key, _MISSING)
+        if value is _MISSING:
+            return self.base[key]
+        if value is _REMOVED:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        value = self.changes.get(key, _MISSING)
+        if value is _MISSING:
+            return self.base.get(key, default)
+        return default if value is _REMOVED else value
+
+    def __contains__(self, key: object) -> bool:
+        value = self.changes.get(key, _MISSING)
+        if value is _MISSING:
+            return key in self.base
+        return value is not _REMOVED
+
+    def __iter__(self) -> Iterator[Any]:
+        changes = self.changes
+        for key in self.base:
+            if key not in changes:
+                yield key
+        for key, value in changes.items():
+            if value is not _REMOVED:
+                yield key
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self) -> str:
+        return f"OverlayMap({dict(self.items())!r})"
+
+    def update(self, items: Any) -> 'OverlayMap':
+        """
+        Return a copy with every key of items set.
+
+        Args:
+            items: Mapping or iterable of (key, value) pairs
+
+        Returns:
+            New map
+        """
+        pairs = list(items.items() if isinstance(items, Mapping) else items)
+        size = self.size + sum(1 for key, _ in pairs if key not in self)
+        return OverlayMap(self.base, self.changes.update(pairs), size)
+
+    def discard_all(self, keys: Iterable[Any]) -> 'OverlayMap':
+        """Return a copy without any of keys."""
+        gone = {key for key in keys if key in self}
+        if not gone:
+            return self
+        return OverlayMap(self.base, self.changes.update((key, _REMOVED) for key in gone),
+                          self.size - len(gone))
+
+
+_CHUNK_BITS = 12
+_CHUNK = 1 << _CHUNK_BITS  # Positions per chunk of a PBits
+
+
+class PBits:
+    """
+    Immutable array of 0/1 bytes, one per position, with structural sharing.
+
+    Positions are split into chunks of _CHUNK bytes kept in a PMap by chunk
+    number. Setting a few positions copies only the chunks they fall in and
+    O(log N) trie nodes, and filling a range shares one all-ones or
+    all-zeros chunk for every chunk it covers whole. Reads follow the
+    bytearray methods the inclusion code uses: indexing, count and find.
+    """
+
+    __slots__ = ("chunks", "length", "ones")
+
+    def __init__(self, chunks: PMap, length: int, ones: int) -> None:
+        self.chunks = chunks  # Chunk number -> bytes
+        self.length = length
+        self.ones = ones  # Number of positions set
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'PBits':
+        """
+        Build an array from a flat buffer of 0/1 bytes.
+
+        Args:
+            data: One byte per position
+
+        Returns:
+            New PBits
+        """
+        data = bytes(data)
+        chunks = PMap((start >> _CHUNK_BITS, data[start:start + _CHUNK])
+                      for start in range(0, len(data), _CHUNK))
+        return cls(chunks, len(data), data.count(1))
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, row: int) -> int:
+        return self.chunks[row >> _CHUNK_BITS][row & (_CHUNK - 1)]
+
+    def __iter__(self) -> Iterator[int]:
+        chunks = self.chunks
+        for number in range((self.length + _CHUNK - 1) >> _CHUNK_BITS):
+            yield from chunks[number]
+
+    def tobytes(self) -> bytes:
+        """Return the positions as one flat buffer."""
+        chunks = self.chunks
+        return b''.join(chunks[number]
+                        for number in range((self.length + _CHUNK - 1) >> _CHUNK_BITS))
+
+    def _spans(self, start: int, end: int) -> Iterator[Tuple[int, int, int]]:
+        """Yield (chunk number, start, end) for the part of [start, end) in each chunk."""
+        while start < end:
+            number = start >> _CHUNK_BITS
+            offset = start & (_CHUNK - 1)
+            stop = min(end - start + offset, _CHUNK)
+            yield number, offset, stop
+            start += stop - offset
+
+    def count(self, value: int, start: int = 0, end: Optional[int] = None) -> int:
+        """Count positions in [start, end) holding value (0 or 1)."""
+        end = self.length if end is None else min(end, self.length)
+        chunks = self.chunks
+        ones = sum(chunks[number].count(1, offset, stop)
+                   for number, offset, stop in self._spans(start, end))
+        return ones if value else max(end - start, 0) - ones
+
+    def find(self, value: int, start: int = 0, end: Optional[int] = None) -> int:
+        """Return the first position in [start, end) holding value, or -1."""
+        end = self.length if end is None else min(end, self.length)
+        chunks = self.chunks
+        for number, offset, stop in self._spans(start, end):
+            found = chunks[number].find(value, offset, stop)
+            if found != -1:
+                return (number << _CHUNK_BITS) + found
+        return -1
+
+    def set_rows(self, rows: Iterable[int], value: int) -> 'PBits':
+        """
+        Return a copy with the given positions set to value.
+
+        Args:
+            rows: Positions to change
+            value: 0 or 1
+
+        Returns:
+            New PBits, sharing every chunk none of rows fall in
+        """
+        edited: Dict[int, bytearray] = {}
+        for row in rows:
+            number = row >> _CHUNK_BITS
+            chunk = edited.get(number)
+            if chunk is None:
+                chunk = edited[number] = bytearray(self.chunks[number])
+            chunk[row & (_CHUNK - 1)] = value
+        return self._replaced(edited)
+
+    def fill(self, start: int, end: int, value: int) -> 'PBits':
+        """
+        Return a copy with every position in [start, end) set to value.
+
+        Args:
+            start: First position
+            end: Position after the last
+            value: 0 or 1
+
+        Returns:
+            New PBits
+        """
+        full = _ONES if value else _ZEROS
+        edited = {}
+        for number, offset, stop in self._spans(start, min(end, self.length)):
+            if offset == 0 and stop == _CHUNK:
+                edited[number] = full
+            else:
+                chunk = bytearray(self.chunks[number])
+                chunk[offset:stop] = full[offset:stop]
+                edited[number] = chunk
+        return self._replaced(edited)
+
+    def _replaced(self, edited: Dict[int, bytes]) -> 'PBits':
+        """Return a copy with whole chunks swapped in."""
+        if not edited:
+            return self
+        chunks = self.chunks
+        ones = self.ones
+        for number, chunk in edited.items():
+            ones += chunk.count(1) - chunks[number].count(1)
+        return PBits(chunks.update((number, bytes(chunk)) for number, chunk in edited.items()),
+                     self.length, ones)
+
+
+_ZEROS = bytes(_CHUNK)
+_ONES = b'\x01' * _CHUNK
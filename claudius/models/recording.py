@@ -0,0 +1,129 @@
+"""
+Session recording for Claudius.
+Appends every dispatched action, with the time it was dispatched, to a
+JSONL file so a session can be replayed offline. The first LOAD_DATA
+action holds the whole tree, so a recording needs no access to the
+original files.
+"""
+import json
+import time
+from collections.abc import Mapping, Set as AbstractSet
+from typing import Any, Dict, Iterator, Optional
+
+from .state import ActionType
+from ..utils.patterns import PatternMatcher
+
+RECORDING_VERSION = 1
+
+# Payload keys holding sets, which JSON stores as lists
+SET_KEYS = ("folders", "pruned_folders", "included_paths", "expanded_folders")
+
+# Feedback that follows from other actions rather than from input
+UNRECORDED_ACTIONS = {ActionType.SET_NOTIFICATION, ActionType.CLEAR_NOTIFICATION}
+
+
+def _to_json(value: Any) -> Any:
+    """Convert the persistent and compact collections actions carry."""
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, AbstractSet):
+        return list(value)
+    if isinstance(value, PatternMatcher):
+        return value.lines
+    if hasattr(value, "__iter__"):
+        return list(value)
+    raise TypeError(f"Cannot record {type(value).__name__}")
+
+
+def decode_action(action: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Restore the types an action's payload had before it was recorded.
+
+    Args:
+        action: Action as read from a recording
+
+    Returns:
+        Action ready for the reducer
+    """
+    action = dict(action)
+    for key in SET_KEYS:
+        if key in action:
+            action[key] = set(action[key])
+    if action.get("ignore_matcher") is not None:
+        action["ignore_matcher"] = PatternMatcher(action["ignore_matcher"])
+    if action["type"] in (ActionType.SET_FILE_STATS, ActionType.UPDATE_FILE_STATS):
+        action["stats"] = {path: tuple(stat) for path, stat in action["stats"].items()}
+    return action
+
+
+class SessionRecorder:
+    """Writes the actions a session dispatches to a JSONL file."""
+
+    def __init__(self, path: str, root_dir: Optional[str] = None) -> None:
+        """
+        Args:
+            path: Recording file; replaced if it exists
+            root_dir: Root directory being recorded, noted in the header
+        """
+        self.path = path
+        self.started = time.monotonic()
+        # Line buffered, so a session that crashes is still recorded
+        self.file = open(path, "w", encoding="utf-8", buffering=1)
+        self._write({"v": RECORDING_VERSION, "root": root_dir})
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        """Append one line."""
+        self.file.write(json.dumps(record, default=_to_json) + "\n")
+
+    def record(self, action: Dict[str, Any]) -> None:
+        """
+        Record a dispatched action.
+
+        Args:
+            action: Action with type and payload
+        """
+        if action["type"] in UNRECORDED_ACTIONS or self.file.closed:
+            return
+        self._write({"t": time.monotonic() - self.started, "action": action})
+
+    def record_command(self, command: str) -> None:
+        """
+        Record input that runs outside the reducer, such as writing .claudeignore.
+
+        Args:
+            command: Name of the app action, e.g. "write_file"
+        """
+        if not self.file.closed:
+            self._write({"t": time.monotonic() - self.started, "command": command})
+
+    def close(self) -> None:
+        """Finish the recording."""
+        self.file.close()
+
+
+def read_recording(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Read a recording.
+
+    Args:
+        path: Recording file
+
+    Yields:
+        Records in order, each with a time "t" and either a decoded
+        "action" or a "command"
+
+    Raises:
+        ValueError: If the file is not a recording this version can read
+    """
+    with open(path, encoding="utf-8") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("v") != RECORDING_VERSION:
+            raise ValueError(f"{path} is not a version {RECORDING_VERSION} recording")
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break  # Torn last line of a session that was killed
+            if "action" in record:
+                record["action"] = decode_action(record["action"])
+            yield record
@@ -0,0 +1,338 @@
+"""
+On-disk scan index for Claudius.
+Stores the last scan of a root directory in a compact columnar binary file
+so a warm start only has to re-list folders whose mtime changed.
+
+File layout (all columns 8-byte aligned, native byte order):
+    header      magic, version, byte order, root device/inode, prune
+                patterns hash, counts, crc32
+    root path   UTF-8 bytes of the canonical root path
+    dir_mtime   int64[n_dirs]       st_mtime_ns of each folder (-1: always re-list)
+    dir_ino     uint64[n_dirs]      st_ino of each folder
+    dir_first   uint64[n_dirs + 1]  index of each folder's first entry
+    dir_names   uint64[n_dirs + 1]  byte offset of each folder's names in the blob
+    entry_dir   int64[n_entries]    folder index of each entry, -1 if not
+                                    listed, -2 if a pruned folder
+    names       bytes               entry names, each terminated by NUL
+
+Folders are numbered in pre-order with the root at index 0. The file is
+memory-mapped and read through memoryview casts, so nothing is decoded
+until a folder's listing is actually reused.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .persistence import atomic_write
+from .scanner import ScanResult, list_directory, scan_tree, stat_directory
+from ..utils.patterns import PatternMatcher
+from ..utils.profiling import timed
+
+MAGIC = b'CLDSCAN\x00'
+VERSION = 2
+
+# magic, version, byte order, root dev, root ino, prune hash, n_dirs,
+# n_entries, names length, payload length, payload crc32, root path length
+_HEADER = struct.Struct('<8sIB3xQQQQQQQII')
+
+PRUNED = -2
+_BYTE_ORDER = 1 if sys.byteorder == 'little' else 2
+
+# Folders modified this recently may change again within the same mtime
+# tick, so their mtime is not trusted and they are re-listed next time
+RACY_WINDOW_NS = 2_000_000_000
+
+_ENCODING = 'utf-8'
+_ERRORS = 'surrogateescape'
+
+
+def _pad(length: int) -> int:
+    """Round length up to a multiple of 8."""
+    return (length + 7) & ~7
+
+
+def _prune_hash(prune: Optional[PatternMatcher]) -> int:
+    """Fingerprint the prune patterns; a cache is only valid for the same patterns."""
+    lines = ''
+    if prune is not None:
+        lines = '\n'.join(prune.lines + ['\0' + path for path in sorted(prune.skip)])
+    digest = hashlib.sha1(lines.encode(_ENCODING, _ERRORS)).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+class ScanCache:
+    """A memory-mapped scan index loaded from disk."""
+
+    def __init__(self, buffer: mmap.mmap, n_dirs: int, n_entries: int,
+                 names_len: int, offset: int) -> None:
+        self._buffer = buffer
+        view = memoryview(buffer)
+        self._view = view
+
+        def column(code: str, count: int) -> memoryview:
+            nonlocal offset
+            size = count * 8
+            col = view[offset:offset + size].cast(code)
+            offset = _pad(offset + size)
+            return col
+
+        self.dir_mtime = column('q', n_dirs)
+        self.dir_ino = column('Q', n_dirs)
+        self.dir_first = column('Q', n_dirs + 1)
+        self.dir_names = column('Q', n_dirs + 1)
+        self.entry_dir = column('q', n_entries)
+        self.names = view[offset:offset + names_len]
+        self.n_dirs = n_dirs
+
+    def close(self) -> None:
+        """Release the memory map."""
+        for col in (self.dir_mtime, self.dir_ino, self.dir_first,
+                    self.dir_names, self.entry_dir, self.names, self._view):
+            col.release()
+        self._buffer.close()
+
+    def __enter__(self) -> 'ScanCache':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def entry_names(self, index: int) -> List[str]:
+        """Return the names of a cached folder's entries."""
+        chunk = self.names[self.dir_names[index]:self.dir_names[index + 1]]
+        return str(chunk, _ENCODING, _ERRORS).split('\0')[:-1]
+
+    def rescan(self, root_dir: str,
+               prune: Optional[PatternMatcher] = None) -> Tuple[ScanResult, int]:
+        """
+        Rebuild the tree, re-listing only folders whose mtime or inode changed.
+
+        Args:
+            root_dir: Root directory the cache was built for
+            prune: The prune matcher the cache was written with
+
+        Returns:
+            Tuple of the scan result (with dir_stats) and the number of
+            folders that had to be re-listed
+        """
+        root_dir = os.path.abspath(root_dir)
+        result = ScanResult()
+        edges, folders, dir_stats = result.edges, result.folders, result.dir_stats
+        pruned = result.pruned
+        dir_mtime, dir_ino = self.dir_mtime, self.dir_ino
+        dir_first, entry_dir = self.dir_first, self.entry_dir
+        relisted = 0
+
+        stack = [("", 0)]  # (relative path, cached folder index or -1)
+        while stack:
+            rel, index = stack.pop()
+            abs_path = root_dir + os.sep + rel if rel else root_dir
+            mtime, ino = stat_directory(abs_path)
+            if mtime < 0:
+                continue
+            prefix = rel + "/" if rel else ""
+
+            if index >= 0 and dir_mtime[index] == mtime and dir_ino[index] == ino:
+                names = self.entry_names(index)
+                children = [prefix + name for name in names]
+                first = dir_first[index]
+                ids = entry_dir[first:first + len(names)].tolist()
+                subdirs = [(child, i) for child, i in zip(children, ids) if i >= 0]
+                if PRUNED in ids:
+                    pruned.update(child for child, i in zip(children, ids) if i == PRUNED)
+            else:
+                try:
+                    children, subdir_names, pruned_names = list_directory(abs_path, rel, prune)
+                except OSError:
+                    continue
+                relisted += 1
+                pruned.update(prefix + name for name in pruned_names)
+
+                # Subfolders we already know keep using the cache
+                known = {}
+                if index >= 0:
+                    names = self.entry_names(index)
+                    first = dir_first[index]
+                    ids = entry_dir[first:first + len(names)].tolist()
+                    known = {name: i for name, i in zip(names, ids) if i >= 0}
+                subdirs = [(prefix + name, known.get(name, -1)) for name in subdir_names]
+
+            if rel:
+                folders.add(rel)
+            edges[rel] = children
+            dir_stats[rel] = (mtime, ino)
+            stack.extend(reversed(subdirs))
+
+        return result, relisted
+
+
+def load_scan_cache(cache_path: Path, root_dir: str,
+                    prune: Optional[PatternMatcher] = None) -> Optional[ScanCache]:
+    """
+    Open a scan cache if it exists and can be trusted.
+
+    The cache is rejected if its header, byte order, root path, root
+    device/inode, prune patterns or checksum don't match.
+
+    Args:
+        cache_path: Path to the cache file
+        root_dir: Root directory the cache should describe
+        prune: Prune matcher the scan will use
+
+    Returns:
+        The loaded cache, or None if a full rescan is needed
+    """
+    try:
+        root = os.path.realpath(root_dir)
+        root_stat = os.stat(root)
+        with open(cache_path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        (magic, version, byte_order, root_dev, root_ino, prune_hash, n_dirs,
+         n_entries, names_len, payload_len, crc, root_len) = _HEADER.unpack_from(buffer, 0)
+        root_start = _HEADER.size
+        payload_start = _pad(root_start + root_len)
+        valid = (
+            magic == MAGIC
+            and version == VERSION
+            and byte_order == _BYTE_ORDER
+            and n_dirs > 0
+            and root_dev == root_stat.st_dev
+            and root_ino == root_stat.st_ino
+            and prune_hash == _prune_hash(prune)
+            and buffer[root_start:root_start + root_len] == root.encode(_ENCODING, _ERRORS)
+            and len(buffer) == payload_start + payload_len
+        )
+        if valid:
+            with memoryview(buffer) as view:
+                valid = zlib.crc32(view[payload_start:]) == crc
+        if not valid:
+            buffer.close()
+            return None
+        return ScanCache(buffer, n_dirs, n_entries, names_len, payload_start)
+    except (struct.error, ValueError, TypeError):
+        buffer.close()
+        return None
+
+
+def write_scan_cache(cache_path: Path, root_dir: str, result: ScanResult,
+                     prune: Optional[PatternMatcher] = None) -> bool:
+    """
+    Write a scan result (which must include dir_stats) to a cache file.
+
+    The file is replaced atomically, so readers never see a partial cache.
+
+    Args:
+        cache_path: Path to the cache file
+        root_dir: Root directory that was scanned
+        result: Scan result to store
+        prune: Prune matcher the scan was done with
+
+    Returns:
+        True if successful, False otherwise
+    """
+    edges, dir_stats, pruned = result.edges, result.dir_stats, result.pruned
+    if "" not in edges:
+        return False
+
+    # Number folders in pre-order
+    order = []
+    stack = [""]
+    while stack:
+        rel = stack.pop()
+        order.append(rel)
+        stack.extend(child for child in reversed(edges[rel]) if child in edges)
+    index_of = {rel: i for i, rel in enumerate(order)}
+    index_of.update((rel, PRUNED) for rel in pruned)
+
+    racy_after = time.time_ns() - RACY_WINDOW_NS
+    dir_mtime = array('q')
+    dir_ino = array('Q')
+    dir_first = array('Q', [0])
+    dir_names = array('Q', [0])
+    entry_dir = array('q')
+    names = bytearray()
+
+    for rel in order:
+        mtime, ino = dir_stats.get(rel, (-1, 0))
+        dir_mtime.append(-1 if mtime >= racy_after else mtime)
+        dir_ino.append(ino)
+
+        children = edges[rel]
+        cut = len(rel) + 1 if rel else 0
+        entry_dir.extend(index_of.get(child, -1) for child in children)
+        if children:
+            names += '\0'.join(child[cut:] for child in children).encode(_ENCODING, _ERRORS)
+            names += b'\0'
+        dir_first.append(len(entry_dir))
+        dir_names.append(len(names))
+
+    root = os.path.realpath(root_dir)
+    root_bytes = root.encode(_ENCODING, _ERRORS)
+    try:
+        root_stat = os.stat(root)
+    except OSError:
+        return False
+
+    payload = bytearray()
+    for col in (dir_mtime, dir_ino, dir_first, dir_names, entry_dir):
+        payload += col.tobytes()
+        payload += b'\0' * (_pad(len(payload)) - len(payload))
+    payload += names
+
+    header = _HEADER.pack(
+        MAGIC, VERSION, _BYTE_ORDER, root_stat.st_dev, root_stat.st_ino,
+        _prune_hash(prune), len(order), len(entry_dir), len(names), len(payload),
+        zlib.crc32(payload), len(root_bytes))
+    head = header + root_bytes
+    head += b'\0' * (_pad(len(head)) - len(head))
+
+    return atomic_write(cache_path, [head, payload], make_dirs=True)
+
+
+@timed("fs.cached_scan", count=ScanResult.node_count)
+def cached_scan(root_dir: str, cache_path: Path, workers: Optional[int] = None,
+                use_processes: bool = False,
+                prune: Optional[PatternMatcher] = None) -> ScanResult:
+    """
+    Scan a tree, reusing the on-disk index when it can be trusted.
+
+    Falls back to a full parallel scan when the cache is missing or invalid,
+    and rewrites the cache whenever anything had to be re-listed.
+
+    Args:
+        root_dir: Root directory to scan
+        cache_path: Path to the cache file
+        workers: Number of scanner threads for a full scan
+        use_processes: Use a process pool for a full scan
+        prune: Matcher for folders to list without walking and files to skip
+
+    Returns:
+        ScanResult with edges, folders and dir_stats
+    """
+    cache = load_scan_cache(cache_path, root_dir, prune)
+    if cache is not None:
+        try:
+            with cache:
+                result, relisted = cache.rescan(root_dir, prune)
+        except (IndexError, ValueError, UnicodeError):
+            result = None
+        if result is not None:
+            if relisted:
+                write_scan_cache(cache_path, root_dir, result, prune)
+            return result
+
+    result = scan_tree(root_dir, workers=workers, use_processes=use_processes,
+                       record_stats=True, prune=prune)
+    write_scan_cache(cache_path, root_dir, result, prune)
+    return result
@@ -0,0 +1,370 @@
+"""
+Parallel filesystem scanner for Claudius.
+Walks a directory tree with os.scandir using a work-stealing thread pool,
+or a process pool for very wide trees.
+"""
+import os
+import random
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..utils.patterns import PatternMatcher
+from ..utils.profiling import timed
+
+
+
+@dataclass
+class ScanResult:
+    """Result of a filesystem scan."""
+    edges: Dict[str, List[str]] = field(default_factory=dict)  # Parent path -> child paths
+    folders: Set[str] = field(default_factory=set)  # Paths that are folders
+    pruned: Set[str] = field(default_factory=set)  # Folders listed but not walked
+    # Folder path -> (st_mtime_ns, st_ino), only filled when stats are recorded
+    dir_stats: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+
+    def merge(self, other: 'ScanResult') -> None:
+        """Merge another (disjoint) scan result into this one."""
+        self.edges.update(other.edges)
+        self.folders.update(other.folders)
+        self.pruned.update(other.pruned)
+        self.dir_stats.update(other.dir_stats)
+
+    def node_count(self) -> int:
+        """Return the number of paths listed."""
+        return sum(len(children) for children in self.edges.values())
+
+
+def default_worker_count() -> int:
+    """Return the default number of scanner threads."""
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+def stat_directory(abs_path: str) -> Tuple[int, int]:
+    """
+    Return the (st_mtime_ns, st_ino) of a directory, or (-1, 0) if it can't be read.
+
+    Args:
+        abs_path: Absolute path of the directory
+
+    Returns:
+        Tuple of modification time in nanoseconds and inode number
+    """
+    try:
+        st = os.stat(abs_path)
+    except OSError:
+        return -1, 0
+    return st.st_mtime_ns, st.st_ino
+
+
+def list_directory(abs_path: str, rel_path: str,
+                   prune: Optional[PatternMatcher] = None) -> Tuple[List[str], List[str], List[str]]:
+    """
+    List a single directory.
+
+    Children are ordered folders first, then files, each sorted by name,
+    matching the order scan_filesystem has always produced.
+
+    Args:
+        abs_path: Absolute path of the directory
+        rel_path: Path of the directory relative to the scan root ('' for root)
+        prune: Matcher for folders to list without walking and files to skip
+
+    Returns:
+        Tuple containing:
+        - children: Relative paths of all children
+        - subdirs: Names of child folders to descend into (symlinks excluded)
+        - pruned: Names of child folders matched by prune
+
+    Raises:
+        OSError: If the directory cannot be listed
+    """
+    prefix = rel_path + "/" if rel_path else ""
+    dir_names = []
+    file_names = []
+    subdirs = []
+    pruned = []
+    skip = prune.skip if prune is not None else ()
+
+    with os.scandir(abs_path) as it:
+        for entry in it:
+            name = entry.name
+            if not rel_path and name == '.claudeignore':
+                # Skip .claudeignore itself
+                continue
+            if skip and prefix + name in skip:
+                continue
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+
+            if prune and prune.match(prefix + name, is_dir, name):
+                if is_dir:
+                    dir_names.append(name)
+                    pruned.append(name)
+                continue
+
+            if is_dir:
+                dir_names.append(name)
+                # Like os.walk, list symlinked folders but don't descend into them
+                if not entry.is_symlink():
+                    subdirs.append(name)
+            else:
+                file_names.append(name)
+
+    dir_names.sort()
+    file_names.sort()
+    children = [prefix + name for name in dir_names]
+    children.extend(prefix + name for name in file_names)
+    return children, subdirs, pruned
+
+
+def scan_subtree(root_dir: str, rel_path: str = "", record_stats: bool = False,
+                 prune: Optional[PatternMatcher] = None) -> ScanResult:
+    """
+    Scan a subtree serially.
+
+    Args:
+        root_dir: Root directory of the scan
+        rel_path: Relative path of the subtree to scan ('' for the whole tree)
+        record_stats: Record each folder's mtime and inode in dir_stats
+        prune: Matcher for folders to list without walking and files to skip
+
+    Returns:
+        ScanResult for the subtree, including rel_path itself
+    """
+    result = ScanResult()
+    stack = [rel_path]
+    while stack:
+        rel = stack.pop()
+        abs_path = os.path.join(root_dir, rel) if rel else root_dir
+        # Stat before listing, so a change made while listing bumps the mtime
+        dir_stat = stat_directory(abs_path) if record_stats else None
+        try:
+            children, subdirs, pruned = list_directory(abs_path, rel, prune)
+        except OSError:
+            continue
+
+        if rel:
+            result.folders.add(rel)
+        result.edges[rel] = children
+        if dir_stat:
+            result.dir_stats[rel] = dir_stat
+
+        prefix = rel + "/" if rel else ""
+        result.pruned.update(prefix + name for name in pruned)
+        stack.extend(prefix + name for name in reversed(subdirs))
+    return result
+
+
+@timed("fs.list_folders", count=ScanResult.node_count)
+def list_folders(root_dir: str, rel_paths: Iterable[str],
+                 prune: Optional[PatternMatcher] = None) -> ScanResult:
+    """
+    List only the given folders, one level each.
+
+    Child folders are reported in folders even though their own contents
+    have not been listed; a folder is loaded once it has a key in edges.
+
+    Args:
+        root_dir: Root directory of the scan
+        rel_paths: Relative paths of the folders to list, parents first
+        prune: Matcher for folders to list without walking and files to skip
+
+    Returns:
+        ScanResult for the listed folders
+    """
+    result = ScanResult()
+    for rel in rel_paths:
+        abs_path = os.path.join(root_dir, rel) if rel else root_dir
+        try:
+            children, subdirs, pruned = list_directory(abs_path, rel, prune)
+        except OSError:
+            children, subdirs, pruned = [], [], []
+
+        if rel:
+            result.folders.add(rel)
+        result.edges[rel] = children
+        prefix = rel + "/" if rel else ""
+        result.folders.update(prefix + name for name in subdirs)
+        result.pruned.update(prefix + name for name in pruned)
+    return result
+
+
+class _WorkStealingScanner:
+    """
+    Thread pool where each worker owns a deque of directories to list.
+
+    Workers pop from the tail of their own deque (depth-first, good locality)
+    and, when empty, steal from the head of another worker's deque, which
+    tends to hand over large untouched subtrees. A worker that finds nothing
+    sleeps until new folders are pushed or the scan is done.
+    """
+
+    def __init__(self, root_dir: str, workers: int, record_stats: bool = False,
+                 prune: Optional[PatternMatcher] = None) -> None:
+        self.root_dir = root_dir
+        self.record_stats = record_stats
+        self.prune = prune
+        self.workers = max(1, workers)
+        self.queues: List[Deque[str]] = [deque() for _ in range(self.workers)]
+        self.results = [ScanResult() for _ in range(self.workers)]
+        self.pending = 0
+        self.pushes = 0  # Batches of folders published so far
+        self.cond = threading.Condition()
+
+    def run(self, rel_path: str) -> ScanResult:
+        """Scan the subtree at rel_path and return the merged result."""
+        self.queues[0].append(rel_path)
+        self.pending = 1
+
+        threads = [
+            threading.Thread(target=self._work, args=(i,), daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        result = self.results[0]
+        for other in self.results[1:]:
+            result.merge(other)
+        return result
+
+    def _next_task(self, index: int) -> Optional[str]:
+        """Take a task from our own deque or steal one; None when done."""
+        own = self.queues[index]
+        while True:
+            # Read before looking, so a push we miss below still wakes us
+            seen = self.pushes
+            try:
+                return own.pop()
+            except IndexError:
+                pass
+
+            # Try to steal, starting from a random victim
+            start = random.randrange(self.workers)
+            for offset in range(self.workers):
+                victim = self.queues[(start + offset) % self.workers]
+                try:
+                    return victim.popleft()
+                except IndexError:
+                    continue
+
+            with self.cond:
+                while self.pending and self.pushes == seen:
+                    self.cond.wait()
+                if self.pending == 0:
+                    return None
+
+    def _work(self, index: int) -> None:
+        """Worker loop."""
+        own = self.queues[index]
+        result = self.results[index]
+        root_dir = self.root_dir
+
+        while True:
+            rel = self._next_task(index)
+            if rel is None:
+                return
+
+            abs_path = root_dir + os.sep + rel if rel else root_dir
+            dir_stat = stat_directory(abs_path) if self.record_stats else None
+            try:
+                children, subdirs, pruned = list_directory(abs_path, rel, self.prune)
+            except OSError:
+                subdirs = None
+
+            if subdirs is not None:
+                if rel:
+                    result.folders.add(rel)
+                result.edges[rel] = children
+                if dir_stat:
+                    result.dir_stats[rel] = dir_stat
+                if pruned:
+                    prefix = rel + "/" if rel else ""
+                    result.pruned.update(prefix + name for name in pruned)
+                if subdirs:
+                    # Count new tasks before publishing them so pending
+                    # can never drop to zero while work is queued
+                    with self.cond:
+                        self.pending += len(subdirs)
+                    prefix = rel + "/" if rel else ""
+                    own.extend(prefix + name for name in reversed(subdirs))
+
+            with self.cond:
+                self.pending -= 1
+                if self.pending == 0:
+                    self.cond.notify_all()
+                elif subdirs:
+                    self.pushes += 1
+                    self.cond.notify(len(subdirs))
+
+
+def _scan_subtree_task(args: Tuple[str, str, bool, Optional[PatternMatcher]]) -> ScanResult:
+    """Process pool entry point."""
+    root_dir, rel_path, record_stats, prune = args
+    return scan_subtree(root_dir, rel_path, record_stats, prune)
+
+
+def _scan_with_processes(root_dir: str, workers: int, rel_path: str,
+                         record_stats: bool, prune: Optional[PatternMatcher]) -> ScanResult:
+    """Scan the top level here and each child folder in a worker process."""
+    result = ScanResult()
+    abs_path = os.path.join(root_dir, rel_path) if rel_path else root_dir
+    dir_stat = stat_directory(abs_path) if record_stats else None
+    try:
+        children, subdirs, pruned = list_directory(abs_path, rel_path, prune)
+    except OSError:
+        return result
+    if rel_path:
+        result.folders.add(rel_path)
+    result.edges[rel_path] = children
+    if dir_stat:
+        result.dir_stats[rel_path] = dir_stat
+
+    prefix = rel_path + "/" if rel_path else ""
+    result.pruned.update(prefix + name for name in pruned)
+    # Imported here: multiprocessing is slow to import and rarely needed
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        tasks = [(root_dir, prefix + name, record_stats, prune) for name in subdirs]
+        for sub_result in executor.map(_scan_subtree_task, tasks):
+            result.merge(sub_result)
+    return result
+
+
+@timed("fs.scan", count=ScanResult.node_count)
+def scan_tree(root_dir: str, workers: Optional[int] = None,
+              use_processes: bool = False, rel_path: str = "",
+              record_stats: bool = False,
+              prune: Optional[PatternMatcher] = None) -> ScanResult:
+    """
+    Scan a directory tree in parallel.
+
+    Args:
+        root_dir: Root directory to scan
+        workers: Number of worker threads (or processes); defaults to
+            default_worker_count(). 1 scans serially.
+        use_processes: Scan each top-level folder in a separate process
+            instead of using threads. Helps on very wide trees where the
+            GIL limits thread scaling.
+        rel_path: Only scan the subtree at this relative path
+        record_stats: Record each folder's mtime and inode in dir_stats
+        prune: Matcher for folders to list without walking and files to skip
+
+    Returns:
+        ScanResult with edges and folders
+    """
+    root_dir = os.path.abspath(root_dir)
+    if workers is None:
+        workers = default_worker_count()
+
+    if use_processes:
+        return _scan_with_processes(root_dir, max(1, workers), rel_path, record_stats, prune)
+    if workers <= 1:
+        return scan_subtree(root_dir, rel_path, record_stats, prune)
+    return _WorkStealingScanner(root_dir, workers, record_stats, prune).run(rel_path)
@@ -2,8 +2,68 @@
 State management for Claudius.
 Uses immutable pattern with dataclasses for state management.
 """
-from dataclasses import dataclass, replace as dataclass_replace
-from typing import Set, Dict, Optional, List, Any
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass, field, replace as dataclass_replace
+from typing import Set, Dict, Optional, List, Any, Callable, Iterable, Tuple
+
+from .compact_tree import TreeEdges, TreeFolders
+from .persistent import OverlayMap, PMap, PSet
+from .totals import SubtreeTotals
+from .tree_index import IncludedSet, TreeIndex
+from .visible_rows import VisibleRows
+from ..utils.calculations import get_pattern_inclusion, get_pattern_matches, iter_partial_rows
+from ..utils.patterns import PatternMatcher
+from ..utils.profiling import timed
+from ..utils.traversal import iter_ancestors, iter_descendants
+
+# Derived values and the fields they are derived from
+_DERIVED_FIELDS = {
+    "visible_rows": ("edges", "folders", "expanded_folders"),
+    "tree_index": ("edges",),
+    "subtree_totals": ("edges", "included_paths", "file_stats"),
+    "subtree_counts": ("edges", "included_paths"),
+}
+
+
+class DerivedCache:
+    """
+    Values derived from one AppState, each built on first use.
+
+    The UI thread and workers (writing .claudeignore, collecting stats)
+    read the same state, so values are built under a lock and only once.
+    The lock is reentrant because some values are built from others.
+    """
+
+    __slots__ = ("values", "lock")
+
+    def __init__(self, values: Optional[Dict[str, Any]] = None) -> None:
+        self.values = values if values is not None else {}
+        self.lock = threading.RLock()
+
+    def peek(self, name: str) -> Any:
+        """Return a value if it has been built, else None."""
+        return self.values.get(name)
+
+    def get(self, name: str, build: Callable[[], Any]) -> Any:
+        """
+        Return a value, building it first if needed.
+
+        Args:
+            name: Key in _DERIVED_FIELDS
+            build: Computes the value from the state
+
+        Returns:
+            The value
+        """
+        value = self.values.get(name)
+        if value is None:
+            with self.lock:
+                value = self.values.get(name)
+                if value is None:
+                    value = build()
+                    self.values[name] = value
+        return value
 
 
 @dataclass(frozen=True)
@@ -15,10 +75,80 @@ class AppState:
     selected_item: Optional[str]  # Currently selected item
     expanded_folders: Set[str]  # Set of expanded folders
     notification: Optional[str] = None  # Current notification message
+    pruned_folders: Set[str] = frozenset()  # Folders shown collapsed and never walked
+    ignore_matcher: Optional[PatternMatcher] = None  # Patterns read from .claudeignore
+    # File path -> (bytes, estimated tokens); None until collected
+    file_stats: Optional[Dict[str, Tuple[int, int]]] = None
+    # Indexes derived from the fields above, built on first use
+    derived: DerivedCache = field(default_factory=DerivedCache, compare=False, repr=False)
 
     def update(self, **kwargs) -> 'AppState':
-        """Create a new state with the specified updates."""
-        return dataclass_replace(self, **kwargs)
+        """
+        Create a new state with the specified updates.
+
+        Derived values are kept unless a field they are derived from
+        changes. Passing one by name (as the reducer does after patching
+        it) hands it to the new state instead; passing None drops it.
+        """
+        values = self.derived.values.copy()
+        for derived, sources in _DERIVED_FIELDS.items():
+            if derived in kwargs:
+                values[derived] = kwargs.pop(derived)
+            elif any(key in kwargs for key in sources):
+                values[derived] = None
+        values = {name: value for name, value in values.items() if value is not None}
+        return dataclass_replace(self, derived=DerivedCache(values), **kwargs)
+
+    @property
+    def visible_rows(self) -> Optional[VisibleRows]:
+        """The visible rows, or None if they haven't been built."""
+        return self.derived.peek("visible_rows")
+
+    @property
+    def subtree_totals(self) -> Optional[SubtreeTotals]:
+        """The subtree size and token sums, or None if they haven't been built."""
+        return self.derived.peek("subtree_totals")
+
+    @property
+    def subtree_counts(self) -> Optional[SubtreeTotals]:
+        """The subtree node counts, or None if they haven't been built."""
+        return self.derived.peek("subtree_counts")
+
+    def get_visible_rows(self) -> VisibleRows:
+        """Return the visible-row index, building it on first use."""
+        return self.derived.get("visible_rows", lambda: VisibleRows.build(
+            self.edges, self.folders, self.expanded_folders))
+
+    def get_tree_index(self) -> TreeIndex:
+        """Return the pre-order numbering of the tree, building it on first use."""
+        return self.derived.get("tree_index", lambda: TreeIndex.build(self.edges))
+
+    def get_included(self) -> IncludedSet:
+        """Return the included paths as a bitset over the tree index."""
+        return IncludedSet.from_paths(self.get_tree_index(), self.included_paths)
+
+    def get_subtree_totals(self) -> Optional[SubtreeTotals]:
+        """
+        Return size and token sums for every subtree, building them on first use.
+
+        Returns:
+            SubtreeTotals over (bytes, tokens), or None until file stats are collected
+        """
+        if self.file_stats is None:
+            return None
+        return self.derived.get("subtree_totals", lambda: SubtreeTotals.build(
+            self.get_tree_index(), self.get_included(), self.file_stats))
+
+    def get_subtree_counts(self) -> SubtreeTotals:
+        """
+        Return included and total node counts for every subtree, building them on first use.
+
+        They are built in one pass over the tree. After that, include
+        toggles and tree edits rewrite only the changed nodes and their
+        ancestors (see the reducer), keyed by node ID for a compact tree.
+        """
+        return self.derived.get("subtree_counts", lambda: SubtreeTotals.counts(
+            self.get_tree_index(), self.get_included()))
 
 
 def get_initial_state() -> AppState:
@@ -26,12 +156,13 @@ def get_initial_state() -> AppState:
     # Note: We don't load persisted state here because we need filesystem data first
     # The app.py's load_data method will handle merging persisted state with filesystem data
     return AppState(
-        included_paths=set(),
-        edges={},
-        folders=set(),
+        included_paths=PSet(),
+        edges=PMap(),
+        folders=PSet(),
         selected_item=None,
-        expanded_folders=set(),
-        notification=None
+        expanded_folders=PSet(),
+        notification=None,
+        pruned_folders=PSet()
     )
 
 # Action types
@@ -40,6 +171,7 @@ def get_initial_state() -> AppState:
 class ActionType:
     """Constants for action types."""
     TOGGLE_INCLUDE = "TOGGLE_INCLUDE"
+    SET_INCLUDE = "SET_INCLUDE"
     MOVE_SELECTION = "MOVE_SELECTION"
     TOGGLE_EXPAND = "TOGGLE_EXPAND"
     EXPAND_ALL = "EXPAND_ALL"
@@ -47,11 +179,136 @@ class ActionType:
     SET_NOTIFICATION = "SET_NOTIFICATION"
     CLEAR_NOTIFICATION = "CLEAR_NOTIFICATION"
     LOAD_DATA = "LOAD_DATA"
+    MERGE_SCAN = "MERGE_SCAN"
+    INSERT_NODES = "INSERT_NODES"
+    REMOVE_NODES = "REMOVE_NODES"
+    RENAME_NODES = "RENAME_NODES"
     WRITE_IGNORE_FILE = "WRITE_IGNORE_FILE"
+    SET_FILE_STATS = "SET_FILE_STATS"
+    UPDATE_FILE_STATS = "UPDATE_FILE_STATS"
+    REVEAL_PATH = "REVEAL_PATH"
+
+# Tree editing helpers
+
+
+def _insert_child(children: List[str], child: str, folders: Set[str]) -> List[str]:
+    """Return a copy of children with child inserted in listing order (folders first, by name)."""
+    split = 0
+    while split < len(children) and children[split] in folders:
+        split += 1
+    if child in folders:
+        index = bisect_left(children, child, 0, split)
+    else:
+        index = bisect_left(children, child, split, len(children))
+    return children[:index] + [child] + children[index:]
+
+
+def _fallback_selection(state: AppState, removed: Set[str], edges: Dict[str, List[str]]) -> Optional[str]:
+    """Pick a new selection when the selected item was removed."""
+    if state.selected_item not in removed:
+        return state.selected_item
+    path = state.selected_item
+    while path:
+        path = path.rpartition("/")[0]
+        if path and path not in removed:
+            return path
+    return next(iter(edges.get("", [])), None)
+
+
+def _persistent_paths(paths: Iterable[str]) -> Set[str]:
+    """Return paths as a PSet, keeping the compact tree's and inclusion bitset's own types."""
+    if isinstance(paths, (TreeFolders, IncludedSet)):
+        return paths
+    return PSet.coerce(paths)
+
+
+def _with_paths(included: Set[str], paths: Iterable[str]) -> Set[str]:
+    """Add paths to the included set, keeping an IncludedSet a bitset."""
+    if isinstance(included, IncludedSet):
+        # Nodes new to the tree wait in extra until the next toggle reindexes
+        return included.with_paths(paths)
+    return PSet.coerce(included) | paths
+
+
+def _without_paths(included: Set[str], paths: Iterable[str]) -> Set[str]:
+    """Remove paths from the included set, keeping an IncludedSet a bitset."""
+    if isinstance(included, IncludedSet):
+        return included.without_paths(paths)
+    return PSet.coerce(included) - paths
+
+
+def _persistent_edges(edges: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """Return edges as a PMap, keeping the compact tree's own view."""
+    if isinstance(edges, TreeEdges):
+        return edges
+    return PMap.coerce(edges)
+
+
+def _pattern_matches(matcher: PatternMatcher, roots: Iterable[str], edges: Dict[str, List[str]],
+                     folders: Set[str], pruned_folders: Set[str], include_roots: bool) -> Set[str]:
+    """Return the paths below (and optionally at) newly added roots that .claudeignore patterns include."""
+    matched = set()
+    for root in roots:
+        included = get_pattern_inclusion(matcher, root, root in folders or root in pruned_folders)
+        if included and include_roots:
+            matched.add(root)
+        matched |= get_pattern_matches(matcher, edges, folders, pruned_folders, root, included)
+    return matched
+
+
+def _move_paths(paths: Iterable[str], old: str, new: str) -> Set[str]:
+    """Rewrite paths that are old or lie under old."""
+    prefix = old + "/"
+    return {new + path[len(old):] if path == old or path.startswith(prefix) else path
+            for path in paths}
+
+
+def _patched_sums(state: AppState, edges: Dict[str, List[str]], included: Set[str],
+                  file_stats: Optional[Dict[str, Tuple[int, int]]],
+                  removed: Set[str] = frozenset(), added: Iterable[str] = ()
+                  ) -> Dict[str, Optional[SubtreeTotals]]:
+    """
+    Carry the node counts and the size and token totals over a tree edit.
+
+    Args:
+        state: State before the edit
+        edges: Edges after the edit
+        included: Included paths after the edit
+        file_stats: File stats after the edit
+        removed: Every removed node, including the ones under removed folders
+        added: Tops of the added subtrees
+
+    Returns:
+        subtree_counts and subtree_totals for AppState.update; None for the
+        ones that were never built
+    """
+    sums = {}
+    for name, value, weights in (("subtree_counts", state.subtree_counts, None),
+                                 ("subtree_totals", state.subtree_totals, file_stats)):
+        if value is not None:
+            if removed:
+                value = value.removed(removed)
+            value = value.inserted(added, edges, included, weights) if added else value.with_edges(edges)
+        sums[name] = value
+    return sums
+
+
+def _without_stats(file_stats: Optional[Dict[str, Tuple[int, int]]],
+                   paths: Iterable[str]) -> Optional[Dict[str, Tuple[int, int]]]:
+    """Drop the stats of removed paths, if any were collected."""
+    if file_stats is None:
+        return None
+    return OverlayMap.coerce(file_stats).discard_all(paths)
+
+
+def _row_count(state: AppState) -> Optional[int]:
+    """Return the number of visible rows if they have been built."""
+    return len(state.visible_rows) if state.visible_rows is not None else None
 
 # Reducer function
 
 
+@timed("reduce", key=lambda state, action: action["type"], count=_row_count)
 def reducer(state: AppState, action: Dict[str, Any]) -> AppState:
     """
     Pure function to handle state transitions.
@@ -65,67 +322,126 @@ def reducer(state: AppState, action: Dict[str, Any]) -> AppState:
     """
     action_type = action["type"]
 
-    if action_type == ActionType.TOGGLE_INCLUDE:
+    if action_type in (ActionType.TOGGLE_INCLUDE, ActionType.SET_INCLUDE):
         path = action["path"]
         if not path:  # Skip empty path
             return state
 
-        if path in state.included_paths:
-            new_included = state.included_paths - {path}
-
-            # If it's a folder, remove all children recursively
-            if path in state.folders:
-                from ..utils.calculations import get_all_descendants
-                children_to_remove = get_all_descendants(state.edges, path)
-                new_included = new_included - children_to_remove
+        # A folder's subtree is one pre-order range, so a recursive toggle
+        # is a single fill of the inclusion bitset
+        included = state.get_included()
+        if action_type == ActionType.SET_INCLUDE:
+            value = action["included"]
         else:
-            new_included = state.included_paths | {path}
-
-            # If it's a folder, include all children recursively
-            if path in state.folders:
-                from ..utils.calculations import get_all_descendants
-                children_to_include = get_all_descendants(state.edges, path)
-                new_included = new_included | children_to_include
-
-        return state.update(included_paths=new_included)
+            value = path not in included
+        new_included = included.with_subtree(path, value)
+
+        # Size and token totals and node counts follow along, rewriting
+        # only path's ancestors
+        totals, counts = state.subtree_totals, state.subtree_counts
+        if totals is not None:
+            totals = totals.with_subtree(path, value)
+        if counts is not None:
+            counts = counts.with_subtree(path, value)
+        return state.update(included_paths=new_included, subtree_totals=totals,
+                            subtree_counts=counts)
 
     elif action_type == ActionType.MOVE_SELECTION:
         direction = action["direction"]
-        from ..utils.calculations import get_visible_items
-        visible_items = get_visible_items(state)
+        rows = state.get_visible_rows()
 
-        if not visible_items:
+        if not rows:
             return state
 
-        if state.selected_item not in visible_items:
-            return state.update(selected_item=visible_items[0])
-
-        current_index = visible_items.index(state.selected_item)
+        current_index = rows.index(state.selected_item)
+        if current_index is None:
+            return state.update(selected_item=rows[0])
 
         if direction == "down":
-            new_index = (current_index + 1) % len(visible_items)
-        else:  # "up"
-            new_index = (current_index - 1) % len(visible_items)
+            new_index = (current_index + 1) % len(rows)
+        elif direction == "up":
+            new_index = (current_index - 1) % len(rows)
+        elif direction == "page_down":
+            new_index = min(current_index + action.get("count", 1), len(rows) - 1)
+        elif direction == "page_up":
+            new_index = max(current_index - action.get("count", 1), 0)
+        elif direction == "parent":
+            new_index = rows.index(state.selected_item.rpartition("/")[0])
+        elif direction in ("next_included", "previous_included"):
+            # Search from the row after (or before) the selection, wrapping around
+            step = 1 if direction == "next_included" else -1
+            included = state.included_paths
+            new_index = None
+            for offset in range(1, len(rows)):
+                row = (current_index + step * offset) % len(rows)
+                if rows[row] in included:
+                    new_index = row
+                    break
+        elif direction == "next_partial":
+            # The first partial folder after the selection, else wrap around
+            new_index = None
+            for row in iter_partial_rows(state):
+                if new_index is None or row > current_index:
+                    new_index = row
+                    if row > current_index:
+                        break
+        elif direction == "previous_partial":
+            # The last partial folder before the selection, else wrap around
+            before = last = None
+            for row in iter_partial_rows(state):
+                if row < current_index:
+                    before = row
+                last = row
+            new_index = before if before is not None else last
+        else:
+            new_index = None
 
-        return state.update(selected_item=visible_items[new_index])
+        if new_index is None or new_index == current_index:
+            return state
+        return state.update(selected_item=rows[new_index])
 
     elif action_type == ActionType.TOGGLE_EXPAND:
         path = action["path"]
         if not path or path not in state.folders:
             return state
 
-        if path in state.expanded_folders:
-            new_expanded = state.expanded_folders - {path}
+        # Splice the folder's rows in or out instead of rebuilding them
+        rows = state.visible_rows
+        expanded = PSet.coerce(state.expanded_folders)
+        if path in expanded:
+            new_expanded = expanded.discard(path)
+            if rows is not None:
+                rows = rows.collapse(path)
         else:
-            new_expanded = state.expanded_folders | {path}
+            new_expanded = expanded.add(path)
+            if rows is not None:
+                rows = rows.expand(path, state.edges, state.folders, new_expanded)
+
+        return state.update(expanded_folders=new_expanded, visible_rows=rows)
+
+    elif action_type == ActionType.REVEAL_PATH:
+        path = action["path"]
+        if path not in state.edges.get(path.rpartition("/")[0], ()):
+            return state
 
-        return state.update(expanded_folders=new_expanded)
+        # Expand the collapsed ancestors; splicing in the outermost one
+        # brings in the rows of the others
+        expanded = PSet.coerce(state.expanded_folders)
+        collapsed = [folder for folder in iter_ancestors(path) if folder not in expanded]
+        if not collapsed:
+            return state.update(selected_item=path)
+        expanded = expanded.union(collapsed)
+        rows = state.visible_rows
+        if rows is not None:
+            rows = rows.expand(collapsed[-1], state.edges, state.folders, expanded)
+        return state.update(expanded_folders=expanded, visible_rows=rows, selected_item=path)
 
     elif action_type == ActionType.EXPAND_ALL:
-        return state.update(expanded_folders=state.folders.copy())
+        # Both sets are immutable, so a PSet of folders can simply be shared
+        return state.update(expanded_folders=PSet.coerce(state.folders))
 
     elif action_type == ActionType.COLLAPSE_ALL:
-        return state.update(expanded_folders=set())
+        return state.update(expanded_folders=PSet())
 
     elif action_type == ActionType.SET_NOTIFICATION:
         return state.update(notification=action["message"])
@@ -133,13 +449,204 @@ def reducer(state: AppState, action: Dict[str, Any]) -> AppState:
     elif action_type == ActionType.CLEAR_NOTIFICATION:
         return state.update(notification=None)
 
+    elif action_type == ActionType.SET_FILE_STATS:
+        return state.update(file_stats=action["stats"])
+
+    elif action_type == ActionType.UPDATE_FILE_STATS:
+        # Stats for files new to the tree, merged into the collected ones
+        if state.file_stats is None:
+            return state  # The full collection that is still running covers them
+        stats = action["stats"]
+        totals = state.subtree_totals
+        if totals is not None:
+            totals = totals.reweighed(
+                [(path, state.file_stats.get(path), weight) for path, weight in stats.items()],
+                state.included_paths)
+        return state.update(file_stats=OverlayMap.coerce(state.file_stats).update(stats),
+                            subtree_totals=totals)
+
     elif action_type == ActionType.LOAD_DATA:
         return state.update(
-            edges=action["edges"],
-            folders=action["folders"],
-            included_paths=action["included_paths"],
+            edges=_persistent_edges(action["edges"]),
+            folders=_persistent_paths(action["folders"]),
+            included_paths=_persistent_paths(action["included_paths"]),
             selected_item=action["selected_item"],
-            expanded_folders=action["expanded_folders"]
+            expanded_folders=PSet.coerce(action["expanded_folders"]),
+            pruned_folders=PSet.coerce(action.get("pruned_folders", ())),
+            ignore_matcher=action.get("ignore_matcher")
+        )
+
+    elif action_type == ActionType.MERGE_SCAN:
+        # Add folders listed after the initial (lazy) load
+        if isinstance(state.edges, TreeEdges):
+            tree = state.edges.tree.merged(action["edges"], action["folders"])
+            new_edges, new_folders = tree.edges, tree.folders
+        else:
+            new_edges = PMap.coerce(state.edges).update(action["edges"])
+            new_folders = PSet.coerce(state.folders) | action["folders"]
+        new_pruned = PSet.coerce(state.pruned_folders) | action.get("pruned_folders", set())
+
+        # Listed folders were already known, so only their contents are new
+        included = state.included_paths
+        if state.ignore_matcher:
+            roots = [folder for folder in action["edges"]
+                     if folder and folder.rpartition("/")[0] not in action["edges"]]
+            matched = _pattern_matches(state.ignore_matcher, roots, action["edges"],
+                                       new_folders, new_pruned, include_roots=False)
+            if matched:
+                included = _with_paths(included, matched)
+
+        # A listing replaces the folder's old one; folders that are new
+        # themselves come in with their parent's listing
+        added, gone = [], set()
+        for folder, children in action["edges"].items():
+            parent = folder.rpartition("/")[0]
+            if folder and parent in action["edges"] and parent not in state.edges:
+                continue
+            old_children = set(state.edges.get(folder, ()))
+            added.extend(child for child in children if child not in old_children)
+            for child in old_children.difference(children):
+                gone.add(child)
+                gone.update(iter_descendants(state.edges, child, ordered=False))
+        file_stats = _without_stats(state.file_stats, gone) if gone else state.file_stats
+        return state.update(
+            edges=new_edges,
+            folders=new_folders,
+            included_paths=included,
+            pruned_folders=new_pruned,
+            file_stats=file_stats,
+            **_patched_sums(state, new_edges, included, file_stats, gone, added)
         )
 
+    elif action_type == ActionType.INSERT_NODES:
+        # Nodes created on disk while the app is running
+        compact = isinstance(state.edges, TreeEdges)
+        new_edges = _persistent_edges(state.edges)
+        new_folders = state.folders if compact else PSet.coerce(state.folders) | action["folders"]
+        new_pruned = PSet.coerce(state.pruned_folders) | action.get("pruned_folders", set())
+        new_included = set()
+        added = []
+
+        for path in action["paths"]:
+            parent = path.rpartition("/")[0]
+            if parent not in state.edges or path in state.edges[parent]:
+                continue  # Parent not loaded yet, or already known
+            added.append(path)
+            if not compact:
+                new_edges = new_edges.set(parent, _insert_child(new_edges[parent], path, new_folders))
+
+            # Anything created inside an included folder is included too
+            if parent in state.included_paths:
+                new_included.add(path)
+                new_included.update(iter_descendants(action["edges"], path, ordered=False))
+
+        if compact:
+            tree = state.edges.tree.inserted(action["paths"], action["edges"], action["folders"])
+            new_edges, new_folders = tree.edges, tree.folders
+        else:
+            new_edges = new_edges.update(
+                (folder, children) for folder, children in action["edges"].items()
+                if folder not in new_edges)
+
+        if state.ignore_matcher:
+            new_included |= _pattern_matches(state.ignore_matcher, added, action["edges"],
+                                             new_folders, new_pruned, include_roots=True)
+
+        included = state.included_paths
+        if new_included:
+            included = _with_paths(included, new_included)
+        return state.update(
+            edges=new_edges,
+            folders=new_folders,
+            included_paths=included,
+            pruned_folders=new_pruned,
+            **_patched_sums(state, new_edges, included, state.file_stats, added=added)
+        )
+
+    elif action_type == ActionType.REMOVE_NODES:
+        removed = set()
+        for path in action["paths"]:
+            removed.add(path)
+            removed.update(iter_descendants(state.edges, path, ordered=False))
+
+        if isinstance(state.edges, TreeEdges):
+            tree = state.edges.tree.removed(action["paths"])
+            new_edges, new_folders = tree.edges, tree.folders
+        else:
+            new_edges = PMap.coerce(state.edges)
+            for parent in {path.rpartition("/")[0] for path in action["paths"]}:
+                if parent in new_edges:
+                    new_edges = new_edges.set(
+                        parent, [child for child in new_edges[parent] if child not in removed])
+            new_edges = new_edges.discard_all(removed)
+            new_folders = PSet.coerce(state.folders) - removed
+
+        included = _without_paths(state.included_paths, removed)
+        file_stats = _without_stats(state.file_stats, removed)
+        return state.update(
+            edges=new_edges,
+            folders=new_folders,
+            included_paths=included,
+            file_stats=file_stats,
+            **_patched_sums(state, new_edges, included, file_stats, removed),
+            expanded_folders=PSet.coerce(state.expanded_folders) - removed,
+            pruned_folders=PSet.coerce(state.pruned_folders) - removed,
+            selected_item=_fallback_selection(state, removed, new_edges)
+        )
+
+    elif action_type == ActionType.RENAME_NODES:
+        new_state = state
+        for old, new in action["renames"]:
+            edges = new_state.edges
+            if old == new or old.rpartition("/")[0] not in edges:
+                continue
+            moved = {old, *iter_descendants(edges, old, ordered=False)}
+
+            if isinstance(edges, TreeEdges):
+                # Descendant paths follow the moved node automatically
+                tree = edges.tree.renamed(old, new)
+                new_edges, new_folders = tree.edges, tree.folders
+            else:
+                new_edges = PMap.coerce(edges)
+                old_parent = old.rpartition("/")[0]
+                new_edges = new_edges.set(
+                    old_parent, [child for child in new_edges[old_parent] if child != old])
+                moved_edges = {new + path[len(old):]: [new + child[len(old):] for child in new_edges[path]]
+                               for path in moved if path in new_edges}
+                new_edges = new_edges.discard_all(moved).update(moved_edges)
+
+                folders = PSet.coerce(new_state.folders)
+                new_folders = (folders - moved) | _move_paths(moved & folders, old, new)
+                new_parent = new.rpartition("/")[0]
+                if new_parent in new_edges:
+                    new_edges = new_edges.set(
+                        new_parent, _insert_child(new_edges[new_parent], new, new_folders))
+
+            selected = new_state.selected_item
+            if selected in moved:
+                selected = new + selected[len(old):]
+
+            included = new_state.included_paths
+            new_included = _with_paths(_without_paths(included, moved),
+                                       _move_paths(moved & included, old, new))
+            expanded = PSet.coerce(new_state.expanded_folders)
+            pruned = PSet.coerce(new_state.pruned_folders)
+            # Moved files keep their stats under the new paths
+            file_stats = new_state.file_stats
+            if file_stats is not None:
+                moved_stats = {new + path[len(old):]: file_stats[path]
+                               for path in moved if path in file_stats}
+                file_stats = _without_stats(file_stats, moved).update(moved_stats)
+            new_state = new_state.update(
+                edges=new_edges,
+                folders=new_folders,
+                included_paths=new_included,
+                file_stats=file_stats,
+                **_patched_sums(new_state, new_edges, new_included, file_stats, moved, [new]),
+                expanded_folders=(expanded - moved) | _move_paths(moved & expanded, old, new),
+                pruned_folders=(pruned - moved) | _move_paths(moved & pruned, old, new),
+                selected_item=selected
+            )
+        return new_state
+
     return state
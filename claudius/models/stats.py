@@ -0,0 +1,196 @@
+"""
+File size and token statistics for Claudius.
+Collects file sizes with DirEntry.stat() and estimates tokens on a thread
+pool, reusing earlier estimates for files whose mtime and size are unchanged.
+The estimate cache is stored as columns (a list of paths and three int64
+arrays) in a marshal file: that loads far faster than JSON or a marshalled
+dict and, being binary, doesn't count towards the tokens of a tree it lives in.
+"""
+import marshal
+import os
+import stat
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .persistence import atomic_write
+from .scanner import default_worker_count
+from ..utils.profiling import timed
+
+# Rough average for code and prose across common tokenizers
+BYTES_PER_TOKEN = 4
+
+# Files with a NUL byte in their first bytes are binary and count no tokens
+SNIFF_BYTES = 8192
+
+# Work is handed to the pool in chunks; a task per file costs more than the file
+CHUNK_SIZE = 256
+
+CACHE_VERSION = 1
+
+# Path -> (st_mtime_ns, st_size, estimated tokens)
+TokenCache = Dict[str, Tuple[int, int, int]]
+
+# Path -> (bytes, estimated tokens)
+FileStats = Dict[str, Tuple[int, int]]
+
+
+def estimate_tokens(abs_path: str, size: int) -> int:
+    """
+    Estimate how many tokens a file costs in a context window.
+
+    Args:
+        abs_path: Absolute path of the file
+        size: Size of the file in bytes
+
+    Returns:
+        Estimated token count; 0 for binary or unreadable files
+    """
+    try:
+        with open(abs_path, 'rb') as f:
+            head = f.read(SNIFF_BYTES)
+    except OSError:
+        return 0
+    if b'\0' in head:
+        return 0
+    return -(-size // BYTES_PER_TOKEN)
+
+
+def _chunks(items: List, size: int = CHUNK_SIZE) -> Iterable[List]:
+    """Split a list into consecutive chunks."""
+    return (items[i:i + size] for i in range(0, len(items), size))
+
+
+def _stat_folders(root_dir: str, listings: List[Tuple[str, List[str]]]) -> List[Tuple[str, int, int]]:
+    """Return (path, st_mtime_ns, st_size) for the files among each folder's children."""
+    found = []
+    for rel, children in listings:
+        prefix = rel + "/" if rel else ""
+        wanted = set(children)
+        abs_path = os.path.join(root_dir, rel) if rel else root_dir
+        try:
+            with os.scandir(abs_path) as it:
+                for entry in it:
+                    path = prefix + entry.name
+                    if path not in wanted:
+                        continue
+                    try:
+                        if entry.is_dir():
+                            continue
+                        st = entry.stat()
+                    except OSError:
+                        continue  # Broken symlink or removed meanwhile
+                    found.append((path, st.st_mtime_ns, st.st_size))
+        except OSError:
+            continue
+    return found
+
+
+def _stat_files(root_dir: str, paths: List[str]) -> List[Tuple[str, int, int]]:
+    """Return (path, st_mtime_ns, st_size) for the paths that are files."""
+    found = []
+    for path in paths:
+        try:
+            st = os.stat(os.path.join(root_dir, path))
+        except OSError:
+            continue  # Broken symlink or removed meanwhile
+        if not stat.S_ISDIR(st.st_mode):
+            found.append((path, st.st_mtime_ns, st.st_size))
+    return found
+
+
+def _estimate_all(root_dir: str, files: List[Tuple[str, int, int]]) -> List[int]:
+    """Estimate tokens for (path, st_mtime_ns, st_size) entries."""
+    return [estimate_tokens(os.path.join(root_dir, path), size) for path, _, size in files]
+
+
+@timed("fs.stats", count=lambda result: len(result[0]))
+def collect_file_stats(root_dir: str, edges: Dict[str, List[str]],
+                       cache: Optional[TokenCache] = None,
+                       workers: Optional[int] = None,
+                       paths: Iterable[str] = ()) -> Tuple[FileStats, TokenCache]:
+    """
+    Collect sizes and token estimates for every file in the given folders.
+
+    Args:
+        root_dir: Root directory of the tree
+        edges: Map of folders (all loaded ones, or just new ones) to their child paths
+        cache: Earlier estimates, reused when a file's mtime and size match
+        workers: Number of threads; defaults to default_worker_count()
+        paths: Other files to include, looked up one by one
+
+    Returns:
+        Tuple of the stats by path and the token cache entries for those
+        files, to keep for next time
+    """
+    cache = cache or {}
+    stats = {}
+    new_cache = {}
+    stale = []
+    listings = [(rel, edges[rel]) for rel in edges]
+
+    with ThreadPoolExecutor(max_workers=workers or default_worker_count()) as executor:
+        for found in chain(
+                executor.map(lambda chunk: _stat_folders(root_dir, chunk), _chunks(listings)),
+                executor.map(lambda chunk: _stat_files(root_dir, chunk), _chunks(list(paths)))):
+            for path, mtime, size in found:
+                cached = cache.get(path)
+                if cached is not None and cached[0] == mtime and cached[1] == size:
+                    stats[path] = (size, cached[2])
+                    new_cache[path] = cached
+                else:
+                    stale.append((path, mtime, size))
+
+        chunks = list(_chunks(stale))
+        for chunk, estimates in zip(chunks, executor.map(
+                lambda chunk: _estimate_all(root_dir, chunk), chunks)):
+            for (path, mtime, size), tokens in zip(chunk, estimates):
+                stats[path] = (size, tokens)
+                new_cache[path] = (mtime, size, tokens)
+    return stats, new_cache
+
+
+def load_token_cache(cache_path: Path) -> TokenCache:
+    """
+    Load earlier token estimates.
+
+    Args:
+        cache_path: Path to the cache file
+
+    Returns:
+        The cache, or an empty one if it is missing or unreadable
+    """
+    try:
+        with open(cache_path, 'rb') as f:
+            version, paths, *blobs = marshal.load(f)
+        if version != CACHE_VERSION or len(blobs) != 3:
+            return {}
+        columns = []
+        for blob in blobs:
+            column = array('q')
+            column.frombytes(blob)
+            if len(column) != len(paths):
+                return {}
+            columns.append(column)
+    except (OSError, EOFError, ValueError, TypeError):
+        return {}
+    return dict(zip(paths, zip(*columns)))
+
+
+def write_token_cache(cache_path: Path, cache: TokenCache) -> bool:
+    """
+    Write token estimates, replacing the file atomically.
+
+    Args:
+        cache_path: Path to the cache file
+        cache: Estimates to store
+
+    Returns:
+        True if successful, False otherwise
+    """
+    entries = cache.values()
+    blobs = [array('q', (entry[i] for entry in entries)).tobytes() for i in range(3)]
+    return atomic_write(cache_path, [marshal.dumps((CACHE_VERSION, list(cache), *blobs))],
+                        make_dirs=True)
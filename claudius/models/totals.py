@@ -0,0 +1,387 @@
+"""
+Subtree totals for Claudius.
+Sums per-node weights (bytes and estimated tokens, or one per node to count
+them) over every subtree, both in total and over the included nodes, so a
+folder's numbers are read without walking it. Toggles and tree edits only
+rewrite the changed nodes and their ancestors.
+"""
+from array import array
+from itertools import accumulate
+from operator import mul
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from .compact_tree import NO_NODE, TreeEdges
+from .persistent import PMap
+from .tree_index import CompactTreeIndex, IncludedSet, TreeIndex
+
+# One number per metric, such as (bytes, tokens)
+Totals = Tuple[int, ...]
+
+
+class _PathKeys:
+    """Nodes of a dict tree, keyed by path."""
+
+    __slots__ = ()
+
+    def key(self, path: str) -> str:
+        return path
+
+    def parent(self, key: str) -> Optional[str]:
+        return key.rpartition('/')[0] if key else None
+
+    def row(self, index: TreeIndex, key: str) -> Optional[int]:
+        return index.pos.get(key)
+
+
+class _NodeKeys:
+    """Nodes of a compact tree, keyed by node ID, which survives renames and listing changes."""
+
+    __slots__ = ("tree",)
+
+    def __init__(self, tree) -> None:
+        self.tree = tree
+
+    def key(self, path: str) -> Optional[int]:
+        node = self.tree.find(path)
+        return None if node == NO_NODE else node
+
+    def parent(self, key: int) -> Optional[int]:
+        parent = self.tree.parent[key]
+        return None if parent == NO_NODE else parent
+
+    def row(self, index: CompactTreeIndex, key: int) -> Optional[int]:
+        pos = index.pos
+        row = pos[key] if key < len(pos) else -1
+        return row if row >= 0 else None
+
+
+def _keys_for(tree: Any) -> Any:
+    """Return the node keys for a TreeIndex or edges mapping."""
+    if isinstance(tree, (CompactTreeIndex, TreeEdges)):
+        return _NodeKeys(tree.tree)
+    return _PathKeys()
+
+
+class SubtreeTotals:
+    """
+    Immutable subtree sums of per-node weights.
+
+    Built over a TreeIndex as prefix sums per metric, since subtrees are
+    contiguous in pre-order: a subtree's total is a difference of two
+    entries, and its included sum starts out the same way in base. Later
+    changes never renumber anything. They go into a small persistent
+    overlay keyed by node (path, or node ID for a compact tree):
+
+    - a recursive toggle records a fill at the toggled node; nodes below it
+      take their value from the newest fill above them (everything or
+      nothing) until they are written again, so they are never visited
+    - inserting or removing a subtree writes its top's ancestors with the
+      difference, and the new nodes themselves
+    - a new weight for a node writes it and its ancestors with the difference
+
+    Every change writes the changed node and its ancestors, so it costs
+    O(depth) plus the nodes added.
+    """
+
+    __slots__ = ("index", "keys", "total", "base", "written", "fills", "version")
+
+    def __init__(self, index: TreeIndex, keys: Any, total: List[array],
+                 base: List[array], written: PMap = PMap(), fills: PMap = PMap(),
+                 version: int = 0) -> None:
+        self.index = index  # Numbering the prefix sums were built over
+        self.keys = keys  # Node keys of the current tree
+        self.total = total  # Per metric, prefix sums over pre-order positions
+        self.base = base  # Per metric, prefix sums over the included positions
+        self.written = written  # Key -> (version, included, total); (version, None, None) once removed
+        self.fills = fills  # Key -> (version, included) of the last toggle there
+        self.version = version
+
+    @classmethod
+    def build(cls, index: TreeIndex, included: IncludedSet,
+              weights: Mapping[str, Totals], width: int = 2) -> 'SubtreeTotals':
+        """
+        Build prefix sums of the weights in pre-order.
+
+        Args:
+            index: Tree numbering to use
+            included: Included nodes, over the same index
+            weights: Map of file paths to their weights; other nodes weigh nothing
+            width: Number of metrics in each weight
+
+        Returns:
+            New SubtreeTotals
+        """
+        # Weights are placed by looking up each weighed path, so a compact
+        # tree's index never has to produce every node's path
+        columns = [array('q', bytes(8 * len(index))) for _ in range(width)]
+        get_row = index.row
+        for path, weight in weights.items():
+            row = get_row(path)
+            if row is not None:
+                for column, value in zip(columns, weight):
+                    column[row] = value
+        total, base = [], []
+        for column in columns:
+            total.append(array('q', accumulate(column, initial=0)))
+            base.append(array('q', accumulate(map(mul, column, included.bits), initial=0)))
+        return cls(index, _keys_for(index), total, base)
+
+    @classmethod
+    def counts(cls, index: TreeIndex, included: IncludedSet) -> 'SubtreeTotals':
+        """
+        Build node counts, as if every node, file or folder, weighed one.
+
+        Args:
+            index: Tree numbering to use
+            included: Included nodes, over the same index
+
+        Returns:
+            New SubtreeTotals with one metric: the number of nodes in each
+            subtree, counting its top, and how many of them are included
+        """
+        total = [array('q', range(len(index) + 1))]
+        base = [array('q', accumulate(included.bits, initial=0))]
+        return cls(index, _keys_for(index), total, base)
+
+    def _replace(self, written: PMap, fills: PMap, version: int,
+                 keys: Any = None) -> 'SubtreeTotals':
+        """Return a copy with a new overlay."""
+        return SubtreeTotals(self.index, self.keys if keys is None else keys,
+                             self.total, self.base, written, fills, version)
+
+    def _sums(self, prefixes: List[array], row: int) -> Totals:
+        """Read the subtree sums at row from prefix sums."""
+        end = self.index.end[row]
+        return tuple(prefix[end] - prefix[row] for prefix in prefixes)
+
+    def _chain(self, key: Any) -> List[Any]:
+        """Return key followed by the keys of its ancestors, root-most last."""
+        parent = self.keys.parent
+        chain = [key]
+        key = parent(key)
+        while key is not None:
+            chain.append(key)
+            key = parent(key)
+        return chain
+
+    def _resolve(self, chain: List[Any]) -> List[Optional[Tuple[Totals, Totals]]]:
+        """
+        Return (included, total) for a chain of nodes given root-most last.
+
+        Each node is governed by the newest fill at or above it; if that is
+        newer than the node's own value, the fill decides. Nodes that were
+        removed, or never existed, come back as None.
+        """
+        fills, written = self.fills, self.written
+        zero = (0,) * len(self.total)
+        fill, fill_included = 0, False
+        values = []
+        for key in reversed(chain):
+            filled = fills.get(key)
+            if filled is not None and filled[0] > fill:
+                fill, fill_included = filled
+            entry = written.get(key)
+            if entry is None:
+                row = self.keys.row(self.index, key)
+                if row is None:
+                    values.append(None)
+                    continue
+                total = self._sums(self.total, row)
+                if fill == 0:
+                    values.append((self._sums(self.base, row), total))
+                    continue
+            elif entry[2] is None:
+                values.append(None)
+                continue
+            elif entry[0] >= fill:
+                values.append(entry[1:])
+                continue
+            else:
+                total = entry[2]
+            values.append((total if fill_included else zero, total))
+        values.reverse()
+        return values
+
+    def totals(self, path: str) -> Optional[Tuple[Totals, Totals]]:
+        """
+        Return the included and total sums for a subtree.
+
+        Args:
+            path: Node at the top of the subtree
+
+        Returns:
+            Tuple of (included, total), or None if path isn't in the tree
+        """
+        key = self.keys.key(path)
+        if key is None:
+            return None
+        if not self.written and not self.fills:
+            row = self.keys.row(self.index, key)
+            if row is None:
+                return None
+            return self._sums(self.base, row), self._sums(self.total, row)
+        return self._resolve(self._chain(key))[0]
+
+    @staticmethod
+    def _add(chain: List[Any], values: List[Optional[Tuple[Totals, Totals]]],
+             included: Totals, total: Totals, version: int, updates: Dict[Any, Tuple]) -> None:
+        """Add a difference to each node of a resolved chain, writing into updates."""
+        for key, value in zip(chain, values):
+            if value is None:
+                break  # Above the root of a detached subtree
+            updates[key] = (version,
+                            tuple(v + d for v, d in zip(value[0], included)),
+                            tuple(v + d for v, d in zip(value[1], total)))
+
+    def with_subtree(self, path: str, included: bool) -> 'SubtreeTotals':
+        """
+        Return totals with path's whole subtree included or excluded.
+
+        Args:
+            path: Node whose subtree was toggled
+            included: Whether it is now included
+
+        Returns:
+            New SubtreeTotals; only path and its ancestors are rewritten
+        """
+        key = self.keys.key(path)
+        if key is None:
+            return self
+        chain = self._chain(key)
+        values = self._resolve(chain)
+        if values[0] is None:
+            return self
+        version = self.version + 1
+        old, total = values[0]
+        new = total if included else (0,) * len(total)
+        updates = {key: (version, new, total)}
+        delta = tuple(after - before for after, before in zip(new, old))
+        self._add(chain[1:], values[1:], delta, (0,) * len(total), version, updates)
+        return self._replace(self.written.update(updates),
+                             self.fills.set(key, (version, included)), version)
+
+    def removed(self, paths: Set[str]) -> 'SubtreeTotals':
+        """
+        Return totals without some nodes; call before switching to the new tree.
+
+        Args:
+            paths: Every removed node, including the ones under removed folders
+
+        Returns:
+            New SubtreeTotals; the tops' ancestors are rewritten and every
+            removed node is marked gone
+        """
+        version = self.version + 1
+        result = self
+        for path in paths:
+            if not path or path.rpartition('/')[0] in paths:
+                continue  # Gone with its folder
+            key = result.keys.key(path)
+            if key is None:
+                continue
+            chain = result._chain(key)
+            values = result._resolve(chain)
+            if values[0] is None:
+                continue
+            updates = {}
+            included, total = values[0]
+            self._add(chain[1:], values[1:], tuple(-v for v in included),
+                      tuple(-v for v in total), version, updates)
+            result = result._replace(result.written.update(updates), result.fills, version)
+
+        gone = (version, None, None)
+        keys = [self.keys.key(path) for path in paths]
+        return result._replace(
+            result.written.update((key, gone) for key in keys if key is not None),
+            result.fills, version)
+
+    def inserted(self, paths: Iterable[str], edges: Mapping[str, List[str]],
+                 included: Set[str], weights: Optional[Mapping[str, Totals]] = None
+                 ) -> 'SubtreeTotals':
+        """
+        Return totals for a tree with new subtrees.
+
+        Args:
+            paths: Tops of the new subtrees; ones already counted are skipped
+            edges: Edges of the new tree, listing everything under the tops
+            included: Included paths of the new tree
+            weights: Map of file paths to their weights, or None to count nodes
+
+        Returns:
+            New SubtreeTotals over edges' tree; each new node is written,
+            then each top's ancestors
+        """
+        width = len(self.total)
+        zero = (0,) * width
+        one = (1,) * width
+        version = self.version + 1
+        result = self._replace(self.written, self.fills, self.version,
+                               _keys_for(edges))
+        keys = result.keys
+        for top in paths:
+            key = keys.key(top)
+            if key is None:
+                continue
+            chain = result._chain(key)
+            values = result._resolve(chain)
+            if values[0] is not None:
+                continue
+
+            # Sum the new subtree bottom-up
+            order, stack = [], [top]
+            while stack:
+                path = stack.pop()
+                order.append(path)
+                stack.extend(edges.get(path, ()))
+            sums: Dict[str, Tuple[Totals, Totals]] = {}
+            updates = {}
+            for path in reversed(order):
+                weight = one if weights is None else weights.get(path, zero)
+                child_included, child_total = sums.pop(path, (zero, zero))
+                node_total = tuple(w + s for w, s in zip(weight, child_total))
+                node_included = (tuple(w + s for w, s in zip(weight, child_included))
+                                 if path in included else child_included)
+                updates[keys.key(path)] = (version, node_included, node_total)
+                if path != top:
+                    parent = path.rpartition('/')[0]
+                    up_included, up_total = sums.get(parent, (zero, zero))
+                    sums[parent] = (tuple(a + b for a, b in zip(up_included, node_included)),
+                                    tuple(a + b for a, b in zip(up_total, node_total)))
+            _, node_included, node_total = updates[key]
+            self._add(chain[1:], values[1:], node_included, node_total, version, updates)
+            result = result._replace(result.written.update(updates), result.fills, version)
+        return result
+
+    def reweighed(self, weights: Iterable[Tuple[str, Optional[Totals], Totals]],
+                  included: Set[str]) -> 'SubtreeTotals':
+        """
+        Return totals with new weights for some nodes.
+
+        Args:
+            weights: (path, old weight or None, new weight) for each changed node
+            included: Included paths
+
+        Returns:
+            New SubtreeTotals; each changed node and its ancestors are rewritten
+        """
+        zero = (0,) * len(self.total)
+        version = self.version + 1
+        result = self
+        for path, old, new in weights:
+            key = result.keys.key(path)
+            if key is None:
+                continue
+            chain = result._chain(key)
+            values = result._resolve(chain)
+            if values[0] is None:
+                continue
+            delta = tuple(after - before for after, before in zip(new, old or zero))
+            updates = {}
+            self._add(chain, values, delta if path in included else zero, delta, version, updates)
+            result = result._replace(result.written.update(updates), result.fills, version)
+        return result
+
+    def with_edges(self, edges: Mapping[str, List[str]]) -> 'SubtreeTotals':
+        """Return the same totals, looking nodes up in a new tree whose edits were already applied."""
+        return self._replace(self.written, self.fills, self.version,
+                             _keys_for(edges))
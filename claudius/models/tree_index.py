@@ -0,0 +1,359 @@
+"""
+Subtree ranges and inclusion bitsets for Claudius.
+Numbers every node in DFS pre-order so each subtree is a contiguous range,
+and stores inclusion as one byte per node so recursive toggles are range
+fills and partial inclusion is a range count.
+"""
+from array import array
+from collections.abc import Set as AbstractSet
+from itertools import compress
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .compact_tree import NO_NODE, ROOT, CompactTree, TreeEdges
+from .persistent import PBits, PMap
+
+
+class TreeIndex:
+    """
+    Pre-order numbering of every loaded node.
+
+    order[i] is the path at position i, pos maps a path back to its
+    position, the subtree of position i is the range [i, end[i]) and
+    parent[i] is the position of its folder (-1 for the root). Other code
+    goes through row and path, so a compact tree can be numbered by node
+    ID instead (see CompactTreeIndex).
+    """
+
+    __slots__ = ("order", "pos", "end", "parent")
+
+    def __init__(self, order: List[str], end: array, parent: array) -> None:
+        self.order = order
+        self.pos: Dict[str, int] = dict(zip(order, range(len(order))))
+        self.end = end
+        self.parent = parent
+
+    @classmethod
+    def build(cls, edges: Dict[str, List[str]]) -> 'TreeIndex':
+        """
+        Number the tree in pre-order.
+
+        Args:
+            edges: Map of parent paths to child paths
+
+        Returns:
+            TreeIndex with the root at position 0; a CompactTreeIndex for
+            a compact tree's edges
+        """
+        if isinstance(edges, TreeEdges):
+            return CompactTreeIndex.build(edges.tree)
+        if isinstance(edges, PMap):
+            # One copy per folder beats a trie lookup per node
+            edges = edges.thaw()
+        order = [""]
+        end = array('I', [0])
+        parent = array('i', [-1])
+        open_rows = [0]  # Positions of the nodes on the current path
+        stack = [iter(edges.get("", []))]
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+                end[open_rows.pop()] = len(order)
+                continue
+            row = len(order)
+            order.append(child)
+            end.append(row + 1)
+            parent.append(open_rows[-1])
+            children = edges.get(child)
+            if children:
+                open_rows.append(row)
+                stack.append(iter(children))
+        return cls(order, end, parent)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def __contains__(self, path: object) -> bool:
+        return path in self.pos
+
+    def row(self, path: str) -> Optional[int]:
+        """Return the position of a path, or None if it isn't in the tree."""
+        return self.pos.get(path)
+
+    def path(self, row: int) -> str:
+        """Return the path at a position."""
+        return self.order[row]
+
+    def iter_paths(self, marks: Iterable[int]) -> Iterator[str]:
+        """Yield the paths at the positions where marks (a byte per position) is 1."""
+        return compress(self.order, marks)
+
+    def subtree(self, path: str) -> Optional[Tuple[int, int]]:
+        """
+        Return the range of positions covering path and its descendants.
+
+        Args:
+            path: Node to look up
+
+        Returns:
+            (start, end) tuple, or None if path isn't in the tree
+        """
+        start = self.row(path)
+        if start is None:
+            return None
+        return start, self.end[start]
+
+    def mark(self, paths: Iterable[str]) -> bytearray:
+        """
+        Return a byte per position, 1 for the nodes in paths.
+
+        Args:
+            paths: Paths to mark; those not in the tree are skipped
+
+        Returns:
+            bytearray as long as the index
+        """
+        marks = bytearray(len(self))
+        get_row = self.row
+        for path in paths:
+            row = get_row(path)
+            if row is not None:
+                marks[row] = 1
+        return marks
+
+    def ancestors(self, row: int) -> List[int]:
+        """
+        List the positions of the folders above a node, nearest first.
+
+        Args:
+            row: Position of the node
+
+        Returns:
+            Positions of its parent, grandparent and so on up to the root
+        """
+        parent = self.parent
+        rows = []
+        row = parent[row]
+        while row >= 0:
+            rows.append(row)
+            row = parent[row]
+        return rows
+
+
+class CompactTreeIndex(TreeIndex):
+    """
+    Pre-order numbering of a CompactTree, keyed by node ID.
+
+    order[i] is the node at position i and pos[node] its position (-1 for
+    removed nodes). Both are int arrays, so numbering the tree creates no
+    path strings; paths are looked up, and rebuilt, one at a time.
+    """
+
+    __slots__ = ("tree",)
+
+    def __init__(self, tree: CompactTree, order: array, pos: array,
+                 end: array, parent: array) -> None:
+        self.tree = tree
+        self.order = order
+        self.pos = pos
+        self.end = end
+        self.parent = parent
+
+    @classmethod
+    def build(cls, tree: CompactTree) -> 'CompactTreeIndex':
+        """
+        Number a compact tree in pre-order.
+
+        Args:
+            tree: Tree to number
+
+        Returns:
+            CompactTreeIndex with the root at position 0
+        """
+        first_child, next_sibling = tree.first_child, tree.next_sibling
+        order = array('i', [ROOT])
+        pos = array('i', [-1]) * len(tree.parent)
+        pos[ROOT] = 0
+        end = array('I', [0])
+        parent = array('i', [-1])
+        open_rows = [0]  # Positions of the nodes on the current path
+        stack = [first_child[ROOT]]  # Next node to number at each depth
+        while stack:
+            node = stack[-1]
+            if node == NO_NODE:
+                stack.pop()
+                end[open_rows.pop()] = len(order)
+                continue
+            stack[-1] = next_sibling[node]
+            row = len(order)
+            order.append(node)
+            pos[node] = row
+            end.append(row + 1)
+            parent.append(open_rows[-1])
+            child = first_child[node]
+            if child != NO_NODE:
+                open_rows.append(row)
+                stack.append(child)
+        return cls(tree, order, pos, end, parent)
+
+    def __contains__(self, path: object) -> bool:
+        return isinstance(path, str) and self.row(path) is not None
+
+    def row(self, path: str) -> Optional[int]:
+        """Return the position of a path, or None if it isn't in the tree."""
+        node = self.tree.find(path)
+        if node == NO_NODE or node >= len(self.pos):
+            return None
+        row = self.pos[node]
+        return row if row >= 0 else None
+
+    def path(self, row: int) -> str:
+        """Return the path at a position."""
+        return self.tree.path(self.order[row])
+
+    def iter_paths(self, marks: Iterable[int]) -> Iterator[str]:
+        """Yield the paths at the positions where marks (a byte per position) is 1."""
+        return map(self.tree.path, compress(self.order, marks))
+
+
+class IncludedSet(AbstractSet):
+    """
+    Immutable set of included paths backed by a byte per node over a TreeIndex.
+
+    The bytes are a PBits, so adding or removing paths copies only the
+    chunks they fall in (plus O(log N) trie nodes) and a recursive toggle
+    shares a filled chunk for every chunk its subtree covers whole.
+
+    Paths that aren't in the tree (such as .claudeignore lines for files
+    that don't exist, or nodes loaded after the index was built) are kept
+    in a side set, so they survive a write and are folded into the bits
+    when the set is rebuilt on a newer index.
+    """
+
+    __slots__ = ("index", "bits", "extra")
+
+    def __init__(self, index: TreeIndex, bits: PBits,
+                 extra: FrozenSet[str] = frozenset()) -> None:
+        self.index = index
+        self.bits = bits
+        self.extra = extra
+
+    @classmethod
+    def from_paths(cls, index: TreeIndex, paths: Iterable[str]) -> 'IncludedSet':
+        """
+        Build a bitset from a collection of paths.
+
+        Args:
+            index: Tree numbering to use
+            paths: Included paths
+
+        Returns:
+            New IncludedSet
+        """
+        if isinstance(paths, IncludedSet) and paths.index is index:
+            return paths
+        bits = bytearray(len(index))
+        get_row = index.row
+        extra = set()
+        for path in paths:
+            row = get_row(path)
+            if row is None:
+                extra.add(path)
+            else:
+                bits[row] = 1
+        return cls(index, PBits.from_bytes(bits), frozenset(extra))
+
+    @classmethod
+    def _from_iterable(cls, iterable: Iterable[str]) -> Set[str]:
+        # Set operations (|, -, &) produce plain sets
+        return set(iterable)
+
+    def __contains__(self, path: object) -> bool:
+        row = self.index.row(path) if isinstance(path, str) else None
+        if row is None:
+            return path in self.extra
+        return self.bits[row] == 1
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.index.iter_paths(self.bits)
+        yield from self.extra
+
+    def __len__(self) -> int:
+        return self.bits.ones + len(self.extra)
+
+    def with_paths(self, paths: Iterable[str]) -> 'IncludedSet':
+        """
+        Return a copy with paths added, on the same index.
+
+        Args:
+            paths: Paths to include; those the index doesn't know go to extra
+
+        Returns:
+            New IncludedSet
+        """
+        get_row = self.index.row
+        rows = []
+        extra = set(self.extra)
+        for path in paths:
+            row = get_row(path)
+            if row is None:
+                extra.add(path)
+            else:
+                rows.append(row)
+        return IncludedSet(self.index, self.bits.set_rows(rows, 1), frozenset(extra))
+
+    def without_paths(self, paths: Iterable[str]) -> 'IncludedSet':
+        """
+        Return a copy with paths removed, on the same index.
+
+        Args:
+            paths: Paths to exclude
+
+        Returns:
+            New IncludedSet
+        """
+        get_row = self.index.row
+        rows = []
+        removed = set()
+        for path in paths:
+            row = get_row(path)
+            if row is None:
+                removed.add(path)
+            else:
+                rows.append(row)
+        return IncludedSet(self.index, self.bits.set_rows(rows, 0), self.extra - removed)
+
+    def with_subtree(self, path: str, included: bool) -> 'IncludedSet':
+        """
+        Return a copy with path and all its descendants included or excluded.
+
+        Args:
+            path: Node to fill from
+            included: New inclusion for the whole subtree
+
+        Returns:
+            New IncludedSet
+        """
+        span = self.index.subtree(path)
+        if span is None:
+            extra = self.extra | {path} if included else self.extra - {path}
+            return IncludedSet(self.index, self.bits, extra)
+        start, end = span
+        return IncludedSet(self.index, self.bits.fill(start, end, int(included)), self.extra)
+
+    def count_in(self, path: str) -> Tuple[int, int]:
+        """
+        Count included nodes in the subtree of path.
+
+        Args:
+            path: Node at the top of the subtree
+
+        Returns:
+            Tuple of (included, total), both counting path itself
+        """
+        span = self.index.subtree(path)
+        if span is None:
+            return (1 if path in self.extra else 0), 1
+        start, end = span
+        return self.bits.count(1, start, end), end - start
+
@@ -0,0 +1,401 @@
+"""
+Filesystem watching for Claudius.
+Watches loaded folders with inotify (or by polling folder mtimes where
+inotify is unavailable) and turns batches of changes into reducer actions.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .scanner import list_directory, scan_subtree, stat_directory
+from .state import ActionType, AppState
+from ..utils.patterns import PatternMatcher
+
+# inotify event masks (see inotify(7))
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK)
+
+_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+def _parent(path: str) -> str:
+    """Return the parent of a relative path ('' for top-level items)."""
+    return path.rpartition('/')[0]
+
+
+def _depth(path: str) -> int:
+    """Return the depth of a relative path ('' has depth 0)."""
+    return path.count('/') + 1 if path else 0
+
+
+def _move_path(path: str, old: str, new: str) -> str:
+    """Rewrite path if it is old or lies under old."""
+    if path == old or path.startswith(old + '/'):
+        return new + path[len(old):]
+    return path
+
+
+def compute_fs_actions(root_dir: str, edges: Dict[str, List[str]],
+                       dirty: Set[str], moves: List[Tuple[str, str]],
+                       prune: Optional[PatternMatcher] = None) -> List[Dict[str, Any]]:
+    """
+    Re-list changed folders and describe the differences as reducer actions.
+
+    Folders are compared by listing them again rather than by replaying
+    individual events, so events that were coalesced, reordered or dropped
+    within a batch still produce the right result.
+
+    Args:
+        root_dir: Root directory of the tree
+        edges: Edges of the current state
+        dirty: Folders (in post-move paths) whose contents may have changed
+        moves: (old path, new path) pairs reported by the watcher
+        prune: Matcher for folders to list without walking and files to skip
+
+    Returns:
+        List of RENAME_NODES, REMOVE_NODES and INSERT_NODES actions
+    """
+    listings: Dict[str, Set[str]] = {}
+
+    def exists(path: str) -> bool:
+        parent = _parent(path)
+        if parent not in edges:
+            return False
+        if parent not in listings:
+            listings[parent] = set(edges[parent])
+        return path in listings[parent]
+
+    # Renames keep inclusion and expansion for moved subtrees
+    renames = []
+    for old, new in moves:
+        if exists(old) and not exists(new) and _parent(new) in edges:
+            renames.append((old, new))
+
+    removed = []
+    added = []
+    added_edges: Dict[str, List[str]] = {}
+    added_folders: Set[str] = set()
+    added_pruned: Set[str] = set()
+    seen = set()
+
+    for folder in sorted(dirty, key=_depth):
+        old_folder = folder
+        for old, new in reversed(renames):
+            old_folder = _move_path(old_folder, new, old)
+        if old_folder not in edges or folder in seen:
+            continue
+        seen.add(folder)
+
+        abs_path = os.path.join(root_dir, folder) if folder else root_dir
+        try:
+            children, subdirs, pruned = list_directory(abs_path, folder, prune)
+        except OSError:
+            continue  # Gone; its parent's listing reports the removal
+
+        # The listing we expect once the renames have been applied
+        old_children = edges[old_folder]
+        for old, new in renames:
+            old_children = [_move_path(child, old, new) for child in old_children]
+        old_children = [child for child in old_children if _parent(child) == folder]
+        old_children.extend(new for _, new in renames if _parent(new) == folder)
+        old_set = set(old_children)
+        new_set = set(children)
+
+        removed.extend(child for child in old_children if child not in new_set)
+
+        prefix = folder + '/' if folder else ''
+        new_dirs = {prefix + name for name in subdirs}
+        new_pruned = {prefix + name for name in pruned}
+        for child in children:
+            if child in old_set:
+                continue
+            added.append(child)
+            if child in new_dirs:
+                sub = scan_subtree(root_dir, child, prune=prune)
+                added_edges.update(sub.edges)
+                added_folders |= sub.folders
+                added_pruned |= sub.pruned
+            elif child in new_pruned:
+                added_pruned.add(child)
+
+    actions = []
+    if renames:
+        actions.append({"type": ActionType.RENAME_NODES, "renames": renames})
+    if removed:
+        actions.append({"type": ActionType.REMOVE_NODES, "paths": removed})
+    if added:
+        actions.append({
+            "type": ActionType.INSERT_NODES,
+            "paths": added,
+            "edges": added_edges,
+            "folders": added_folders,
+            "pruned_folders": added_pruned
+        })
+    return actions
+
+
+class _Inotify:
+    """Minimal ctypes binding for Linux inotify."""
+
+    def __init__(self) -> None:
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.fd = fd
+
+    def add_watch(self, path: str, mask: int) -> int:
+        """Add a watch; raises OSError on failure."""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        """Remove a watch, ignoring errors."""
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self) -> List[Tuple[int, int, int, str]]:
+        """Read all pending events as (wd, mask, cookie, name) tuples."""
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            events.append((wd, mask, cookie, name))
+        return events
+
+    def close(self) -> None:
+        """Close the inotify descriptor."""
+        os.close(self.fd)
+
+
+class FileSystemWatcher(threading.Thread):
+    """
+    Background thread that watches the loaded part of the tree.
+
+    Changes are batched until no new event arrives for `debounce` seconds
+    (or at most `max_delay` seconds after the first one), then re-listed and
+    handed to on_actions as a list of reducer actions.
+    """
+
+    def __init__(self, root_dir: str, get_state: Callable[[], AppState],
+                 on_actions: Callable[[List[Dict[str, Any]]], None],
+                 debounce: float = 0.1, max_delay: float = 1.0,
+                 poll_interval: float = 2.0, force_polling: bool = False,
+                 prune: Optional[PatternMatcher] = None) -> None:
+        super().__init__(name='claudius-watcher', daemon=True)
+        self.root_dir = os.path.abspath(root_dir)
+        self.get_state = get_state
+        self.on_actions = on_actions
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.force_polling = force_polling
+        self.prune = prune
+        self.polling = force_polling
+        self._stop_event = threading.Event()
+
+        self._inotify: Optional[_Inotify] = None
+        self._wd_paths: Dict[int, str] = {}
+        self._path_wds: Dict[str, int] = {}
+        self._watched_edges = None
+
+        self._dirty: Set[str] = set()
+        self._moves: List[Tuple[str, str]] = []
+        self._moved_from: Dict[int, Tuple[str, bool]] = {}
+        self._first_event = 0.0
+        self._last_event = 0.0
+
+        self._recheck: Set[str] = set()
+        self._stats: Dict[str, Tuple[int, int]] = {}
+
+    def stop(self) -> None:
+        """Ask the watcher to stop and wait for it."""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+
+    def run(self) -> None:
+        """Thread entry point."""
+        if not self.force_polling:
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError):
+                self.polling = True
+
+        try:
+            if not self.polling:
+                self._run_inotify()
+            if self.polling:
+                self._run_polling()
+        finally:
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+
+    # inotify mode
+
+    def _run_inotify(self) -> None:
+        """Watch with inotify until stopped or watches run out."""
+        fd = self._inotify.fd
+        while not self._stop_event.is_set():
+            if not self._sync_watches():
+                self.polling = True  # Out of watches (ENOSPC etc.)
+                return
+
+            timeout = 0.05
+            if self._dirty:
+                timeout = min(timeout, max(0.0, self.debounce - (time.monotonic() - self._last_event)))
+            readable, _, _ = select.select([fd], [], [], timeout)
+            if readable:
+                self._handle_events(self._inotify.read_events())
+
+            now = time.monotonic()
+            if self._dirty and (now - self._last_event >= self.debounce
+                                or now - self._first_event >= self.max_delay):
+                self._flush()
+
+    def _sync_watches(self) -> bool:
+        """Add watches for loaded folders that aren't watched yet."""
+        edges = self.get_state().edges
+        if edges is self._watched_edges:
+            return True
+        self._watched_edges = edges
+
+        for rel in edges.keys() - self._path_wds.keys():
+            abs_path = os.path.join(self.root_dir, rel) if rel else self.root_dir
+            try:
+                wd = self._inotify.add_watch(abs_path, WATCH_MASK)
+            except OSError as e:
+                if e.errno in (errno.ENOSPC, errno.ENOMEM):
+                    return False
+                continue  # Vanished or unreadable
+            self._wd_paths[wd] = rel
+            self._path_wds[rel] = wd
+            if rel in self._recheck:
+                self._mark_dirty(rel)
+        self._recheck.clear()
+        return True
+
+    def _mark_dirty(self, folder: str) -> None:
+        """Record that a folder changed."""
+        now = time.monotonic()
+        if not self._dirty:
+            self._first_event = now
+        self._last_event = now
+        self._dirty.add(folder)
+
+    def _handle_events(self, events: List[Tuple[int, int, int, str]]) -> None:
+        """Fold raw inotify events into the pending batch."""
+        for wd, mask, cookie, name in events:
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost: re-check every watched folder
+                for rel in self._path_wds:
+                    self._mark_dirty(rel)
+                continue
+            if mask & IN_IGNORED:
+                rel = self._wd_paths.pop(wd, None)
+                if rel is not None and self._path_wds.get(rel) == wd:
+                    del self._path_wds[rel]
+                continue
+
+            folder = self._wd_paths.get(wd)
+            if folder is None:
+                continue
+            path = folder + '/' + name if folder else name
+            self._mark_dirty(folder)
+
+            if mask & IN_MOVED_FROM:
+                self._moved_from[cookie] = (path, bool(mask & IN_ISDIR))
+            elif mask & IN_MOVED_TO and cookie in self._moved_from:
+                old, is_dir = self._moved_from.pop(cookie)
+                self._moves.append((old, path))
+                if is_dir:
+                    self._rename_watches(old, path)
+
+    def _rename_watches(self, old: str, new: str) -> None:
+        """Point watches (and pending changes) under a moved folder at its new path."""
+        for wd, rel in list(self._wd_paths.items()):
+            moved = _move_path(rel, old, new)
+            if moved != rel:
+                self._wd_paths[wd] = moved
+                if self._path_wds.get(rel) == wd:
+                    del self._path_wds[rel]
+                self._path_wds[moved] = wd
+        self._dirty = {_move_path(rel, old, new) for rel in self._dirty}
+
+    def _flush(self) -> None:
+        """Turn the pending batch into actions."""
+        # Folders moved out of the tree keep their watches; drop them
+        for path, is_dir in self._moved_from.values():
+            if is_dir and self._inotify is not None:
+                for rel, wd in list(self._path_wds.items()):
+                    if rel == path or rel.startswith(path + '/'):
+                        self._inotify.rm_watch(wd)
+                        del self._path_wds[rel]
+                        self._wd_paths.pop(wd, None)
+
+        dirty, moves = self._dirty, self._moves
+        self._dirty, self._moves, self._moved_from = set(), [], {}
+
+        state = self.get_state()
+        actions = compute_fs_actions(self.root_dir, state.edges, dirty, moves, self.prune)
+        for action in actions:
+            if action["type"] == ActionType.INSERT_NODES:
+                # Anything created before their watches exist is caught by
+                # listing new folders once more after watching them
+                self._recheck |= action["edges"].keys()
+        if actions:
+            self.on_actions(actions)
+
+    # Polling mode
+
+    def _run_polling(self) -> None:
+        """Poll folder mtimes until stopped."""
+        while not self._stop_event.is_set():
+            edges = self.get_state().edges
+            dirty = set()
+            for rel in list(edges.keys()):
+                abs_path = os.path.join(self.root_dir, rel) if rel else self.root_dir
+                stat = stat_directory(abs_path)
+                previous = self._stats.get(rel)
+                if previous is not None and previous != stat:
+                    dirty.add(rel)
+                self._stats[rel] = stat
+
+            # Forget folders that left the tree
+            for rel in self._stats.keys() - edges.keys():
+                del self._stats[rel]
+
+            if dirty:
+                actions = compute_fs_actions(self.root_dir, edges, dirty, [], self.prune)
+                if actions:
+                    self.on_actions(actions)
+
+            self._stop_event.wait(self.poll_interval)
@@ -0,0 +1,169 @@
+"""
+Unit tests for app module.
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from claudius.models import scanner
+from claudius.models.state import ActionType
+from claudius.models.stats import collect_file_stats
+from claudius.utils.calculations import get_subtree_stats
+from claudius.views.app import ClaudiusApp
+from claudius.views.file_tree import FileTree
+from claudius.views.status_bar import StatusBar
+
+
+class TestApp(unittest.TestCase):
+    """Test case for app module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = tempfile.mkdtemp()
+        for i in range(50):
+            open(os.path.join(self.test_dir, f"file{i:02}.txt"), "w").close()
+        os.makedirs(os.path.join(self.test_dir, "src", "views"))
+        open(os.path.join(self.test_dir, "src", "views", "finder.py"), "w").close()
+        # The app works on the current directory and keeps its state there
+        self.cwd = os.getcwd()
+        os.chdir(self.test_dir)
+
+    def tearDown(self):
+        """Tear down test fixtures."""
+        os.chdir(self.cwd)
+        shutil.rmtree(self.test_dir)
+
+    def test_actions_coalesce_per_frame(self):
+        """A burst of actions is reduced in full but drawn in one frame."""
+        async def run():
+            app = ClaudiusApp(use_cache=False, watch=False)
+            async with app.run_test() as pilot:
+                await pilot.pause(0.2)
+                self.assertEqual(app.state.selected_item, "src")
+                with mock.patch.object(FileTree, "update_from_state",
+                                       autospec=True) as update, \
+                        mock.patch.object(StatusBar, "refresh", autospec=True) as refresh:
+                    for _ in range(30):
+                        app.dispatch(ActionType.MOVE_SELECTION, {"direction": "down"})
+                    self.assertEqual(app.state.selected_item, "file29.txt")
+                    await pilot.pause(0.2)
+                update.assert_called_once()
+                self.assertIs(update.call_args.args[1], app.state)
+                # Nothing the status bar shows changed
+                refresh.assert_not_called()
+
+        asyncio.run(run())
+
+    def test_finder_reveals_path(self):
+        """Choosing a finder result expands its folders and selects it."""
+        async def run():
+            app = ClaudiusApp(use_cache=False, watch=False)
+            async with app.run_test() as pilot:
+                await pilot.pause(0.2)
+                await pilot.press("slash")
+                await pilot.press(*"fndr")
+                await pilot.pause(0.2)
+                await pilot.press("enter")
+                await pilot.pause(0.1)
+                self.assertIsNone(app.finder)
+                self.assertEqual(app.state.selected_item, "src/views/finder.py")
+                self.assertEqual(set(app.state.expanded_folders), {"src", "src/views"})
+
+                # Escape closes the finder without moving
+                await pilot.press("slash", "x", "escape")
+                await pilot.pause(0.1)
+                self.assertEqual(app.state.selected_item, "src/views/finder.py")
+
+        asyncio.run(run())
+
+    def test_lazy_expand_all_loads_in_background(self):
+        """Expanding everything in lazy mode scans off the UI thread, then expands."""
+        release = threading.Event()
+        scan_tree = scanner.scan_tree
+
+        def slow_scan_tree(*args, **kwargs):
+            release.wait(5)
+            return scan_tree(*args, **kwargs)
+
+        async def run():
+            app = ClaudiusApp(use_cache=False, watch=False, lazy=True)
+            async with app.run_test() as pilot:
+                await pilot.pause(0.2)
+                self.assertNotIn("src/views", app.state.edges)
+                await pilot.press("o")
+                await pilot.pause(0.1)
+                # The app still answers input while the subtree loads
+                self.assertEqual(app.state.notification, "Loading...")
+                self.assertNotIn("src", app.state.expanded_folders)
+                await pilot.press("j")
+                self.assertEqual(app.state.selected_item, "file00.txt")
+
+                release.set()
+                await pilot.pause(0.3)
+                self.assertIn("src/views", app.state.expanded_folders)
+                self.assertIn("src/views/finder.py", app.state.edges["src/views"])
+                self.assertIsNone(app.state.notification)
+
+        # Keep the background fill from loading the tree first
+        with mock.patch.object(ClaudiusApp, "fill_tree"), \
+                mock.patch("claudius.views.app.scan_tree", side_effect=slow_scan_tree):
+            asyncio.run(run())
+
+    def test_lazy_toggle_pressed_twice(self):
+        """A second press while a subtree loads replaces the first, so the folder toggles once."""
+        release = threading.Event()
+        scan_tree = scanner.scan_tree
+
+        def slow_scan_tree(*args, **kwargs):
+            release.wait(5)
+            return scan_tree(*args, **kwargs)
+
+        async def run():
+            app = ClaudiusApp(use_cache=False, watch=False, lazy=True)
+            async with app.run_test() as pilot:
+                await pilot.pause(0.2)
+                self.assertEqual(app.state.selected_item, "src")
+                await pilot.press("i", "i")
+                await pilot.pause(0.1)
+                # A message set meanwhile outlives the load
+                app.dispatch(ActionType.SET_NOTIFICATION, {"message": "Other"})
+
+                release.set()
+                await pilot.pause(0.3)
+                self.assertIn("src/views/finder.py", app.state.included_paths)
+                self.assertEqual(app.state.notification, "Other")
+                self.assertEqual(app.subtree_loads, {})
+
+        with mock.patch.object(ClaudiusApp, "fill_tree"), \
+                mock.patch("claudius.views.app.scan_tree", side_effect=slow_scan_tree):
+            asyncio.run(run())
+
+    def test_inserted_files_get_stats(self):
+        """A watcher batch collects stats for the files it inserts only."""
+        async def run():
+            app = ClaudiusApp(use_cache=False, watch=False)
+            async with app.run_test() as pilot:
+                await pilot.pause(0.3)
+                self.assertIsNotNone(app.state.file_stats)
+                with open(os.path.join("src", "new.txt"), "w") as f:
+                    f.write("x" * 40)
+                with mock.patch("claudius.views.app.collect_file_stats",
+                                wraps=collect_file_stats) as collect:
+                    app.apply_actions([{"type": ActionType.INSERT_NODES, "paths": ["src/new.txt"],
+                                        "edges": {}, "folders": set()}])
+                    await pilot.pause(0.3)
+                collect.assert_called_once()
+                self.assertEqual(collect.call_args.args[1], {})
+                self.assertEqual(collect.call_args.kwargs["paths"], ["src/new.txt"])
+                self.assertEqual(app.state.file_stats["src/new.txt"], (40, 10))
+                self.assertEqual(get_subtree_stats(app.state, "src"), ((0, 0), (40, 10)))
+                self.assertTrue(app.token_cache_dirty)
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
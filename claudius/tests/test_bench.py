@@ -0,0 +1,108 @@
+"""
+Smoke tests for the benchmark suite in benchmarks/bench.py.
+"""
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+BENCH_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))), "benchmarks", "bench.py")
+
+
+def load_bench():
+    """Import benchmarks/bench.py, which isn't part of the package."""
+    spec = importlib.util.spec_from_file_location("bench", BENCH_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestBench(unittest.TestCase):
+    """Test case for the benchmark suite."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Tear down test fixtures."""
+        shutil.rmtree(self.test_dir)
+
+    def test_run_and_compare(self):
+        """A small run writes every result and fails against a faster baseline."""
+        output = os.path.join(self.test_dir, "results.json")
+        baseline = os.path.join(self.test_dir, "baseline.json")
+        with open(baseline, "w") as f:
+            json.dump({"version": 1, "results": {
+                "deep/150/scan": {"seconds": 0.0, "peak_bytes": 0, "nodes": 150}}}, f)
+
+        result = subprocess.run(
+            [sys.executable, BENCH_PATH, "--sizes", "150", "--repeat", "1",
+             "--output", output, "--baseline", baseline, "--noise-floor", "0"],
+            capture_output=True, text=True, timeout=120)
+        self.assertEqual(result.returncode, 1, result.stderr)
+        self.assertIn("REGRESSION deep/150/scan", result.stderr)
+
+        with open(output) as f:
+            results = json.load(f)["results"]
+        self.assertEqual(len(results), 24)
+        for shape in ("wide", "deep", "monorepo"):
+            self.assertGreaterEqual(results[f"{shape}/150/scan"]["nodes"], 150)
+
+    def test_makers(self):
+        """Generated trees have the requested number of scanned nodes."""
+        bench = load_bench()
+        for shape, make in bench.MAKERS.items():
+            root = os.path.join(self.test_dir, shape)
+            os.mkdir(root)
+            nodes = make(root, 500)
+            edges, _ = bench.scan_filesystem(root, prune=bench.load_prune_matcher(root))
+            scanned = sum(len(children) for children in edges.values())
+            # Pruned folders are listed but not walked
+            self.assertEqual(scanned, nodes + (2 if shape == "monorepo" else 0), shape)
+            self.assertGreaterEqual(nodes, 500)
+
+    def test_import_budgets(self):
+        """Cold imports are timed per module and checked against their budgets."""
+        bench = load_bench()
+        results, over = bench.run_imports(1)
+        self.assertEqual(set(results), {f"import/{module}" for module in bench.IMPORT_BUDGETS_MS})
+        self.assertGreater(results["import/claudius.cli"]["seconds"], 0)
+        with mock.patch.dict(bench.IMPORT_BUDGETS_MS, {"claudius.cli": 0}):
+            _, over = bench.run_imports(1)
+        self.assertEqual(len(over), 1)
+        self.assertTrue(over[0].startswith("import/claudius.cli:"))
+
+    def test_compact_memory(self):
+        """Drawing and toggling on the compact tree peaks below the dict tree."""
+        bench = load_bench()
+        with mock.patch("sys.stdout"):
+            results = bench.run_benchmarks([3000], ["monorepo"], ["session", "compact_session"], 1)
+        self.assertEqual(bench.check_compact_memory(results), [])
+
+        results["monorepo/3000/compact_session"]["peak_bytes"] = 2**30
+        over = bench.check_compact_memory(results)
+        self.assertEqual(len(over), 1)
+        self.assertTrue(over[0].startswith("monorepo/3000/compact_session: peak 1024.0 MiB"))
+
+    def test_compare(self):
+        """Only slowdowns past both the threshold and the noise floor count."""
+        bench = load_bench()
+        baseline = {"a": {"seconds": 1.0, "peak_bytes": 2**20},
+                    "b": {"seconds": 0.001, "peak_bytes": 2**20}}
+        results = {"a": {"seconds": 1.2, "peak_bytes": 2**20},
+                   "b": {"seconds": 0.002, "peak_bytes": 2**22},
+                   "c": {"seconds": 9.0, "peak_bytes": 0}}
+        self.assertEqual(bench.compare(results, baseline, 0.25, 0.002),
+                         ["b: peak 4.0 MiB, baseline 1.0 MiB"])
+        self.assertEqual(len(bench.compare(results, baseline, 0.1, 0.0)), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,9 +5,13 @@ import unittest
 import os
 from claudius.utils.calculations import (
     get_visible_items, get_root_items, get_display_name, 
-    get_all_descendants, get_indentation_level, get_absolute_paths
+    get_all_descendants, get_indentation_level, get_absolute_paths,
+    get_ancestors, get_unloaded_folders, get_inclusion, get_ignore_lines,
+    get_pattern_inclusion, get_pattern_matches, format_size, format_tokens,
+    get_stats_label, get_stats_summary, get_inclusion_state
 )
 from claudius.models.state import AppState
+from claudius.utils.patterns import PatternMatcher
 
 class TestCalculations(unittest.TestCase):
     """Test case for calculations module."""
@@ -48,6 +52,19 @@ class TestCalculations(unittest.TestCase):
         result = get_all_descendants(self.edges, "folder1")
         self.assertEqual(result, expected)
     
+    def test_get_ancestors(self):
+        """Test get_ancestors function."""
+        self.assertEqual(get_ancestors("a/b/c.txt"), ["a/b", "a"])
+        self.assertEqual(get_ancestors("file1.txt"), [])
+    
+    def test_get_unloaded_folders(self):
+        """Test get_unloaded_folders function."""
+        edges = {"": ["folder1", "folder2"], "folder1": ["folder1/sub"]}
+        folders = {"folder1", "folder2", "folder1/sub"}
+        self.assertEqual(get_unloaded_folders(edges, folders), ["folder1/sub", "folder2"])
+        self.assertEqual(get_unloaded_folders(edges, folders, "folder1"), ["folder1/sub"])
+        self.assertEqual(get_unloaded_folders(self.edges, self.folders), [])
+    
     def test_get_indentation_level(self):
         """Test get_indentation_level function."""
         self.assertEqual(get_indentation_level(""), 0)
@@ -65,6 +82,90 @@ class TestCalculations(unittest.TestCase):
         result = get_absolute_paths(included_paths, root_dir)
         self.assertEqual(sorted(result), sorted(expected))
     
+    def test_get_inclusion(self):
+        """Test get_inclusion function."""
+        self.assertEqual(get_inclusion(self.state, "folder1"), (2, 3))
+        self.assertEqual(get_inclusion(self.state, "folder2"), (0, 2))
+        
+        # The same counts come from the bitset once the state has one
+        from claudius.models.state import reducer, ActionType
+        state = reducer(self.state, {"type": ActionType.TOGGLE_INCLUDE, "path": "folder2"})
+        self.assertEqual(get_inclusion(state, "folder1"), (2, 3))
+        self.assertEqual(get_inclusion(state, "folder2"), (2, 2))
+        self.assertEqual(get_inclusion(state, ""), (4, 7))
+    
+    def test_get_inclusion_state(self):
+        """Test get_inclusion_state function."""
+        self.assertEqual(get_inclusion_state(self.state, "folder1"), "partial")
+        self.assertEqual(get_inclusion_state(self.state, "folder2"), "none")
+        self.assertEqual(get_inclusion_state(self.state, "folder1/file1.txt"), "full")
+        self.assertEqual(get_inclusion_state(self.state, "file1.txt"), "none")
+        
+        # A folder goes by its contents, even if it isn't included itself
+        state = self.state.update(included_paths={"folder2/file1.txt"})
+        self.assertEqual(get_inclusion_state(state, "folder2"), "full")
+        state = self.state.update(included_paths={"folder2"}, edges={**self.edges, "folder2": []})
+        self.assertEqual(get_inclusion_state(state, "folder2"), "full")
+    
+    def test_format_size_and_tokens(self):
+        """Test format_size and format_tokens functions."""
+        self.assertEqual(format_size(512), "512 B")
+        self.assertEqual(format_size(1536), "1.5 KB")
+        self.assertEqual(format_size(200 * 1024 ** 2), "200 MB")
+        self.assertEqual(format_tokens(950), "950")
+        self.assertEqual(format_tokens(12345), "12k")
+        self.assertEqual(format_tokens(999999), "1.0M")
+    
+    def test_get_stats_label(self):
+        """Test get_stats_label and get_stats_summary functions."""
+        self.assertEqual(get_stats_label(self.state, "folder1"), "")
+        self.assertIsNone(get_stats_summary(self.state))
+        
+        from claudius.models.state import reducer, ActionType
+        state = reducer(self.state, {"type": ActionType.SET_FILE_STATS, "stats": {
+            "folder1/file1.txt": (2048, 500), "folder1/file2.txt": (1024, 300)}})
+        self.assertEqual(get_stats_label(state, "folder1/file2.txt"), "1.0 KB, 300 tokens")
+        self.assertEqual(get_stats_label(state, "folder1"), "3.0 KB, 500/800 tokens")
+        self.assertEqual(get_stats_summary(state), "2.0 KB, 500 of 800 tokens included")
+    
+    def test_get_ignore_lines(self):
+        """Test that fully included folders collapse to one entry."""
+        self.assertEqual(get_ignore_lines(self.state), ([], ["folder1", "folder1/file1.txt"]))
+        
+        state = self.state.update(included_paths={"folder1", "folder1/file1.txt", "folder1/file2.txt",
+                                                  "folder2/file1.txt", "gone.txt"})
+        self.assertEqual(get_ignore_lines(state)[1], ["/folder1/", "folder2/file1.txt", "gone.txt"])
+        self.assertEqual(len(get_ignore_lines(state, collapse=False)[1]), 5)
+        
+        # A folder whose children haven't been listed yet stays literal
+        edges = {"": ["folder1", "folder2", "file1.txt"], "folder2": ["folder2/file1.txt"]}
+        state = state.update(edges=edges, included_paths={"folder1", "folder2", "folder2/file1.txt"})
+        self.assertEqual(sorted(get_ignore_lines(state)[1]), ["/folder2/", "folder1"])
+    
+    def test_get_ignore_lines_with_patterns(self):
+        """Test that pattern matches aren't repeated and exclusions are kept."""
+        matcher = PatternMatcher(["*.txt", "!/folder1/file2.txt"])
+        matched = get_pattern_matches(matcher, self.edges, self.folders)
+        self.assertEqual(matched, {"folder1/file1.txt", "folder2/file1.txt", "file1.txt"})
+        
+        # The user excluded folder2/file1.txt and included folder2
+        state = self.state.update(ignore_matcher=matcher,
+                                  included_paths={"folder1/file1.txt", "file1.txt", "folder2"})
+        patterns, entries = get_ignore_lines(state)
+        self.assertEqual(patterns, ["*.txt", "!/folder1/file2.txt", "!/folder2/file1.txt"])
+        self.assertEqual(entries, ["folder2"])
+        
+        # Reading the lines back gives the same inclusion
+        matched = get_pattern_matches(PatternMatcher(patterns), self.edges, self.folders)
+        self.assertEqual(matched | set(entries), set(state.included_paths))
+    
+    def test_get_pattern_inclusion(self):
+        """Test that a path follows its folder unless a pattern matches it."""
+        matcher = PatternMatcher(["folder1/", "!*2.txt"])
+        self.assertTrue(get_pattern_inclusion(matcher, "folder1/file1.txt", False))
+        self.assertFalse(get_pattern_inclusion(matcher, "folder1/file2.txt", False))
+        self.assertFalse(get_pattern_inclusion(matcher, "folder2/file1.txt", False))
+    
     def test_get_visible_items(self):
         """Test get_visible_items function."""
         # With folder1 expanded, we should see root items + folder1's children
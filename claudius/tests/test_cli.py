@@ -0,0 +1,93 @@
+"""
+Unit tests for cli module.
+"""
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from claudius.cli import main
+from claudius.models.file_system import CLAUDEIGNORE_HEADER
+
+
+class TestCli(unittest.TestCase):
+    """Test case for cli module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.test_dir, "folder1", "sub"))
+        for path in ("file1.txt", "folder1/file1.txt", "folder1/sub/deep.py"):
+            open(os.path.join(self.test_dir, path), "w").close()
+        with open(os.path.join(self.test_dir, "file1.txt"), "w") as f:
+            f.write("hello world\n")
+
+    def tearDown(self):
+        """Tear down test fixtures."""
+        shutil.rmtree(self.test_dir)
+
+    def run_command(self, *args):
+        """Run a command and return (status, output lines)."""
+        out = io.StringIO()
+        stdout, sys.stdout = sys.stdout, out
+        try:
+            status = main([*args, "-C", self.test_dir, "--no-cache"])
+        finally:
+            sys.stdout = stdout
+        return status, out.getvalue().splitlines()
+
+    def read_ignore(self):
+        """Return the lines of .claudeignore after the format header."""
+        with open(os.path.join(self.test_dir, ".claudeignore")) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], CLAUDEIGNORE_HEADER)
+        return lines[1:]
+
+    def test_add_and_remove(self):
+        """Adding a folder writes one entry; removing part of it splits it up."""
+        self.assertEqual(self.run_command("add", os.path.join(self.test_dir, "folder1"))[0], 0)
+        self.assertEqual(self.read_ignore(), ["/folder1/"])
+
+        self.assertEqual(self.run_command("remove", os.path.join(self.test_dir, "folder1", "sub"))[0], 0)
+        self.assertEqual(self.read_ignore(), ["folder1", "folder1/file1.txt"])
+
+        status, _ = self.run_command("add", os.path.join(self.test_dir, "missing.txt"))
+        self.assertEqual(status, 1)
+
+    def test_list(self):
+        """Both listing modes print included paths in tree order."""
+        with open(os.path.join(self.test_dir, ".claudeignore"), "w") as f:
+            f.write("/folder1/sub/\n*.txt\n")
+        expected = ["folder1/sub", "folder1/sub/deep.py", "folder1/file1.txt", "file1.txt"]
+        self.assertEqual(self.run_command("list"), (0, expected))
+        self.assertEqual(self.run_command("list", "--stream"), (0, expected))
+
+    def test_check(self):
+        """Entries naming missing paths fail the check."""
+        with open(os.path.join(self.test_dir, ".claudeignore"), "w") as f:
+            f.write("file1.txt\n/gone/\n*.log\n")
+        self.assertEqual(self.run_command("check"), (1, ["gone: no such file or directory"]))
+
+    def test_stats(self):
+        """Stats count included files and folders."""
+        with open(os.path.join(self.test_dir, ".claudeignore"), "w") as f:
+            f.write("/folder1/\n")
+        status, lines = self.run_command("stats")
+        self.assertEqual(status, 0)
+        self.assertEqual(lines[:2], ["files: 2 of 3 included", "folders: 2 of 2 included"])
+        self.assertEqual(lines[2:4], ["size: 0 B of 12 B included",
+                                      "tokens: 0 of 3 included (estimated)"])
+
+    def test_cold_start(self):
+        """The headless commands never import the UI (budgets: bench.py --imports)."""
+        code = ("import sys, claudius.cli; "
+                "print(sorted({m.split('.')[0] for m in sys.modules} & {'textual', 'rich'}))")
+        result = subprocess.run([sys.executable, "-c", code],
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "[]")
+
+
+if __name__ == "__main__":
+    unittest.main()
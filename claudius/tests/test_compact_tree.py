@@ -0,0 +1,150 @@
+"""
+Unit tests for compact_tree module.
+"""
+import unittest
+from claudius.models.compact_tree import CompactTree, NO_NODE
+from claudius.models.state import AppState, ActionType, reducer
+from claudius.utils.calculations import get_all_descendants, get_inclusion, get_visible_items
+
+
+class TestCompactTree(unittest.TestCase):
+    """Test case for compact_tree module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.edges = {
+            "": ["folder1", "folder2", "file1.txt"],
+            "folder1": ["folder1/sub", "folder1/file1.txt", "folder1/file2.txt"],
+            "folder1/sub": ["folder1/sub/deep.txt"],
+            "folder2": ["folder2/file1.txt"]
+        }
+        self.folders = {"folder1", "folder1/sub", "folder2"}
+        self.tree = CompactTree.from_edges(self.edges, self.folders)
+
+    def make_states(self, **kwargs):
+        """Build equivalent dict-backed and tree-backed states."""
+        fields = dict(included_paths={"folder1", "folder1/sub", "folder1/sub/deep.txt",
+                                      "folder1/file1.txt", "folder1/file2.txt"},
+                      selected_item="folder1/sub/deep.txt",
+                      expanded_folders={"folder1", "folder1/sub"})
+        fields.update(kwargs)
+        return (AppState(edges=self.edges, folders=self.folders, **fields),
+                AppState(edges=self.tree.edges, folders=self.tree.folders, **fields))
+
+    def assertSameState(self, expected, actual):
+        """Check that a tree-backed state matches a dict-backed one."""
+        self.assertEqual(dict(actual.edges.items()), expected.edges)
+        self.assertEqual(set(actual.folders), set(expected.folders))
+        self.assertEqual(len(actual.folders), len(expected.folders))
+        self.assertEqual(len(actual.edges), len(expected.edges))
+        self.assertEqual(actual.included_paths, expected.included_paths)
+        self.assertEqual(actual.expanded_folders, expected.expanded_folders)
+        self.assertEqual(actual.selected_item, expected.selected_item)
+        self.assertEqual(get_visible_items(actual), get_visible_items(expected))
+
+    def test_views_match_dicts(self):
+        """The edges and folders views behave like the dict and set they replace."""
+        self.assertEqual(dict(self.tree.edges.items()), self.edges)
+        self.assertEqual(set(self.tree.folders), self.folders)
+        self.assertIn("folder1/sub", self.tree.edges)
+        self.assertNotIn("folder1/file1.txt", self.tree.edges)
+        self.assertNotIn("folder1/file1.txt", self.tree.folders)
+        self.assertNotIn("", self.tree.folders)
+        self.assertIsNone(self.tree.edges.get("missing"))
+        self.assertEqual(self.tree.folders | {"x"}, self.folders | {"x"})
+        self.assertEqual(get_all_descendants(self.tree.edges, "folder1"),
+                         get_all_descendants(self.edges, "folder1"))
+
+    def test_paths_are_rebuilt(self):
+        """Nodes store only a segment; full paths are rebuilt from parents."""
+        node = self.tree.find("folder1/sub/deep.txt")
+        self.assertNotEqual(node, NO_NODE)
+        self.assertEqual(self.tree.path(node), "folder1/sub/deep.txt")
+        self.assertEqual(self.tree.find("folder1/nope"), NO_NODE)
+        # "file1.txt" appears three times but is stored once
+        self.assertEqual(self.tree.names.count("file1.txt"), 1)
+
+    def test_wide_folder_lookup(self):
+        """Lookups in folders with many children stay correct once indexed."""
+        files = [f"wide/f{i:03}" for i in range(100)]
+        tree = CompactTree.from_edges({"": ["wide"], "wide": files}, {"wide"})
+        for path in files:
+            self.assertEqual(tree.path(tree.find(path)), path)
+        tree = tree.inserted(["wide/g"], {}, set())
+        self.assertEqual(tree.path(tree.find("wide/g")), "wide/g")
+
+    def test_merge_scan(self):
+        """Lazily listed folders merge the same way as with dicts."""
+        self.edges = {"": ["folder1", "folder2"]}
+        self.folders = {"folder1", "folder2"}
+        self.tree = CompactTree.from_edges(self.edges, self.folders)
+        expected, actual = self.make_states(included_paths=set(), selected_item="folder1",
+                                            expanded_folders=set())
+        action = {"type": ActionType.MERGE_SCAN,
+                  "edges": {"folder1": ["folder1/sub", "folder1/a.txt"], "folder1/sub": []},
+                  "folders": {"folder1", "folder1/sub"}}
+        self.assertSameState(reducer(expected, action), reducer(actual, action))
+
+    def test_insert_nodes(self):
+        """New nodes land in display order and inherit inclusion."""
+        expected, actual = self.make_states()
+        action = {"type": ActionType.INSERT_NODES,
+                  "paths": ["folder1/aaa", "folder1/b.txt", "folder2/new"],
+                  "edges": {"folder1/aaa": ["folder1/aaa/x.txt"]},
+                  "folders": {"folder1/aaa"}}
+        self.assertSameState(reducer(expected, action), reducer(actual, action))
+
+    def test_remove_nodes(self):
+        """Removed subtrees disappear from edges, folders and counts."""
+        expected, actual = self.make_states()
+        action = {"type": ActionType.REMOVE_NODES, "paths": ["folder1/sub", "file1.txt"]}
+        self.assertSameState(reducer(expected, action), reducer(actual, action))
+
+    def test_rename_nodes(self):
+        """Renaming moves a whole subtree by relinking one node."""
+        expected, actual = self.make_states()
+        action = {"type": ActionType.RENAME_NODES,
+                  "renames": [("folder1/sub", "folder2/moved"), ("file1.txt", "aaa.txt")]}
+        new_actual = reducer(actual, action)
+        self.assertSameState(reducer(expected, action), new_actual)
+        # The original state is untouched
+        self.assertSameState(expected, actual)
+
+    def test_toggle_and_expand_all(self):
+        """Read-only actions run unchanged on top of the views."""
+        expected, actual = self.make_states(expanded_folders=set(), selected_item="folder1")
+        for action in ({"type": ActionType.TOGGLE_EXPAND, "path": "folder1"},
+                       {"type": ActionType.MOVE_SELECTION, "direction": "down"},
+                       {"type": ActionType.TOGGLE_INCLUDE, "path": "folder1/sub"},
+                       {"type": ActionType.EXPAND_ALL}):
+            expected, actual = reducer(expected, action), reducer(actual, action)
+            self.assertSameState(expected, actual)
+
+    def test_counts_follow_edits(self):
+        """Node counts are patched through toggles and tree edits, by path or by node ID."""
+        actions = [
+            {"type": ActionType.TOGGLE_INCLUDE, "path": "folder2"},
+            {"type": ActionType.INSERT_NODES, "paths": ["folder1/new", "folder2/aaa"],
+             "edges": {"folder1/new": ["folder1/new/x.txt"]}, "folders": {"folder1/new"}},
+            {"type": ActionType.TOGGLE_INCLUDE, "path": "folder1/new/x.txt"},
+            {"type": ActionType.RENAME_NODES, "renames": [("folder1/new", "folder2/moved")]},
+            {"type": ActionType.TOGGLE_INCLUDE, "path": "folder2"},
+            {"type": ActionType.REMOVE_NODES, "paths": ["folder1/sub", "file1.txt"]},
+            {"type": ActionType.MERGE_SCAN, "folders": {"folder1/z"},
+             "edges": {"folder1": ["folder1/z", "folder1/file2.txt"], "folder1/z": ["folder1/z/y"]}},
+            {"type": ActionType.TOGGLE_INCLUDE, "path": "folder1/z"},
+        ]
+        for state in self.make_states():
+            get_inclusion(state, "")  # Build the counts
+            for action in actions:
+                state = reducer(state, action)
+                self.assertIsNotNone(state.subtree_counts, action["type"])
+                rebuilt = state.update(subtree_counts=None)
+                for path in ["", *get_all_descendants(state.edges, "")]:
+                    self.assertEqual(get_inclusion(state, path), get_inclusion(rebuilt, path),
+                                     (action["type"], path))
+            self.assertEqual(get_inclusion(state, ""), (4, 10))
+
+
+if __name__ == "__main__":
+    unittest.main()
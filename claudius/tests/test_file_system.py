@@ -5,7 +5,11 @@ import unittest
 import os
 import tempfile
 import shutil
-from claudius.models.file_system import scan_filesystem, read_claudeignore, write_claudeignore
+from unittest import mock
+from claudius.models.file_system import (
+    CLAUDEIGNORE_HEADER, scan_filesystem, parse_claudeignore, read_claudeignore, write_claudeignore, load_prune_matcher)
+from claudius.models.state import ActionType, get_initial_state, reducer
+from claudius.utils.calculations import get_ignore_lines
 
 class TestFileSystem(unittest.TestCase):
     """Test case for file_system module."""
@@ -56,6 +60,31 @@ class TestFileSystem(unittest.TestCase):
         self.assertIn("folder1", included)
         self.assertIn("file1.txt", included)
     
+    def test_read_claudeignore_folder_entries(self):
+        """Test that folder entries expand to the whole subtree."""
+        with open(os.path.join(self.test_dir, ".claudeignore"), "w") as f:
+            f.write("/folder1/\n")
+            f.write("folder2/file1.txt\n")
+        
+        edges, _ = scan_filesystem(self.test_dir)
+        included = read_claudeignore(self.test_dir, edges)
+        self.assertEqual(included, {"folder1", "folder1/file1.txt", "folder1/file2.txt",
+                                    "folder2/file1.txt"})
+        
+        # Without a tree only the folder itself is known
+        self.assertEqual(read_claudeignore(self.test_dir), {"folder1", "folder2/file1.txt"})
+    
+    def test_read_claudeignore_patterns(self):
+        """Test that patterns are matched against the scanned tree."""
+        with open(os.path.join(self.test_dir, ".claudeignore"), "w") as f:
+            f.write("folder1/\n")
+            f.write("!file2.txt\n")
+            f.write("file1.txt\n")
+        
+        edges, folders = scan_filesystem(self.test_dir)
+        included = read_claudeignore(self.test_dir, edges, folders)
+        self.assertEqual(included, {"folder1", "folder1/file1.txt", "file1.txt"})
+    
     def test_write_claudeignore(self):
         """Test writing .claudeignore file."""
         included = {"folder1", "file1.txt"}
@@ -70,6 +99,70 @@ class TestFileSystem(unittest.TestCase):
         self.assertIn("folder1", lines)
         self.assertIn("file1.txt", lines)
     
+    def test_write_claudeignore_unchanged(self):
+        """Test that unchanged contents are not rewritten and chunks join up."""
+        ignore_path = os.path.join(self.test_dir, ".claudeignore")
+        included = {f"file{i:05}.txt" for i in range(10000)}
+        self.assertTrue(write_claudeignore(self.test_dir, included, ["*.log"]))
+        inode = os.stat(ignore_path).st_ino
+        
+        # Equal contents leave the file in place
+        self.assertTrue(write_claudeignore(self.test_dir, included, ["*.log"]))
+        self.assertEqual(os.stat(ignore_path).st_ino, inode)
+        
+        # Changed contents replace it whole
+        self.assertTrue(write_claudeignore(self.test_dir, included - {"file00000.txt"}, ["*.log"]))
+        self.assertNotEqual(os.stat(ignore_path).st_ino, inode)
+        with open(ignore_path, "r") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines, [CLAUDEIGNORE_HEADER, "*.log"] + sorted(included - {"file00000.txt"}))
+        self.assertEqual(os.listdir(self.test_dir).count(".claudeignore"), 1)
+    
+    def test_claudeignore_round_trip(self):
+        """Names with glob characters, '!' and '#' read back as the paths written."""
+        os.makedirs(os.path.join(self.test_dir, "[x]"))
+        names = ["a[1].txt", "a1.txt", "x*y.py", "xzy.py", "!foo", "#bar", "[x]/b.txt"]
+        for name in names:
+            open(os.path.join(self.test_dir, name), "w").close()
+        edges, folders = scan_filesystem(self.test_dir)
+        selected = {"a[1].txt", "x*y.py", "!foo", "#bar", "[x]", "[x]/b.txt"}
+        state = reducer(get_initial_state(), {
+            "type": ActionType.LOAD_DATA,
+            "edges": edges,
+            "folders": folders,
+            "included_paths": selected,
+            "selected_item": "",
+            "expanded_folders": set(),
+        })
+        
+        patterns, entries = get_ignore_lines(state)
+        self.assertIn("/[x]/", [line.replace("\\", "") for line in entries])
+        self.assertTrue(write_claudeignore(self.test_dir, entries, patterns))
+        self.assertEqual(read_claudeignore(self.test_dir, edges, folders), selected)
+    
+    def test_folder_entries_under_shallow_root(self):
+        """Folder entries that start like the root path aren't taken for absolute paths."""
+        contents = "/appdata/\n/app/\n/app/src/main.py\n"
+        with mock.patch("os.path.exists", return_value=True), \
+                mock.patch("builtins.open", mock.mock_open(read_data=contents)):
+            paths, folder_entries, patterns = parse_claudeignore("/app")
+        self.assertEqual(folder_entries, {"appdata", "app"})
+        self.assertEqual(paths, {"src/main.py"})
+        self.assertEqual(patterns, [])
+    
+    def test_read_legacy_claudeignore(self):
+        """Files written before escaping keep paths with glob characters literal."""
+        os.makedirs(os.path.join(self.test_dir, "pages", "[id]"))
+        open(os.path.join(self.test_dir, "pages", "[slug].tsx"), "w").close()
+        open(os.path.join(self.test_dir, "pages", "s.tsx"), "w").close()
+        with open(os.path.join(self.test_dir, ".claudeignore"), "w") as f:
+            f.write("pages/[slug].tsx\n/pages/[id]/\nfolder1/*.txt\nfolder2/\n")
+        
+        paths, folder_entries, patterns = parse_claudeignore(self.test_dir)
+        self.assertEqual(paths, {"pages/[slug].tsx"})
+        self.assertEqual(folder_entries, {"pages/[id]"})
+        self.assertEqual(patterns, ["folder1/*.txt", "folder2/"])
+    
     def test_read_claudeignore_nonexistent(self):
         """Test reading a non-existent .claudeignore file."""
         # Make sure file doesn't exist
@@ -79,6 +172,27 @@ class TestFileSystem(unittest.TestCase):
             
         included = read_claudeignore(self.test_dir)
         self.assertEqual(len(included), 0)
+    
+    def test_load_prune_matcher(self):
+        """Test combining default prune patterns with .gitignore."""
+        with open(os.path.join(self.test_dir, ".gitignore"), "w") as f:
+            f.write("folder2/\n!node_modules/\n")
+        
+        matcher = load_prune_matcher(self.test_dir)
+        self.assertTrue(matcher.match(".git", True))
+        self.assertTrue(matcher.match("pkg/__pycache__", True))
+        self.assertTrue(matcher.match("folder2", True))
+        self.assertFalse(matcher.match("node_modules", True))
+        self.assertFalse(matcher.match("folder1", True))
+        
+        matcher = load_prune_matcher(self.test_dir, ["*.txt"],
+                                     use_defaults=False, use_gitignore=False)
+        self.assertFalse(matcher.match(".git", True))
+        self.assertTrue(matcher.match("folder1/file1.txt", False))
+        
+        edges, folders = scan_filesystem(self.test_dir, prune=load_prune_matcher(self.test_dir))
+        self.assertIn("folder2", edges[""])
+        self.assertNotIn("folder2", edges)
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,30 @@
+"""
+Unit tests for file_tree module.
+"""
+import unittest
+from claudius.views.file_tree import get_guide
+
+
+class TestFileTree(unittest.TestCase):
+    """Test case for file_tree module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.edges = {
+            "": ["folder1", "folder2", "file1.txt"],
+            "folder1": ["folder1/sub", "folder1/file1.txt"],
+            "folder1/sub": ["folder1/sub/deep.txt"],
+            "folder2": ["folder2/file1.txt"]
+        }
+
+    def test_get_guide(self):
+        """Guides continue a line for every ancestor that has later siblings."""
+        self.assertEqual(get_guide(self.edges, "folder1"), "├── ")
+        self.assertEqual(get_guide(self.edges, "file1.txt"), "└── ")
+        self.assertEqual(get_guide(self.edges, "folder1/sub"), "│   ├── ")
+        self.assertEqual(get_guide(self.edges, "folder1/sub/deep.txt"), "│   │   └── ")
+        self.assertEqual(get_guide(self.edges, "folder2/file1.txt"), "│   └── ")
+
+
+if __name__ == "__main__":
+    unittest.main()
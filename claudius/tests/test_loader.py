@@ -0,0 +1,88 @@
+"""
+Unit tests for loader module.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from claudius.models.compact_tree import TreeEdges
+from claudius.models.loader import load_initial_data, scan_visible, start_loading
+
+
+def import_times(module):
+    """Import module in a fresh interpreter and return {module: cumulative ms}."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+class TestLoader(unittest.TestCase):
+    """Test case for loader module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.test_dir, "folder1", "sub"))
+        os.makedirs(os.path.join(self.test_dir, "folder2"))
+        for path in ("file1.txt", "folder1/file1.txt", "folder1/sub/deep.py", "folder2/file2.txt"):
+            open(os.path.join(self.test_dir, path), "w").close()
+        with open(os.path.join(self.test_dir, ".claudeignore"), "w") as f:
+            f.write("/folder1/\n")
+
+        saved = {'expanded_folders': {"folder2", "gone"}, 'selected_item': "gone"}
+        patcher = mock.patch("claudius.models.loader.load_state", return_value=saved)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """Tear down test fixtures."""
+        shutil.rmtree(self.test_dir)
+
+    def test_load_initial_data(self):
+        """The payload merges the scan, .claudeignore and the saved state."""
+        payload = load_initial_data(self.test_dir, use_cache=False, workers=1)
+        self.assertEqual(set(payload["included_paths"]),
+                         {"folder1", "folder1/file1.txt", "folder1/sub", "folder1/sub/deep.py"})
+        self.assertEqual(payload["expanded_folders"], {"folder2"})
+        self.assertEqual(payload["selected_item"], payload["edges"][""][0])
+
+        compact = load_initial_data(self.test_dir, use_cache=False, compact=True)
+        self.assertIsInstance(compact["edges"], TreeEdges)
+        self.assertEqual(set(compact["included_paths"]), set(payload["included_paths"]))
+
+    def test_scan_visible(self):
+        """Only expanded folders are listed, except folder entries, which are walked in full."""
+        result = scan_visible(self.test_dir, ["folder2"])
+        self.assertEqual(set(result.edges), {"", "folder2"})
+
+        result = scan_visible(self.test_dir, [], ["folder1"])
+        self.assertEqual(set(result.edges), {"", "folder1", "folder1/sub"})
+
+    def test_start_loading(self):
+        """The background load yields the same payload, or the error it raised."""
+        future = start_loading(self.test_dir, use_cache=False, workers=1)
+        expected = load_initial_data(self.test_dir, use_cache=False, workers=1)
+        self.assertEqual(future.result(timeout=10)["edges"], expected["edges"])
+
+        with mock.patch("claudius.models.loader.parse_claudeignore", side_effect=OSError("boom")):
+            future = start_loading(self.test_dir)
+            self.assertIsInstance(future.exception(timeout=10), OSError)
+
+    def test_app_cold_start(self):
+        """Importing the UI skips pkg_resources (budgets: bench.py --imports)."""
+        times = import_times("claudius.views.app")
+        self.assertNotIn("pkg_resources", times)
+        self.assertIn("claudius.views.app", times)
+
+
+if __name__ == "__main__":
+    unittest.main()
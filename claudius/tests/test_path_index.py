@@ -0,0 +1,76 @@
+"""
+Unit tests for path_index module.
+"""
+import random
+import unittest
+from claudius.models.path_index import PathIndex
+
+
+class TestPathIndex(unittest.TestCase):
+    """Test case for path_index module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.edges = {
+            "": ["src", "docs", "README.md"],
+            "src": ["src/views", "src/app.py", "src/App.md"],
+            "src/views": ["src/views/app.py", "src/views/finder.py", "src/views/mapper.py"],
+            "docs": ["docs/app.py"],
+        }
+        self.index = PathIndex.build(self.edges)
+
+    def test_build(self):
+        """Every path is indexed once under its lowercase name."""
+        self.assertEqual(len(self.index), 10)
+        self.assertEqual(self.index.names[:2], ["src", "docs"])
+        self.assertEqual(self.index.paths[self.index.names.index("app.py")],
+                         ["docs/app.py", "src/app.py", "src/views/app.py"])
+
+    def test_search(self):
+        """Shorter names, earlier matches and shallower paths rank first."""
+        self.assertEqual(self.index.search("APP"),
+                         ["src/App.md", "docs/app.py", "src/app.py", "src/views/app.py",
+                          "src/views/mapper.py"])
+        self.assertEqual(self.index.search("app", limit=2), ["src/App.md", "docs/app.py"])
+        self.assertEqual(self.index.search("  "), [])
+
+    def test_search_words(self):
+        """Other words and folder parts of the last word filter whole paths."""
+        self.assertEqual(self.index.search("views app.py"), ["src/views/app.py"])
+        self.assertEqual(self.index.search("src/app"),
+                         ["src/App.md", "src/app.py"])
+        self.assertEqual(self.index.search("views/"), ["src/views"])
+
+    def test_search_fuzzy(self):
+        """Letters in order match when no name contains the word."""
+        self.assertEqual(self.index.search("fndr"), ["src/views/finder.py"])
+        self.assertEqual(self.index.search("views/mppy"), ["src/views/mapper.py"])
+        self.assertEqual(self.index.search("zzz"), [])
+
+    def test_search_matches_brute_force(self):
+        """Ranked results agree with a plain scan over every path."""
+        rng = random.Random(7)
+        edges = {"": []}
+        folders = [""]
+        for i in range(2000):
+            parent = rng.choice(folders)
+            name = "".join(rng.choice("abcd") for _ in range(rng.randint(1, 6)))
+            path = f"{parent}/{name}{i % 7}" if parent else f"{name}{i % 7}"
+            edges[parent].append(path)
+            if rng.random() < 0.2:
+                edges[path] = []
+                folders.append(path)
+        index = PathIndex.build(edges)
+        paths = [path for children in edges.values() for path in children]
+
+        for word in ["a", "ab", "dcb", "a1", "abcdab"]:
+            def rank(path):
+                name = path.rpartition("/")[2].lower()
+                return (len(name), name.find(word), name, path.count("/"), path)
+            expected = sorted((path for path in paths
+                               if word in path.rpartition("/")[2].lower()), key=rank)
+            self.assertEqual(index.search(word, limit=25), expected[:25])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+Unit tests for patterns module.
+"""
+import unittest
+from claudius.utils.patterns import PatternMatcher, escape_glob, is_pattern, parse_pattern
+
+
+class TestPatterns(unittest.TestCase):
+    """Test case for patterns module."""
+
+    def test_parse_pattern(self):
+        """Lines are split into glob, negation, anchoring and folder-only flags."""
+        self.assertIsNone(parse_pattern(""))
+        self.assertIsNone(parse_pattern("# comment"))
+        self.assertEqual(parse_pattern("build/"), ("build", False, False, True))
+        self.assertEqual(parse_pattern("/docs/*.md"), ("docs/*.md", False, True, False))
+        self.assertEqual(parse_pattern("!keep.log"), ("keep.log", True, False, False))
+        self.assertEqual(parse_pattern("\\#hash"), ("#hash", False, False, False))
+
+    def test_names_and_suffixes(self):
+        """Unanchored names and extensions match at any depth."""
+        matcher = PatternMatcher(["node_modules/", "*.pyc", ".DS_Store"])
+        self.assertTrue(matcher.match("node_modules", True))
+        self.assertTrue(matcher.match("a/b/node_modules", True))
+        self.assertFalse(matcher.match("a/node_modules", False))
+        self.assertTrue(matcher.match("pkg/mod.pyc", False))
+        self.assertTrue(matcher.match("x/.DS_Store", False))
+        self.assertFalse(matcher.match("src/main.py", False))
+
+    def test_anchored(self):
+        """Patterns containing a slash only match relative to the root."""
+        matcher = PatternMatcher(["/build", "docs/*.md"])
+        self.assertTrue(matcher.match("build", True))
+        self.assertFalse(matcher.match("src/build", True))
+        self.assertTrue(matcher.match("docs/index.md", False))
+        self.assertFalse(matcher.match("docs/api/index.md", False))
+        self.assertFalse(matcher.match("other/docs/index.md", False))
+
+    def test_double_star(self):
+        """'**' matches any number of folders."""
+        matcher = PatternMatcher(["**/gen/**", "a/**/z"])
+        self.assertTrue(matcher.match("gen/out.c", False))
+        self.assertTrue(matcher.match("x/y/gen/out.c", False))
+        self.assertTrue(matcher.match("a/z", True))
+        self.assertTrue(matcher.match("a/b/c/z", False))
+
+    def test_character_classes(self):
+        """'?' and bracket expressions match a single character."""
+        matcher = PatternMatcher(["file?.[ch]", "[!a]*.log"])
+        self.assertTrue(matcher.match("file1.c", False))
+        self.assertFalse(matcher.match("file10.c", False))
+        self.assertTrue(matcher.match("b.log", False))
+        self.assertFalse(matcher.match("a.log", False))
+
+    def test_last_match_wins(self):
+        """A later negation re-includes what an earlier pattern matched."""
+        matcher = PatternMatcher(["*.log", "!keep.log", "logs/"])
+        self.assertTrue(matcher.match("debug.log", False))
+        self.assertFalse(matcher.match("keep.log", False))
+        self.assertTrue(matcher.match("logs", True))
+
+        matcher = PatternMatcher(["!keep.log", "*.log"])
+        self.assertTrue(matcher.match("keep.log", False))
+
+    def test_check(self):
+        """check tells a negated match apart from no match."""
+        matcher = PatternMatcher(["*.log", "!keep.log"])
+        self.assertTrue(matcher.check("debug.log", False))
+        self.assertFalse(matcher.check("keep.log", False))
+        self.assertIsNone(matcher.check("main.py", False))
+
+    def test_is_pattern(self):
+        """Globs, negations and bare folder names are patterns; paths are not."""
+        for line in ("*.log", "build/", "**/fixtures/**", "!keep.log"):
+            self.assertTrue(is_pattern(line), line)
+        for line in ("file.txt", "src/app.py", "/src/", "src/app/", "a\\[1].txt", "\\!foo"):
+            self.assertFalse(is_pattern(line), line)
+
+    def test_escape_glob(self):
+        """Escaped paths only match themselves."""
+        path = "data/[draft]*.txt"
+        matcher = PatternMatcher(["/" + escape_glob(path)])
+        self.assertTrue(matcher.match(path, False))
+        self.assertFalse(matcher.match("data/d.txt", False))
+
+    def test_empty(self):
+        """A matcher without patterns is falsy and matches nothing."""
+        matcher = PatternMatcher(["", "# only a comment"])
+        self.assertFalse(matcher)
+        self.assertFalse(matcher.match("anything", True))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,222 @@
+"""
+Unit tests for persistence module.
+"""
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+from claudius.models import persistence
+from claudius.models.file_system import load_prune_matcher
+from claudius.models.scanner import list_directory
+from claudius.models.persistence import (
+    StateStore, StateWriter, atomic_write, load_state, save_state)
+
+
+class TestPersistence(unittest.TestCase):
+    """Test case for persistence module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = tempfile.mkdtemp()
+        self.config_dir = Path(self.test_dir) / "config"
+        self.config_dir.mkdir()
+        self.root_a = os.path.join(self.test_dir, "a")
+        self.root_b = os.path.join(self.test_dir, "b")
+        os.makedirs(self.root_a)
+        os.makedirs(self.root_b)
+        patcher = mock.patch("claudius.models.persistence.get_config_dir",
+                             return_value=self.config_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """Tear down test fixtures."""
+        shutil.rmtree(self.test_dir)
+
+    def log_lines(self, root):
+        """Return the parsed records of a root's state log."""
+        path = persistence.get_state_log_path(root, local_mode=False)
+        return [json.loads(line) for line in path.read_text().splitlines()]
+
+    def test_atomic_write(self):
+        """The file is replaced whole and no temporary file is left behind."""
+        path = os.path.join(self.test_dir, "data.bin")
+        self.assertTrue(atomic_write(path, [b"old"]))
+        self.assertTrue(atomic_write(path, [b"new ", b"contents"], fsync=False))
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"new contents")
+
+        missing = os.path.join(self.test_dir, "missing", "data.bin")
+        self.assertFalse(atomic_write(missing, [b"x"]))
+        self.assertEqual(sorted(os.listdir(self.test_dir)), ["a", "b", "config", "data.bin"])
+
+    def test_local_files(self):
+        """Local-mode files go to a folder created on write, taking over files left by older versions."""
+        cwd = os.getcwd()
+        os.chdir(self.root_a)
+        self.addCleanup(os.chdir, cwd)
+        Path(".claudius_state.log").write_text("old\n")
+
+        # Asking for a path doesn't touch the current directory
+        self.assertEqual(persistence.get_state_log_path(self.root_a, local_mode=True),
+                         Path(".claudius/state.log"))
+        self.assertEqual(persistence.get_scan_cache_path(self.root_a, local_mode=True),
+                         Path(".claudius/scan_cache.bin"))
+        self.assertEqual(os.listdir(self.root_a), [".claudius_state.log"])
+
+        store = StateStore(self.root_a, local_mode=True)
+        self.assertEqual(Path(".claudius/state.log").read_text(), "old\n")
+        self.assertEqual(os.listdir(self.root_a), [".claudius"])
+        self.assertTrue(store.save({"x"}, "x"))
+        self.assertTrue(atomic_write(persistence.get_token_cache_path(self.root_a, local_mode=True),
+                                     [b"x"], make_dirs=True))
+        self.assertEqual(sorted(os.listdir(".claudius")), ["state.log", "token_cache.bin"])
+
+    def test_local_dir_skipped(self):
+        """Scans leave out the local-mode folder only while it holds this root's files."""
+        os.makedirs(os.path.join(self.root_a, ".claudius"))
+        os.makedirs(os.path.join(self.root_a, "sub", ".claudius"))
+        cwd = os.getcwd()
+        os.chdir(self.root_a)
+        self.addCleanup(os.chdir, cwd)
+
+        with mock.patch("claudius.models.persistence.get_local_mode", return_value=True):
+            self.assertEqual(persistence.get_local_dir(self.root_a), ".claudius")
+            self.assertEqual(persistence.get_local_dir(self.test_dir), "a/.claudius")
+            self.assertIsNone(persistence.get_local_dir(self.root_b))
+            prune = load_prune_matcher(self.root_a)
+        self.assertEqual(list_directory(self.root_a, "", prune)[0], ["sub"])
+        self.assertEqual(list_directory(os.path.join(self.root_a, "sub"), "sub", prune)[0],
+                         ["sub/.claudius"])
+
+        # Outside local mode a folder of that name is an ordinary folder
+        with mock.patch("claudius.models.persistence.get_local_mode", return_value=False):
+            self.assertIsNone(persistence.get_local_dir(self.root_a))
+            prune = load_prune_matcher(self.root_a)
+        self.assertEqual(list_directory(self.root_a, "", prune)[0], [".claudius", "sub"])
+
+    def test_state_per_root(self):
+        """Each root keeps its own state, found by its canonical path."""
+        self.assertTrue(save_state(self.root_a, {"x", "x/y"}, "x/y", local_mode=False))
+        self.assertTrue(save_state(self.root_b, {"z"}, "z", local_mode=False))
+
+        alias = os.path.join(self.root_a, "..", "a")
+        self.assertEqual(load_state(alias, local_mode=False),
+                         {'expanded_folders': {"x", "x/y"}, 'selected_item': "x/y"})
+        self.assertEqual(load_state(self.root_b, local_mode=False),
+                         {'expanded_folders': {"z"}, 'selected_item': "z"})
+
+    def test_legacy_state(self):
+        """A root without a log starts from the old global state file."""
+        (self.config_dir / "state.json").write_text(
+            json.dumps({'expanded_folders': ["x"], 'selected_item': "x"}))
+        self.assertEqual(load_state(self.root_a, local_mode=False),
+                         {'expanded_folders': {"x"}, 'selected_item': "x"})
+
+        (self.config_dir / "state.json").write_text("{not json")
+        with mock.patch("builtins.print"):
+            state = load_state(self.root_a, local_mode=False)
+        self.assertEqual(state, {'expanded_folders': set(), 'selected_item': None})
+
+    def test_deltas(self):
+        """Saves append only what changed, and the log replays to the newest state."""
+        store = StateStore(self.root_a, local_mode=False)
+        self.assertTrue(store.save({"x", "y"}, "x"))
+        self.assertTrue(store.save({"x", "y"}, "x"))
+        self.assertTrue(store.save({"x", "y", "y/z"}, "x"))
+        self.assertTrue(store.save({"y", "y/z"}, "y/z"))
+
+        records = self.log_lines(self.root_a)
+        self.assertEqual(records[0]["expanded"], ["x", "y"])
+        self.assertEqual(records[1:], [{"add": ["y/z"]},
+                                       {"remove": ["x"], "selected": "y/z"}])
+        self.assertEqual(load_state(self.root_a, local_mode=False),
+                         {'expanded_folders': {"y", "y/z"}, 'selected_item': "y/z"})
+
+        # A fresh store continues the same log
+        store = StateStore(self.root_a, local_mode=False)
+        self.assertTrue(store.save({"y"}, "y"))
+        self.assertEqual(self.log_lines(self.root_a)[-1], {"remove": ["y/z"], "selected": "y"})
+
+    def test_compaction(self):
+        """The log is rewritten as one snapshot once it holds enough deltas."""
+        store = StateStore(self.root_a, local_mode=False)
+        with mock.patch("claudius.models.persistence.COMPACT_AFTER", 3):
+            for i in range(6):
+                self.assertTrue(store.save({"x"}, f"x/{i}"))
+        records = self.log_lines(self.root_a)
+        self.assertEqual(records, [{"v": 1, "root": os.path.realpath(self.root_a),
+                                    "expanded": ["x"], "selected": "x/4"},
+                                   {"selected": "x/5"}])
+
+    def test_torn_log(self):
+        """A line torn by a crash is ignored and the next save compacts."""
+        store = StateStore(self.root_a, local_mode=False)
+        store.save({"x"}, "x")
+        store.save({"x", "y"}, "y")
+        path = persistence.get_state_log_path(self.root_a, local_mode=False)
+        with open(path, "a") as f:
+            f.write('{"add": ["z"')
+
+        store = StateStore(self.root_a, local_mode=False)
+        self.assertEqual(store.load(), {'expanded_folders': {"x", "y"}, 'selected_item': "y"})
+        self.assertTrue(store.save({"x", "y", "w"}, "w"))
+        records = self.log_lines(self.root_a)
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["expanded"], ["w", "x", "y"])
+
+    def test_state_writer_coalesces(self):
+        """Many saves within the interval become one write of the newest state."""
+        writer = StateWriter(self.root_a, interval=60, local_mode=False)
+        with mock.patch.object(writer.store, "save", wraps=writer.store.save) as saved:
+            for i in range(100):
+                writer.save(frozenset({"x"}), f"x/{i}")
+            self.assertTrue(writer.close())
+        saved.assert_called_once_with(frozenset({"x"}), "x/99")
+        self.assertEqual(load_state(self.root_a, local_mode=False)['selected_item'], "x/99")
+
+        # Saves after closing are dropped
+        writer.save(frozenset(), None)
+        self.assertTrue(writer.flush())
+        self.assertEqual(load_state(self.root_a, local_mode=False)['selected_item'], "x/99")
+
+    def test_state_writer_flushes_after_interval(self):
+        """The background thread writes the pending state once the interval passes."""
+        writer = StateWriter(self.root_a, interval=0.01, local_mode=False)
+        self.addCleanup(writer.close)
+        writer.save(frozenset({"x"}), "x")
+        path = persistence.get_state_log_path(self.root_a, local_mode=False)
+        for _ in range(500):
+            if path.exists():
+                break
+            time.sleep(0.01)
+        self.assertEqual(load_state(self.root_a, local_mode=False)['selected_item'], "x")
+
+    def test_errors_stay_off_stdout(self):
+        """Failures are reported to the caller or stderr, never printed over the UI."""
+        errors = []
+        writer = StateWriter(self.root_a, interval=60, local_mode=False, on_error=errors.append)
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout, \
+                mock.patch("claudius.models.persistence.atomic_write", return_value=False):
+            writer.save(frozenset({"x"}), "x")
+            self.assertFalse(writer.close())
+        self.assertEqual(stdout.getvalue(), "")
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(errors[0].startswith("Error saving state"))
+
+        legacy = self.config_dir / "state.json"
+        legacy.write_text("{not json")
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout, \
+                mock.patch("sys.stderr", new_callable=io.StringIO) as stderr:
+            self.assertEqual(load_state(self.root_b, local_mode=False)['selected_item'], None)
+        self.assertEqual(stdout.getvalue(), "")
+        self.assertIn("Error loading state", stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+"""
+Unit tests for persistent module.
+"""
+import random
+import unittest
+from claudius.models.persistent import OverlayMap, PBits, PMap, PSet
+
+
+class CollidingKey:
+    """Key whose hash collides with every other CollidingKey."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def __hash__(self):
+        return 42
+
+    def __eq__(self, other):
+        return isinstance(other, CollidingKey) and other.value == self.value
+
+
+class TestPersistent(unittest.TestCase):
+    """Test case for persistent module."""
+
+    def test_pmap_matches_dict(self):
+        """Random sets and discards agree with a dict, and old versions are unchanged."""
+        rng = random.Random(7)
+        keys = [f"path/{i}" for i in range(200)] + [CollidingKey(i) for i in range(5)]
+        expected = {}
+        pmap = PMap()
+        history = []
+        for _ in range(2000):
+            key = rng.choice(keys)
+            if rng.random() < 0.6:
+                expected[key] = rng.random()
+                pmap = pmap.set(key, expected[key])
+            else:
+                expected.pop(key, None)
+                pmap = pmap.discard(key)
+            history.append((pmap, dict(expected)))
+
+        for version, snapshot in history[::50]:
+            self.assertEqual(len(version), len(snapshot))
+            self.assertEqual(version, snapshot)
+            for key in keys:
+                self.assertEqual(version.get(key), snapshot.get(key))
+
+    def test_pmap_batch_updates(self):
+        """update and discard_all return new maps in one pass."""
+        pmap = PMap({"a": 1, "b": 2})
+        updated = pmap.update({"b": 3, "c": 4})
+        self.assertEqual(updated, {"a": 1, "b": 3, "c": 4})
+        self.assertEqual(updated.discard_all(["a", "missing"]), {"b": 3, "c": 4})
+        self.assertEqual(pmap, {"a": 1, "b": 2})
+        self.assertIs(pmap.discard("missing"), pmap)
+        with self.assertRaises(KeyError):
+            pmap["missing"]
+
+    def test_pset_operations(self):
+        """Set operators accept plain sets and return PSets."""
+        pset = PSet(["a", "b", "c"])
+        self.assertEqual(pset, {"a", "b", "c"})
+        self.assertEqual(pset.add("d"), {"a", "b", "c", "d"})
+        self.assertEqual(pset.discard("a"), {"b", "c"})
+        self.assertIs(pset.add("a"), pset)
+
+        for result, expected in ((pset | {"d"}, {"a", "b", "c", "d"}),
+                                 ({"d"} | pset, {"a", "b", "c", "d"}),
+                                 (pset - {"a", "x"}, {"b", "c"}),
+                                 (pset & {"a", "x"}, {"a"}),
+                                 ({"a", "x"} & pset, {"a"})):
+            self.assertIsInstance(result, PSet)
+            self.assertEqual(result, expected)
+        self.assertEqual(pset, {"a", "b", "c"})
+
+    def test_pset_shrinks_to_empty(self):
+        """Removing every item leaves an empty set."""
+        items = [f"f{i}" for i in range(1000)]
+        pset = PSet(items)
+        self.assertEqual(len(pset), 1000)
+        empty = pset - set(items[:500])
+        empty = empty.difference(items[500:])
+        self.assertEqual(len(empty), 0)
+        self.assertEqual(list(empty), [])
+        self.assertEqual(len(pset), 1000)
+
+    def test_pbits_matches_bytearray(self):
+        """Random fills and sets agree with a bytearray, and old versions are unchanged."""
+        rng = random.Random(3)
+        size = 10000  # A few chunks and a short last one
+        expected = bytearray(size)
+        bits = PBits.from_bytes(expected)
+        history = []
+        for _ in range(300):
+            value = rng.randrange(2)
+            if rng.random() < 0.5:
+                start = rng.randrange(size)
+                end = rng.randrange(start, size + 1)
+                expected[start:end] = bytes([value]) * (end - start)
+                bits = bits.fill(start, end, value)
+            else:
+                rows = [rng.randrange(size) for _ in range(5)]
+                for row in rows:
+                    expected[row] = value
+                bits = bits.set_rows(rows, value)
+            history.append((bits, bytes(expected)))
+
+        for version, data in history[::30]:
+            self.assertEqual(version.tobytes(), data)
+            self.assertEqual(bytes(version), data)
+            self.assertEqual(version.ones, data.count(1))
+            for _ in range(20):
+                start = rng.randrange(size)
+                end = rng.randrange(start, size + 1)
+                self.assertEqual(version.count(1, start, end), data.count(1, start, end))
+                self.assertEqual(version.count(0, start, end), data.count(0, start, end))
+                self.assertEqual(version.find(1, start, end), data.find(1, start, end))
+                self.assertEqual(version[start], data[start])
+
+    def test_pbits_shares_chunks(self):
+        """An update copies only the chunks it touches."""
+        bits = PBits.from_bytes(bytes(100000))
+        one = bits.set_rows([5], 1)
+        shared = [number for number in bits.chunks if bits.chunks[number] is one.chunks[number]]
+        self.assertEqual(len(shared), len(bits.chunks) - 1)
+        # Chunks a fill covers whole are one shared buffer
+        filled = bits.fill(0, 100000, 1)
+        self.assertEqual(len({id(filled.chunks[number]) for number in filled.chunks}), 2)
+        self.assertEqual(filled.ones, 100000)
+
+    def test_overlay_map_matches_dict(self):
+        """Edits on top of a dict agree with editing a copy, and leave the dict alone."""
+        rng = random.Random(7)
+        base = {f"path/{i}": i for i in range(100)}
+        expected = dict(base)
+        overlay = OverlayMap(base)
+        for _ in range(500):
+            key = f"path/{rng.randrange(150)}"
+            if rng.random() < 0.5:
+                expected[key] = rng.random()
+                overlay = overlay.update({key: expected[key]})
+            else:
+                expected.pop(key, None)
+                overlay = overlay.discard_all([key])
+            self.assertEqual(len(overlay), len(expected))
+        self.assertEqual(dict(overlay.items()), expected)
+        self.assertEqual(overlay.get("path/200", 0), 0)
+        self.assertEqual(base, {f"path/{i}": i for i in range(100)})
+        self.assertIs(OverlayMap.coerce(overlay), overlay)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Unit tests for profiling module.
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from claudius.models.state import ActionType, reducer, get_initial_state
+from claudius.utils.profiling import Histogram, format_summaries, profiler, timed
+
+
+class TestProfiling(unittest.TestCase):
+    """Test case for profiling module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = tempfile.mkdtemp()
+        profiler.disable()
+        profiler.reset()
+
+    def tearDown(self):
+        """Tear down test fixtures."""
+        profiler.disable()
+        profiler.reset()
+        shutil.rmtree(self.test_dir)
+
+    def test_histogram_percentiles(self):
+        """Percentiles land within a bucket of the exact value."""
+        histogram = Histogram()
+        for ms in range(1, 101):
+            histogram.record(ms * 1_000_000, allocs=2)
+        summary = histogram.summary()
+        self.assertEqual(summary["count"], 100)
+        self.assertEqual(summary["max_ms"], 100)
+        self.assertEqual(summary["allocs"], 2)
+        for key, exact in (("p50_ms", 50), ("p95_ms", 95), ("p99_ms", 99)):
+            self.assertGreaterEqual(summary[key], exact)
+            self.assertLessEqual(summary[key], exact * 1.1)
+        self.assertIsNone(Histogram().summary()["allocs"])
+
+    def test_disabled_records_nothing(self):
+        """Wrapped functions run unchanged while the profiler is off."""
+        double = timed("double")(lambda x: 2 * x)
+        self.assertEqual(double(4), 8)
+        self.assertEqual(profiler.summaries(), {})
+
+    def test_timed(self):
+        """Spans are named by key and carry allocation and node counts."""
+        build = timed("build", key=lambda n: "big" if n > 5 else "small", count=len)(
+            lambda n: [object() for _ in range(n)])
+        untracked = timed("untracked", allocations=False)(lambda: None)
+        profiler.enable()
+        build(2)
+        build(1000)
+        build(1000)
+        untracked()
+
+        summaries = profiler.summaries()
+        self.assertEqual(set(summaries), {"build.small", "build.big", "untracked"})
+        self.assertEqual(summaries["build.big"]["count"], 2)
+        self.assertEqual(summaries["build.big"]["nodes"], 1000)
+        self.assertGreaterEqual(summaries["build.big"]["allocs"], 1000)
+        self.assertIsNone(summaries["untracked"]["allocs"])
+        lines = format_summaries(summaries)
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[1].startswith("build.big"))
+
+    def test_trace(self):
+        """The trace has a line per span and ends with a summary."""
+        trace_path = os.path.join(self.test_dir, "trace.jsonl")
+        profiler.enable(trace_path)
+        state = get_initial_state().update(edges={"": ["a"]}, selected_item="a")
+        reducer(state, {"type": ActionType.MOVE_SELECTION, "direction": "down"})
+        reducer(state, {"type": ActionType.CLEAR_NOTIFICATION})
+        profiler.disable()
+
+        with open(trace_path) as f:
+            events = [json.loads(line) for line in f]
+        # Spans nested in the reducer end first
+        self.assertEqual([event.get("name") for event in events],
+                         ["rows.build", "reduce.MOVE_SELECTION",
+                          "reduce.CLEAR_NOTIFICATION", None])
+        self.assertEqual(events[1]["nodes"], 2)
+        self.assertIn("ms", events[1])
+        self.assertEqual(set(events[-1]["summary"]),
+                         {"rows.build", "reduce.MOVE_SELECTION", "reduce.CLEAR_NOTIFICATION"})
+
+
+if __name__ == "__main__":
+    unittest.main()
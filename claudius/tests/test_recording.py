@@ -0,0 +1,77 @@
+"""
+Unit tests for recording module.
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from claudius.models.persistent import PMap, PSet
+from claudius.models.recording import SessionRecorder, read_recording
+from claudius.models.state import ActionType
+from claudius.utils.patterns import PatternMatcher
+
+
+class TestRecording(unittest.TestCase):
+    """Test case for recording module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, "session.jsonl")
+
+    def tearDown(self):
+        """Tear down test fixtures."""
+        shutil.rmtree(self.test_dir)
+
+    def test_round_trip(self):
+        """Recorded actions read back with their sets, stats and matcher restored."""
+        recorder = SessionRecorder(self.path, "/repo")
+        recorder.record({
+            "type": ActionType.LOAD_DATA,
+            "edges": PMap.coerce({"": ["src"], "src": ["src/a.py"]}),
+            "folders": PSet.coerce({"src"}),
+            "included_paths": {"src/a.py"},
+            "selected_item": "src",
+            "expanded_folders": frozenset(),
+            "pruned_folders": set(),
+            "ignore_matcher": PatternMatcher(["*.log"]),
+        })
+        recorder.record({"type": ActionType.SET_NOTIFICATION, "message": "Saved"})
+        recorder.record({"type": ActionType.SET_FILE_STATS, "stats": {"src/a.py": (10, 3)}})
+        recorder.record_command("write_file")
+        recorder.record({"type": ActionType.RENAME_NODES, "renames": [("src", "lib")]})
+        recorder.close()
+
+        records = list(read_recording(self.path))
+        self.assertEqual([r.get("command") or r["action"]["type"] for r in records],
+                         [ActionType.LOAD_DATA, ActionType.SET_FILE_STATS, "write_file",
+                          ActionType.RENAME_NODES])
+        times = [record["t"] for record in records]
+        self.assertEqual(times, sorted(times))
+
+        load = records[0]["action"]
+        self.assertEqual(load["edges"], {"": ["src"], "src": ["src/a.py"]})
+        self.assertEqual(load["folders"], {"src"})
+        self.assertEqual(load["expanded_folders"], set())
+        self.assertEqual(load["ignore_matcher"].lines, ["*.log"])
+        self.assertEqual(records[1]["action"]["stats"], {"src/a.py": (10, 3)})
+        self.assertEqual(records[3]["action"]["renames"], [["src", "lib"]])
+
+    def test_torn_and_foreign_files(self):
+        """A torn last line ends the recording; other files are refused."""
+        recorder = SessionRecorder(self.path)
+        recorder.record({"type": ActionType.COLLAPSE_ALL})
+        recorder.close()
+        with open(self.path, "a") as f:
+            f.write('{"t": 1.0, "act')
+        self.assertEqual(len(list(read_recording(self.path))), 1)
+
+        with open(self.path, "w") as f:
+            json.dump({"version": 1, "results": {}}, f)
+        with self.assertRaises(ValueError):
+            list(read_recording(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
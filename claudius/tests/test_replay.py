@@ -0,0 +1,96 @@
+"""
+Smoke tests for the session replay harness in benchmarks/replay.py.
+"""
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from claudius.models.recording import SessionRecorder
+from claudius.models.state import ActionType
+
+REPLAY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))), "benchmarks", "replay.py")
+
+
+def load_replay():
+    """Import benchmarks/replay.py, which isn't part of the package."""
+    spec = importlib.util.spec_from_file_location("replay", REPLAY_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestReplay(unittest.TestCase):
+    """Test case for the replay harness."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, "session.jsonl")
+        self.replay = load_replay()
+
+        files = [f"src/file{i}.py" for i in range(20)]
+        recorder = SessionRecorder(self.path)
+        recorder.record({"type": ActionType.SET_NOTIFICATION, "message": "Scanning..."})
+        recorder.record({
+            "type": ActionType.LOAD_DATA,
+            "edges": {"": ["src", "README.md"], "src": files},
+            "folders": {"src"},
+            "included_paths": set(),
+            "selected_item": "src",
+            "expanded_folders": set(),
+        })
+        recorder.record({"type": ActionType.TOGGLE_EXPAND, "path": "src"})
+        for _ in range(10):
+            recorder.record({"type": ActionType.MOVE_SELECTION, "direction": "down"})
+        recorder.record({"type": ActionType.TOGGLE_INCLUDE, "path": "src/file9.py"})
+        recorder.record_command("write_file")
+        recorder.close()
+
+    def tearDown(self):
+        """Tear down test fixtures."""
+        shutil.rmtree(self.test_dir)
+
+    def test_load_session(self):
+        """Inputs start after the tree snapshot."""
+        snapshot, events = self.replay.load_session(self.path)
+        self.assertEqual(snapshot["folders"], {"src"})
+        self.assertEqual([self.replay.label(event) for event in events],
+                         [ActionType.TOGGLE_EXPAND] + [ActionType.MOVE_SELECTION] * 10
+                         + [ActionType.TOGGLE_INCLUDE, "write_file"])
+
+    def test_replay_reducer(self):
+        """The bare reducer replays every input and writes .claudeignore."""
+        snapshot, events = self.replay.load_session(self.path)
+        samples = self.replay.replay_reducer(snapshot, events, self.test_dir)
+        summary = self.replay.summarize(samples["state"])
+        self.assertEqual(summary["all"]["count"], 13)
+        self.assertEqual(summary[ActionType.MOVE_SELECTION]["count"], 10)
+        with open(os.path.join(self.test_dir, ".claudeignore")) as f:
+            self.assertIn("src/file9.py", f.read())
+
+    def test_replay_app(self):
+        """The headless app reports a frame latency for every input."""
+        output = os.path.join(self.test_dir, "latency.json")
+        self.assertEqual(self.replay.main([self.path, "--mode", "app", "--speed", "0",
+                                           "--output", output]), 0)
+        with open(output) as f:
+            latency = json.load(f)["latency"]
+        self.assertEqual(latency["state"]["all"]["count"], 13)
+        self.assertEqual(latency["frame"]["all"]["count"], 13)
+        self.assertGreaterEqual(latency["frame"]["all"]["p50_ms"],
+                                latency["state"]["all"]["p50_ms"])
+
+    def test_percentiles(self):
+        """Percentiles use the nearest rank."""
+        result = self.replay.percentiles([i / 1000 for i in range(1, 101)])
+        self.assertEqual(result["count"], 100)
+        self.assertAlmostEqual(result["p50_ms"], 50)
+        self.assertAlmostEqual(result["p99_ms"], 99)
+        self.assertAlmostEqual(result["max_ms"], 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Unit tests for scan_cache module.
+"""
+import unittest
+import os
+import tempfile
+import shutil
+from pathlib import Path
+from claudius.models import scan_cache
+from claudius.models.scan_cache import cached_scan, load_scan_cache, write_scan_cache
+from claudius.models.scanner import scan_tree
+from claudius.utils.patterns import PatternMatcher
+
+
+class TestScanCache(unittest.TestCase):
+    """Test case for scan_cache module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.test_dir, "root")
+        for i in range(3):
+            os.makedirs(os.path.join(self.root, f"folder{i}", "sub"))
+            open(os.path.join(self.root, f"folder{i}", "file.txt"), "w").close()
+            open(os.path.join(self.root, f"folder{i}", "sub", "ünï.txt"), "w").close()
+        open(os.path.join(self.root, "file1.txt"), "w").close()
+        self.cache_path = Path(self.test_dir) / "cache.bin"
+
+        # Trust mtimes immediately so tests don't have to wait
+        self.racy_window = scan_cache.RACY_WINDOW_NS
+        scan_cache.RACY_WINDOW_NS = -10 ** 12
+
+    def tearDown(self):
+        """Tear down test fixtures."""
+        scan_cache.RACY_WINDOW_NS = self.racy_window
+        shutil.rmtree(self.test_dir)
+
+    def assertMatchesScan(self, result):
+        """Check a result against a fresh full scan."""
+        expected = scan_tree(self.root, workers=1)
+        self.assertEqual(result.edges, expected.edges)
+        self.assertEqual(result.folders, expected.folders)
+
+    def test_round_trip(self):
+        """A warm start reuses every listing and matches a full scan."""
+        cached_scan(self.root, self.cache_path)
+        self.assertTrue(self.cache_path.exists())
+
+        with load_scan_cache(self.cache_path, self.root) as cache:
+            result, relisted = cache.rescan(self.root)
+        self.assertEqual(relisted, 0)
+        self.assertMatchesScan(result)
+
+    def test_changed_folders_are_relisted(self):
+        """Only folders whose mtime changed are listed again."""
+        cached_scan(self.root, self.cache_path)
+        os.makedirs(os.path.join(self.root, "folder1", "sub", "new"))
+        open(os.path.join(self.root, "folder1", "sub", "new", "a.txt"), "w").close()
+        os.remove(os.path.join(self.root, "folder2", "file.txt"))
+        # Make the mtime change visible even on coarse-grained filesystems
+        os.utime(os.path.join(self.root, "folder1", "sub"), ns=(1, 1))
+        os.utime(os.path.join(self.root, "folder2"), ns=(1, 1))
+
+        with load_scan_cache(self.cache_path, self.root) as cache:
+            result, relisted = cache.rescan(self.root)
+        # folder1/sub, its new subfolder and folder2
+        self.assertEqual(relisted, 3)
+        self.assertMatchesScan(result)
+
+    def test_racy_folders_are_not_trusted(self):
+        """Folders modified right before the cache was written are listed again."""
+        scan_cache.RACY_WINDOW_NS = 10 ** 12
+        result = scan_tree(self.root, record_stats=True)
+        write_scan_cache(self.cache_path, self.root, result)
+
+        with load_scan_cache(self.cache_path, self.root) as cache:
+            _, relisted = cache.rescan(self.root)
+        self.assertEqual(relisted, len(result.edges))
+
+    def test_corrupt_cache_is_rejected(self):
+        """A cache that fails its checksum falls back to a full scan."""
+        cached_scan(self.root, self.cache_path)
+        data = bytearray(self.cache_path.read_bytes())
+        data[-2] ^= 0xFF
+        self.cache_path.write_bytes(bytes(data))
+
+        self.assertIsNone(load_scan_cache(self.cache_path, self.root))
+        self.assertMatchesScan(cached_scan(self.root, self.cache_path))
+        self.assertIsNotNone(load_scan_cache(self.cache_path, self.root))
+
+    def test_cache_for_other_root_is_rejected(self):
+        """A cache written for a different root is never used."""
+        cached_scan(self.root, self.cache_path)
+        self.assertIsNone(load_scan_cache(self.cache_path, self.test_dir))
+
+    def test_missing_cache(self):
+        """A missing cache file is reported as unusable."""
+        self.assertIsNone(load_scan_cache(self.cache_path, self.root))
+
+    def test_pruned_folders(self):
+        """Pruned folders survive a warm start, and other patterns invalidate the cache."""
+        prune = PatternMatcher(["sub/"])
+        cached_scan(self.root, self.cache_path, prune=prune)
+        self.assertIsNone(load_scan_cache(self.cache_path, self.root))
+        self.assertIsNone(load_scan_cache(self.cache_path, self.root, PatternMatcher(["x/"])))
+
+        with load_scan_cache(self.cache_path, self.root, prune) as cache:
+            result, relisted = cache.rescan(self.root, prune)
+        self.assertEqual(relisted, 0)
+        expected = scan_tree(self.root, workers=1, prune=prune)
+        self.assertEqual(result.edges, expected.edges)
+        self.assertEqual(result.pruned, {f"folder{i}/sub" for i in range(3)})
+
+if __name__ == "__main__":
+    unittest.main()
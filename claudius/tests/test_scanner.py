@@ -0,0 +1,145 @@
+"""
+Unit tests for scanner module.
+"""
+import unittest
+import os
+import tempfile
+import shutil
+import threading
+from unittest import mock
+from claudius.models.scanner import scan_tree, scan_subtree, list_directory, list_folders
+from claudius.utils.patterns import PatternMatcher
+
+
+def walk_reference(root_dir):
+    """Scan with os.walk the way scan_filesystem originally did."""
+    edges = {"": []}
+    folders = set()
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        rel = os.path.relpath(dirpath, root_dir)
+        rel = '' if rel == '.' else rel.replace('\\', '/')
+        if rel:
+            folders.add(rel)
+        children = [os.path.join(rel, d).replace('\\', '/') for d in sorted(dirnames)]
+        children += [os.path.join(rel, f).replace('\\', '/') for f in sorted(filenames)
+                     if not (f == '.claudeignore' and rel == '')]
+        edges[rel] = children
+    return edges, folders
+
+
+class TestScanner(unittest.TestCase):
+    """Test case for scanner module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = tempfile.mkdtemp()
+        for i in range(5):
+            for j in range(4):
+                path = os.path.join(self.test_dir, f"dir{i}", f"sub{j}")
+                os.makedirs(path)
+                for k in range(3):
+                    open(os.path.join(path, f"file{k}.txt"), "w").close()
+            open(os.path.join(self.test_dir, f"dir{i}", "top.txt"), "w").close()
+        open(os.path.join(self.test_dir, "b.txt"), "w").close()
+        open(os.path.join(self.test_dir, "a.txt"), "w").close()
+        open(os.path.join(self.test_dir, ".claudeignore"), "w").close()
+
+    def tearDown(self):
+        """Tear down test fixtures."""
+        shutil.rmtree(self.test_dir)
+
+    def test_list_directory_order(self):
+        """Folders come first, then files, each sorted; .claudeignore is skipped."""
+        children, subdirs, pruned = list_directory(self.test_dir, "")
+        self.assertEqual(children[:5], [f"dir{i}" for i in range(5)])
+        self.assertEqual(children[5:], ["a.txt", "b.txt"])
+        self.assertEqual(sorted(subdirs), [f"dir{i}" for i in range(5)])
+        self.assertEqual(pruned, [])
+
+    def test_matches_os_walk(self):
+        """Every scan mode produces the same result as os.walk."""
+        expected_edges, expected_folders = walk_reference(self.test_dir)
+        for workers in (1, 2, 8):
+            result = scan_tree(self.test_dir, workers=workers)
+            self.assertEqual(result.edges, expected_edges)
+            self.assertEqual(result.folders, expected_folders)
+
+        result = scan_tree(self.test_dir, workers=2, use_processes=True)
+        self.assertEqual(result.edges, expected_edges)
+        self.assertEqual(result.folders, expected_folders)
+
+    def test_idle_workers_wait_for_work(self):
+        """Idle workers sleep until notified instead of polling, and never hang."""
+        path = self.test_dir
+        for depth in range(30):
+            path = os.path.join(path, f"d{depth}")
+            os.makedirs(path)
+        expected_edges, _ = walk_reference(self.test_dir)
+        wait = threading.Condition.wait
+        with mock.patch.object(threading.Condition, "wait", autospec=True,
+                               side_effect=wait) as patched:
+            # Only one folder at a time has children, so most workers sit idle
+            result = scan_tree(self.test_dir, workers=8)
+        self.assertEqual(result.edges, expected_edges)
+        timeouts = [call.args[1] if len(call.args) > 1 else call.kwargs.get("timeout")
+                    for call in patched.call_args_list]
+        self.assertEqual(set(timeouts) - {None}, set())
+
+    def test_scan_subtree(self):
+        """Scanning a subtree only returns that subtree."""
+        result = scan_subtree(self.test_dir, "dir1")
+        self.assertIn("dir1", result.folders)
+        self.assertIn("dir1/sub0", result.folders)
+        self.assertNotIn("dir0", result.folders)
+        self.assertEqual(result.edges["dir1/sub0"],
+                         ["dir1/sub0/file0.txt", "dir1/sub0/file1.txt", "dir1/sub0/file2.txt"])
+
+    def test_list_folders(self):
+        """Listing folders reads one level and reports unlisted child folders."""
+        result = list_folders(self.test_dir, ["", "dir2"])
+        self.assertEqual(set(result.edges), {"", "dir2"})
+        self.assertIn("dir2/sub1", result.edges["dir2"])
+        self.assertIn("dir2/sub1", result.folders)
+        self.assertNotIn("dir2/sub1", result.edges)
+
+    def test_scan_tree_subtree(self):
+        """Parallel scans can start below the root."""
+        expected = scan_subtree(self.test_dir, "dir3")
+        result = scan_tree(self.test_dir, workers=4, rel_path="dir3")
+        self.assertEqual(result.edges, expected.edges)
+        self.assertEqual(result.folders, expected.folders)
+
+    @unittest.skipUnless(hasattr(os, "symlink"), "symlinks not supported")
+    def test_symlinked_folder_not_followed(self):
+        """Symlinked folders are listed but not descended into."""
+        os.symlink(os.path.join(self.test_dir, "dir0"),
+                   os.path.join(self.test_dir, "link"))
+        result = scan_tree(self.test_dir, workers=4)
+        self.assertIn("link", result.edges[""])
+        self.assertNotIn("link", result.folders)
+        self.assertNotIn("link", result.edges)
+
+    def test_prune(self):
+        """Pruned folders are listed but not walked, and pruned files are skipped."""
+        prune = PatternMatcher(["sub1/", "/dir2/", "*.txt"])
+        for workers in (1, 4):
+            result = scan_tree(self.test_dir, workers=workers, prune=prune)
+            self.assertEqual(result.edges[""], [f"dir{i}" for i in range(5)])
+            self.assertIn("dir2", result.edges[""])
+            self.assertNotIn("dir2", result.edges)
+            self.assertNotIn("dir2", result.folders)
+            self.assertNotIn("dir0/sub1", result.edges)
+            self.assertEqual(result.edges["dir0/sub0"], [])
+            self.assertEqual(result.pruned,
+                             {"dir2"} | {f"dir{i}/sub1" for i in range(5) if i != 2})
+
+    def test_prune_lazy_listing(self):
+        """Pruned child folders are not reported as loadable folders."""
+        result = list_folders(self.test_dir, ["dir0"], PatternMatcher(["sub1/"]))
+        self.assertIn("dir0/sub1", result.edges["dir0"])
+        self.assertNotIn("dir0/sub1", result.folders)
+        self.assertEqual(result.pruned, {"dir0/sub1"})
+
+
+if __name__ == "__main__":
+    unittest.main()
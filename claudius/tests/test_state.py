@@ -1,8 +1,14 @@
 """
 Unit tests for state module.
 """
+import threading
+import time
 import unittest
+from unittest import mock
+from claudius.models.persistent import PMap, PSet
 from claudius.models.state import AppState, reducer, ActionType
+from claudius.models.visible_rows import VisibleRows
+from claudius.utils.patterns import PatternMatcher
 from claudius.utils.calculations import get_all_descendants, get_visible_items
 
 class TestState(unittest.TestCase):
@@ -144,6 +150,301 @@ class TestState(unittest.TestCase):
         
         new_state = reducer(state_with_notification, action)
         self.assertIsNone(new_state.notification)
+    
+    def test_merge_scan(self):
+        """Test merging a lazily listed folder into the tree."""
+        lazy_state = self.state.update(
+            edges={"": ["folder1", "file1.txt"]},
+            folders={"folder1"}
+        )
+        action = {
+            "type": ActionType.MERGE_SCAN,
+            "edges": {"folder1": ["folder1/sub", "folder1/file1.txt"]},
+            "folders": {"folder1", "folder1/sub"}
+        }
+        
+        new_state = reducer(lazy_state, action)
+        self.assertEqual(new_state.edges["folder1"], ["folder1/sub", "folder1/file1.txt"])
+        self.assertEqual(new_state.edges[""], ["folder1", "file1.txt"])
+        self.assertIn("folder1/sub", new_state.folders)
+        # The previous state is left untouched
+        self.assertNotIn("folder1", lazy_state.edges)
+        
+        # Patterns from .claudeignore apply to the listed children
+        pattern_state = lazy_state.update(ignore_matcher=PatternMatcher(["*.txt"]))
+        new_state = reducer(pattern_state, action)
+        self.assertEqual(new_state.included_paths, {"folder1/file1.txt"})
+    
+    def test_insert_nodes(self):
+        """Test inserting nodes created on disk."""
+        state = self.state.update(included_paths={"folder2", "folder2/file1.txt"})
+        action = {
+            "type": ActionType.INSERT_NODES,
+            "paths": ["folder2/a.txt", "folder2/new"],
+            "edges": {"folder2/new": ["folder2/new/b.txt"]},
+            "folders": {"folder2/new"}
+        }
+        
+        new_state = reducer(state, action)
+        self.assertEqual(new_state.edges["folder2"],
+                         ["folder2/new", "folder2/a.txt", "folder2/file1.txt"])
+        self.assertIn("folder2/new", new_state.folders)
+        # New nodes inside an included folder are included
+        self.assertIn("folder2/new/b.txt", new_state.included_paths)
+    
+    def test_remove_nodes(self):
+        """Test removing nodes deleted on disk."""
+        state = self.state.update(
+            included_paths={"folder1", "folder1/file1.txt", "file1.txt"},
+            expanded_folders={"folder1"},
+            selected_item="folder1/file2.txt"
+        )
+        action = {
+            "type": ActionType.REMOVE_NODES,
+            "paths": ["folder1"]
+        }
+        
+        new_state = reducer(state, action)
+        self.assertEqual(new_state.edges[""], ["folder2", "file1.txt"])
+        self.assertNotIn("folder1", new_state.edges)
+        self.assertNotIn("folder1", new_state.folders)
+        self.assertEqual(new_state.included_paths, {"file1.txt"})
+        self.assertEqual(new_state.expanded_folders, set())
+        self.assertEqual(new_state.selected_item, "folder2")
+    
+    def test_rename_nodes(self):
+        """Test renaming a folder along with its subtree."""
+        state = self.state.update(
+            included_paths={"folder1", "folder1/file1.txt"},
+            expanded_folders={"folder1"},
+            selected_item="folder1/file2.txt"
+        )
+        action = {
+            "type": ActionType.RENAME_NODES,
+            "renames": [("folder1", "folder3")]
+        }
+        
+        new_state = reducer(state, action)
+        self.assertEqual(new_state.edges[""], ["folder2", "folder3", "file1.txt"])
+        self.assertEqual(new_state.edges["folder3"], ["folder3/file1.txt", "folder3/file2.txt"])
+        self.assertNotIn("folder1", new_state.edges)
+        self.assertEqual(new_state.folders, {"folder2", "folder3"})
+        self.assertEqual(new_state.included_paths, {"folder3", "folder3/file1.txt"})
+        self.assertEqual(new_state.expanded_folders, {"folder3"})
+        self.assertEqual(new_state.selected_item, "folder3/file2.txt")
+    
+    def test_move_selection(self):
+        """Test moving the selection, wrapping at both ends."""
+        state = self.state.update(selected_item="file1.txt")
+        down = reducer(state, {"type": ActionType.MOVE_SELECTION, "direction": "down"})
+        self.assertEqual(down.selected_item, "")
+        up = reducer(down, {"type": ActionType.MOVE_SELECTION, "direction": "up"})
+        self.assertEqual(up.selected_item, "file1.txt")
+    
+    def test_page_and_parent_moves(self):
+        """Test page moves clamping at the ends and jumping to the parent."""
+        state = self.state.update(expanded_folders={"folder1"}, selected_item="folder1")
+        action = {"type": ActionType.MOVE_SELECTION, "direction": "page_down", "count": 2}
+        paged = reducer(state, action)
+        self.assertEqual(paged.selected_item, "folder1/file2.txt")
+        paged = reducer(reducer(paged, action), action)
+        self.assertEqual(paged.selected_item, "file1.txt")
+        
+        child = state.update(selected_item="folder1/file2.txt")
+        parent = reducer(child, {"type": ActionType.MOVE_SELECTION, "direction": "parent"})
+        self.assertEqual(parent.selected_item, "folder1")
+    
+    def test_next_included(self):
+        """Test jumping between included items."""
+        state = self.state.update(
+            included_paths={"folder2", "file1.txt"},
+            selected_item="folder2"
+        )
+        action = {"type": ActionType.MOVE_SELECTION, "direction": "next_included"}
+        state = reducer(state, action)
+        self.assertEqual(state.selected_item, "file1.txt")
+        state = reducer(state, action)
+        self.assertEqual(state.selected_item, "folder2")
+        
+        action = {"type": ActionType.MOVE_SELECTION, "direction": "previous_included"}
+        self.assertEqual(reducer(state, action).selected_item, "file1.txt")
+    
+    def test_next_partial(self):
+        """Test jumping between partially included folders."""
+        state = self.state.update(
+            included_paths={"folder1/file1.txt", "folder2", "folder2/file1.txt"},
+            selected_item="file1.txt"
+        )
+        action = {"type": ActionType.MOVE_SELECTION, "direction": "next_partial"}
+        state = reducer(state, action)
+        self.assertEqual(state.selected_item, "folder1")
+        # The only partial folder is already selected
+        self.assertIs(reducer(state, action), state)
+        
+        # Including the rest of folder1's files leaves nothing partial
+        state = reducer(state, {"type": ActionType.TOGGLE_INCLUDE, "path": "folder1/file2.txt"})
+        state = reducer(state.update(selected_item="file1.txt"), action)
+        self.assertEqual(state.selected_item, "file1.txt")
+    
+    def test_subtree_counts_follow_toggles(self):
+        """Test that include toggles keep the node counts in step with a rebuild."""
+        from claudius.utils.calculations import get_inclusion
+        state = self.state
+        get_inclusion(state, "")  # Build the counts
+        for path in ["folder2", "folder1", "folder2/file1.txt", "folder1/file2.txt"]:
+            state = reducer(state, {"type": ActionType.TOGGLE_INCLUDE, "path": path})
+            self.assertIsNotNone(state.subtree_counts)
+            rebuilt = state.update(subtree_counts=None)
+            for node in ["", "folder1", "folder2", "folder1/file1.txt", "file1.txt"]:
+                self.assertEqual(get_inclusion(state, node), get_inclusion(rebuilt, node), node)
+        self.assertEqual(get_inclusion(state, "folder1"), (2, 3))
+        self.assertEqual(get_inclusion(state, ""), (3, 7))
+    
+    def test_toggle_expand_splices_rows(self):
+        """Test that toggling keeps the cached visible rows in step."""
+        get_visible_items(self.state)  # Build the cache
+        action = {"type": ActionType.TOGGLE_EXPAND, "path": "folder1"}
+        expanded = reducer(self.state, action)
+        self.assertIsNotNone(expanded.visible_rows)
+        self.assertEqual(expanded.visible_rows.paths,
+                         ["", "folder1", "folder1/file1.txt", "folder1/file2.txt", "folder2", "file1.txt"])
+        collapsed = reducer(expanded, action)
+        self.assertEqual(collapsed.visible_rows.paths, ["", "folder1", "folder2", "file1.txt"])
+        
+        # Other tree changes drop the cache so it is rebuilt on demand
+        self.assertIsNone(reducer(expanded, {"type": ActionType.EXPAND_ALL}).visible_rows)
+    
+    def test_derived_values_built_once(self):
+        """Test that threads reading one state share a single build of each derived value."""
+        builds = []
+        build = VisibleRows.build
+        
+        def slow_build(*args):
+            builds.append(args)
+            time.sleep(0.05)
+            return build(*args)
+        
+        with mock.patch.object(VisibleRows, "build", side_effect=slow_build):
+            threads = [threading.Thread(target=self.state.get_visible_rows) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(builds), 1)
+        rows = self.state.visible_rows
+        
+        # A new state keeps values whose sources didn't change
+        moved = self.state.update(selected_item="folder2")
+        self.assertIs(moved.visible_rows, rows)
+        self.assertIsNone(self.state.update(folders={"folder1"}).visible_rows)
+        self.assertIs(self.state.visible_rows, rows)
+    
+    def test_pruned_folders(self):
+        """Test that pruned folders are tracked and can't be expanded."""
+        action = {
+            "type": ActionType.INSERT_NODES,
+            "paths": ["node_modules"],
+            "edges": {},
+            "folders": set(),
+            "pruned_folders": {"node_modules"}
+        }
+        
+        new_state = reducer(self.state, action)
+        self.assertIn("node_modules", new_state.edges[""])
+        self.assertEqual(new_state.pruned_folders, {"node_modules"})
+        
+        expanded = reducer(new_state, {"type": ActionType.TOGGLE_EXPAND, "path": "node_modules"})
+        self.assertEqual(expanded.expanded_folders, set())
+        
+        renamed = reducer(new_state, {"type": ActionType.RENAME_NODES,
+                                      "renames": [("node_modules", "deps")]})
+        self.assertEqual(renamed.pruned_folders, {"deps"})
+        
+        removed = reducer(renamed, {"type": ActionType.REMOVE_NODES, "paths": ["deps"]})
+        self.assertEqual(removed.pruned_folders, set())
+    
+    def test_persistent_collections(self):
+        """Test that updates return persistent collections and leave old states alone."""
+        loaded = reducer(self.state, {
+            "type": ActionType.LOAD_DATA,
+            "edges": self.edges,
+            "folders": self.folders,
+            "included_paths": {"file1.txt"},
+            "selected_item": "folder1",
+            "expanded_folders": set()
+        })
+        self.assertIsInstance(loaded.edges, PMap)
+        self.assertIsInstance(loaded.expanded_folders, PSet)
+        
+        expanded = reducer(loaded, {"type": ActionType.TOGGLE_EXPAND, "path": "folder1"})
+        self.assertEqual(expanded.expanded_folders, {"folder1"})
+        self.assertEqual(loaded.expanded_folders, set())
+        
+        # Expanding everything shares the folder set instead of copying it
+        self.assertIs(reducer(loaded, {"type": ActionType.EXPAND_ALL}).expanded_folders, loaded.folders)
+        
+        removed = reducer(loaded, {"type": ActionType.REMOVE_NODES, "paths": ["folder2"]})
+        self.assertNotIn("folder2", removed.edges)
+        self.assertIn("folder2", loaded.edges)
+        self.assertEqual(loaded.edges[""], ["folder1", "folder2", "file1.txt"])
+    
+    def test_file_stats(self):
+        """Test that size and token totals follow toggles without a rebuild."""
+        from claudius.utils.calculations import get_subtree_stats
+        self.assertIsNone(get_subtree_stats(self.state, ""))
+        
+        state = reducer(self.state, {"type": ActionType.SET_FILE_STATS, "stats": {
+            "file1.txt": (100, 25), "folder1/file1.txt": (40, 10), "folder1/file2.txt": (4, 1)}})
+        self.assertEqual(get_subtree_stats(state, ""), ((0, 0), (144, 36)))
+        
+        totals = state.subtree_totals
+        state = reducer(state, {"type": ActionType.TOGGLE_INCLUDE, "path": "folder1"})
+        self.assertIsNot(state.subtree_totals, None)
+        self.assertIs(state.subtree_totals.total, totals.total)
+        self.assertEqual(get_subtree_stats(state, ""), ((44, 11), (144, 36)))
+        self.assertEqual(get_subtree_stats(state, "folder1/file2.txt"), ((4, 1), (4, 1)))
+        
+        # Tree edits patch the totals and drop or move the stats they touch
+        removed = reducer(state, {"type": ActionType.REMOVE_NODES, "paths": ["folder1/file1.txt"]})
+        self.assertIsNotNone(removed.subtree_totals)
+        self.assertNotIn("folder1/file1.txt", removed.file_stats)
+        self.assertEqual(get_subtree_stats(removed, ""), ((4, 1), (104, 26)))
+        renamed = reducer(removed, {"type": ActionType.RENAME_NODES,
+                                    "renames": [("folder1/file2.txt", "folder2/moved.txt")]})
+        self.assertEqual(renamed.file_stats["folder2/moved.txt"], (4, 1))
+        self.assertEqual(get_subtree_stats(renamed, "folder2"), ((4, 1), (4, 1)))
+        
+        # New files get their stats merged in, without collecting the rest again
+        inserted = reducer(renamed, {"type": ActionType.INSERT_NODES, "paths": ["folder2/new.txt"],
+                                     "edges": {}, "folders": set()})
+        self.assertEqual(get_subtree_stats(inserted, "folder2"), ((4, 1), (4, 1)))
+        updated = reducer(inserted, {"type": ActionType.UPDATE_FILE_STATS,
+                                     "stats": {"folder2/new.txt": (8, 2)}})
+        self.assertEqual(get_subtree_stats(updated, "folder2"), ((4, 1), (12, 3)))
+        self.assertEqual(get_subtree_stats(updated, ""), ((4, 1), (112, 28)))
+        self.assertEqual(len(updated.file_stats), 3)
+        self.assertEqual(get_subtree_stats(updated.update(subtree_totals=None), ""),
+                         get_subtree_stats(updated, ""))
+    
+    def test_reveal_path(self):
+        """Test that revealing a path expands its ancestors and selects it."""
+        edges = dict(self.edges, folder1=["folder1/sub", "folder1/file1.txt"],
+                     **{"folder1/sub": ["folder1/sub/deep.txt"]})
+        state = self.state.update(edges=edges, folders={"folder1", "folder1/sub", "folder2"})
+        get_visible_items(state)  # Build the cache
+        
+        action = {"type": ActionType.REVEAL_PATH, "path": "folder1/sub/deep.txt"}
+        new_state = reducer(state, action)
+        self.assertEqual(new_state.selected_item, "folder1/sub/deep.txt")
+        self.assertEqual(set(new_state.expanded_folders), {"folder1", "folder1/sub"})
+        self.assertEqual(new_state.visible_rows.paths,
+                         ["", "folder1", "folder1/sub", "folder1/sub/deep.txt",
+                          "folder1/file1.txt", "folder2", "file1.txt"])
+        
+        # Visible paths are only selected; unknown paths are ignored
+        self.assertIs(reducer(new_state, {"type": ActionType.REVEAL_PATH, "path": "folder1"}).visible_rows,
+                      new_state.visible_rows)
+        self.assertIs(reducer(new_state, {"type": ActionType.REVEAL_PATH, "path": "nope"}), new_state)
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,65 @@
+"""
+Unit tests for stats module.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from claudius.models.scanner import scan_tree
+from claudius.models.stats import (
+    collect_file_stats, estimate_tokens, load_token_cache, write_token_cache)
+
+
+class TestStats(unittest.TestCase):
+    """Test case for stats module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.test_dir, "folder1"))
+        with open(os.path.join(self.test_dir, "file1.txt"), "w") as f:
+            f.write("x" * 41)
+        with open(os.path.join(self.test_dir, "folder1", "image.png"), "wb") as f:
+            f.write(b"\x89PNG\0\0" * 10)
+        self.edges = scan_tree(self.test_dir, workers=1).edges
+
+    def tearDown(self):
+        """Tear down test fixtures."""
+        shutil.rmtree(self.test_dir)
+
+    def test_estimate_tokens(self):
+        """Text costs about a token per four bytes; binary files cost nothing."""
+        self.assertEqual(estimate_tokens(os.path.join(self.test_dir, "file1.txt"), 41), 11)
+        self.assertEqual(estimate_tokens(os.path.join(self.test_dir, "folder1", "image.png"), 60), 0)
+        self.assertEqual(estimate_tokens(os.path.join(self.test_dir, "missing"), 10), 0)
+
+    def test_collect_file_stats(self):
+        """Files get sizes and estimates; unchanged files reuse the cache."""
+        stats, cache = collect_file_stats(self.test_dir, self.edges, workers=2)
+        self.assertEqual(stats, {"file1.txt": (41, 11), "folder1/image.png": (60, 0)})
+        self.assertEqual(set(cache), set(stats))
+
+        # An estimate is trusted while the file's mtime and size match
+        mtime, size, _ = cache["file1.txt"]
+        stats, _ = collect_file_stats(self.test_dir, self.edges,
+                                      {"file1.txt": (mtime, size, 99)})
+        self.assertEqual(stats["file1.txt"], (41, 99))
+        stats, _ = collect_file_stats(self.test_dir, self.edges,
+                                      {"file1.txt": (mtime - 1, size, 99)})
+        self.assertEqual(stats["file1.txt"], (41, 11))
+
+    def test_token_cache_round_trip(self):
+        """The cache survives a write and read; a damaged file reads as empty."""
+        path = Path(self.test_dir) / "cache.bin"
+        cache = {"a.txt": (1_700_000_000_000_000_000, 10, 3), "b/ü.py": (1, 2, 0)}
+        self.assertTrue(write_token_cache(path, cache))
+        self.assertEqual(load_token_cache(path), cache)
+
+        path.write_bytes(b"garbage")
+        self.assertEqual(load_token_cache(path), {})
+        self.assertEqual(load_token_cache(Path(self.test_dir) / "missing.bin"), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
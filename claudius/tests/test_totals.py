@@ -0,0 +1,88 @@
+"""
+Unit tests for totals module.
+"""
+import random
+import unittest
+from claudius.models.totals import SubtreeTotals
+from claudius.models.tree_index import IncludedSet, TreeIndex
+
+
+class TestSubtreeTotals(unittest.TestCase):
+    """Test case for totals module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.edges = {
+            "": ["folder1", "folder2", "file1.txt"],
+            "folder1": ["folder1/sub", "folder1/file1.txt"],
+            "folder1/sub": ["folder1/sub/deep.txt"],
+            "folder2": []
+        }
+        self.weights = {
+            "file1.txt": (100, 25),
+            "folder1/file1.txt": (40, 10),
+            "folder1/sub/deep.txt": (8, 2)
+        }
+        self.index = TreeIndex.build(self.edges)
+
+    def test_build(self):
+        """Folders sum their subtree, in total and over included files."""
+        included = IncludedSet.from_paths(self.index, {"folder1/sub", "folder1/sub/deep.txt"})
+        totals = SubtreeTotals.build(self.index, included, self.weights)
+        self.assertEqual(totals.totals(""), ((8, 2), (148, 37)))
+        self.assertEqual(totals.totals("folder1"), ((8, 2), (48, 12)))
+        self.assertEqual(totals.totals("folder2"), ((0, 0), (0, 0)))
+        self.assertEqual(totals.totals("file1.txt"), ((0, 0), (100, 25)))
+        self.assertIsNone(totals.totals("missing"))
+
+    def test_with_subtree(self):
+        """Toggles are reflected above, at and below the toggled node."""
+        included = IncludedSet.from_paths(self.index, set())
+        totals = SubtreeTotals.build(self.index, included, self.weights)
+
+        totals = totals.with_subtree("folder1", True)
+        self.assertEqual(totals.totals(""), ((48, 12), (148, 37)))
+        self.assertEqual(totals.totals("folder1/sub"), ((8, 2), (8, 2)))
+
+        totals = totals.with_subtree("folder1/sub/deep.txt", False)
+        self.assertEqual(totals.totals("folder1"), ((40, 10), (48, 12)))
+        self.assertEqual(totals.totals("folder1/sub"), ((0, 0), (8, 2)))
+        self.assertEqual(totals.totals(""), ((40, 10), (148, 37)))
+
+        # Only the toggled node and its ancestors were written
+        self.assertEqual(set(totals.written), {"", "folder1", "folder1/sub", "folder1/sub/deep.txt"})
+
+    def test_matches_brute_force(self):
+        """Random toggles on a random tree agree with summing the bitset."""
+        rng = random.Random(7)
+        edges, nodes, weights = {"": []}, [""], {}
+        for i in range(300):
+            parent = rng.choice([node for node in nodes if node in edges])
+            path = f"{parent}/n{i}" if parent else f"n{i}"
+            edges[parent].append(path)
+            nodes.append(path)
+            if rng.random() < 0.3:
+                edges[path] = []
+            else:
+                weights[path] = (rng.randrange(1000), rng.randrange(100))
+        index = TreeIndex.build(edges)
+        included = IncludedSet.from_paths(index, rng.sample(nodes[1:], 60))
+        totals = SubtreeTotals.build(index, included, weights)
+
+        for _ in range(200):
+            path = rng.choice(nodes[1:])
+            value = rng.random() < 0.5
+            included = included.with_subtree(path, value)
+            totals = totals.with_subtree(path, value)
+            query = rng.choice(nodes)
+            start, end = index.subtree(query)
+            rows = [weights.get(index.order[row], (0, 0)) for row in range(start, end)]
+            picked = [weights.get(index.order[row], (0, 0)) for row in range(start, end)
+                      if included.bits[row]]
+            expected = (tuple(map(sum, zip((0, 0), *picked))),
+                        tuple(map(sum, zip((0, 0), *rows))))
+            self.assertEqual(totals.totals(query), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+Unit tests for traversal module.
+"""
+import itertools
+import sys
+import unittest
+from claudius.utils.traversal import iter_ancestors, iter_descendants, iter_visible
+
+
+class TestTraversal(unittest.TestCase):
+    """Test case for traversal module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.edges = {
+            "": ["folder1", "folder2", "file1.txt"],
+            "folder1": ["folder1/sub", "folder1/file1.txt"],
+            "folder1/sub": ["folder1/sub/deep.txt"],
+            "folder2": ["folder2/file1.txt"]
+        }
+        self.folders = {"folder1", "folder1/sub", "folder2"}
+
+    def test_iter_visible(self):
+        """A subtree can be walked on its own, following expanded folders only."""
+        self.assertEqual(list(iter_visible(self.edges, self.folders, {"folder1/sub"}, "folder1")),
+                         ["folder1/sub", "folder1/sub/deep.txt", "folder1/file1.txt"])
+        self.assertEqual(list(iter_visible(self.edges, self.folders, {"folder1/sub"})),
+                         ["folder1", "folder2", "file1.txt"])
+        self.assertEqual(list(iter_visible(self.edges, self.folders, set(), "missing")), [])
+
+    def test_iter_descendants(self):
+        """Descendants come in display order, collapsed or not."""
+        self.assertEqual(list(iter_descendants(self.edges)),
+                         ["folder1", "folder1/sub", "folder1/sub/deep.txt", "folder1/file1.txt",
+                          "folder2", "folder2/file1.txt", "file1.txt"])
+        self.assertEqual(list(iter_descendants(self.edges, "folder2")), ["folder2/file1.txt"])
+        self.assertEqual(list(iter_descendants(self.edges, "file1.txt")), [])
+        self.assertEqual(sorted(iter_descendants(self.edges, ordered=False)),
+                         sorted(iter_descendants(self.edges)))
+
+    def test_iter_ancestors(self):
+        """Ancestors come closest first, without the root."""
+        self.assertEqual(list(iter_ancestors("a/b/c.txt")), ["a/b", "a"])
+        self.assertEqual(list(iter_ancestors("a")), [])
+        self.assertEqual(list(iter_ancestors("")), [])
+
+    def test_deep_tree(self):
+        """Trees deeper than the recursion limit are walked lazily."""
+        depth = sys.getrecursionlimit() * 5
+        edges, folders = {}, set()
+        parent = ""
+        for i in range(depth):
+            path = f"{parent}/d" if parent else "d"
+            edges[parent] = [path]
+            folders.add(path)
+            parent = path
+        leaf = parent
+
+        self.assertEqual(sum(1 for _ in iter_visible(edges, folders, folders)), depth)
+        self.assertEqual(sum(1 for _ in iter_descendants(edges)), depth)
+        self.assertEqual(sum(1 for _ in iter_ancestors(leaf)), depth - 1)
+        # Taking a window only walks that far
+        window = list(itertools.islice(iter_descendants(edges), 2, 4))
+        self.assertEqual(window, ["d/d/d", "d/d/d/d"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+"""
+Unit tests for tree_index module.
+"""
+import unittest
+from claudius.models.compact_tree import CompactTree
+from claudius.models.totals import SubtreeTotals
+from claudius.models.tree_index import CompactTreeIndex, IncludedSet, TreeIndex
+from claudius.models.state import AppState, ActionType, reducer
+from claudius.utils.patterns import PatternMatcher
+
+
+class TestTreeIndex(unittest.TestCase):
+    """Test case for tree_index module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.edges = {
+            "": ["folder1", "folder2", "file1.txt"],
+            "folder1": ["folder1/sub", "folder1/file1.txt"],
+            "folder1/sub": ["folder1/sub/deep.txt"],
+            "folder2": []
+        }
+        self.index = TreeIndex.build(self.edges)
+
+    def test_pre_order_ranges(self):
+        """Every subtree is the contiguous range after its root."""
+        self.assertEqual(self.index.order, ["", "folder1", "folder1/sub", "folder1/sub/deep.txt",
+                                            "folder1/file1.txt", "folder2", "file1.txt"])
+        self.assertEqual(self.index.subtree(""), (0, 7))
+        self.assertEqual(self.index.subtree("folder1"), (1, 5))
+        self.assertEqual(self.index.subtree("folder2"), (5, 6))
+        self.assertEqual(self.index.subtree("file1.txt"), (6, 7))
+        self.assertIsNone(self.index.subtree("missing"))
+
+    def test_ancestors(self):
+        """Parents are recorded while numbering."""
+        self.assertEqual(list(self.index.parent), [-1, 0, 1, 2, 1, 0, 0])
+        self.assertEqual(self.index.ancestors(3), [2, 1, 0])
+        self.assertEqual(self.index.ancestors(0), [])
+
+    def test_compact_index(self):
+        """A compact tree is numbered by node ID in the same order, without building paths."""
+        tree = CompactTree.from_edges(self.edges, {"folder1", "folder1/sub", "folder2"})
+        index = TreeIndex.build(tree.edges)
+        self.assertIsInstance(index, CompactTreeIndex)
+        self.assertEqual([index.path(row) for row in range(len(index))], self.index.order)
+        self.assertEqual(list(index.end), list(self.index.end))
+        self.assertEqual(list(index.parent), list(self.index.parent))
+        self.assertEqual(index.subtree("folder1"), (1, 5))
+        self.assertIsNone(index.row("missing"))
+        self.assertNotIn("folder1/missing", index)
+
+        # Sets and totals over it match the ones over the path index
+        weights = {"folder1/sub/deep.txt": (10, 3), "file1.txt": (5, 1)}
+        for numbering in (index, self.index):
+            included = IncludedSet.from_paths(numbering, {"file1.txt", "gone.txt"})
+            included = included.with_subtree("folder1/sub", True)
+            self.assertEqual(set(included), {"folder1/sub", "folder1/sub/deep.txt",
+                                             "file1.txt", "gone.txt"})
+            totals = SubtreeTotals.build(numbering, included, weights)
+            self.assertEqual(totals.totals("folder1"), ((10, 3), (10, 3)))
+            totals = totals.with_subtree("folder1", False)
+            self.assertEqual(totals.totals(""), ((5, 1), (15, 4)))
+
+    def test_included_set(self):
+        """Range fills include or exclude whole subtrees."""
+        included = IncludedSet.from_paths(self.index, {"file1.txt", "gone.txt"})
+        included = included.with_subtree("folder1", True)
+        self.assertEqual(set(included), {"folder1", "folder1/sub", "folder1/sub/deep.txt",
+                                         "folder1/file1.txt", "file1.txt", "gone.txt"})
+        self.assertEqual(len(included), 6)
+        self.assertIn("folder1/sub/deep.txt", included)
+        self.assertNotIn("folder2", included)
+
+        excluded = included.with_subtree("folder1/sub", False)
+        self.assertEqual(excluded.count_in("folder1"), (2, 4))
+        self.assertEqual(len(excluded), 4)
+        # The original is untouched
+        self.assertEqual(included.count_in("folder1"), (4, 4))
+
+    def test_set_operations(self):
+        """Set operators work and return plain sets."""
+        included = IncludedSet.from_paths(self.index, {"folder2", "file1.txt"})
+        self.assertEqual(included, {"folder2", "file1.txt"})
+        self.assertEqual(included - {"folder2"}, {"file1.txt"})
+        self.assertIsInstance(included | {"x"}, set)
+
+    def test_with_and_without_paths(self):
+        """Paths are added and removed in place; unknown ones go to extra."""
+        included = IncludedSet.from_paths(self.index, {"file1.txt"})
+        added = included.with_paths(["folder2", "folder2/new.txt"])
+        self.assertIs(added.index, self.index)
+        self.assertEqual(added, {"file1.txt", "folder2", "folder2/new.txt"})
+        self.assertEqual(added.extra, {"folder2/new.txt"})
+
+        removed = added.without_paths(["file1.txt", "folder2/new.txt"])
+        self.assertEqual(removed, {"folder2"})
+        self.assertEqual(len(removed), 1)
+
+        # A newer index folds extra paths back into the bits
+        edges = dict(self.edges, folder2=["folder2/new.txt"])
+        rebuilt = IncludedSet.from_paths(TreeIndex.build(edges), added)
+        self.assertEqual(rebuilt, added)
+        self.assertEqual(rebuilt.extra, frozenset())
+
+    def test_merge_keeps_bitset(self):
+        """Background merges after a toggle keep included paths a bitset."""
+        state = AppState(included_paths=set(), edges={"": ["folder1", "file1.txt"]},
+                         folders={"folder1"}, selected_item="folder1", expanded_folders=set())
+        state = reducer(state, {"type": ActionType.TOGGLE_INCLUDE, "path": "file1.txt"})
+        state = state.update(ignore_matcher=PatternMatcher(["*.py"]))
+        state = reducer(state, {"type": ActionType.MERGE_SCAN,
+                                "edges": {"folder1": ["folder1/a.py", "folder1/b.txt"]},
+                                "folders": {"folder1"}})
+        self.assertIsInstance(state.included_paths, IncludedSet)
+        self.assertEqual(state.included_paths, {"file1.txt", "folder1/a.py"})
+
+        state = reducer(state, {"type": ActionType.TOGGLE_INCLUDE, "path": "folder1/b.txt"})
+        self.assertEqual(state.included_paths, {"file1.txt", "folder1/a.py", "folder1/b.txt"})
+        state = reducer(state, {"type": ActionType.REMOVE_NODES, "paths": ["folder1/a.py"]})
+        self.assertIsInstance(state.included_paths, IncludedSet)
+        self.assertEqual(state.included_paths, {"file1.txt", "folder1/b.txt"})
+
+    def test_deep_tree_toggle(self):
+        """Toggling the root of a very deep tree doesn't recurse."""
+        edges = {"": ["d0"]}
+        path = "d0"
+        for i in range(1, 5000):
+            child = f"{path}/d{i}"
+            edges[path] = [child]
+            path = child
+        edges[path] = []
+        state = AppState(included_paths=set(), edges=edges, folders=set(edges) - {""},
+                         selected_item="d0", expanded_folders=set())
+
+        state = reducer(state, {"type": ActionType.TOGGLE_INCLUDE, "path": "d0"})
+        self.assertEqual(len(state.included_paths), 5000)
+        self.assertIn(path, state.included_paths)
+        state = reducer(state, {"type": ActionType.TOGGLE_INCLUDE, "path": "d0"})
+        self.assertEqual(len(state.included_paths), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Unit tests for visible_rows module.
+"""
+import unittest
+from claudius.models.visible_rows import VisibleRows
+from claudius.views.file_tree import get_guide
+
+
+class TestVisibleRows(unittest.TestCase):
+    """Test case for visible_rows module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.edges = {
+            "": ["folder1", "folder2", "file1.txt"],
+            "folder1": ["folder1/sub", "folder1/file1.txt"],
+            "folder1/sub": ["folder1/sub/deep.txt"],
+            "folder2": ["folder2/file1.txt"]
+        }
+        self.folders = {"folder1", "folder1/sub", "folder2"}
+
+    def test_build(self):
+        """Rows start with the root and follow expanded folders only."""
+        rows = VisibleRows.build(self.edges, self.folders, {"folder1"})
+        self.assertEqual(rows.paths, ["", "folder1", "folder1/sub", "folder1/file1.txt",
+                                      "folder2", "file1.txt"])
+        self.assertEqual(rows.index("folder2"), 4)
+        self.assertIsNone(rows.index("folder1/sub/deep.txt"))
+
+    def test_expand_matches_rebuild(self):
+        """Splicing in a folder gives the same rows as a full rebuild."""
+        expanded = {"folder1/sub"}
+        rows = VisibleRows.build(self.edges, self.folders, expanded)
+        for path in ("folder1", "folder2"):
+            expanded = expanded | {path}
+            rows = rows.expand(path, self.edges, self.folders, expanded)
+            self.assertEqual(rows.paths, VisibleRows.build(self.edges, self.folders, expanded).paths)
+            self.assertEqual(rows.index("file1.txt"), len(rows) - 1)
+
+    def test_guides(self):
+        """Every row carries its guide, also after splices."""
+        rows = VisibleRows.build(self.edges, self.folders, {"folder1", "folder1/sub"})
+        self.assertEqual(rows.guides, [""] + [get_guide(self.edges, path) for path in rows.paths[1:]])
+        self.assertEqual(rows.guides[3], "│   │   └── ")
+
+        expanded = {"folder1", "folder1/sub", "folder2"}
+        rows = rows.collapse("folder1").expand("folder2", self.edges, self.folders, {"folder2"})
+        rows = rows.expand("folder1", self.edges, self.folders, expanded)
+        self.assertEqual(rows.paths, VisibleRows.build(self.edges, self.folders, expanded).paths)
+        self.assertEqual(rows.guides, [""] + [get_guide(self.edges, path) for path in rows.paths[1:]])
+
+    def test_collapse_matches_rebuild(self):
+        """Splicing out a folder removes all of its visible descendants."""
+        expanded = {"folder1", "folder1/sub", "folder2"}
+        rows = VisibleRows.build(self.edges, self.folders, expanded)
+        rows = rows.collapse("folder1")
+        self.assertEqual(rows.paths, VisibleRows.build(self.edges, self.folders, {"folder2"}).paths)
+        self.assertIs(rows.collapse("folder1"), rows)
+
+    def test_hidden_folder_is_ignored(self):
+        """Expanding a folder inside a collapsed one leaves the rows alone."""
+        rows = VisibleRows.build(self.edges, self.folders, set())
+        self.assertIs(rows.expand("folder1/sub", self.edges, self.folders, {"folder1/sub"}), rows)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+Unit tests for watcher module.
+"""
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+import threading
+import time
+from claudius.models.scanner import scan_tree
+from claudius.models.state import AppState, ActionType, reducer
+from claudius.models.watcher import FileSystemWatcher, compute_fs_actions
+from claudius.utils.patterns import PatternMatcher
+
+
+class TestWatcher(unittest.TestCase):
+    """Test case for watcher module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.test_dir, "folder1", "sub"))
+        os.makedirs(os.path.join(self.test_dir, "folder2"))
+        open(os.path.join(self.test_dir, "file1.txt"), "w").close()
+        open(os.path.join(self.test_dir, "folder1", "sub", "file1.txt"), "w").close()
+
+        result = scan_tree(self.test_dir)
+        self.state = AppState(
+            included_paths={"folder1", "folder1/sub", "folder1/sub/file1.txt"},
+            edges=result.edges,
+            folders=result.folders,
+            selected_item="folder1/sub/file1.txt",
+            expanded_folders={"folder1", "folder1/sub"}
+        )
+
+    def tearDown(self):
+        """Tear down test fixtures."""
+        shutil.rmtree(self.test_dir)
+
+    def apply(self, actions):
+        """Run actions through the reducer."""
+        for action in actions:
+            self.state = reducer(self.state, action)
+
+    def assertMatchesDisk(self):
+        """Check the state's tree against a fresh scan."""
+        expected = scan_tree(self.test_dir)
+        self.assertEqual(self.state.edges, expected.edges)
+        self.assertEqual(self.state.folders, expected.folders)
+
+    def test_created_and_removed(self):
+        """New and deleted nodes become INSERT_NODES and REMOVE_NODES."""
+        os.makedirs(os.path.join(self.test_dir, "folder2", "new"))
+        open(os.path.join(self.test_dir, "folder2", "new", "a.txt"), "w").close()
+        os.remove(os.path.join(self.test_dir, "file1.txt"))
+
+        actions = compute_fs_actions(self.test_dir, self.state.edges, {"", "folder2"}, [])
+        self.assertEqual([a["type"] for a in actions],
+                         [ActionType.REMOVE_NODES, ActionType.INSERT_NODES])
+        self.apply(actions)
+        self.assertMatchesDisk()
+
+    def test_created_pruned_folder(self):
+        """A new folder matching the prune patterns is inserted but not walked."""
+        os.makedirs(os.path.join(self.test_dir, "folder2", "node_modules", "pkg"))
+        prune = PatternMatcher(["node_modules/"])
+
+        actions = compute_fs_actions(self.test_dir, self.state.edges, {"folder2"}, [], prune)
+        self.apply(actions)
+        self.assertEqual(self.state.edges["folder2"], ["folder2/node_modules"])
+        self.assertNotIn("folder2/node_modules", self.state.edges)
+        self.assertEqual(self.state.pruned_folders, {"folder2/node_modules"})
+
+    def test_rename_keeps_state(self):
+        """A reported move renames the subtree along with its inclusion and expansion."""
+        os.rename(os.path.join(self.test_dir, "folder1", "sub"),
+                  os.path.join(self.test_dir, "folder2", "moved"))
+
+        actions = compute_fs_actions(self.test_dir, self.state.edges,
+                                     {"folder1", "folder2"},
+                                     [("folder1/sub", "folder2/moved")])
+        self.assertEqual([a["type"] for a in actions], [ActionType.RENAME_NODES])
+        self.apply(actions)
+        self.assertMatchesDisk()
+        self.assertIn("folder2/moved/file1.txt", self.state.included_paths)
+        self.assertIn("folder2/moved", self.state.expanded_folders)
+        self.assertEqual(self.state.selected_item, "folder2/moved/file1.txt")
+
+    def test_unchanged_folders(self):
+        """Folders that didn't change produce no actions."""
+        self.assertEqual(compute_fs_actions(self.test_dir, self.state.edges, {"", "folder1"}, []), [])
+
+    def run_watcher(self, force_polling):
+        """Start a watcher, change the tree and wait for the state to catch up."""
+        lock = threading.Lock()
+
+        def on_actions(actions):
+            with lock:
+                self.apply(actions)
+
+        watcher = FileSystemWatcher(self.test_dir, lambda: self.state, on_actions,
+                                    debounce=0.05, poll_interval=0.05,
+                                    force_polling=force_polling)
+        watcher.start()
+        try:
+            time.sleep(0.2)
+            open(os.path.join(self.test_dir, "folder2", "created.txt"), "w").close()
+            os.remove(os.path.join(self.test_dir, "folder1", "sub", "file1.txt"))
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                with lock:
+                    if "folder2/created.txt" in self.state.edges["folder2"] \
+                            and not self.state.edges["folder1/sub"]:
+                        break
+                time.sleep(0.02)
+        finally:
+            watcher.stop()
+        self.assertMatchesDisk()
+        self.assertNotIn("folder1/sub/file1.txt", self.state.included_paths)
+
+    def test_polling_watcher(self):
+        """The polling fallback picks up changes."""
+        self.run_watcher(force_polling=True)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux-only")
+    def test_inotify_watcher(self):
+        """The inotify watcher picks up changes."""
+        self.run_watcher(force_polling=False)
+
+if __name__ == "__main__":
+    unittest.main()
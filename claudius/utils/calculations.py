@@ -1,37 +1,365 @@
 """
-Pure functions for Claudius.
-These functions perform calculations without side effects.
+Calculations for Claudius.
+Functions that read an AppState (or plain edges and folders) and return a
+value without changing anything. Indexes they need, such as the visible
+rows and subtree totals, come from the state's own cache, which builds each
+one on first use (see AppState.derived).
 """
-from typing import Dict, List, Set, Optional
+from typing import TYPE_CHECKING, Dict, Iterator, List, Set, Optional, Tuple
 import os
-from ..models.state import AppState
+import re
+from .patterns import PatternMatcher, escape_glob, escape_path
+from .traversal import iter_ancestors, iter_descendants
 
-def get_visible_items(state: AppState) -> List[str]:
+if TYPE_CHECKING:
+    # state.py imports this module at load time
+    from ..models.state import AppState
+    from ..models.totals import Totals
+    from ..models.tree_index import TreeIndex
+
+def get_subtree_stats(state: 'AppState', path: str) -> Optional[Tuple['Totals', 'Totals']]:
     """
-    Return a list of visible items based on expanded folders.
+    Return the included and total (bytes, tokens) of a subtree.
     
     Args:
         state: Current application state
+        path: Node at the top of the subtree ('' for the whole tree)
         
     Returns:
-        List of visible item paths
+        Tuple of (included, total), or None if stats aren't known yet
+    """
+    totals = state.get_subtree_totals()
+    if totals is None:
+        return None
+    return totals.totals(path)
+
+def format_size(size: int) -> str:
     """
-    visible = []
+    Format a byte count for display.
     
-    # Helper function to traverse the tree
-    def traverse(node, is_visible=True):
-        if is_visible:
-            visible.append(node)
+    Args:
+        size: Number of bytes
         
-        # If this is a folder and it's either the root or it's expanded
-        if not node or (node in state.folders and node in state.expanded_folders):
-            for child in state.edges.get(node, []):
-                traverse(child, is_visible)
+    Returns:
+        Short string such as "512 B" or "1.5 MB"
+    """
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            break
+        size /= 1024
+    if unit == "B":
+        return f"{size} B"
+    return f"{size:.1f} {unit}" if size < 10 else f"{size:.0f} {unit}"
+
+def format_tokens(tokens: int) -> str:
+    """
+    Format a token count for display.
+    
+    Args:
+        tokens: Number of tokens
+        
+    Returns:
+        Short string such as "950", "12k" or "1.2M"
+    """
+    # 999,500 would round to "1000k", so it already counts as millions
+    for threshold, scale, suffix in ((999_500, 10 ** 6, "M"), (1000, 1000, "k")):
+        if tokens >= threshold:
+            value = tokens / scale
+            return f"{value:.1f}{suffix}" if value < 10 else f"{value:.0f}{suffix}"
+    return str(tokens)
+
+def get_stats_label(state: 'AppState', path: str) -> str:
+    """
+    Return the size and token label shown after a row.
     
-    # Start with root items
-    traverse("", True)
+    Files show their own size and tokens; folders show their total size
+    and how many of their tokens are included. Pruned and not yet loaded
+    folders have no label, since their contents were never counted.
+    
+    Args:
+        state: Current application state
+        path: Path of the row
+        
+    Returns:
+        Label such as "4.2 KB, 1.1k tokens", or "" if stats aren't known yet
+    """
+    is_folder = path in state.folders
+    if path in state.pruned_folders or (is_folder and path not in state.edges):
+        return ""
+    stats = get_subtree_stats(state, path)
+    if stats is None:
+        return ""
+    (_, included_tokens), (size, tokens) = stats
+    if is_folder:
+        return f"{format_size(size)}, {format_tokens(included_tokens)}/{format_tokens(tokens)} tokens"
+    return f"{format_size(size)}, {format_tokens(tokens)} tokens"
+
+def get_stats_summary(state: 'AppState') -> Optional[str]:
+    """
+    Summarize how much of the tree is included.
+    
+    Args:
+        state: Current application state
+        
+    Returns:
+        Text such as "1.2 MB, 3.4k of 9.8k tokens included", or None if
+        stats aren't known yet
+    """
+    stats = get_subtree_stats(state, "")
+    if stats is None:
+        return None
+    (size, included_tokens), (_, tokens) = stats
+    return (f"{format_size(size)}, {format_tokens(included_tokens)} of "
+            f"{format_tokens(tokens)} tokens included")
+
+def get_inclusion(state: 'AppState', path: str) -> Tuple[int, int]:
+    """
+    Count included nodes in a subtree.
     
-    return visible
+    Args:
+        state: Current application state
+        path: Node at the top of the subtree
+        
+    Returns:
+        Tuple of (included, total), both counting path itself; the folder
+        is fully included when they are equal and partially when included > 0
+    """
+    counts = state.get_subtree_counts().totals(path)
+    if counts is None:
+        # Not in the tree, such as an included path that no longer exists
+        return int(path in state.included_paths), 1
+    (included,), (total,) = counts
+    return included, total
+
+def get_inclusion_state(state: 'AppState', path: str) -> str:
+    """
+    Classify how much of a node is included.
+    
+    Files and empty folders are included or not. Other folders go by
+    their contents, so a folder whose files were all included one by one
+    counts as full.
+    
+    Args:
+        state: Current application state
+        path: File or folder path
+        
+    Returns:
+        "full", "partial" or "none"
+    """
+    is_included = path in state.included_paths
+    if path not in state.folders:
+        return "full" if is_included else "none"
+    included, total = get_inclusion(state, path)
+    included -= is_included
+    total -= 1
+    if total == 0:
+        return "full" if is_included else "none"
+    if included == total:
+        return "full"
+    return "partial" if included else "none"
+
+def is_partially_included(state: 'AppState', path: str) -> bool:
+    """
+    Check whether a folder has both included and excluded contents.
+    
+    Args:
+        state: Current application state
+        path: File or folder path
+        
+    Returns:
+        True if get_inclusion_state is "partial"
+    """
+    return get_inclusion_state(state, path) == "partial"
+
+def iter_partial_rows(state: 'AppState') -> Iterator[int]:
+    """
+    Yield the visible rows of partially included folders, top to bottom.
+    
+    A folder that is fully included or excluded can't contain a partial
+    one, so its visible descendants are skipped without being checked.
+    
+    Args:
+        state: Current application state
+        
+    Yields:
+        Row numbers in state.get_visible_rows()
+    """
+    rows = state.get_visible_rows()
+    folders = state.folders
+    row = 0
+    while row < len(rows):
+        path = rows[row]
+        if not path or path not in folders:
+            row += 1
+        elif is_partially_included(state, path):
+            yield row
+            row += 1
+        else:
+            row = rows.subtree_end(row)
+
+def get_pattern_inclusion(matcher: PatternMatcher, path: str, is_dir: bool) -> bool:
+    """
+    Check whether .claudeignore patterns include a path, given its ancestors.
+    
+    Args:
+        matcher: Compiled .claudeignore patterns
+        path: Path to check
+        is_dir: Whether the path is a folder
+        
+    Returns:
+        True if the path's own last matching pattern includes it, or no
+        pattern matches it and its folder is included
+    """
+    included = False
+    for ancestor in reversed(get_ancestors(path)):
+        result = matcher.check(ancestor, True)
+        if result is not None:
+            included = result
+    result = matcher.check(path, is_dir)
+    return included if result is None else result
+
+def get_pattern_matches(matcher: PatternMatcher, edges: Dict[str, List[str]],
+                        folders: Set[str], pruned_folders: Set[str] = frozenset(),
+                        node: str = "", included: bool = False) -> Set[str]:
+    """
+    Return the paths below node that .claudeignore patterns include.
+    
+    Each path is checked once: its own last matching pattern decides, and a
+    path no pattern matches follows its folder. Unlike gitignore, a negated
+    pattern can exclude a path inside a matched folder.
+    
+    Args:
+        matcher: Compiled .claudeignore patterns
+        edges: Map of parent paths to child paths
+        folders: Set of paths that are folders
+        pruned_folders: Folders that are listed but not walked
+        node: Folder to search under ('' for the whole tree)
+        included: Whether node itself is included by the patterns
+        
+    Returns:
+        Set of included paths, not counting node
+    """
+    matched = set()
+    stack = [(node, included)]
+    while stack:
+        parent, parent_included = stack.pop()
+        for child in edges.get(parent, ()):
+            is_dir = child in folders or child in pruned_folders
+            result = matcher.check(child, is_dir)
+            child_included = parent_included if result is None else result
+            if child_included:
+                matched.add(child)
+            if is_dir:
+                stack.append((child, child_included))
+    return matched
+
+def _is_exclusion(line: str) -> bool:
+    """Check for an '!/path' line excluding one path (or folder) from the patterns."""
+    if not line.startswith('!/'):
+        return False
+    body = line[2:]
+    for suffix in ('/**', '/'):
+        if body.endswith(suffix):
+            body = body[:-len(suffix)]
+            break
+    return not any(c in re.sub(r'\\.', '', body) for c in '*?[')
+
+def _and_not(bits: bytes, mask: bytes) -> bytearray:
+    """Return bits with every position set in mask cleared (both hold 0/1 bytes)."""
+    value = int.from_bytes(bits, 'big') & ~int.from_bytes(mask, 'big')
+    return bytearray(value.to_bytes(len(bits), 'big'))
+
+def _collapse_rows(state: 'AppState', index: 'TreeIndex', bits: bytearray,
+                   collapse: bool = True) -> List[Tuple[str, bool]]:
+    """
+    List the rows set in bits, folding subtrees that are set throughout.
+    
+    Returns:
+        (path, whole_subtree) tuples in pre-order
+    """
+    end = index.end
+    folders, pruned = state.folders, state.pruned_folders
+    
+    # With lazy loading, a folder whose subtree isn't fully listed yet
+    # can't be collapsed: the unlisted part may not be included
+    unloaded = bytearray(len(index))
+    if collapse:
+        for folder in folders:
+            if folder not in state.edges:
+                row = index.row(folder)
+                if row is not None:
+                    unloaded[row] = 1
+    
+    rows = []
+    row = bits.find(1, 1)
+    while row != -1:
+        path = index.path(row)
+        stop = end[row]
+        if (collapse and (path in folders or path in pruned)
+                and bits.count(1, row, stop) == stop - row
+                and not unloaded.count(1, row, stop)):
+            rows.append((path, True))
+        else:
+            rows.append((path, False))
+            stop = row + 1
+        row = bits.find(1, stop)
+    return rows
+
+def get_ignore_lines(state: 'AppState', collapse: bool = True) -> Tuple[List[str], List[str]]:
+    """
+    Return the lines to write to .claudeignore.
+    
+    A folder whose whole subtree is included (and fully loaded) is written
+    once as '/folder/', and its subtree is skipped; every other included
+    path is written as is, escaped so it doesn't read back as a pattern.
+    Paths the patterns already include aren't written, and pattern
+    matches that were excluded get an '!/path' line.
+    
+    Args:
+        state: Current application state
+        collapse: Fold fully included folders into one entry
+        
+    Returns:
+        Tuple containing:
+        - patterns: Pattern lines, in the order they must be written
+        - entries: Included paths and folder entries
+    """
+    index = state.get_tree_index()
+    included = state.get_included()
+    explicit = bytearray(included.bits.tobytes())
+    patterns = []
+    
+    matcher = state.ignore_matcher
+    if matcher:
+        patterns = [line for line in matcher.lines if not _is_exclusion(line)]
+        edges, folders, pruned = state.edges, state.folders, state.pruned_folders
+        base = PatternMatcher(patterns)
+        matched = index.mark(get_pattern_matches(base, edges, folders, pruned))
+        excluded = _and_not(matched, explicit)
+        if excluded.count(1):
+            for path, whole in _collapse_rows(state, index, excluded, collapse):
+                path = escape_glob(path)
+                patterns.extend([f"!/{path}/", f"!/{path}/**"] if whole else [f"!/{path}"])
+            matched = index.mark(
+                get_pattern_matches(PatternMatcher(patterns), edges, folders, pruned))
+        explicit = _and_not(explicit, matched)
+    
+    entries = [f"/{escape_glob(path)}/" if whole else escape_path(path)
+               for path, whole in _collapse_rows(state, index, explicit, collapse)]
+    entries.extend(map(escape_path, included.extra))
+    return patterns, entries
+
+def get_visible_items(state: 'AppState') -> List[str]:
+    """
+    Return a list of visible items based on expanded folders.
+    
+    Args:
+        state: Current application state
+        
+    Returns:
+        List of visible item paths
+    """
+    return list(state.get_visible_rows().paths)
 
 def get_root_items(edges: Dict[str, List[str]]) -> List[str]:
     """
@@ -78,15 +406,7 @@ def get_all_descendants(edges: Dict[str, List[str]], node: str) -> Set[str]:
     Returns:
         Set of descendant paths
     """
-    result = set()
-    
-    def collect_descendants(current_node):
-        for child in edges.get(current_node, []):
-            result.add(child)
-            collect_descendants(child)
-    
-    collect_descendants(node)
-    return result
+    return set(iter_descendants(edges, node, ordered=False))
 
 def get_indentation_level(path: str) -> int:
     """
@@ -135,3 +455,41 @@ def get_absolute_paths(included_paths: Set[str], root_dir: str) -> List[str]:
         List of absolute paths
     """
     return [get_path_for_ignore(path, root_dir) for path in sorted(included_paths)]
+
+def get_ancestors(path: str) -> List[str]:
+    """
+    Return the ancestor folders of a path, closest first (root excluded).
+    
+    Args:
+        path: File or folder path
+        
+    Returns:
+        List of ancestor paths
+    """
+    return list(iter_ancestors(path))
+
+def get_unloaded_folders(edges: Dict[str, List[str]], folders: Set[str], node: str = "") -> List[str]:
+    """
+    Return folders under node (or node itself) whose children have not been listed yet.
+    
+    With lazy loading a folder is known from its parent's listing before its
+    own contents are read; it is loaded once it has an entry in edges.
+    
+    Args:
+        edges: Dictionary mapping parent paths to lists of child paths
+        folders: Set of paths that are folders
+        node: Node to search under
+        
+    Returns:
+        List of unloaded folder paths, topmost first
+    """
+    unloaded = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current not in edges:
+            if current in folders:
+                unloaded.append(current)
+            continue
+        stack.extend(child for child in reversed(edges[current]) if child in folders)
+    return unloaded
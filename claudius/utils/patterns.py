@@ -0,0 +1,256 @@
+"""
+Gitignore-style pattern matching for Claudius.
+Compiles a list of patterns once into a single matcher.
+"""
+import re
+from typing import FrozenSet, Iterable, List, Optional, Tuple
+
+
+def _translate_glob(glob: str) -> str:
+    """Translate the body of a gitignore pattern into a regex (no capturing groups)."""
+    out = []
+    i, n = 0, len(glob)
+    while i < n:
+        c = glob[i]
+        if c == '*':
+            if glob.startswith('**', i):
+                at_start = i == 0 or glob[i - 1] == '/'
+                after = i + 2
+                if at_start and after < n and glob[after] == '/':
+                    out.append('(?:.*/)?')  # "**/" matches zero or more folders
+                    i = after + 1
+                    continue
+                if at_start and after == n:
+                    out.append('.*')  # Trailing "/**" matches everything inside
+                    i = after
+                    continue
+            out.append('[^/]*')
+            i += 1
+            while i < n and glob[i] == '*':
+                i += 1
+        elif c == '?':
+            out.append('[^/]')
+            i += 1
+        elif c == '[':
+            end = i + 1
+            if end < n and glob[end] in '!^':
+                end += 1
+            if end < n and glob[end] == ']':
+                end += 1
+            while end < n and glob[end] != ']':
+                end += 1
+            if end >= n:
+                out.append(re.escape(c))
+                i += 1
+                continue
+            body = glob[i + 1:end]
+            if body and body[0] in '!^':
+                body = '^' + body[1:]
+            out.append('[' + body.replace('\\', '\\\\') + ']')
+            i = end + 1
+        elif c == '\\' and i + 1 < n:
+            out.append(re.escape(glob[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return ''.join(out)
+
+
+def is_pattern(line: str) -> bool:
+    """
+    Check whether a .claudeignore line is a pattern rather than a path.
+
+    Lines with glob characters, negations and unanchored folder names such
+    as 'build/' are patterns. Plain paths and anchored folder entries such
+    as '/src/app/' are not, and neither are paths whose glob characters
+    are all escaped (see escape_path).
+
+    Args:
+        line: Stripped line
+
+    Returns:
+        True if the line should be compiled into a PatternMatcher
+    """
+    if line.startswith('!') or any(c in re.sub(r'\\.', '', line) for c in '*?['):
+        return True
+    return line.endswith('/') and '/' not in line.rstrip('/')
+
+
+def escape_glob(path: str) -> str:
+    """Escape glob characters so a pattern matches path literally."""
+    return re.sub(r'([*?\[\\])', r'\\\1', path)
+
+
+def escape_path(path: str) -> str:
+    """
+    Escape a path so a .claudeignore line reads back as that literal path.
+
+    Glob characters are escaped, and so is a leading '!' or '#', which
+    would otherwise make the line a negation or a comment.
+
+    Args:
+        path: Path to write as is
+
+    Returns:
+        Line that is_pattern doesn't take for a pattern
+    """
+    path = escape_glob(path)
+    return '\\' + path if path.startswith(('!', '#')) else path
+
+
+def unescape_path(line: str) -> str:
+    """Undo escape_path."""
+    return re.sub(r'\\(.)', r'\1', line)
+
+
+def parse_pattern(line: str) -> Optional[Tuple[str, bool, bool, bool]]:
+    """
+    Parse one line of a gitignore-style file.
+
+    Args:
+        line: Raw line
+
+    Returns:
+        Tuple of (glob, negated, anchored, dir_only), or None for blank
+        lines and comments
+    """
+    line = line.rstrip('\n\r')
+    # Trailing spaces are ignored unless escaped
+    stripped = line.rstrip(' ')
+    if stripped.endswith('\\') and len(stripped) < len(line):
+        stripped += ' '
+    line = stripped
+    if not line or line.startswith('#'):
+        return None
+
+    negated = line.startswith('!')
+    if negated:
+        line = line[1:]
+    elif line.startswith('\\!') or line.startswith('\\#'):
+        line = line[1:]
+
+    dir_only = line.endswith('/')
+    line = line.rstrip('/')
+    anchored = '/' in line
+    line = line.lstrip('/')
+    if not line:
+        return None
+    return line, negated, anchored, dir_only
+
+
+class PatternMatcher:
+    """
+    A compiled set of gitignore-style patterns.
+
+    The last matching pattern wins, as in gitignore. All patterns are joined
+    into one regex with the alternatives in reverse order, so the first
+    alternative that matches is the last pattern in file order. When no
+    pattern is negated, plain names, anchored paths and "*.ext" suffixes are
+    checked with set lookups and str.endswith before the regex.
+
+    A matcher used for pruning can also carry skip, root-relative paths
+    that scans leave out of the tree altogether.
+    """
+
+    def __init__(self, lines: Iterable[str], skip: Iterable[str] = ()) -> None:
+        self.lines: List[str] = []
+        self.skip: FrozenSet[str] = frozenset(skip)
+        parsed = []
+        for line in lines:
+            pattern = parse_pattern(line)
+            if pattern is not None:
+                self.lines.append(line.strip())
+                parsed.append(pattern)
+
+        self._names = set()  # Unanchored names, files or folders
+        self._dir_names = set()  # Unanchored names, folders only
+        self._paths = set()  # Anchored literal paths, files or folders
+        self._dir_paths = set()  # Anchored literal paths, folders only
+        suffixes = []
+        dir_suffixes = []
+        regex_patterns = []
+        self._negated: List[bool] = []
+
+        has_negation = any(negated for _, negated, _, _ in parsed)
+        for glob, negated, anchored, dir_only in parsed:
+            if not has_negation:
+                literal = not any(c in glob for c in '*?[\\')
+                if literal and not anchored:
+                    (self._dir_names if dir_only else self._names).add(glob)
+                    continue
+                if literal:
+                    (self._dir_paths if dir_only else self._paths).add(glob)
+                    continue
+                if (not anchored and glob.startswith('*')
+                        and not any(c in glob[1:] for c in '*?[\\')):
+                    (dir_suffixes if dir_only else suffixes).append(glob[1:])
+                    continue
+
+            body = _translate_glob(glob)
+            if not anchored:
+                body = '(?:.*/)?' + body
+            body += '/' if dir_only else '/?'
+            regex_patterns.append(body)
+            self._negated.append(negated)
+
+        self._suffixes = tuple(suffixes)
+        self._dir_suffixes = tuple(dir_suffixes)
+        self._negated.reverse()
+        self._regex = None
+        if regex_patterns:
+            self._regex = re.compile(
+                '|'.join('(' + body + ')' for body in reversed(regex_patterns)),
+                re.DOTALL)
+
+    def __bool__(self) -> bool:
+        return bool(self.lines)
+
+    def match(self, path: str, is_dir: bool, name: Optional[str] = None) -> bool:
+        """
+        Check one node.
+
+        Only the node itself is tested; callers walking a tree should treat
+        everything under a matched folder as matched too.
+
+        Args:
+            path: Path relative to the root, using '/' separators
+            is_dir: Whether the node is a folder
+            name: The last path segment, if the caller already has it
+
+        Returns:
+            True if the last pattern matching the node is not negated
+        """
+        return self.check(path, is_dir, name) is True
+
+    def check(self, path: str, is_dir: bool, name: Optional[str] = None) -> Optional[bool]:
+        """
+        Check one node, telling a negated match apart from no match.
+
+        Args:
+            path: Path relative to the root, using '/' separators
+            is_dir: Whether the node is a folder
+            name: The last path segment, if the caller already has it
+
+        Returns:
+            None if no pattern matches the node, otherwise whether the last
+            matching pattern is not negated
+        """
+        if name is None:
+            name = path.rpartition('/')[2]
+        if name in self._names or path in self._paths:
+            return True
+        if self._suffixes and name.endswith(self._suffixes):
+            return True
+        if is_dir:
+            if name in self._dir_names or path in self._dir_paths:
+                return True
+            if self._dir_suffixes and name.endswith(self._dir_suffixes):
+                return True
+
+        if self._regex is None:
+            return None
+        m = self._regex.fullmatch(path + '/' if is_dir else path)
+        if m is None:
+            return None
+        return not self._negated[m.lastindex - 1]
@@ -0,0 +1,258 @@
+"""
+Built-in instrumentation for Claudius.
+Functions wrapped with timed() record their latency, the memory blocks
+they allocated and, optionally, how many nodes they handled. Recording is
+off by default; a disabled wrapper costs one attribute check per call.
+"""
+import atexit
+import json
+import math
+import os
+import sys
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, IO, List, Optional
+
+# Environment variable naming a JSONL file to trace every span into
+TRACE_ENV = "CLAUDIUS_TRACE"
+# Environment variable that turns on recording without a trace file
+PROFILE_ENV = "CLAUDIUS_PROFILE"
+# Histogram buckets per doubling of latency (about 9% resolution)
+BUCKETS_PER_OCTAVE = 8
+
+
+class Histogram:
+    """Log-bucketed latency histogram with constant memory per span name."""
+
+    __slots__ = ("buckets", "count", "total_ns", "max_ns", "allocs", "nodes")
+
+    def __init__(self) -> None:
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.allocs: Optional[int] = None  # Net memory blocks allocated over all calls, if counted
+        self.nodes: Optional[int] = None  # Node count of the latest call that had one
+
+    def record(self, elapsed_ns: int, allocs: Optional[int] = None,
+               nodes: Optional[int] = None) -> None:
+        """
+        Add one call.
+
+        Args:
+            elapsed_ns: Latency in nanoseconds
+            allocs: Net memory blocks allocated during the call, if counted
+            nodes: Number of nodes the call handled, if known
+        """
+        bucket = int(math.log2(elapsed_ns) * BUCKETS_PER_OCTAVE) if elapsed_ns > 0 else 0
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total_ns += elapsed_ns
+        self.max_ns = max(self.max_ns, elapsed_ns)
+        if allocs is not None:
+            self.allocs = (self.allocs or 0) + allocs
+        if nodes is not None:
+            self.nodes = nodes
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Estimate a latency percentile.
+
+        Args:
+            fraction: Percentile as a fraction, e.g. 0.95
+
+        Returns:
+            Upper bound of the bucket holding the percentile, in seconds
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                upper = 2 ** ((bucket + 1) / BUCKETS_PER_OCTAVE)
+                return min(upper, self.max_ns) / 1e9
+        return self.max_ns / 1e9
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the count, percentiles and totals as a JSON-ready dict."""
+        return {
+            "count": self.count,
+            "total_ms": self.total_ns / 1e6,
+            "p50_ms": self.percentile(0.50) * 1e3,
+            "p95_ms": self.percentile(0.95) * 1e3,
+            "p99_ms": self.percentile(0.99) * 1e3,
+            "max_ms": self.max_ns / 1e6,
+            "allocs": None if self.allocs is None else self.allocs / self.count,
+            "nodes": self.nodes,
+        }
+
+
+class Profiler:
+    """
+    Collects a histogram per span name and optionally traces every span.
+
+    Spans may end on any thread. Allocation counts are the change in
+    sys.getallocatedblocks() over a span, so they include whatever other
+    threads allocated meanwhile.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.histograms: Dict[str, Histogram] = {}
+        self.trace_path: Optional[str] = None
+        self._trace: Optional[IO[str]] = None
+        self._started = 0
+        self._lock = threading.Lock()
+
+    def enable(self, trace_path: Optional[str] = None) -> None:
+        """
+        Start recording.
+
+        Args:
+            trace_path: JSONL file to append a line per span to, if any
+        """
+        with self._lock:
+            if trace_path and self._trace is None:
+                self._trace = open(trace_path, "a", encoding="utf-8")
+                self.trace_path = trace_path
+            if not self.enabled:
+                if not self._started:
+                    # Close the trace however the process ends
+                    atexit.register(self.disable)
+                self._started = time.perf_counter_ns()
+                self.enabled = True
+
+    def disable(self) -> None:
+        """Stop recording and close the trace, ending it with a summary line."""
+        with self._lock:
+            self.enabled = False
+            if self._trace is not None:
+                self._trace.write(json.dumps({"summary": self._summaries()}) + "\n")
+                self._trace.close()
+                self._trace = None
+
+    def reset(self) -> None:
+        """Forget every recorded span."""
+        with self._lock:
+            self.histograms = {}
+
+    def record(self, name: str, elapsed_ns: int, allocs: Optional[int] = None,
+               nodes: Optional[int] = None) -> None:
+        """
+        Record one finished span.
+
+        Args:
+            name: Span name, e.g. "reduce.TOGGLE_INCLUDE"
+            elapsed_ns: Latency in nanoseconds
+            allocs: Net memory blocks allocated during the span, if counted
+            nodes: Number of nodes the span handled, if known
+        """
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.record(elapsed_ns, allocs, nodes)
+            if self._trace is not None:
+                event = {"t": (time.perf_counter_ns() - self._started) / 1e9,
+                         "name": name, "ms": elapsed_ns / 1e6}
+                if allocs is not None:
+                    event["allocs"] = allocs
+                if nodes is not None:
+                    event["nodes"] = nodes
+                self._trace.write(json.dumps(event) + "\n")
+
+    def _summaries(self) -> Dict[str, Dict[str, Any]]:
+        """Summarize every histogram; the caller holds the lock."""
+        return {name: histogram.summary() for name, histogram in self.histograms.items()}
+
+    def summaries(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Summarize every span name.
+
+        Returns:
+            Span name -> Histogram.summary(), slowest total first
+        """
+        with self._lock:
+            summaries = self._summaries()
+        return dict(sorted(summaries.items(), key=lambda item: -item[1]["total_ms"]))
+
+
+# The process-wide profiler every timed() wrapper records into
+profiler = Profiler()
+
+
+def enable_from_environment(trace_path: Optional[str] = None, force: bool = False) -> bool:
+    """
+    Turn on the profiler if asked to by arguments or the environment.
+
+    Args:
+        trace_path: Trace file given on the command line; overrides CLAUDIUS_TRACE
+        force: Record even without a trace file or CLAUDIUS_PROFILE
+
+    Returns:
+        True if the profiler is now enabled
+    """
+    trace_path = trace_path or os.environ.get(TRACE_ENV) or None
+    if force or trace_path or os.environ.get(PROFILE_ENV):
+        profiler.enable(trace_path)
+    return profiler.enabled
+
+
+def timed(name: str, key: Optional[Callable[..., str]] = None,
+          count: Optional[Callable[[Any], Optional[int]]] = None,
+          allocations: bool = True) -> Callable:
+    """
+    Decorate a function so each call is recorded while profiling is on.
+
+    Args:
+        name: Span name
+        key: Called with the function's arguments; its result is appended
+            to the name, e.g. the action type of a reducer call
+        count: Called with the function's result to get its node count
+        allocations: Count allocated blocks. This walks the heap's arenas,
+            which takes a while on large trees, so calls made many times a
+            frame or that enclose other spans turn it off.
+
+    Returns:
+        Decorator
+    """
+    def decorate(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            blocks = sys.getallocatedblocks() if allocations else None
+            start = time.perf_counter_ns()
+            result = func(*args, **kwargs)
+            elapsed = time.perf_counter_ns() - start
+            allocs = sys.getallocatedblocks() - blocks if allocations else None
+            span = name if key is None else f"{name}.{key(*args, **kwargs)}"
+            profiler.record(span, elapsed, allocs, count(result) if count else None)
+            return result
+        return wrapper
+    return decorate
+
+
+def format_summaries(summaries: Dict[str, Dict[str, Any]], limit: Optional[int] = None) -> List[str]:
+    """
+    Format span summaries as aligned text lines.
+
+    Args:
+        summaries: Output of Profiler.summaries()
+        limit: Maximum number of spans to list
+
+    Returns:
+        Header line followed by one line per span
+    """
+    lines = [f"{'span':<28} {'calls':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+             f"{'max ms':>8} {'allocs':>8} {'nodes':>8}"]
+    for name, s in list(summaries.items())[:limit]:
+        allocs = "" if s["allocs"] is None else f"{s['allocs']:.0f}"
+        nodes = "" if s["nodes"] is None else s["nodes"]
+        lines.append(f"{name[:28]:<28} {s['count']:>7} {s['p50_ms']:>8.2f} "
+                     f"{s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f} {s['max_ms']:>8.2f} "
+                     f"{allocs:>8} {nodes:>8}")
+    return lines
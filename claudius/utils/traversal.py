@@ -0,0 +1,134 @@
+"""
+Tree traversal for Claudius.
+Lazy generators over the edges map. Each walk keeps its own stack of child
+iterators instead of recursing, so no tree is too deep to walk, and a
+caller that stops early or slices a window only pays for what it reads.
+"""
+from typing import Dict, Iterator, List, Set, Tuple
+
+# Tree guide pieces for a row, and for the rows below it
+BRANCH, LAST_BRANCH = "├── ", "└── "
+PIPE, SPACE = "│   ", "    "
+
+
+def iter_visible(edges: Dict[str, List[str]], folders: Set[str],
+                 expanded_folders: Set[str], node: str = "") -> Iterator[str]:
+    """
+    Yield the rows below node in display order.
+
+    Args:
+        edges: Map of parent paths to child paths
+        folders: Set of paths that are folders
+        expanded_folders: Set of expanded folders
+        node: Folder whose visible descendants to walk ('' for the whole tree)
+
+    Yields:
+        Visible descendants of node, not including node itself
+    """
+    stack = [iter(edges.get(node, ()))]
+    while stack:
+        for child in stack[-1]:
+            yield child
+            if child in expanded_folders and child in folders:
+                children = edges.get(child)
+                if children:
+                    stack.append(iter(children))
+                    break
+        else:
+            stack.pop()
+
+
+def extend_visible(paths: List[str], guides: List[str], edges: Dict[str, List[str]],
+                   folders: Set[str], expanded_folders: Set[str], node: str = "",
+                   prefix: str = "") -> None:
+    """
+    Append the rows below node in display order, with the guide drawn before each.
+
+    Unlike iter_visible this fills both lists directly, since a flattened
+    tree with guides is always read in full. Siblings share their guide
+    strings, so the guides cost one string per folder rather than per row.
+
+    Args:
+        paths: List to append the rows to
+        guides: List to append their guides to, such as "│   └── "
+        edges: Map of parent paths to child paths
+        folders: Set of paths that are folders
+        expanded_folders: Set of expanded folders
+        node: Folder whose visible descendants to walk ('' for the whole tree)
+        prefix: Guide for the columns left of node's children ('' below the root)
+    """
+    children = edges.get(node)
+    if not children:
+        return
+    add_path, add_guide = paths.append, guides.append
+    # Each frame: (children iterator, last child, guide prefix)
+    stack = [(iter(children), children[-1], prefix)]
+    while stack:
+        it, last, prefix = stack[-1]
+        branch = prefix + BRANCH
+        for child in it:
+            add_path(child)
+            if child == last:
+                add_guide(prefix + LAST_BRANCH)
+                below = SPACE
+            else:
+                add_guide(branch)
+                below = PIPE
+            if child in expanded_folders and child in folders:
+                grandchildren = edges.get(child)
+                if grandchildren:
+                    stack.append((iter(grandchildren), grandchildren[-1], prefix + below))
+                    break
+        else:
+            stack.pop()
+
+
+def iter_descendants(edges: Dict[str, List[str]], node: str = "",
+                     ordered: bool = True) -> Iterator[str]:
+    """
+    Yield every path below node, expanded or not.
+
+    Args:
+        edges: Map of parent paths to child paths
+        node: Node whose descendants to walk ('' for the whole tree)
+        ordered: Yield in display order. Otherwise each folder's children
+            come out together, which is quicker when only the set matters.
+
+    Yields:
+        Descendants of node, not including node itself
+    """
+    if not ordered:
+        stack = [node]
+        while stack:
+            children = edges.get(stack.pop())
+            if children:
+                yield from children
+                stack.extend(children)
+        return
+
+    stack = [iter(edges.get(node, ()))]
+    while stack:
+        for child in stack[-1]:
+            yield child
+            children = edges.get(child)
+            if children:
+                stack.append(iter(children))
+                break
+        else:
+            stack.pop()
+
+
+def iter_ancestors(path: str) -> Iterator[str]:
+    """
+    Yield the ancestor folders of a path, closest first (root excluded).
+
+    Args:
+        path: File or folder path
+
+    Yields:
+        Ancestor paths
+    """
+    end = path.rfind("/")
+    while end > 0:
+        yield path[:end]
+        end = path.rfind("/", 0, end)
@@ -3,44 +3,101 @@ Main application class for Claudius.
 Handles the app lifecycle and user input.
 """
 import os
-import pkg_resources
-import asyncio
+import threading
+import time
+from functools import partial
+from concurrent.futures import Future, wait
+from importlib.resources import files
+from typing import Dict, Iterable, List, Optional
 from textual.app import App, ComposeResult
 from textual.widgets import Header, Footer
 from textual.containers import Container
-from textual import on
+from textual import on, work
+from textual.worker import get_current_worker
 
 from ..models.state import AppState, reducer, ActionType, get_initial_state
-from ..models.file_system import scan_filesystem, read_claudeignore, write_claudeignore
-from ..models.persistence import save_state, load_state
-from ..utils.calculations import get_visible_items
+from ..models.file_system import write_claudeignore, load_prune_matcher
+from ..models.loader import load_initial_data
+from ..models.scanner import ScanResult, list_folders, scan_subtree, scan_tree
+from ..models.path_index import PathIndex
+from ..models.persistence import StateWriter, get_token_cache_path
+from ..models.recording import SessionRecorder
+from ..models.stats import collect_file_stats, load_token_cache, write_token_cache
+from ..utils.calculations import get_ignore_lines, get_stats_summary, get_unloaded_folders
+from ..utils.profiling import timed
 from .file_tree import FileTree
+from .profile_overlay import ProfileOverlay
 from .status_bar import StatusBar
 
+# Shortest time between two UI updates
+FRAME_INTERVAL = 1 / 60
+# Shown while a subtree loads for an action
+LOADING_MESSAGE = "Loading..."
+
 
 class ClaudiusApp(App):
     """Textual app for managing .claudeignore files."""
 
     ENABLE_DEVTOOLS = True
 
-    CSS_PATH = pkg_resources.resource_filename(
-        "claudius.views", "claudius.css")
+    CSS_PATH = str(files("claudius.views") / "claudius.css")
 
     BINDINGS = [
         ("j", "move_down", "Move Down"),
         ("k", "move_up", "Move Up"),
+        ("pagedown", "page_down", "Page Down"),
+        ("pageup", "page_up", "Page Up"),
+        ("h", "select_parent", "Parent"),
+        ("slash", "find", "Find"),
+        ("n", "next_included", "Next Included"),
+        ("N", "previous_included", "Previous Included"),
+        ("m", "next_partial", "Next Partial"),
+        ("M", "previous_partial", "Previous Partial"),
         ("f", "toggle_folder", "Toggle Folder"),
         ("i", "toggle_include", "Toggle Include"),
         ("w", "write_file", "Write .claudeignore"),
         ("o", "expand_all", "Expand All"),
         ("p", "collapse_all", "Collapse All"),
+        ("f12", "toggle_profile", "Profile"),
         ("q", "quit", "Quit"),
     ]
 
-    def __init__(self):
+    def __init__(self, scan_workers: int = None, scan_processes: bool = False,
+                 lazy: bool = False, use_cache: bool = True,
+                 watch: bool = True, force_polling: bool = False,
+                 prune: bool = True, prune_patterns=(), use_gitignore: bool = True,
+                 compact: bool = False, collapse_ignore: bool = True,
+                 loading: Optional[Future] = None, record: Optional[str] = None):
         super().__init__()
         self.state = get_initial_state()
         self.root_dir = os.getcwd()
+        self.state_writer = StateWriter(self.root_dir, on_error=self.show_save_error)
+        self.ignore_lock = threading.Lock()
+        self.rendered_state = None  # State the widgets last showed
+        self.frame_pending = False
+        self.last_frame = 0.0
+        self.save_pending = False
+        self.path_index: Optional[PathIndex] = None
+        self.finder = None  # Finder screen while it is open
+        self.scan_workers = scan_workers
+        self.scan_processes = scan_processes
+        self.lazy = lazy
+        self.use_cache = use_cache
+        self.watch = watch
+        self.force_polling = force_polling
+        self.watcher = None
+        self.compact = compact
+        self.collapse_ignore = collapse_ignore
+        # Started by main() before Textual was imported, if at all
+        self.loading = loading
+        self.token_cache = None  # Loaded by the first collect_stats
+        self.token_cache_dirty = False  # Estimates added since the cache file was written
+        self.subtree_loads = {}  # Folder -> worker loading its subtree for an action
+        # Writes every dispatched action to this file, if given
+        self.recorder = SessionRecorder(record, self.root_dir) if record else None
+        self.prune = load_prune_matcher(
+            self.root_dir, prune_patterns,
+            use_defaults=prune, use_gitignore=use_gitignore)
 
     def compose(self) -> ComposeResult:
         """Compose the app with widgets."""
@@ -49,6 +106,7 @@ class ClaudiusApp(App):
         with Container(id="main"):
             yield FileTree()
 
+        yield ProfileOverlay()
         yield StatusBar()
         yield Footer()
 
@@ -58,34 +116,260 @@ class ClaudiusApp(App):
 
     def load_data(self) -> None:
         """Load initial data from filesystem and .claudeignore file."""
+        if self.loading is not None and not self.loading.done():
+            self.dispatch(ActionType.SET_NOTIFICATION, {"message": "Scanning..."})
+            self.wait_for_loading()
+            return
+        self.finish_loading()
+
+    @work(thread=True, group="load_data")
+    def wait_for_loading(self) -> None:
+        """Wait for the startup scan without blocking the event loop."""
+        wait([self.loading])
         try:
-            edges, folders = scan_filesystem(self.root_dir)
-            included_paths = read_claudeignore(self.root_dir)
-
-            # Load saved state
-            saved_state = load_state()
-            expanded_folders = saved_state['expanded_folders']
-
-            # Filter out any folders that don't exist anymore
-            valid_expanded_folders = {
-                folder for folder in expanded_folders if folder in folders}
-
-            # Get selected item, defaulting to first item if saved one doesn't exist
-            selected_item = saved_state['selected_item']
-            if selected_item not in edges.get('', []) and selected_item not in folders:
-                selected_item = next(iter(edges.get('', [])), None)
-
-            self.dispatch(ActionType.LOAD_DATA, {
-                "edges": edges,
-                "folders": folders,
-                "included_paths": included_paths,
-                "selected_item": selected_item,
-                "expanded_folders": valid_expanded_folders
-            })
+            self.call_from_thread(self.dispatch, ActionType.CLEAR_NOTIFICATION)
+            self.call_from_thread(self.finish_loading)
+        except RuntimeError:
+            pass  # App is shutting down
+
+    def finish_loading(self) -> None:
+        """Dispatch the loaded tree and start background work."""
+        try:
+            if self.loading is not None:
+                payload = self.loading.result()
+            else:
+                payload = load_initial_data(
+                    self.root_dir, self.prune, lazy=self.lazy,
+                    use_cache=self.use_cache, workers=self.scan_workers,
+                    use_processes=self.scan_processes, compact=self.compact)
+            self.dispatch(ActionType.LOAD_DATA, payload)
         except Exception as e:
             self.dispatch(ActionType.SET_NOTIFICATION, {
                           "message": f"Error loading data: {e}"})
+            return
+
+        if self.lazy:
+            self.fill_tree()
+        if self.watch:
+            self.start_watcher()
+        self.collect_stats()
+        self.build_path_index()
+
+    def start_watcher(self) -> None:
+        """Start watching the loaded folders for changes on disk."""
+        # Imported here: the watcher pulls in ctypes, which isn't needed to paint
+        from ..models.watcher import FileSystemWatcher
+
+        def on_actions(actions):
+            try:
+                self.call_from_thread(self.apply_actions, actions)
+            except RuntimeError:
+                pass  # App is shutting down
+
+        self.watcher = FileSystemWatcher(
+            self.root_dir,
+            get_state=lambda: self.state,
+            on_actions=on_actions,
+            force_polling=self.force_polling,
+            prune=self.prune)
+        self.watcher.start()
+
+    def apply_actions(self, actions) -> None:
+        """
+        Dispatch a batch of prebuilt actions.
+
+        Args:
+            actions: Actions, each a dict with a "type" key and its payload
+        """
+        for action in actions:
+            payload = dict(action)
+            self.dispatch(payload.pop("type"), payload)
+
+        # The reducer drops and moves the stats of removed and renamed
+        # nodes, so only inserted files need collecting
+        edges, paths = {}, []
+        for action in actions:
+            if action["type"] == ActionType.INSERT_NODES:
+                edges.update(action["edges"])
+                skip = action["folders"] | action.get("pruned_folders", set())
+                paths.extend(path for path in action["paths"] if path not in skip)
+        if edges or paths:
+            self.update_stats(edges, paths)
+
+    def ensure_loaded(self, path: str) -> None:
+        """
+        Make sure a folder's children have been listed.
+
+        Args:
+            path: Folder to load ('' for the root)
+        """
+        if not self.lazy or path in self.state.edges:
+            return
+        result = list_folders(self.root_dir, [path], self.prune)
+        self.dispatch(ActionType.MERGE_SCAN, {
+            "edges": result.edges,
+            "folders": result.folders,
+            "pruned_folders": result.pruned
+        })
+
+    def dispatch_when_loaded(self, path: str, action_type: str, payload: dict = None) -> None:
+        """
+        Dispatch an action that needs a folder's whole subtree to be listed.
+
+        In lazy mode the parts not listed yet are scanned in the background
+        behind a "Loading..." notification, and the action follows once they
+        are merged; otherwise it is dispatched right away.
+
+        Args:
+            path: Folder whose subtree the action needs ('' for the root)
+            action_type: Type of action to dispatch
+            payload: Action payload
+        """
+        if self.lazy and get_unloaded_folders(self.state.edges, self.state.folders, path):
+            self.dispatch(ActionType.SET_NOTIFICATION, {"message": LOADING_MESSAGE})
+            # A second request for the same folder replaces the first, so a
+            # double press scans once and dispatches its action once
+            self.subtree_loads[path] = self.run_worker(
+                partial(self.load_subtree, path, action_type, payload),
+                group=f"load_subtree:{path}", exclusive=True, thread=True)
+        else:
+            self.dispatch(action_type, payload)
+
+    def load_subtree(self, path: str, action_type: str, payload: dict = None) -> None:
+        """Scan the unlisted parts of a subtree, then dispatch the action waiting on it."""
+        worker = get_current_worker()
+        result = ScanResult()
+        for folder in get_unloaded_folders(self.state.edges, self.state.folders, path):
+            if worker.is_cancelled:
+                return
+            result.merge(scan_tree(self.root_dir, workers=self.scan_workers,
+                                   use_processes=self.scan_processes,
+                                   rel_path=folder, prune=self.prune))
+
+        def finish():
+            if worker.is_cancelled:
+                return  # Replaced by a newer request for this folder
+            del self.subtree_loads[path]
+            self.dispatch(ActionType.MERGE_SCAN, {
+                "edges": result.edges,
+                "folders": result.folders,
+                "pruned_folders": result.pruned
+            })
+            # Leave other messages, and the one for loads still running, in place
+            if not self.subtree_loads and self.state.notification == LOADING_MESSAGE:
+                self.dispatch(ActionType.CLEAR_NOTIFICATION)
+            self.dispatch(action_type, payload)
+            self.update_stats(result.edges)
+
+        try:
+            self.call_from_thread(finish)
+        except RuntimeError:
+            pass  # App is shutting down
+
+    @work(thread=True, exclusive=True, group="fill_tree")
+    def fill_tree(self) -> None:
+        """Load the rest of the tree in the background, one subtree at a time."""
+        worker = get_current_worker()
+        while not worker.is_cancelled:
+            unloaded = get_unloaded_folders(self.state.edges, self.state.folders)
+            if not unloaded:
+                try:
+                    self.call_from_thread(self.collect_stats)
+                except RuntimeError:
+                    pass  # App is shutting down
+                return
+
+            for folder in unloaded:
+                if worker.is_cancelled:
+                    return
+                if folder in self.state.edges:
+                    continue  # Loaded in the foreground meanwhile
+                result = scan_subtree(self.root_dir, folder, prune=self.prune)
+                try:
+                    self.call_from_thread(self.dispatch, ActionType.MERGE_SCAN, {
+                        "edges": result.edges,
+                        "folders": result.folders,
+                        "pruned_folders": result.pruned
+                    })
+                except RuntimeError:
+                    return  # App is shutting down
+
+    @work(thread=True, exclusive=True, group="file_stats")
+    def collect_stats(self) -> None:
+        """Collect file sizes and token estimates for the loaded tree in the background."""
+        worker = get_current_worker()
+        cache_path = get_token_cache_path(self.root_dir)
+        if self.token_cache is None:
+            self.token_cache = load_token_cache(cache_path)
+        stats, cache = collect_file_stats(
+            self.root_dir, self.state.edges, self.token_cache, workers=self.scan_workers)
+        if worker.is_cancelled:
+            return
+        if cache != self.token_cache:
+            self.token_cache = cache
+            write_token_cache(cache_path, cache)
+            self.token_cache_dirty = False
+        try:
+            self.call_from_thread(self.dispatch, ActionType.SET_FILE_STATS, {"stats": stats})
+        except RuntimeError:
+            pass  # App is shutting down
 
+    def update_stats(self, edges: Dict[str, List[str]], paths: Iterable[str] = ()) -> None:
+        """
+        Collect stats for files new to the tree and merge them into the collected ones.
+
+        Args:
+            edges: Newly listed folders, whose files are all new
+            paths: Other new files
+        """
+        if self.state.file_stats is None:
+            # The first collection may have listed the tree before these
+            # files arrived, so start it over instead
+            self.collect_stats()
+        else:
+            self.collect_new_stats(edges, list(paths))
+
+    @work(thread=True, group="new_file_stats")
+    def collect_new_stats(self, edges: Dict[str, List[str]], paths: List[str]) -> None:
+        """Collect stats for new files in the background (see update_stats)."""
+        stats, cache = collect_file_stats(self.root_dir, edges, self.token_cache,
+                                          workers=self.scan_workers, paths=paths)
+        # Rewriting the whole cache file for a few files isn't worth it; new
+        # estimates are written with the next full collection, or on exit
+        if any(self.token_cache.get(path) != entry for path, entry in cache.items()):
+            self.token_cache.update(cache)
+            self.token_cache_dirty = True
+        if stats:
+            try:
+                self.call_from_thread(self.dispatch, ActionType.UPDATE_FILE_STATS, {"stats": stats})
+            except RuntimeError:
+                pass  # App is shutting down
+
+    @work(thread=True, exclusive=True, group="path_index")
+    def build_path_index(self) -> None:
+        """Index every loaded path for the finder in the background."""
+        worker = get_current_worker()
+        index = PathIndex.build(self.state.edges)
+        if worker.is_cancelled:
+            return
+        try:
+            self.call_from_thread(self.set_path_index, index)
+        except RuntimeError:
+            pass  # App is shutting down
+
+    def set_path_index(self, index: PathIndex) -> None:
+        """
+        Use a newly built path index, also in an open finder.
+
+        Args:
+            index: The new index
+        """
+        self.path_index = index
+        if self.finder is not None:
+            self.finder.set_index(index)
+
+    @timed("dispatch", key=lambda self, action_type, payload=None: action_type,
+           allocations=False)
     def dispatch(self, action_type: str, payload: dict = None) -> None:
         """
         Dispatch an action to update state.
@@ -95,35 +379,75 @@ class ClaudiusApp(App):
             payload: Action payload
         """
         action = {"type": action_type, **(payload or {})}
+        if self.recorder is not None:
+            self.recorder.record(action)
         new_state = reducer(self.state, action)
         self.state = new_state
 
-        # Update UI based on new state
-        self.update_ui()
-
         # Save state for certain actions
         if action_type in [
             ActionType.TOGGLE_EXPAND,
             ActionType.EXPAND_ALL,
             ActionType.COLLAPSE_ALL,
-            ActionType.MOVE_SELECTION
+            ActionType.MOVE_SELECTION,
+            ActionType.REVEAL_PATH
         ]:
+            self.save_pending = True
+
+        # Update UI based on new state, at most once per frame
+        self.schedule_frame()
+
+    def schedule_frame(self) -> None:
+        """Arrange for render_frame to run once the current frame interval is over."""
+        if self.frame_pending:
+            return
+        self.frame_pending = True
+        delay = self.last_frame + FRAME_INTERVAL - time.monotonic()
+        if delay > 0:
+            self.set_timer(delay, self.render_frame)
+        else:
+            # Runs after the events already queued, so a burst still coalesces
+            self.call_later(self.render_frame)
+
+    @timed("frame", allocations=False)
+    def render_frame(self) -> None:
+        """Show every action dispatched since the last frame in one UI update."""
+        self.frame_pending = False
+        self.last_frame = time.monotonic()
+        self.update_ui()
+        if self.save_pending:
+            self.save_pending = False
             self.save_state()
 
     def update_ui(self) -> None:
-        """Update UI components based on current state."""
+        """Update the UI components whose part of the state changed."""
+        state, previous = self.state, self.rendered_state
+        if state is previous:
+            return
+        self.rendered_state = state
+
         file_tree = self.query_one(FileTree)
-        file_tree.update_from_state(self.state)
+        file_tree.update_from_state(state)
 
         status_bar = self.query_one(StatusBar)
-        if self.state.notification:
-            status_bar.update_message(self.state.notification)
+        if (previous is None or previous.included_paths is not state.included_paths
+                or previous.file_stats is not state.file_stats):
+            status_bar.update_stats(get_stats_summary(state))
+        if state.notification:
+            status_bar.update_message(state.notification)
         else:
             status_bar.clear_message()
 
+    def show_save_error(self, message: str) -> None:
+        """Show a failed state save, reported from the writer thread."""
+        try:
+            self.call_from_thread(self.dispatch, ActionType.SET_NOTIFICATION, {"message": message})
+        except RuntimeError:
+            pass  # App is shutting down, or this is the final save on its own thread
+
     def save_state(self) -> None:
-        """Save current state to persistent storage."""
-        save_state(
+        """Schedule a write-behind save of the current state."""
+        self.state_writer.save(
             expanded_folders=self.state.expanded_folders,
             selected_item=self.state.selected_item
         )
@@ -136,33 +460,130 @@ class ClaudiusApp(App):
         """Move selection up one item."""
         self.dispatch(ActionType.MOVE_SELECTION, {"direction": "up"})
 
+    def action_page_down(self) -> None:
+        """Move selection down one screen."""
+        self.dispatch(ActionType.MOVE_SELECTION, {
+                      "direction": "page_down", "count": self.page_size()})
+
+    def action_page_up(self) -> None:
+        """Move selection up one screen."""
+        self.dispatch(ActionType.MOVE_SELECTION, {
+                      "direction": "page_up", "count": self.page_size()})
+
+    def action_select_parent(self) -> None:
+        """Move selection to the parent folder."""
+        self.dispatch(ActionType.MOVE_SELECTION, {"direction": "parent"})
+
+    def action_next_included(self) -> None:
+        """Move selection to the next included item."""
+        self.dispatch(ActionType.MOVE_SELECTION, {"direction": "next_included"})
+
+    def action_previous_included(self) -> None:
+        """Move selection to the previous included item."""
+        self.dispatch(ActionType.MOVE_SELECTION, {"direction": "previous_included"})
+
+    def action_next_partial(self) -> None:
+        """Move selection to the next partially included folder."""
+        self.dispatch(ActionType.MOVE_SELECTION, {"direction": "next_partial"})
+
+    def action_previous_partial(self) -> None:
+        """Move selection to the previous partially included folder."""
+        self.dispatch(ActionType.MOVE_SELECTION, {"direction": "previous_partial"})
+
+    def action_find(self) -> None:
+        """Open the finder to jump to any path."""
+        # Imported here: the finder's widgets aren't needed to paint the tree
+        from .finder import FinderScreen
+
+        if self.finder is not None:
+            return
+        # Reindex if the tree changed; the old index serves until then
+        if self.path_index is None or self.path_index.edges is not self.state.edges:
+            self.build_path_index()
+        self.finder = FinderScreen(self.path_index, self.path_exists)
+        self.push_screen(self.finder, self.reveal_path)
+
+    def path_exists(self, path: str) -> bool:
+        """
+        Check whether a path is in the current tree.
+
+        Args:
+            path: Path to look for
+
+        Returns:
+            True if the path's parent lists it
+        """
+        return path in self.state.edges.get(path.rpartition("/")[0], ())
+
+    def reveal_path(self, path: Optional[str]) -> None:
+        """
+        Select a path chosen in the finder, expanding its ancestors.
+
+        Args:
+            path: Chosen path, or None if the finder was closed
+        """
+        self.finder = None
+        if path is not None:
+            self.dispatch(ActionType.REVEAL_PATH, {"path": path})
+
+    def page_size(self) -> int:
+        """Return the number of rows the file tree shows at once."""
+        return max(1, self.query_one(FileTree).scrollable_content_region.height - 1)
+
     def action_toggle_folder(self) -> None:
         """Toggle expansion of selected folder."""
         if self.state.selected_item in self.state.folders:
+            self.ensure_loaded(self.state.selected_item)
             self.dispatch(ActionType.TOGGLE_EXPAND, {
                           "path": self.state.selected_item})
 
     def action_toggle_include(self) -> None:
         """Toggle selection of current item."""
-        self.dispatch(ActionType.TOGGLE_INCLUDE, {
-                      "path": self.state.selected_item})
+        # Recursive includes need the whole subtree, even parts not shown yet
+        path = self.state.selected_item
+        if path in self.state.folders:
+            self.dispatch_when_loaded(path, ActionType.TOGGLE_INCLUDE, {"path": path})
+        else:
+            self.dispatch(ActionType.TOGGLE_INCLUDE, {"path": path})
 
     def action_expand_all(self) -> None:
         """Expand all folders."""
-        self.dispatch(ActionType.EXPAND_ALL)
+        self.dispatch_when_loaded("", ActionType.EXPAND_ALL)
 
     def action_collapse_all(self) -> None:
         """Collapse all folders."""
         self.dispatch(ActionType.COLLAPSE_ALL)
 
+    def action_toggle_profile(self) -> None:
+        """Show or hide the profile overlay."""
+        self.query_one(ProfileOverlay).toggle()
+
     def action_write_file(self) -> None:
         """Write included paths to .claudeignore file."""
+        if self.recorder is not None:
+            self.recorder.record_command("write_file")
         self.write_ignore_file()
 
+    @work(thread=True, group="write_ignore")
     def write_ignore_file(self) -> None:
-        """Write included paths to .claudeignore file."""
-        success = write_claudeignore(self.root_dir, self.state.included_paths)
+        """Write included paths to .claudeignore file in the background."""
+        # Writes run one at a time, each with the newest state, so a
+        # slow earlier write can never land after a later one
+        with self.ignore_lock:
+            patterns, entries = get_ignore_lines(self.state, collapse=self.collapse_ignore)
+            success = write_claudeignore(self.root_dir, entries, patterns)
+        try:
+            self.call_from_thread(self.show_write_result, success)
+        except RuntimeError:
+            pass  # App is shutting down
 
+    def show_write_result(self, success: bool) -> None:
+        """
+        Report the outcome of writing .claudeignore.
+
+        Args:
+            success: Whether the write succeeded
+        """
         if success:
             self.dispatch(ActionType.SET_NOTIFICATION, {
                           "message": "Saved to .claudeignore"})
@@ -178,5 +599,15 @@ class ClaudiusApp(App):
 
     def on_unmount(self) -> None:
         """Handle app unmounting event."""
-        # Save state when the app is closed
+        if self.watcher is not None:
+            self.watcher.stop()
+        # Let a .claudeignore write in progress finish
+        with self.ignore_lock:
+            pass
+        # Write out any state still pending when the app is closed
         self.save_state()
+        if self.token_cache_dirty:
+            write_token_cache(get_token_cache_path(self.root_dir), self.token_cache)
+        self.state_writer.close()
+        if self.recorder is not None:
+            self.recorder.close()
@@ -1,97 +1,234 @@
 """
 File tree widget for Claudius.
-Renders the file tree with appropriate styling.
+Renders the file tree line by line, drawing only the rows in the viewport.
 """
-from rich.console import RenderableType
-from rich.text import Text
-from rich.tree import Tree
-from textual.widget import Widget
+from typing import Dict, List, Optional
+
+from rich.cells import cell_len
+from rich.segment import Segment
+from rich.style import Style
+from textual.geometry import Region, Size
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
 
 from ..models.state import AppState
-from ..utils.calculations import get_display_name
+from ..models.visible_rows import VisibleRows
+from ..utils.calculations import (
+    get_display_name, get_inclusion_state, get_stats_label)
+from ..utils.profiling import timed
+
+GUIDE_STYLE = Style(dim=True)
+INCLUDED_STYLE = Style(bold=True, color="green")
+PARTIAL_STYLE = Style(color="yellow")
+PARTIAL_SUFFIX = " (partial)"
+SELECTED_STYLE = Style(reverse=True)
+PRUNED_STYLE = Style(dim=True)
+PRUNED_SUFFIX = " (pruned)"
+STATS_STYLE = Style(dim=True, italic=True)
+STATS_GAP = "  "
+
+
+def get_guide(edges: Dict[str, List[str]], path: str) -> str:
+    """
+    Build the tree guide drawn in front of a row by walking its ancestors.
+
+    VisibleRows keeps these for every visible row; this is for one-off rows.
 
+    Args:
+        edges: Map of parent paths to child paths
+        path: Path of the row
 
-class FileTree(Widget):
+    Returns:
+        Guide prefix such as "│   ├── "
+    """
+    parts = []
+    node = path
+    while node:
+        parent = node.rpartition("/")[0]
+        siblings = edges.get(parent)
+        is_last = not siblings or siblings[-1] == node
+        if node == path:
+            parts.append("└── " if is_last else "├── ")
+        else:
+            parts.append("    " if is_last else "│   ")
+        node = parent
+    return "".join(reversed(parts))
+
+
+def get_row_width(state: AppState, path: str) -> int:
+    """Return the width of a row in cells."""
+    if not path:
+        return 4
+    depth = path.count("/") + 1
+    width = 4 * depth + 3 + cell_len(get_display_name(path))
+    if path in state.pruned_folders:
+        width += len(PRUNED_SUFFIX)
+    if get_inclusion_state(state, path) == "partial":
+        width += len(PARTIAL_SUFFIX)
+    label = get_stats_label(state, path)
+    if label:
+        width += len(STATS_GAP) + cell_len(label)
+    return width
+
+
+class FileTree(ScrollView):
     """Widget for displaying the file tree."""
 
     DEFAULT_CSS = """
     FileTree {
         width: 1fr;
         height: 1fr;
-        overflow: auto;
     }
     """
 
     def __init__(self, name: str = None) -> None:
         super().__init__(name=name)
         self.state = None
+        self.rows: Optional[VisibleRows] = None
+        self._width = 0
 
+    @timed("tree.update", allocations=False)
     def update_from_state(self, state: AppState) -> None:
         """
         Update view from app state.
 
+        The viewport is repainted when the visible rows or the inclusion
+        changed; a selection move repaints just the two affected lines.
+        Any other change leaves the tree alone.
+
         Args:
             state: Current application state
         """
+        previous = self.state
         self.state = state
-        self.refresh()
 
-    def render(self) -> RenderableType:
+        rows = state.get_visible_rows()
+        if rows is not self.rows:
+            self.rows = rows
+            self._width = 0
+            self.refresh()
+        elif (previous is None or previous.included_paths is not state.included_paths
+              or previous.pruned_folders is not state.pruned_folders
+              or previous.file_stats is not state.file_stats):
+            self._width = 0  # Labels change width
+            self.refresh()
+        elif previous.selected_item != state.selected_item:
+            self.refresh_row(previous.selected_item)
+            self.refresh_row(state.selected_item)
+        else:
+            return  # Nothing shown here changed
+
+        self.scroll_to_selected()
+        self.fit_virtual_size()
+
+    def fit_virtual_size(self) -> None:
         """
-        Render the file tree.
+        Size the scrollable area to the rows.
 
-        Returns:
-            Rich renderable
+        Only rows near the viewport are measured, so the width grows as
+        wider rows scroll into view instead of costing a pass over all rows.
         """
-        if not self.state:
-            return Text("Loading...")
-
-        # Start with a root tree
-        tree = Tree("📁 .")
-
-        # Build a nested tree structure from the flat edges
-        self._build_tree(tree, "", 0)
-
-        return tree
-
-    def _build_tree(self, tree, current_path, level):
+        if self.rows is None:
+            return
+        top = max(0, self.scroll_offset.y)
+        height = max(self.size.height, 1)
+        width = self._width
+        for path in self.rows.paths[top:top + 2 * height]:
+            width = max(width, get_row_width(self.state, path))
+        self._width = width
+        size = Size(width, len(self.rows))
+        if size != self.virtual_size:
+            self.virtual_size = size
+
+    def watch_scroll_y(self, old_value: float, new_value: float) -> None:
+        """Measure rows that scrolled into view."""
+        super().watch_scroll_y(old_value, new_value)
+        self.fit_virtual_size()
+
+    def refresh_row(self, path: Optional[str]) -> None:
         """
-        Recursively build the tree structure.
+        Repaint the row showing path, if it is on screen.
 
         Args:
-            tree: The current tree node
-            current_path: The current path being processed
-            level: The current indentation level
+            path: Path of the row
         """
-        # Skip if not visible (parent folder not expanded)
-        if level > 0 and (not current_path or current_path not in self.state.expanded_folders):
+        row = self.rows.index(path)
+        if row is None:
+            return
+        y = row - self.scroll_offset.y
+        if 0 <= y < self.size.height:
+            self.refresh(Region(0, y, self.size.width, 1))
+
+    def scroll_to_selected(self) -> None:
+        """Scroll just enough to keep the selected row in view."""
+        row = self.rows.index(self.state.selected_item)
+        if row is None:
             return
+        top = self.scroll_offset.y
+        height = self.scrollable_content_region.height
+        if row < top:
+            self.scroll_to(y=row, animate=False, immediate=True)
+        elif height and row >= top + height:
+            self.scroll_to(y=row - height + 1, animate=False, immediate=True)
+
+    @timed("tree.render_line", allocations=False)
+    def render_line(self, y: int) -> Strip:
+        """
+        Render one line of the file tree.
+
+        Args:
+            y: Line number relative to the top of the widget
 
-        # Add children
-        for child in self.state.edges.get(current_path, []):
-            is_folder = child in self.state.folders
-            is_included = child in self.state.included_paths
-            is_selected = child == self.state.selected_item
-            is_expanded = child in self.state.expanded_folders
-
-            # Determine icon
-            icon = "📁 " if is_folder else "📄 "
-            if is_folder and is_expanded:
-                icon = "📂 "  # Open folder icon
-
-            # Create display text
-            display_name = get_display_name(child)
-            text = Text(f"{icon}{display_name}")
-
-            # Apply styling
-            if is_included:
-                text.stylize("bold green")
-            if is_selected:
-                text.stylize("reverse")
-
-            # Add to tree
-            child_tree = tree.add(text)
-
-            # Recursively add children if it's a folder
-            if is_folder:
-                self._build_tree(child_tree, child, level + 1)
+        Returns:
+            Strip for the line
+        """
+        scroll_x, scroll_y = self.scroll_offset
+        width = self.size.width
+        base_style = self.rich_style
+        index = scroll_y + y
+
+        if not self.state:
+            segments = [Segment("Loading...")] if index == 0 else []
+            return Strip(segments).crop_extend(scroll_x, scroll_x + width, base_style)
+        if index >= len(self.rows):
+            return Strip.blank(width, base_style)
+
+        path = self.rows[index]
+        if not path:
+            segments = [Segment("📁 .")]
+        else:
+            segments = self._render_row(path, self.rows.guides[index])
+        strip = Strip(segments).apply_style(base_style)
+        return strip.crop_extend(scroll_x, scroll_x + width, base_style)
+
+    def _render_row(self, path: str, guide: str) -> List[Segment]:
+        """Build the segments for one node."""
+        state = self.state
+        is_folder = path in state.folders
+        is_pruned = path in state.pruned_folders
+
+        # Determine icon
+        icon = "📁 " if is_folder or is_pruned else "📄 "
+        if is_folder and path in state.expanded_folders:
+            icon = "📂 "  # Open folder icon
+
+        # Apply styling
+        style = Style()
+        inclusion = get_inclusion_state(state, path)
+        if inclusion == "full":
+            style += INCLUDED_STYLE
+        elif inclusion == "partial":
+            style += PARTIAL_STYLE
+        if path == state.selected_item:
+            style += SELECTED_STYLE
+
+        segments = [Segment(guide, GUIDE_STYLE),
+                    Segment(f"{icon}{get_display_name(path)}", style)]
+        if is_pruned:
+            segments.append(Segment(PRUNED_SUFFIX, style + PRUNED_STYLE))
+        if inclusion == "partial":
+            segments.append(Segment(PARTIAL_SUFFIX, style))
+        label = get_stats_label(state, path)
+        if label:
+            segments.append(Segment(STATS_GAP + label, STATS_STYLE))
+        return segments
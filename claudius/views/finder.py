@@ -0,0 +1,135 @@
+"""
+Fuzzy finder for Claudius.
+A modal screen that searches a PathIndex as you type and returns the
+chosen path to the app.
+"""
+from typing import Callable, Optional
+from rich.text import Text
+from textual import on, work
+from textual.app import ComposeResult
+from textual.containers import Vertical
+from textual.screen import ModalScreen
+from textual.widgets import Input, OptionList
+from textual.widgets.option_list import Option
+from textual.worker import get_current_worker
+
+from ..models.path_index import PathIndex
+
+
+class FinderScreen(ModalScreen):
+    """Modal screen for jumping to any path in the tree."""
+
+    DEFAULT_CSS = """
+    FinderScreen {
+        align: center top;
+    }
+
+    FinderScreen #finder {
+        width: 80%;
+        height: auto;
+        max-height: 80%;
+        margin-top: 2;
+        background: $surface;
+        border: round $accent;
+    }
+
+    FinderScreen OptionList {
+        height: auto;
+        max-height: 20;
+        border: none;
+    }
+    """
+
+    BINDINGS = [
+        ("escape", "close", "Close"),
+        ("down", "cursor_down", "Next"),
+        ("up", "cursor_up", "Previous"),
+    ]
+
+    def __init__(self, index: Optional[PathIndex], exists: Callable[[str], bool]) -> None:
+        """
+        Args:
+            index: Index to search, or None while it is being built
+            exists: Whether a path is still in the tree; the index may be older
+        """
+        super().__init__()
+        self.index = index
+        self.exists = exists
+
+    def compose(self) -> ComposeResult:
+        """Create child widgets."""
+        with Vertical(id="finder"):
+            yield Input(placeholder="Find a file or folder")
+            yield OptionList()
+
+    def set_index(self, index: PathIndex) -> None:
+        """
+        Search a newly built index with the current query.
+
+        Args:
+            index: Index to search from now on
+        """
+        self.index = index
+        self.search(self.query_one(Input).value)
+
+    @on(Input.Changed)
+    def on_query_changed(self, event: Input.Changed) -> None:
+        """Search again whenever the query changes."""
+        self.search(event.value)
+
+    @work(thread=True, exclusive=True, group="finder")
+    def search(self, query: str) -> None:
+        """Run a query off the event loop; a newer query supersedes it."""
+        if self.index is None:
+            results = None
+        else:
+            results = [path for path in self.index.search(query) if self.exists(path)]
+        if get_current_worker().is_cancelled:
+            return
+        try:
+            self.app.call_from_thread(self.show_results, results)
+        except RuntimeError:
+            pass  # App is shutting down
+
+    def show_results(self, results: Optional[list]) -> None:
+        """
+        Replace the listed results.
+
+        Args:
+            results: Matching paths, best first, or None while indexing
+        """
+        option_list = self.query_one(OptionList)
+        option_list.clear_options()
+        if results is None:
+            option_list.add_option(Option("Indexing...", disabled=True))
+            return
+        option_list.add_options(Option(Text(path), id=path) for path in results)
+        if results:
+            option_list.highlighted = 0
+
+    def action_cursor_down(self) -> None:
+        """Highlight the next result."""
+        self.query_one(OptionList).action_cursor_down()
+
+    def action_cursor_up(self) -> None:
+        """Highlight the previous result."""
+        self.query_one(OptionList).action_cursor_up()
+
+    def action_close(self) -> None:
+        """Close without choosing a path."""
+        self.dismiss(None)
+
+    @on(Input.Submitted)
+    def on_query_submitted(self) -> None:
+        """Choose the highlighted result."""
+        option_list = self.query_one(OptionList)
+        if option_list.highlighted is not None:
+            option = option_list.get_option_at_index(option_list.highlighted)
+            if option.id is not None:
+                self.dismiss(option.id)
+
+    @on(OptionList.OptionSelected)
+    def on_option_selected(self, event: OptionList.OptionSelected) -> None:
+        """Choose a clicked result."""
+        if event.option.id is not None:
+            self.dismiss(event.option.id)
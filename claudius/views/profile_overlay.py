@@ -0,0 +1,69 @@
+"""
+Profile overlay widget for Claudius.
+Shows the latency histograms the profiler has recorded, refreshed while visible.
+"""
+from rich.console import RenderableType
+from rich.text import Text
+from textual.widget import Widget
+
+from ..utils.profiling import format_summaries, profiler
+
+# Seconds between refreshes while the overlay is shown
+REFRESH_INTERVAL = 0.5
+# Spans listed, slowest total first
+MAX_SPANS = 40
+
+
+class ProfileOverlay(Widget):
+    """Panel listing p50/p95/p99 latency, allocations and node counts per span."""
+
+    DEFAULT_CSS = """
+    ProfileOverlay {
+        dock: right;
+        width: 86;
+        height: 1fr;
+        display: none;
+        background: $panel;
+        color: $text;
+        padding: 0 1;
+    }
+    """
+
+    def __init__(self, name: str = None) -> None:
+        super().__init__(name=name)
+        self.timer = None
+
+    def on_mount(self) -> None:
+        """Set up the refresh timer, paused until the overlay is shown."""
+        self.timer = self.set_interval(REFRESH_INTERVAL, self.refresh, pause=True)
+
+    def toggle(self) -> None:
+        """Show or hide the overlay; showing it turns the profiler on."""
+        self.display = not self.display
+        if self.display:
+            profiler.enable()
+            self.timer.resume()
+            self.refresh()
+        else:
+            self.timer.pause()
+
+    def render(self) -> RenderableType:
+        """
+        Render the recorded spans.
+
+        Returns:
+            Rich renderable
+        """
+        text = Text()
+        title = "Profile"
+        if profiler.trace_path:
+            title += f" (tracing to {profiler.trace_path})"
+        text.append(title + "\n", style="bold")
+        summaries = profiler.summaries()
+        if not summaries:
+            text.append("Nothing recorded yet", style="italic")
+            return text
+        lines = format_summaries(summaries, limit=MAX_SPANS)
+        text.append(lines[0] + "\n", style="bold")
+        text.append("\n".join(lines[1:]))
+        return text
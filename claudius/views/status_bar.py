@@ -1,11 +1,13 @@
 """
 Status bar widget for Claudius.
-Displays notifications and key bindings.
+Displays notifications, included size and tokens, and key bindings.
 """
 from rich.console import RenderableType
 from rich.text import Text
 from textual.widget import Widget
 
+from ..utils.profiling import timed
+
 
 class StatusBar(Widget):
     """Status bar widget for displaying notifications."""
@@ -27,6 +29,7 @@ class StatusBar(Widget):
     def __init__(self, name: str = None) -> None:
         super().__init__(name=name)
         self.message = None
+        self.stats = None
 
     def update_message(self, message: str) -> None:
         """
@@ -35,16 +38,32 @@ class StatusBar(Widget):
         Args:
             message: Message to display
         """
+        if message == self.message:
+            return
         self.message = message
         self.add_class("notification")
         self.refresh()
 
     def clear_message(self) -> None:
         """Clear the status message."""
+        if self.message is None:
+            return
         self.message = None
         self.remove_class("notification")
         self.refresh()
 
+    def update_stats(self, stats: str) -> None:
+        """
+        Update the summary of what is included.
+
+        Args:
+            stats: Text such as "1.2k of 9.8k tokens included", or None
+        """
+        if stats != self.stats:
+            self.stats = stats
+            self.refresh()
+
+    @timed("status.render", allocations=False)
     def render(self) -> RenderableType:
         """
         Render the status bar.
@@ -58,6 +77,7 @@ class StatusBar(Widget):
         # Show key bindings when no message is displayed
         keys = [
             ("j/k", "Navigate"),
+            ("/", "Find"),
             ("Tab", "Toggle Folder"),
             ("Enter", "Toggle Include"),
             ("w", "Write .claudeignore"),
@@ -67,6 +87,9 @@ class StatusBar(Widget):
         ]
 
         help_text = Text(" ")
+        if self.stats:
+            help_text.append(self.stats, style="bold")
+            help_text.append(" | ", style="dim")
         for key, description in keys:
             help_text.append(key, style="bold")
             help_text.append(f": {description} ", style="italic")